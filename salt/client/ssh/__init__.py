@@ -2,8 +2,10 @@
 Create ssh executor system
 """
 
+import asyncio
 import base64
 import binascii
+import concurrent.futures
 import copy
 import datetime
 import getpass
@@ -57,6 +59,20 @@ try:
 except ImportError:
     HAS_WINSHELL = False
 
+try:
+    import resource
+
+    HAS_RESOURCE = True
+except ImportError:
+    # resource is not available on windows
+    HAS_RESOURCE = False
+
+# File descriptors each ssh_async connection may hold in the salt-ssh
+# process: the stdout and stderr pipes of the ssh command, and their child
+# ends while it is spawned. Some are left for everything else.
+ASYNC_FDS_PER_CONN = 4
+ASYNC_FDS_RESERVED = 64
+
 # The directory where salt thin is deployed
 DEFAULT_THIN_DIR = "/var/tmp/.%%USER%%_%%FQDNUUID%%_salt"
 
@@ -305,14 +321,23 @@ class SSH:
         self.serial = salt.payload.Serial(opts)
         self.returners = salt.loader.returners(self.opts, {})
         self.fsclient = salt.fileclient.FSClient(self.opts)
-        self.thin = salt.utils.thin.gen_thin(
-            self.opts["cachedir"],
-            extra_mods=self.opts.get("thin_extra_mods"),
-            overwrite=self.opts["regen_thin"],
-            python2_bin=self.opts["python2_bin"],
-            python3_bin=self.opts["python3_bin"],
-            extended_cfg=self.opts.get("ssh_ext_alternatives"),
-        )
+        if self.opts.get("ssh_thin_layers"):
+            salt.utils.thin.gen_thin_layers(
+                self.opts["cachedir"],
+                extra_mods=self.opts.get("thin_extra_mods"),
+                overwrite=self.opts["regen_thin"],
+                extended_cfg=self.opts.get("ssh_ext_alternatives"),
+            )
+            self.thin = salt.utils.thin.thin_path(self.opts["cachedir"])
+        else:
+            self.thin = salt.utils.thin.gen_thin(
+                self.opts["cachedir"],
+                extra_mods=self.opts.get("thin_extra_mods"),
+                overwrite=self.opts["regen_thin"],
+                python2_bin=self.opts["python2_bin"],
+                python3_bin=self.opts["python3_bin"],
+                extended_cfg=self.opts.get("ssh_ext_alternatives"),
+            )
         self.mods = mod_data(self.fsclient)
 
     @property
@@ -338,12 +363,17 @@ class SSH:
         """
         roster_file = salt.roster.get_roster_file(self.opts)
         if roster_file not in self.__parsed_rosters:
-            roster_data = compile_template(
+            roster_data = salt.roster.cached_roster(
+                self.opts,
+                "flat",
                 roster_file,
-                salt.loader.render(self.opts, {}),
-                self.opts["renderer"],
-                self.opts["renderer_blacklist"],
-                self.opts["renderer_whitelist"],
+                lambda: compile_template(
+                    roster_file,
+                    salt.loader.render(self.opts, {}),
+                    self.opts["renderer"],
+                    self.opts["renderer_blacklist"],
+                    self.opts["renderer_whitelist"],
+                ),
             )
             self.__parsed_rosters[roster_file] = roster_data
         return roster_file
@@ -548,29 +578,150 @@ class SSH:
         stdout, stderr, retcode = single.run()
         logging._releaseLock()
         # This job is done, yield
-        try:
-            data = salt.utils.json.find_json(stdout)
-            if len(data) < 2 and "local" in data:
-                ret["ret"] = data["local"]
-            else:
-                ret["ret"] = {
-                    "stdout": stdout,
-                    "stderr": stderr,
-                    "retcode": retcode,
-                }
-        except Exception:  # pylint: disable=broad-except
-            ret["ret"] = {
-                "stdout": stdout,
-                "stderr": stderr,
-                "retcode": retcode,
-            }
+        ret["ret"] = _routine_ret(stdout, stderr, retcode)
         que.put(ret)
 
+    def _prep_target(self, host):
+        """
+        Apply the defaults to a target, return the return of the targets
+        which can not be run
+        """
+        for default in self.defaults:
+            if default not in self.targets[host]:
+                self.targets[host][default] = self.defaults[default]
+        if "host" not in self.targets[host]:
+            self.targets[host]["host"] = host
+        if self.targets[host].get("winrm") and not HAS_WINSHELL:
+            log_msg = "Please contact sales@saltstack.com for access to the enterprise saltwinshell module."
+            log.debug(log_msg)
+            return {
+                "fun_args": [],
+                "jid": None,
+                "return": log_msg,
+                "retcode": 1,
+                "fun": "",
+                "id": host,
+            }
+        return None
+
+    async def _run_routine_async(self, loop, pool, host, mine=False):
+        """
+        Run the routine of a target in the event loop, or in the process pool
+        when it needs a terminal or runs wrapper functions, and return its
+        return
+        """
+        target = self.targets[host]
+        if not target.get("winrm"):
+            # Single only sets top level options
+            opts = copy.copy(self.opts)
+            single = Single(
+                opts,
+                opts["argv"],
+                host,
+                mods=self.mods,
+                fsclient=self.fsclient,
+                thin=self.thin,
+                mine=mine,
+                **target
+            )
+            if single.can_run_async():
+                return _routine_ret(*(await single.run_async()))
+        return await loop.run_in_executor(
+            pool, _pool_routine, self.opts, host, target, mine, self.mods, self.thin
+        )
+
+    def _async_max_conns(self):
+        """
+        Return ``ssh_async_max_conns``, lowered so that the connections fit
+        in the open file limit of the process
+        """
+        max_conns = self.opts.get("ssh_async_max_conns", 100)
+        if not HAS_RESOURCE:
+            return max_conns
+        mof_s, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if mof_s == resource.RLIM_INFINITY:
+            return max_conns
+        fd_conns = max(1, (mof_s - ASYNC_FDS_RESERVED) // ASYNC_FDS_PER_CONN)
+        if fd_conns < max_conns:
+            log.warning(
+                "Running %s ssh_async connections at a time instead of %s, "
+                "to stay under the open file limit of %s",
+                fd_conns,
+                max_conns,
+                mof_s,
+            )
+            return fd_conns
+        return max_conns
+
+    def handle_ssh_async(self, mine=False):
+        """
+        Execute the routines from this process: the ssh and scp commands run
+        as asyncio subprocesses, at most ``ssh_async_max_conns`` targets at a
+        time, while wrapper functions such as the state functions, and the
+        commands which need a terminal or password prompts, go to a pool of
+        up to ``ssh_max_procs`` worker processes.
+        """
+        if not self.targets:
+            log.error("No matching targets found in roster.")
+            return
+        max_conns = self._async_max_conns()
+        loop = asyncio.new_event_loop()
+        # The subprocess child watcher is attached to the current event loop
+        asyncio.set_event_loop(loop)
+        pool = concurrent.futures.ProcessPoolExecutor(
+            min(self.opts.get("ssh_max_procs", 25), multiprocessing.cpu_count())
+        )
+        target_iter = iter(self.targets)
+        pending = {}
+        try:
+            while True:
+                while len(pending) < max_conns:
+                    host = next(target_iter, None)
+                    if host is None:
+                        break
+                    no_ret = self._prep_target(host)
+                    if no_ret is not None:
+                        yield {host: no_ret}
+                        continue
+                    future = asyncio.ensure_future(
+                        self._run_routine_async(loop, pool, host, mine), loop=loop
+                    )
+                    pending[future] = host
+                if not pending:
+                    break
+                done, _ = loop.run_until_complete(
+                    asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+                )
+                for future in done:
+                    host = pending.pop(future)
+                    try:
+                        ret = future.result()
+                    except Exception as exc:  # pylint: disable=broad-except
+                        ret = (
+                            "Target '{}' did not return any data, "
+                            "probably due to an error: {}"
+                        ).format(host, exc)
+                        log.error(ret, exc_info_on_loglevel=logging.DEBUG)
+                    yield {host: ret}
+        finally:
+            for future in pending:
+                future.cancel()
+            if pending:
+                loop.run_until_complete(
+                    asyncio.gather(*pending, return_exceptions=True)
+                )
+            pool.shutdown(wait=False)
+            asyncio.set_event_loop(None)
+            loop.close()
+
     def handle_ssh(self, mine=False):
         """
         Spin up the needed threads or processes and execute the subsequent
         routines
         """
+        if self.opts.get("ssh_async"):
+            yield from self.handle_ssh_async(mine=mine)
+            return
         que = multiprocessing.Queue()
         running = {}
         target_iter = self.targets.__iter__()
@@ -587,24 +738,10 @@ class SSH:
                 except StopIteration:
                     init = True
                     continue
-                for default in self.defaults:
-                    if default not in self.targets[host]:
-                        self.targets[host][default] = self.defaults[default]
-                if "host" not in self.targets[host]:
-                    self.targets[host]["host"] = host
-                if self.targets[host].get("winrm") and not HAS_WINSHELL:
+                no_ret = self._prep_target(host)
+                if no_ret is not None:
                     returned.add(host)
                     rets.add(host)
-                    log_msg = "Please contact sales@saltstack.com for access to the enterprise saltwinshell module."
-                    log.debug(log_msg)
-                    no_ret = {
-                        "fun_args": [],
-                        "jid": None,
-                        "return": log_msg,
-                        "retcode": 1,
-                        "fun": "",
-                        "id": host,
-                    }
                     yield {host: no_ret}
                     continue
                 args = (
@@ -855,6 +992,48 @@ class SSH:
             sys.exit(salt.defaults.exitcodes.EX_AGGREGATE)
 
 
+def _routine_ret(stdout, stderr, retcode):
+    """
+    Return the return of a target out of the output of its routine
+    """
+    try:
+        data = salt.utils.json.find_json(stdout)
+        if len(data) < 2 and "local" in data:
+            return data["local"]
+    except Exception:  # pylint: disable=broad-except
+        pass
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "retcode": retcode,
+    }
+
+
+# The file client of a worker process of the salt-ssh process pool
+_POOL_FSCLIENT = None
+
+
+def _pool_routine(opts, host, target, mine, mods, thin):
+    """
+    Run the routine of a target in a worker process of the salt-ssh process
+    pool, which reuses its file client from one target to the next
+    """
+    global _POOL_FSCLIENT  # pylint: disable=global-statement
+    if _POOL_FSCLIENT is None:
+        _POOL_FSCLIENT = salt.fileclient.FSClient(opts)
+    single = Single(
+        opts,
+        opts["argv"],
+        host,
+        mods=mods,
+        fsclient=_POOL_FSCLIENT,
+        thin=thin,
+        mine=mine,
+        **target
+    )
+    return _routine_ret(*single.run())
+
+
 class Single:
     """
     Hold onto a single ssh execution
@@ -1029,16 +1208,60 @@ class Single:
             return False
         return True
 
+    def _thin_cachedir(self):
+        if "_caller_cachedir" in self.opts:
+            return self.opts["_caller_cachedir"]
+        return self.opts["cachedir"]
+
+    def _thin_layers(self):
+        """
+        Return the manifest of the salt-thin layers, see
+        :func:`salt.utils.thin.gen_thin_layers`
+        """
+        return salt.utils.thin.gen_thin_layers(
+            self._thin_cachedir(),
+            extra_mods=self.opts.get("thin_extra_mods"),
+            extended_cfg=self.opts.get("ssh_ext_alternatives"),
+        )
+
+    def _layer_sends(self, digests=None):
+        """
+        Return the ``(local, remote)`` paths of the salt-thin layers to send,
+        all of them unless only the given digests are missing on the target
+        """
+        ret = []
+        for _, digest, _ in self._thin_layers():
+            if digests is None or digest in digests:
+                ret.append(
+                    (
+                        salt.utils.thin.thin_layer_path(self._thin_cachedir(), digest),
+                        os.path.join(self.thin_dir, "layer-{}.tgz".format(digest)),
+                    )
+                )
+        return ret
+
     def deploy(self):
         """
         Deploy salt-thin
         """
-        self.shell.send(
-            self.thin, os.path.join(self.thin_dir, "salt-thin.tgz"),
-        )
+        if self.opts.get("ssh_thin_layers"):
+            self.deploy_layers()
+        else:
+            self.shell.send(
+                self.thin, os.path.join(self.thin_dir, "salt-thin.tgz"),
+            )
         self.deploy_ext()
         return True
 
+    def deploy_layers(self, digests=None):
+        """
+        Deploy the salt-thin layers, all of them unless only the given
+        digests are missing on the target
+        """
+        for local, remote in self._layer_sends(digests):
+            self.shell.send(local, remote)
+        return True
+
     def deploy_ext(self):
         """
         Deploy the ext_mods tarball
@@ -1049,6 +1272,37 @@ class Single:
             )
         return True
 
+    async def deploy_async(self):
+        """
+        Same as :meth:`deploy`, without blocking the event loop
+        """
+        if self.opts.get("ssh_thin_layers"):
+            await self.deploy_layers_async()
+        else:
+            await self.shell.send_async(
+                self.thin, os.path.join(self.thin_dir, "salt-thin.tgz"),
+            )
+        await self.deploy_ext_async()
+        return True
+
+    async def deploy_layers_async(self, digests=None):
+        """
+        Same as :meth:`deploy_layers`, without blocking the event loop
+        """
+        for local, remote in self._layer_sends(digests):
+            await self.shell.send_async(local, remote)
+        return True
+
+    async def deploy_ext_async(self):
+        """
+        Same as :meth:`deploy_ext`, without blocking the event loop
+        """
+        if self.mods.get("file"):
+            await self.shell.send_async(
+                self.mods["file"], os.path.join(self.thin_dir, "salt-ext_mods.tgz"),
+            )
+        return True
+
     def run(self, deploy_attempted=False):
         """
         Execute the routine, the routine can be either:
@@ -1290,11 +1544,13 @@ class Single:
         """
         sudo = "sudo" if self.target["sudo"] else ""
         sudo_user = self.target["sudo_user"]
-        if "_caller_cachedir" in self.opts:
-            cachedir = self.opts["_caller_cachedir"]
+        cachedir = self._thin_cachedir()
+        if self.opts.get("ssh_thin_layers"):
+            layers = self._thin_layers()
+            thin_code_digest, thin_sum = "'0'", ""
         else:
-            cachedir = self.opts["cachedir"]
-        thin_code_digest, thin_sum = salt.utils.thin.thin_sum(cachedir, "sha1")
+            layers = None
+            thin_code_digest, thin_sum = salt.utils.thin.thin_sum(cachedir, "sha1")
         debug = ""
         if not self.opts.get("log_level"):
             self.opts["log_level"] = "info"
@@ -1318,6 +1574,7 @@ OPTIONS.wipe = {wipe}
 OPTIONS.tty = {tty}
 OPTIONS.cmd_umask = {cmd_umask}
 OPTIONS.code_checksum = {code_checksum}
+OPTIONS.layers = {layers}
 ARGS = {arguments}\n'''.format(
             config=self.minion_config,
             delimeter=RSTR,
@@ -1330,6 +1587,7 @@ ARGS = {arguments}\n'''.format(
             tty=self.tty,
             cmd_umask=self.cmd_umask,
             code_checksum=thin_code_digest,
+            layers=layers,
             arguments=self.argv,
         )
         py_code = SSH_PY_SHIM.replace("#%%OPTS", arg_str)
@@ -1413,13 +1671,93 @@ ARGS = {arguments}\n'''.format(
         5. split SHIM results from command results
         6. return command results
         """
+        steps = self._cmd_block_steps()
+        result = None
+        while True:
+            try:
+                request = steps.send(result)
+            except StopIteration as exc:
+                return exc.value
+            if request[0] == "shim":
+                result = self.shim_cmd(request[1])
+            elif request[0] == "deploy":
+                result = self.deploy()
+            elif request[0] == "deploy_ext":
+                result = self.deploy_ext()
+            elif request[0] == "deploy_layers":
+                result = self.deploy_layers(request[1])
+            else:
+                result = saltwinshell.deploy_python(self)
+
+    async def cmd_block_async(self):
+        """
+        Same as :meth:`cmd_block`, running the ssh and scp commands without
+        blocking the event loop. Only usable when :meth:`can_run_async`.
+        """
+        steps = self._cmd_block_steps()
+        result = None
+        while True:
+            try:
+                request = steps.send(result)
+            except StopIteration as exc:
+                return exc.value
+            if request[0] == "shim":
+                result = await self.shell.exec_cmd_async(request[1])
+            elif request[0] == "deploy":
+                result = await self.deploy_async()
+            elif request[0] == "deploy_ext":
+                result = await self.deploy_ext_async()
+            elif request[0] == "deploy_layers":
+                result = await self.deploy_layers_async(request[1])
+            else:
+                # deploy_python is only asked for on Windows, which is never
+                # run asynchronously
+                raise salt.exceptions.SaltClientError(
+                    "Unexpected step '{}' for target {}".format(request[0], self.id)
+                )
+
+    def can_run_async(self):
+        """
+        Whether this execution can be driven by :meth:`run_async`: shimmed
+        commands run without a tty or password prompts, no wrapper functions
+        """
+        return not (
+            self.winrm
+            or self.tty
+            or self.ssh_pre_flight
+            or self.mine
+            or self.shell.passwd
+            or self.shell.priv_passwd
+            or (not self.opts.get("raw_shell") and self.fun in self.wfuncs)
+        )
+
+    async def run_async(self):
+        """
+        Same as :meth:`run`, without blocking the event loop. Only usable when
+        :meth:`can_run_async`.
+
+        Returns tuple of (stdout, stderr, retcode)
+        """
+        if self.opts.get("raw_shell", False):
+            cmd_str = " ".join([self._escape_arg(arg) for arg in self.argv])
+            return await self.shell.exec_cmd_async(cmd_str)
+        return await self.cmd_block_async()
+
+    def _cmd_block_steps(self):
+        """
+        The logic of :meth:`cmd_block`, as a generator yielding the remote
+        operations to run (``shim``, ``deploy``, ``deploy_layers``,
+        ``deploy_ext`` and ``deploy_python``) and receiving their results, so that it can be
+        driven both by blocking and asynchronous calls. Returns the command
+        results.
+        """
         self.argv = _convert_args(self.argv)
         log.debug(
             "Performing shimmed, blocking command as follows:\n%s",
             " ".join([str(arg) for arg in self.argv]),
         )
         cmd_str = self._cmd_str()
-        stdout, stderr, retcode = self.shim_cmd(cmd_str)
+        stdout, stderr, retcode = yield ("shim", cmd_str)
 
         log.trace("STDOUT %s\n%s", self.target["host"], stdout)
         log.trace("STDERR %s\n%s", self.target["host"], stderr)
@@ -1428,15 +1766,15 @@ ARGS = {arguments}\n'''.format(
         error = self.categorize_shim_errors(stdout, stderr, retcode)
         if error:
             if error == "Python environment not found on Windows system":
-                saltwinshell.deploy_python(self)
-                stdout, stderr, retcode = self.shim_cmd(cmd_str)
+                yield ("deploy_python",)
+                stdout, stderr, retcode = yield ("shim", cmd_str)
                 while re.search(RSTR_RE, stdout):
                     stdout = re.split(RSTR_RE, stdout, 1)[1].strip()
                 while re.search(RSTR_RE, stderr):
                     stderr = re.split(RSTR_RE, stderr, 1)[1].strip()
             elif error == "Undefined SHIM state":
-                self.deploy()
-                stdout, stderr, retcode = self.shim_cmd(cmd_str)
+                yield ("deploy",)
+                stdout, stderr, retcode = yield ("shim", cmd_str)
                 if not re.search(RSTR_RE, stdout) or not re.search(RSTR_RE, stderr):
                     # If RSTR is not seen in both stdout and stderr then there
                     # was a thin deployment problem.
@@ -1474,8 +1812,8 @@ ARGS = {arguments}\n'''.format(
                 "deploy" == shim_command
                 and retcode == salt.defaults.exitcodes.EX_THIN_DEPLOY
             ):
-                self.deploy()
-                stdout, stderr, retcode = self.shim_cmd(cmd_str)
+                yield ("deploy",)
+                stdout, stderr, retcode = yield ("shim", cmd_str)
                 if not re.search(RSTR_RE, stdout) or not re.search(RSTR_RE, stderr):
                     if not self.tty:
                         # If RSTR is not seen in both stdout and stderr then there
@@ -1487,7 +1825,7 @@ ARGS = {arguments}\n'''.format(
                             stderr,
                             retcode,
                         )
-                        return self.cmd_block()
+                        return (yield from self._cmd_block_steps())
                     elif not re.search(RSTR_RE, stdout):
                         # If RSTR is not seen in stdout with tty, then there
                         # was a thin deployment problem.
@@ -1505,9 +1843,27 @@ ARGS = {arguments}\n'''.format(
                 else:
                     while re.search(RSTR_RE, stderr):
                         stderr = re.split(RSTR_RE, stderr, 1)[1].strip()
+            elif (
+                shim_command.startswith("layers ")
+                and retcode == salt.defaults.exitcodes.EX_THIN_DEPLOY
+            ):
+                yield ("deploy_layers", shim_command.split()[1:])
+                stdout, stderr, retcode = yield ("shim", cmd_str)
+                if not re.search(RSTR_RE, stdout) or not re.search(RSTR_RE, stderr):
+                    # If RSTR is not seen in both stdout and stderr then there
+                    # was a thin deployment problem.
+                    return (
+                        "ERROR: Failure deploying thin layers: {}".format(stdout),
+                        stderr,
+                        retcode,
+                    )
+                while re.search(RSTR_RE, stdout):
+                    stdout = re.split(RSTR_RE, stdout, 1)[1].strip()
+                while re.search(RSTR_RE, stderr):
+                    stderr = re.split(RSTR_RE, stderr, 1)[1].strip()
             elif "ext_mods" == shim_command:
-                self.deploy_ext()
-                stdout, stderr, retcode = self.shim_cmd(cmd_str)
+                yield ("deploy_ext",)
+                stdout, stderr, retcode = yield ("shim", cmd_str)
                 if not re.search(RSTR_RE, stdout) or not re.search(RSTR_RE, stderr):
                     # If RSTR is not seen in both stdout and stderr then there
                     # was a thin deployment problem.
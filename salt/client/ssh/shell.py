@@ -2,6 +2,8 @@
 Manage transport commands via ssh
 """
 
+import asyncio
+import hashlib
 import logging
 import os
 import re
@@ -13,6 +15,7 @@ import time
 import salt.defaults.exitcodes
 import salt.utils.json
 import salt.utils.nb_popen
+import salt.utils.stringutils
 import salt.utils.vt
 
 log = logging.getLogger(__name__)
@@ -189,6 +192,44 @@ class Shell:
     def _ssh_opts(self):
         return " ".join(["-o {}".format(opt) for opt in self.ssh_options])
 
+    def _control_path(self):
+        """
+        Return the path of the socket of the master connection shared by all
+        the ssh and scp commands run against this host, user and port
+        """
+        # Hash the connection details, socket paths are limited to ~100 chars
+        conn_id = hashlib.sha256(
+            "{}@{}:{}".format(self.user, self.host, self.port).encode("utf-8")
+        ).hexdigest()[:16]
+        return os.path.join(self.opts["cachedir"], "ssh_control", conn_id)
+
+    def _control_opts(self):
+        """
+        Return the options making ssh and scp share a persistent master
+        connection to the host, or an empty string if that is disabled
+        """
+        persist = self.opts.get("ssh_control_persist")
+        if not persist:
+            return ""
+        control_path = self._control_path()
+        control_dir = os.path.dirname(control_path)
+        if not os.path.isdir(control_dir):
+            try:
+                os.makedirs(control_dir, 0o700)
+            except OSError as exc:
+                log.warning(
+                    "Not sharing ssh connections, failed to create %s: %s",
+                    control_dir,
+                    exc,
+                )
+                return ""
+        options = [
+            "ControlMaster=auto",
+            "ControlPath={}".format(control_path),
+            "ControlPersist={}".format(int(persist)),
+        ]
+        return " ".join(["-o {}".format(opt) for opt in options])
+
     def _copy_id_str_old(self):
         """
         Return the string to execute ssh-copy-id
@@ -261,6 +302,10 @@ class Shell:
             )
         if self.ssh_options:
             command.append(self._ssh_opts())
+        # After the user's ssh_options, which take precedence
+        control_opts = self._control_opts()
+        if control_opts:
+            command.append(control_opts)
 
         command.append(cmd)
 
@@ -309,9 +354,9 @@ class Shell:
             yield None, None, None
         yield "".join(r_out), "".join(r_err), rcode
 
-    def exec_cmd(self, cmd):
+    def _exec_cmd_str(self, cmd):
         """
-        Execute a remote command
+        Return the ssh command string which executes a remote command
         """
         cmd = self._cmd_str(cmd)
 
@@ -323,17 +368,26 @@ class Shell:
             log.trace(logmsg)
         else:
             log.debug(logmsg)
+        return cmd
 
-        ret = self._run_cmd(cmd)
+    def exec_cmd(self, cmd):
+        """
+        Execute a remote command
+        """
+        ret = self._run_cmd(self._exec_cmd_str(cmd))
         return ret
 
-    def send(self, local, remote, makedirs=False):
+    async def exec_cmd_async(self, cmd):
         """
-        scp a file or files to a remote system
+        Execute a remote command without blocking the event loop. Password
+        prompts can not be answered, see :meth:`_run_cmd_async`.
         """
-        if makedirs:
-            self.exec_cmd("mkdir -p {}".format(os.path.dirname(remote)))
+        return await self._run_cmd_async(self._exec_cmd_str(cmd))
 
+    def _send_cmd_str(self, local, remote):
+        """
+        Return the scp command string which copies files to a remote system
+        """
         # scp needs [<ipv6}
         host = self.host
         if ":" in host:
@@ -346,8 +400,25 @@ class Shell:
         if self.passwd:
             logmsg = logmsg.replace(self.passwd, ("*" * 6))
         log.debug(logmsg)
+        return cmd
+
+    def send(self, local, remote, makedirs=False):
+        """
+        scp a file or files to a remote system
+        """
+        if makedirs:
+            self.exec_cmd("mkdir -p {}".format(os.path.dirname(remote)))
+
+        return self._run_cmd(self._send_cmd_str(local, remote))
+
+    async def send_async(self, local, remote, makedirs=False):
+        """
+        scp a file or files to a remote system without blocking the event loop
+        """
+        if makedirs:
+            await self.exec_cmd_async("mkdir -p {}".format(os.path.dirname(remote)))
 
-        return self._run_cmd(cmd)
+        return await self._run_cmd_async(self._send_cmd_str(local, remote))
 
     def _split_cmd(self, cmd):
         """
@@ -364,6 +435,29 @@ class Shell:
             cmd_lst.append("/bin/sh {}".format(cmd_part))
         return cmd_lst
 
+    async def _run_cmd_async(self, cmd):
+        """
+        Execute a shell command as an asyncio subprocess. It runs in a new
+        session, without a controlling terminal, so ssh can not prompt for
+        passwords or host keys and fails instead of waiting for an answer.
+        """
+        if not cmd:
+            return "", "No command or passphrase", 245
+
+        proc = await asyncio.create_subprocess_exec(
+            *self._split_cmd(cmd),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True
+        )
+        stdout, stderr = await proc.communicate()
+        stdout = salt.utils.stringutils.to_unicode(stdout, errors="replace")
+        stderr = salt.utils.stringutils.to_unicode(stderr, errors="replace")
+        log.trace("STDOUT %s\n%s", self.host, stdout)
+        log.trace("STDERR %s\n%s", self.host, stderr)
+        return stdout, stderr, proc.returncode
+
     def _run_cmd(self, cmd, key_accept=False, passwd_retries=3):
         """
         Execute a shell command via VT. This is blocking and assumes that ssh
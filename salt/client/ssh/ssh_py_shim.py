@@ -20,6 +20,8 @@ import time
 
 THIN_ARCHIVE = "salt-thin.tgz"
 EXT_ARCHIVE = "salt-ext_mods.tgz"
+LAYER_ARCHIVE = "layer-{0}.tgz"
+LAYERS_FILE = "thin_layers"
 
 # Keep these in sync with salt/defaults/exitcodes.py
 EX_THIN_PYTHON_INVALID = 10
@@ -182,6 +184,70 @@ def unpack_thin(thin_path):
     reset_time(OPTIONS.saltdir)
 
 
+def unpack_layer(layer_path):
+    """
+    Unpack a thin layer archive, replacing the directories it provides.
+    """
+    tfile = tarfile.TarFile.gzopen(layer_path)
+    old_umask = os.umask(0o077)  # pylint: disable=blacklisted-function
+    try:
+        tops = set()
+        for member in tfile.getmembers():
+            tops.add(os.path.join(OPTIONS.saltdir, *member.name.split("/")[:2]))
+        for top in tops:
+            if os.path.isdir(top):
+                shutil.rmtree(top)
+        tfile.extractall(path=OPTIONS.saltdir)
+    finally:
+        tfile.close()
+        os.umask(old_umask)  # pylint: disable=blacklisted-function
+    os.unlink(layer_path)
+
+
+def check_layers():
+    """
+    Unpack the thin layers which were sent and signal the ones which are
+    missing to the master.
+    """
+    if not os.path.exists(OPTIONS.saltdir):
+        need_deployment()
+    layers_path = os.path.join(OPTIONS.saltdir, LAYERS_FILE)
+    installed = {}
+    if os.path.isfile(layers_path):
+        with open(layers_path, "r") as lfp:
+            for line in lfp:
+                if line.strip():
+                    name, digest = line.split()
+                    installed[name] = digest
+    missing = []
+    unpacked = False
+    for name, digest, archive_sum in OPTIONS.layers:
+        if installed.get(name) == digest:
+            continue
+        layer_path = os.path.join(OPTIONS.saltdir, LAYER_ARCHIVE.format(digest))
+        if not os.path.isfile(layer_path):
+            missing.append(digest)
+            continue
+        if get_hash(layer_path, OPTIONS.hashfunc) != archive_sum:
+            os.unlink(layer_path)
+            missing.append(digest)
+            continue
+        unpack_layer(layer_path)
+        unpacked = True
+        installed[name] = digest
+        with open(layers_path, "w") as lfp:
+            for lname in sorted(installed):
+                lfp.write("{0} {1}\n".format(lname, installed[lname]))
+    if unpacked:
+        reset_time(OPTIONS.saltdir)
+    if missing:
+        # Delimiter emitted on stdout *only* to indicate shim message to master.
+        sys.stdout.write(
+            "{0}\nlayers {1}\n".format(OPTIONS.delimiter, " ".join(missing))
+        )
+        sys.exit(EX_THIN_DEPLOY)
+
+
 def need_ext():
     """
     Signal that external modules need to be deployed.
@@ -274,7 +340,16 @@ def main(argv):  # pylint: disable=W0613
     Main program body
     """
     thin_path = os.path.join(OPTIONS.saltdir, THIN_ARCHIVE)
-    if os.path.isfile(thin_path):
+    if getattr(OPTIONS, "layers", None):
+        if os.path.exists(OPTIONS.saltdir) and not os.path.isdir(OPTIONS.saltdir):
+            sys.stderr.write(
+                'ERROR: salt path "{0}" exists but is'
+                " not a directory\n".format(OPTIONS.saltdir)
+            )
+            sys.exit(EX_CANTCREAT)
+        check_layers()
+        # Salt thin now is available to use
+    elif os.path.isfile(thin_path):
         if OPTIONS.checksum != get_hash(thin_path, OPTIONS.hashfunc):
             need_deployment()
         unpack_thin(thin_path)
@@ -5,11 +5,13 @@ Create ssh executor system
 from __future__ import absolute_import, print_function
 
 # Import python libs
+import hashlib
+import io
 import logging
 import os
 import shutil
 import tarfile
-import tempfile
+import time
 from contextlib import closing
 
 import salt.client.ssh
@@ -20,9 +22,10 @@ import salt.loader
 import salt.minion
 import salt.roster
 import salt.state
+import salt.utils.atomicfile
 import salt.utils.files
+import salt.utils.hashutils
 import salt.utils.json
-import salt.utils.path
 import salt.utils.stringutils
 import salt.utils.thin
 import salt.utils.url
@@ -175,18 +178,11 @@ def salt_refs(data, ret=None):
     return ret
 
 
-def prep_trans_tar(
-    file_client, chunks, file_refs, pillar=None, id_=None, roster_grains=None
-):
+def _collect_file_refs(file_client, file_refs, cachedir):
     """
-    Generate the execution package from the saltenv file refs and a low state
-    data structure
+    Cache the files referenced by the states and return a dict of the paths
+    of the cached files by their path in the state tarball
     """
-    gendir = tempfile.mkdtemp()
-    trans_tar = salt.utils.files.mkstemp()
-    lowfn = os.path.join(gendir, "lowstate.json")
-    pillarfn = os.path.join(gendir, "pillar.json")
-    roster_grainsfn = os.path.join(gendir, "roster_grains.json")
     sync_refs = [
         [salt.utils.url.create("_modules")],
         [salt.utils.url.create("_states")],
@@ -196,30 +192,11 @@ def prep_trans_tar(
         [salt.utils.url.create("_output")],
         [salt.utils.url.create("_utils")],
     ]
-    with salt.utils.files.fopen(lowfn, "w+") as fp_:
-        salt.utils.json.dump(chunks, fp_)
-    if pillar:
-        with salt.utils.files.fopen(pillarfn, "w+") as fp_:
-            salt.utils.json.dump(pillar, fp_)
-    if roster_grains:
-        with salt.utils.files.fopen(roster_grainsfn, "w+") as fp_:
-            salt.utils.json.dump(roster_grains, fp_)
-
-    if id_ is None:
-        id_ = ""
-    try:
-        cachedir = os.path.join("salt-ssh", id_).rstrip(os.sep)
-    except AttributeError:
-        # Minion ID should always be a str, but don't let an int break this
-        cachedir = os.path.join("salt-ssh", six.text_type(id_)).rstrip(os.sep)
-
+    members = {}
     for saltenv in file_refs:
         # Location where files in this saltenv will be cached
         cache_dest_root = os.path.join(cachedir, "files", saltenv)
         file_refs[saltenv].extend(sync_refs)
-        env_root = os.path.join(gendir, saltenv)
-        if not os.path.isdir(env_root):
-            os.makedirs(env_root)
         for ref in file_refs[saltenv]:
             for name in ref:
                 short = salt.utils.url.parse(name)[0].lstrip("/")
@@ -229,11 +206,7 @@ def prep_trans_tar(
                 except IOError:
                     path = ""
                 if path:
-                    tgt = os.path.join(env_root, short)
-                    tgt_dir = os.path.dirname(tgt)
-                    if not os.path.isdir(tgt_dir):
-                        os.makedirs(tgt_dir)
-                    shutil.copy(path, tgt)
+                    members[os.path.join(saltenv, short)] = path
                     continue
                 try:
                     files = file_client.cache_dir(name, saltenv, cachedir=cachedir)
@@ -244,24 +217,107 @@ def prep_trans_tar(
                         fn = filename[
                             len(file_client.get_cachedir(cache_dest)) :
                         ].strip("/")
-                        tgt = os.path.join(env_root, short, fn,)
-                        tgt_dir = os.path.dirname(tgt)
-                        if not os.path.isdir(tgt_dir):
-                            os.makedirs(tgt_dir)
-                        shutil.copy(filename, tgt)
+                        members[os.path.join(saltenv, short, fn)] = filename
                     continue
+    return members
+
+
+def _write_trans_tar(fp_, members, data):
+    """
+    Write a gzipped tarball of the ``members`` files, by their path in the
+    tarball, and of the ``data`` objects, as JSON files, to the open file
+    ``fp_``
+    """
+    with closing(tarfile.open(fileobj=fp_, mode="w:gz")) as tfp:
+        for name in sorted(data):
+            blob = salt.utils.stringutils.to_bytes(salt.utils.json.dumps(data[name]))
+            info = tarfile.TarInfo(name)
+            info.size = len(blob)
+            info.mtime = time.time()
+            tfp.addfile(info, io.BytesIO(blob))
+        for name in sorted(members):
+            tfp.add(members[name], arcname=name)
+
+
+def _cached_state_pkg(opts, chunks, members):
+    """
+    Return the path of the state tarball holding the given low data and
+    files, building it only if no other target needed the same one recently
+    """
+    pkg_dir = os.path.join(opts["cachedir"], "salt-ssh-state-pkgs")
+    if not os.path.isdir(pkg_dir):
+        os.makedirs(pkg_dir)
+    key = hashlib.sha256()
+    key.update(
+        salt.utils.stringutils.to_bytes(salt.utils.json.dumps(chunks, sort_keys=True))
+    )
+    for name in sorted(members):
+        key.update(salt.utils.stringutils.to_bytes("\0{}\0".format(name)))
+        key.update(
+            salt.utils.stringutils.to_bytes(
+                salt.utils.hashutils.get_hash(members[name], "sha256")
+            )
+        )
+    pkg = os.path.join(pkg_dir, "{}.tgz".format(key.hexdigest()))
+    if os.path.isfile(pkg):
+        log.debug("Reusing the state tarball %s", pkg)
+        # Mark the tarball as used
+        os.utime(pkg, None)
+        return pkg
+
+    with salt.utils.atomicfile.atomic_open(pkg, "wb") as fp_:
+        _write_trans_tar(fp_, members, {"lowstate.json": chunks})
+
+    # Drop the tarballs no target used for a while
+    expired = time.time() - opts.get("ssh_state_pkg_cache_ttl", 86400)
+    for fname in os.listdir(pkg_dir):
+        path = os.path.join(pkg_dir, fname)
+        try:
+            if os.path.getmtime(path) < expired:
+                os.remove(path)
+        except OSError:
+            pass
+    return pkg
+
+
+def prep_trans_tar(
+    file_client, chunks, file_refs, pillar=None, id_=None, roster_grains=None
+):
+    """
+    Generate the execution package from the saltenv file refs and a low state
+    data structure
+
+    With ``ssh_state_pkg_cache``, the low data and the files are packed into
+    a tarball which is shared by all the targets with the same low data and
+    files, and the data specific to the target, its pillar and roster grains,
+    is appended to a copy of it as a second tarball.
+    """
+    trans_tar = salt.utils.files.mkstemp()
+
+    if id_ is None:
+        id_ = ""
     try:
-        # cwd may not exist if it was removed but salt was run from it
-        cwd = os.getcwd()
-    except OSError:
-        cwd = None
-    os.chdir(gendir)
-    with closing(tarfile.open(trans_tar, "w:gz")) as tfp:
-        for root, dirs, files in salt.utils.path.os_walk(gendir):
-            for name in files:
-                full = os.path.join(root, name)
-                tfp.add(full[len(gendir) :].lstrip(os.sep))
-    if cwd:
-        os.chdir(cwd)
-    shutil.rmtree(gendir)
+        cachedir = os.path.join("salt-ssh", id_).rstrip(os.sep)
+    except AttributeError:
+        # Minion ID should always be a str, but don't let an int break this
+        cachedir = os.path.join("salt-ssh", six.text_type(id_)).rstrip(os.sep)
+
+    members = _collect_file_refs(file_client, file_refs, cachedir)
+    target_data = {}
+    if pillar:
+        target_data["pillar.json"] = pillar
+    if roster_grains:
+        target_data["roster_grains.json"] = roster_grains
+    if file_client.opts.get("ssh_state_pkg_cache"):
+        shared = _cached_state_pkg(file_client.opts, chunks, members)
+        with salt.utils.files.fopen(trans_tar, "wb") as fp_:
+            with salt.utils.files.fopen(shared, "rb") as sfp:
+                shutil.copyfileobj(sfp, fp_)
+            if target_data:
+                # state.pkg reads the concatenated archives as one
+                _write_trans_tar(fp_, {}, target_data)
+    else:
+        target_data["lowstate.json"] = chunks
+        with salt.utils.files.fopen(trans_tar, "wb") as fp_:
+            _write_trans_tar(fp_, members, target_data)
     return trans_tar
@@ -243,6 +243,16 @@ VALID_OPTS = immutabletypes.freeze(
         # When using a local file_client, this parameter is used to allow the client to connect to
         # a master for remote execution.
         "use_master_when_local": bool,
+        # Fetch only the changed blocks of files the minion has an older copy of
+        "fileclient_delta_transfer": bool,
+        # The number of files the fileclient fetches at the same time when caching many
+        "fileclient_prefetch_workers": int,
+        # How long the hashes fetched in bulk from the master are trusted
+        "fileclient_hash_batch_ttl": int,
+        # The size in bytes above which the least recently used cached files are removed
+        "fileclient_cache_size_max": int,
+        # How long a cached file is used without checking its hash with the master
+        "fileclient_cache_ttl": int,
         # A map of saltenvs and fileserver backend locations
         "file_roots": dict,
         # A map of saltenvs and fileserver backend locations
@@ -304,6 +314,11 @@ VALID_OPTS = immutabletypes.freeze(
         "ipv6": (type(None), bool),
         # The chunk size to use when streaming files with the file server
         "file_buffer_size": int,
+        # Serve files to minions asking for compression from a compressed copy
+        # kept in the cache, at or above the given size, pruned after the ttl
+        "file_precompress": bool,
+        "file_precompress_min_size": int,
+        "file_precompress_ttl": int,
         # The TCP port on which minion events should be published if ipc_mode is TCP
         "tcp_pub_port": int,
         # The TCP port on which minion events should be pulled if ipc_mode is TCP
@@ -376,6 +391,11 @@ VALID_OPTS = immutabletypes.freeze(
         "state_auto_order": bool,
         # Fire events as state chunks are processed by the state compiler
         "state_events": bool,
+        # Cache the salt:// sources of all of the states before running them
+        "state_prefetch_sources": bool,
+        # Apply the states which support it in batches, like all of the pkg
+        # states a run can install in one package manager transaction
+        "state_batch": (bool, list),
         # The number of seconds a minion should wait before retry when attempting authentication
         "acceptance_wait_time": float,
         # The number of seconds a minion should wait before giving up during authentication
@@ -430,6 +450,16 @@ VALID_OPTS = immutabletypes.freeze(
         # The goal here is to ensure that if the bus is not busy enough to reach a total
         # `event_return_queue` events won't get stale.
         "event_return_queue_max_seconds": int,
+        # The number of threads writing batches of events to the event returners
+        "event_return_workers": int,
+        # The number of flushed batches which may wait for a free writer before
+        # batches are spooled to disk (or the reader blocks, if spooling is off)
+        "event_return_backlog": int,
+        # Spool batches of events which could not be stored by an event returner
+        # to the cachedir and replay them once the returner recovers
+        "event_return_spool": bool,
+        # The maximum number of batches kept in the spool of each event returner
+        "event_return_spool_max_batches": int,
         # Only forward events to an event returner if it matches one of the tags in this list
         "event_return_whitelist": list,
         # Events matching a tag in this list should never be sent to an event returner.
@@ -520,6 +550,15 @@ VALID_OPTS = immutabletypes.freeze(
         "azurefs_update_interval": int,
         "gitfs_update_interval": int,
         "git_pillar_update_interval": int,
+        # Number of gitfs/git_pillar remotes fetched at the same time, and the
+        # default number of seconds after which a fetch is given up on
+        "gitfs_fetch_workers": int,
+        "gitfs_fetch_timeout": int,
+        # Write the files gitfs serves to the cache, instead of serving them
+        # straight from the git object database
+        "gitfs_write_blobs": bool,
+        "git_pillar_fetch_workers": int,
+        "git_pillar_fetch_timeout": int,
         "hgfs_update_interval": int,
         "minionfs_update_interval": int,
         "s3fs_update_interval": int,
@@ -637,6 +676,9 @@ VALID_OPTS = immutabletypes.freeze(
         "fileserver_ignoresymlinks": bool,
         "fileserver_limit_traversal": bool,
         "fileserver_verify_config": bool,
+        # Keep a generation number for every fileserver environment, which is
+        # bumped when a fileserver update finds changes and sent to minions
+        "fileserver_generation": bool,
         # Optionally apply '*' permissioins to any user. By default '*' is a fallback case that is
         # applied only if the user didn't matched by other matchers.
         "permissive_acl": bool,
@@ -671,6 +713,12 @@ VALID_OPTS = immutabletypes.freeze(
         # Specify a returner for the master to use as a backend storage system to cache jobs returns
         # that it receives
         "master_job_cache": str,
+        # Write returns to the master_job_cache from a dedicated process instead of the MWorkers
+        "master_job_cache_async": bool,
+        # The number of returns which may wait for the job cache writer process
+        "master_job_cache_queue_size": int,
+        # The number of threads the job cache writer process uses to write returns
+        "master_job_cache_writer_threads": int,
         # Specify whether the master should store end times for jobs as returns come in
         "job_cache_store_endtime": bool,
         # The minion data cache is a cache of information about the minions stored on the master.
@@ -684,10 +732,15 @@ VALID_OPTS = immutabletypes.freeze(
         "reactor": list,
         # The TTL for the cache of the reactor configuration
         "reactor_refresh_interval": int,
-        # The number of workers for the runner/wheel in the reactor
-        "reactor_worker_threads": int,
+        # The number of workers for the runner/wheel in the reactor, or a dict
+        # of worker counts keyed by reaction type
+        "reactor_worker_threads": (int, dict),
         # The queue size for workers in the reactor
         "reactor_worker_hwm": int,
+        # Cache compiled reactor templates and salt:// reactor file lookups
+        "reactor_render_cache": bool,
+        # Drop identical reactions fired within this many seconds of each other
+        "reactor_coalesce_window": int,
         # Defines engines. See https://docs.saltstack.com/en/latest/topics/engines/
         "engines": list,
         # Whether or not to store runner returns in the job cache
@@ -804,6 +857,28 @@ VALID_OPTS = immutabletypes.freeze(
         "ssh_config_file": str,
         "ssh_merge_pillar": bool,
         "ssh_run_pre_flight": bool,
+        # Number of seconds salt-ssh keeps a multiplexed master connection to a
+        # host open after its last use, 0 disables connection sharing
+        "ssh_control_persist": int,
+        # Dispatch salt-ssh targets from an asyncio event loop instead of a
+        # process per target, and how many targets it runs at a time
+        "ssh_async": bool,
+        "ssh_async_max_conns": int,
+        # Deploy the salt-thin as content addressed layers, sending only the
+        # layers missing on the target
+        "ssh_thin_layers": bool,
+        # Share the state tarballs built by salt-ssh between the targets with
+        # the same low data and files, and how long unused ones are kept
+        "ssh_state_pkg_cache": bool,
+        "ssh_state_pkg_cache_ttl": int,
+        # Keep the roster data salt-ssh reads from the flat, ansible and
+        # terraform rosters in the cache until the roster file changes, or for
+        # at most roster_cache_ttl seconds
+        "roster_cache": bool,
+        "roster_cache_ttl": int,
+        # Keep the package inventories read by the apt and yum pkg modules in
+        # the minion cache until the dpkg or rpm database changes
+        "pkg_inventory_cache": bool,
         "cluster_mode": bool,
         "sqlite_queue_dir": str,
         "queue_dirs": list,
@@ -939,6 +1014,8 @@ VALID_OPTS = immutabletypes.freeze(
         "thoriumenv": (type(None), str),
         # Thorium top file location
         "thorium_top": str,
+        # Seconds between snapshots of the thorium register to the cachedir
+        "thorium_register_snapshot_interval": int,
         # Allow raw_shell option when using the ssh
         # client via the Salt API
         "netapi_allow_raw_shell": bool,
@@ -984,6 +1061,7 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "grains_blacklist": [],
         "grains_cache": False,
         "grains_cache_expiration": 300,
+        "pkg_inventory_cache": False,
         "grains_deep_merge": False,
         "conf_file": os.path.join(salt.syspaths.CONFIG_DIR, "minion"),
         "sock_dir": os.path.join(salt.syspaths.SOCK_DIR, "minion"),
@@ -1022,10 +1100,16 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "thoriumenv": None,
         "thorium_top": "top.sls",
         "thorium_interval": 0.5,
+        "thorium_register_snapshot_interval": 0,
         "thorium_roots": {"base": [salt.syspaths.BASE_THORIUM_ROOTS_DIR]},
         "file_client": "remote",
         "local": False,
         "use_master_when_local": False,
+        "fileclient_delta_transfer": False,
+        "fileclient_prefetch_workers": 1,
+        "fileclient_hash_batch_ttl": 0,
+        "fileclient_cache_size_max": 0,
+        "fileclient_cache_ttl": 0,
         "file_roots": {
             "base": [salt.syspaths.BASE_FILE_ROOTS_DIR, salt.syspaths.SPM_FORMULA_PATH]
         },
@@ -1053,6 +1137,11 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "azurefs_update_interval": DEFAULT_INTERVAL,
         "gitfs_update_interval": DEFAULT_INTERVAL,
         "git_pillar_update_interval": DEFAULT_INTERVAL,
+        "gitfs_fetch_workers": 1,
+        "gitfs_fetch_timeout": 0,
+        "gitfs_write_blobs": True,
+        "git_pillar_fetch_workers": 1,
+        "git_pillar_fetch_timeout": 0,
         "hgfs_update_interval": DEFAULT_INTERVAL,
         "minionfs_update_interval": DEFAULT_INTERVAL,
         "s3fs_update_interval": DEFAULT_INTERVAL,
@@ -1120,6 +1209,9 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "ipc_write_buffer": _DFLT_IPC_WBUFFER,
         "ipv6": None,
         "file_buffer_size": 262144,
+        "file_precompress": False,
+        "file_precompress_min_size": 1048576,
+        "file_precompress_ttl": 86400,
         "tcp_pub_port": 4510,
         "tcp_pull_port": 4511,
         "tcp_authentication_retries": 5,
@@ -1148,6 +1240,8 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "state_auto_order": True,
         "state_events": False,
         "state_aggregate": False,
+        "state_prefetch_sources": False,
+        "state_batch": False,
         "snapper_states": False,
         "snapper_states_config": "root",
         "acceptance_wait_time": 10,
@@ -1194,6 +1288,8 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "reactor_refresh_interval": 60,
         "reactor_worker_threads": 10,
         "reactor_worker_hwm": 10000,
+        "reactor_render_cache": True,
+        "reactor_coalesce_window": 0,
         "engines": [],
         "tcp_keepalive": True,
         "tcp_keepalive_idle": 300,
@@ -1284,6 +1380,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "thoriumenv": None,
         "thorium_top": "top.sls",
         "thorium_interval": 0.5,
+        "thorium_register_snapshot_interval": 0,
         "thorium_roots": {"base": [salt.syspaths.BASE_THORIUM_ROOTS_DIR]},
         "top_file_merging_strategy": "merge",
         "env_order": [],
@@ -1298,6 +1395,11 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "azurefs_update_interval": DEFAULT_INTERVAL,
         "gitfs_update_interval": DEFAULT_INTERVAL,
         "git_pillar_update_interval": DEFAULT_INTERVAL,
+        "gitfs_fetch_workers": 1,
+        "gitfs_fetch_timeout": 0,
+        "gitfs_write_blobs": True,
+        "git_pillar_fetch_workers": 1,
+        "git_pillar_fetch_timeout": 0,
         "hgfs_update_interval": DEFAULT_INTERVAL,
         "minionfs_update_interval": DEFAULT_INTERVAL,
         "s3fs_update_interval": DEFAULT_INTERVAL,
@@ -1402,6 +1504,9 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "file_recv": False,
         "file_recv_max_size": 100,
         "file_buffer_size": 1048576,
+        "file_precompress": False,
+        "file_precompress_min_size": 1048576,
+        "file_precompress_ttl": 86400,
         "file_ignore_regex": [],
         "file_ignore_glob": [],
         "fileserver_backend": ["roots"],
@@ -1409,6 +1514,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "fileserver_ignoresymlinks": False,
         "fileserver_limit_traversal": False,
         "fileserver_verify_config": True,
+        "fileserver_generation": False,
         "max_open_files": 100000,
         "hash_type": "sha256",
         "optimization_order": [0, 1, 2],
@@ -1427,6 +1533,9 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "job_cache": True,
         "ext_job_cache": "",
         "master_job_cache": "local_cache",
+        "master_job_cache_async": False,
+        "master_job_cache_queue_size": 10000,
+        "master_job_cache_writer_threads": 1,
         "job_cache_store_endtime": False,
         "minion_data_cache": True,
         "enforce_mine_cache": False,
@@ -1465,9 +1574,15 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "reactor_refresh_interval": 60,
         "reactor_worker_threads": 10,
         "reactor_worker_hwm": 10000,
+        "reactor_render_cache": True,
+        "reactor_coalesce_window": 0,
         "engines": [],
         "event_return": "",
         "event_return_queue": 0,
+        "event_return_workers": 1,
+        "event_return_backlog": 10,
+        "event_return_spool": False,
+        "event_return_spool_max_batches": 1000,
         "event_return_whitelist": [],
         "event_return_blacklist": [],
         "event_match_type": "startswith",
@@ -1480,6 +1595,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "state_auto_order": True,
         "state_events": False,
         "state_aggregate": False,
+        "state_prefetch_sources": False,
+        "state_batch": False,
         "search": "",
         "loop_interval": 60,
         "nodegroups": {},
@@ -1539,6 +1656,14 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "ssh_identities_only": False,
         "ssh_log_file": os.path.join(salt.syspaths.LOGS_DIR, "ssh"),
         "ssh_config_file": os.path.join(salt.syspaths.HOME_DIR, ".ssh", "config"),
+        "ssh_control_persist": 0,
+        "ssh_async": False,
+        "ssh_async_max_conns": 100,
+        "ssh_thin_layers": False,
+        "ssh_state_pkg_cache": False,
+        "ssh_state_pkg_cache_ttl": 86400,
+        "roster_cache": False,
+        "roster_cache_ttl": 3600,
         "cluster_mode": False,
         "sqlite_queue_dir": os.path.join(salt.syspaths.CACHE_DIR, "master", "queues"),
         "queue_dirs": [],
@@ -427,8 +427,11 @@ class RemoteFuncs(object):
         """
         fs_ = salt.fileserver.Fileserver(self.opts)
         self._serve_file = fs_.serve_file
+        self._serve_file_delta = fs_.serve_file_delta
         self._file_find = fs_._find_file
         self._file_hash = fs_.file_hash
+        self._file_hash_list = fs_.file_hash_list
+        self._file_hash_and_stat_list = fs_.file_hash_and_stat_list
         self._file_list = fs_.file_list
         self._file_list_emptydirs = fs_.file_list_emptydirs
         self._dir_list = fs_.dir_list
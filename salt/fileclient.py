@@ -5,10 +5,14 @@ Classes that manage file clients
 import contextlib
 import errno
 import ftplib
+import hashlib
 import logging
 import os
 import shutil
 import string
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 
 import salt.client
 import salt.crypt
@@ -18,7 +22,9 @@ import salt.loader
 import salt.payload
 import salt.transport.client
 import salt.utils.atomicfile
+import salt.utils.compress
 import salt.utils.data
+import salt.utils.filedelta
 import salt.utils.files
 import salt.utils.gzip_util
 import salt.utils.hashutils
@@ -30,6 +36,7 @@ import salt.utils.templates
 import salt.utils.url
 import salt.utils.versions
 from salt.exceptions import CommandExecutionError, MinionError
+from salt.utils.ctx import RequestContext
 
 # pylint: disable=no-name-in-module,import-error
 from salt.ext import six
@@ -81,15 +88,208 @@ def decode_dict_keys_to_str(src):
     return output
 
 
+def fileserver_generations(opts):
+    """
+    Return the fileserver generations the master published, either in the
+    opts of a state run or along with the job being run
+    """
+    gens = opts.get("fileserver_generations")
+    if gens is None:
+        # pylint: disable=no-member
+        gens = RequestContext.current.get("data", {}).get("fileserver_generations")
+        # pylint: enable=no-member
+    return gens
+
+
+class CacheIndex:
+    """
+    Index of the files a fileclient cached under ``cachedir/files``, with the
+    hash they had on the master when they were last validated, their size and
+    when they were last used. It is shared by all of the fileclients of a
+    minion through ``cachedir/files.idx``, which is written back every
+    ``save_interval`` seconds and when the client is destroyed, merging in
+    the changes made by the others.
+
+    When it is saved, the least recently used files are removed once their
+    total size goes over ``fileclient_cache_size_max``.
+
+    The index is only kept when it is of use, that is when
+    ``fileclient_cache_size_max`` or ``fileclient_cache_ttl`` is set or the
+    master announces the generations of its fileserver.
+    """
+
+    save_interval = 5
+
+    # Fields of an index entry
+    HSUM, HASH_TYPE, SIZE, USED, VALIDATED, GENERATION = range(6)
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.path = os.path.join(opts["cachedir"], "files.idx")
+        self._entries = None
+        self.dirty = set()
+        self.last_save = time.time()
+
+    @property
+    def enabled(self):
+        return bool(
+            self.opts.get("fileclient_cache_size_max", 0)
+            or self.opts.get("fileclient_cache_ttl", 0)
+            or fileserver_generations(self.opts)
+        )
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self):
+        try:
+            with salt.utils.files.fopen(self.path, "rb") as fp_:
+                return self.serial.load(fp_)
+        except (OSError, ValueError, TypeError) as exc:
+            if getattr(exc, "errno", None) != errno.ENOENT:
+                log.debug("Failed to read the fileclient cache index: %s", exc)
+        # Start with the files cached before there was an index
+        ret = {}
+        for root, _, files in salt.utils.path.os_walk(
+            os.path.join(self.opts["cachedir"], "files")
+        ):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                ret[path] = [None, None, stat.st_size, stat.st_mtime, 0, None]
+        return ret
+
+    def get(self, path):
+        return self.entries.get(path)
+
+    def update(self, path, hash_result, generation=None):
+        """
+        Record that a cached file was validated against the master
+        """
+        if not self.enabled:
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        now = time.time()
+        self.entries[path] = [
+            hash_result.get("hsum"),
+            hash_result.get("hash_type"),
+            size,
+            now,
+            now,
+            generation,
+        ]
+        self.dirty.add(path)
+        self._maybe_save()
+
+    def touch(self, path):
+        """
+        Record a use of a cached file
+        """
+        if not self.enabled:
+            return
+        entry = self.entries.get(path)
+        if entry is not None:
+            entry[self.USED] = time.time()
+            self.dirty.add(path)
+            self._maybe_save()
+
+    def fresh(self, path, generation=None):
+        """
+        Whether a cached file can be used without asking the master, because
+        it is unchanged since it was validated and either the fileserver
+        generation it was validated for is still the current one, or it was
+        validated less than ``fileclient_cache_ttl`` seconds ago.
+        """
+        if not self.enabled:
+            return False
+        entry = self.entries.get(path)
+        if entry is None or entry[self.HSUM] is None:
+            return False
+        if generation is None or entry[self.GENERATION] != generation:
+            ttl = self.opts.get("fileclient_cache_ttl", 0)
+            if (
+                not ttl
+                or entry[self.VALIDATED] + ttl < time.time()
+                or entry[self.GENERATION] != generation
+            ):
+                return False
+        try:
+            return os.path.getsize(path) == entry[self.SIZE]
+        except OSError:
+            return False
+
+    def _maybe_save(self):
+        if time.time() - self.last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        """
+        Merge the changes into the index on disk, evicting the least recently
+        used files if the cache is over its size limit
+        """
+        if not self.dirty:
+            return
+        try:
+            with salt.utils.files.flopen(self.path + ".lock", "a"):
+                entries = self._load()
+                for path in self.dirty:
+                    if path in self._entries:
+                        entries[path] = self._entries[path]
+                self._evict(entries)
+                with salt.utils.atomicfile.atomic_open(self.path, "wb") as fp_:
+                    self.serial.dump(entries, fp_)
+        except OSError as exc:
+            log.warning("Failed to write the fileclient cache index: %s", exc)
+            return
+        self._entries = entries
+        self.dirty = set()
+        self.last_save = time.time()
+
+    def _evict(self, entries):
+        size_max = self.opts.get("fileclient_cache_size_max", 0)
+        if not size_max:
+            return
+        total = sum(x[self.SIZE] for x in entries.values())
+        if total <= size_max:
+            return
+        for path in sorted(entries, key=lambda x: entries[x][self.USED]):
+            if total <= size_max:
+                break
+            if path in self.dirty:
+                # Used by this client since the last save
+                continue
+            log.debug("Evicting %s from the fileclient cache", path)
+            try:
+                os.remove(path)
+            except OSError as exc:
+                if exc.errno != errno.ENOENT:
+                    continue
+            total -= entries.pop(path)[self.SIZE]
+
+
 class Client:
     """
     Base class for Salt file interactions
     """
 
+    # Whether _fetch_many may use one client per worker thread
+    _parallel_fetch = False
+
     def __init__(self, opts):
         self.opts = opts
         self.utils = salt.loader.utils(self.opts)
         self.serial = salt.payload.Serial(self.opts)
+        self.cache_index = CacheIndex(self.opts)
 
     # Add __setstate__ and __getstate__ so that the object may be
     # deep copied. It normally can't be deep copied because its
@@ -198,24 +398,80 @@ class Client:
         Download a list of files stored on the master and put them in the
         minion file cache
         """
-        ret = []
         if isinstance(paths, str):
             paths = paths.split(",")
-        for path in paths:
-            ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
-        return ret
+        return self._fetch_many(paths, saltenv, cachedir=cachedir)
 
     def cache_master(self, saltenv="base", cachedir=None):
         """
         Download and cache all files on a master in a specified environment
         """
-        ret = []
-        for path in self.file_list(saltenv):
-            ret.append(
-                self.cache_file(salt.utils.url.create(path), saltenv, cachedir=cachedir)
-            )
+        return self._cache_many(self.file_list(saltenv), saltenv, cachedir=cachedir)
+
+    def _fetch_many(self, paths, saltenv="base", cachedir=None):
+        """
+        Cache a list of files, with up to ``fileclient_prefetch_workers``
+        of them being fetched at the same time, each worker thread using a
+        client of its own.
+        """
+        workers = min(self.opts.get("fileclient_prefetch_workers", 1), len(paths))
+        if workers < 2 or not self._parallel_fetch:
+            return [self.cache_file(x, saltenv, cachedir=cachedir) for x in paths]
+
+        local = threading.local()
+        clients = []
+
+        def _fetch(path):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = self.__class__(self.opts)
+                clients.append(client)
+            return client.cache_file(path, saltenv, cachedir=cachedir)
+
+        pool = ThreadPool(workers)
+        try:
+            return pool.map(_fetch, paths)
+        finally:
+            pool.close()
+            pool.join()
+            for client in clients:
+                client.destroy()
+
+    def _cache_many(self, paths, saltenv="base", prefix="", cachedir=None):
+        """
+        Cache a list of files from a saltenv, all under ``prefix``. The
+        hashes of all of them are asked for at once, the files whose cached
+        copy is up to date are not asked about again and the others are
+        fetched with :meth:`_fetch_many`.
+        """
+        ret = [None] * len(paths)
+        hashes = self.hash_list(saltenv, prefix) if len(paths) > 1 else None
+        fetch = []
+        for idx, path in enumerate(paths):
+            if hashes is not None and path in hashes["hashes"]:
+                with self._cache_loc(path, saltenv, cachedir=cachedir) as dest:
+                    if os.path.isfile(dest) and hashes["hashes"][
+                        path
+                    ] == salt.utils.hashutils.get_hash(dest, hashes["hash_type"]):
+                        ret[idx] = dest
+                        continue
+            fetch.append(idx)
+        fetched = self._fetch_many(
+            [salt.utils.url.create(paths[idx]) for idx in fetch],
+            saltenv,
+            cachedir=cachedir,
+        )
+        for idx, dest in zip(fetch, fetched):
+            ret[idx] = dest
         return ret
 
+    def hash_list(self, saltenv="base", prefix=""):
+        """
+        Return the hashes of all of the files under a prefix on the file
+        server, or None if the file server cannot do it in one go
+        """
+        return None
+
     def cache_dir(
         self,
         path,
@@ -240,17 +496,17 @@ class Client:
         log.info("Caching directory '%s' for environment '%s'", path, saltenv)
         # go through the list of all files finding ones that are in
         # the target directory and caching them
-        for fn_ in self.file_list(saltenv):
+        paths = []
+        for fn_ in self.file_list(saltenv, prefix=path):
             fn_ = salt.utils.data.decode(fn_)
             if fn_.strip() and fn_.startswith(path):
                 if salt.utils.stringutils.check_include_exclude(
                     fn_, include_pat, exclude_pat
                 ):
-                    fn_ = self.cache_file(
-                        salt.utils.url.create(fn_), saltenv, cachedir=cachedir
-                    )
-                    if fn_:
-                        ret.append(fn_)
+                    paths.append(fn_)
+        ret.extend(
+            x for x in self._cache_many(paths, saltenv, path, cachedir=cachedir) if x
+        )
 
         if include_empty:
             # Break up the path into a list containing the bottom-level
@@ -316,6 +572,13 @@ class Client:
         """
         return {}
 
+    def _fileserver_generation(self, saltenv):
+        """
+        Return the generation of the saltenv on the master's fileserver, as
+        last announced by the master, or None if it is not known
+        """
+        return salt.fileserver.generation(fileserver_generations(self.opts), saltenv)
+
     def is_cached(self, path, saltenv="base", cachedir=None):
         """
         Returns the full path to a file if it is cached locally on the minion
@@ -338,6 +601,7 @@ class Client:
         extrndest = self._extrn_path(path, saltenv, cachedir=cachedir)
 
         if os.path.exists(filesdest):
+            self.cache_index.touch(filesdest)
             return salt.utils.url.escape(filesdest) if escaped else filesdest
         elif os.path.exists(localsfilesdest):
             return (
@@ -1067,9 +1331,12 @@ class RemoteClient(Client):
     Interact with the salt master file server.
     """
 
+    _parallel_fetch = True
+
     def __init__(self, opts):
         Client.__init__(self, opts)
         self._closing = False
+        self._hash_batch = {}
         self.channel = salt.transport.client.ReqChannel.factory(self.opts)
         if hasattr(self.channel, "auth"):
             self.auth = self.channel.auth
@@ -1097,6 +1364,10 @@ class RemoteClient(Client):
             return
 
         self._closing = True
+        try:
+            self.cache_index.save()
+        except AttributeError:
+            pass
         channel = None
         try:
             channel = self.channel
@@ -1118,6 +1389,17 @@ class RemoteClient(Client):
         if senv:
             saltenv = senv
 
+        # Files cached in the default location are tracked in the cache index
+        index_dest = None
+        generation = self._fileserver_generation(saltenv)
+        if not dest:
+            with self._cache_loc(
+                self._check_proto(path), saltenv, cachedir=cachedir
+            ) as index_dest:
+                if self.cache_index.fresh(index_dest, generation):
+                    self.cache_index.touch(index_dest)
+                    return index_dest
+
         if not salt.utils.platform.is_windows():
             hash_server, stat_server = self.hash_and_stat_file(path, saltenv)
             try:
@@ -1177,7 +1459,12 @@ class RemoteClient(Client):
                 hash_local = self.hash_file(dest2check, saltenv)
                 mode_local = None
 
-            if hash_local == hash_server:
+            if hash_local == hash_server or (
+                self.opts.get("fileclient_delta_transfer")
+                and self._get_file_delta(path, saltenv, dest2check, hash_server)
+            ):
+                if dest2check == index_dest:
+                    self.cache_index.update(index_dest, hash_server, generation)
                 return dest2check
 
         log.debug(
@@ -1190,6 +1477,10 @@ class RemoteClient(Client):
         if gzip:
             gzip = int(gzip)
             load["gzip"] = gzip
+            # Let the master serve a precompressed copy of the whole file
+            load["codecs"] = salt.utils.compress.available_codecs()
+        decomp = None
+        decomp_loc = 0
 
         fn_ = None
         if dest:
@@ -1214,6 +1505,8 @@ class RemoteClient(Client):
         while True:
             if not fn_:
                 load["loc"] = 0
+            elif decomp is not None:
+                load["loc"] = decomp_loc
             else:
                 load["loc"] = fn_.tell()
             data = self.channel.send(load, raw=True)
@@ -1224,6 +1517,18 @@ class RemoteClient(Client):
             # strings for the top-level keys to simplify things.
             data = decode_dict_keys_to_str(data)
             try:
+                if not data["data"] and decomp is not None and not decomp.eof:
+                    log.warning(
+                        "Compressed download of file %s was cut short, fetching "
+                        "it again uncompressed",
+                        path,
+                    )
+                    for key in ("codecs", "codec", "chash"):
+                        load.pop(key, None)
+                    decomp = None
+                    fn_.seek(0)
+                    fn_.truncate()
+                    continue
                 if not data["data"]:
                     if not fn_ and data["dest"]:
                         # This is a 0 byte file on the master
@@ -1261,7 +1566,14 @@ class RemoteClient(Client):
                         if os.path.isdir(dest):
                             salt.utils.files.rm_rf(dest)
                         fn_ = salt.utils.atomicfile.atomic_open(dest, "wb+")
-                if data.get("gzip", None):
+                if data.get("codec"):
+                    if decomp is None:
+                        load["codec"] = salt.utils.stringutils.to_str(data["codec"])
+                        load["chash"] = salt.utils.stringutils.to_str(data["chash"])
+                        decomp = salt.utils.compress.Decompressor(load["codec"])
+                    decomp_loc += len(data["data"])
+                    data = decomp.decompress(data["data"])
+                elif data.get("gzip", None):
                     data = salt.utils.gzip_util.uncompress(data["data"])
                 else:
                     data = data["data"]
@@ -1297,6 +1609,8 @@ class RemoteClient(Client):
         if fn_:
             fn_.close()
             log.info("Fetching file from saltenv '%s', ** done ** '%s'", saltenv, path)
+            if dest == index_dest:
+                self.cache_index.update(index_dest, hash_server, generation)
         else:
             log.debug(
                 "In saltenv '%s', we are ** missing ** the file '%s'", saltenv, path
@@ -1304,6 +1618,118 @@ class RemoteClient(Client):
 
         return dest
 
+    def _get_file_delta(self, path, saltenv, dest, hash_server):
+        """
+        Update the local copy ``dest`` of a file by fetching only the blocks
+        which changed on the master, see :mod:`salt.utils.filedelta`.
+        Returns False when the master does not support it or the result does
+        not match ``hash_server``, the caller then fetches the whole file.
+        """
+        try:
+            hash_obj = hashlib.new(hash_server["hash_type"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        block_size = self.opts["file_buffer_size"]
+        load = {
+            "path": self._check_proto(path),
+            "saltenv": saltenv,
+            "cmd": "_serve_file_delta",
+            "block_size": block_size,
+            "loc": 0,
+        }
+        try:
+            with salt.utils.atomicfile.atomic_open(dest, "wb+") as fn_:
+                # The basis is closed before the new file is moved over it
+                with salt.utils.files.fopen(dest, "rb") as basis:
+                    load["sigs"] = salt.utils.filedelta.signatures(basis, block_size)
+                    while True:
+                        data = decode_dict_keys_to_str(
+                            self.channel.send(load, raw=True)
+                        )
+                        if not isinstance(data, dict) or "ops" not in data:
+                            raise MinionError("Delta transfer not available")
+                        salt.utils.filedelta.apply(
+                            data["ops"], basis, fn_, block_size, hash_obj
+                        )
+                        if data["done"]:
+                            break
+                        load["loc"] = data["loc"]
+                        if "token" in data:
+                            # The master keeps the signatures from now on
+                            load["token"] = data["token"]
+                            load.pop("sigs", None)
+                if hash_obj.hexdigest() != hash_server["hsum"]:
+                    raise MinionError("Hash mismatch after delta transfer")
+        except MinionError as exc:
+            log.debug("%s for '%s', fetching the whole file", exc, path)
+            return False
+        log.info(
+            "Fetching file from saltenv '%s', ** done ** '%s' (delta)", saltenv, path
+        )
+        return True
+
+    def hash_and_stat_list(self, saltenv="base", paths=None, prefix=""):
+        """
+        Return the hashes and stat results of a list of salt:// files, or of
+        all of the files under a prefix, in one request to the master. Returns
+        None if the master does not support it.
+
+        The answers are remembered for ``fileclient_hash_batch_ttl`` seconds,
+        if set, during which :meth:`hash_file` and :meth:`hash_and_stat_file`
+        do not ask the master about these files again.
+        """
+        load = {"saltenv": saltenv, "cmd": "_file_hash_and_stat_list"}
+        if paths is not None:
+            load["paths"] = [self._check_proto(x) for x in paths]
+        else:
+            load["prefix"] = prefix
+        ret = self.channel.send(load)
+        if not isinstance(ret, dict) or "hashes" not in ret:
+            return None
+        now = time.time()
+        self._hash_batch = {
+            key: val for key, val in self._hash_batch.items() if val[0] >= now
+        }
+        ttl = self.opts.get("fileclient_hash_batch_ttl", 0)
+        if ttl <= 0:
+            return ret
+        expire = now + ttl
+        for path, hsum in ret["hashes"].items():
+            self._hash_batch[(saltenv, path)] = (
+                expire,
+                {"hsum": hsum, "hash_type": ret["hash_type"]},
+                ret["stats"].get(path),
+            )
+        return ret
+
+    def _batch_lookup(self, path, saltenv):
+        """
+        Return the hash and stat result of a file remembered by
+        :meth:`hash_and_stat_list`, or None
+        """
+        if not self._hash_batch or not path.startswith("salt://"):
+            return None
+        key = (saltenv, self._check_proto(path))
+        try:
+            expire, hsum, stat = self._hash_batch[key]
+        except KeyError:
+            return None
+        if expire < time.time():
+            del self._hash_batch[key]
+            return None
+        return dict(hsum), stat
+
+    def hash_list(self, saltenv="base", prefix=""):
+        """
+        Return the hashes of all of the files under a prefix on the master,
+        or None if the master does not support it
+        """
+        load = {"saltenv": saltenv, "prefix": prefix, "cmd": "_file_hash_list"}
+        ret = self.channel.send(load)
+        if not isinstance(ret, dict) or "hashes" not in ret:
+            return None
+        return ret
+
     def file_list(self, saltenv="base", prefix=""):
         """
         List the files on the master
@@ -1375,6 +1801,9 @@ class RemoteClient(Client):
         master file server prepend the path with salt://<file on server>
         otherwise, prepend the file with / for a local file.
         """
+        batch = self._batch_lookup(path, saltenv)
+        if batch is not None:
+            return batch[0]
         return self.__hash_and_stat_file(path, saltenv)
 
     def hash_and_stat_file(self, path, saltenv="base"):
@@ -1382,6 +1811,9 @@ class RemoteClient(Client):
         The same as hash_file, but also return the file's mode, or None if no
         mode data is present.
         """
+        batch = self._batch_lookup(path, saltenv)
+        if batch is not None:
+            return batch
         hash_result = self.hash_file(path, saltenv)
         try:
             path = self._check_proto(path)
@@ -1462,9 +1894,12 @@ class FSClient(RemoteClient):
     the FSChan object
     """
 
+    _parallel_fetch = False
+
     def __init__(self, opts):  # pylint: disable=W0231
         Client.__init__(self, opts)  # pylint: disable=W0233
         self._closing = False
+        self._hash_batch = {}
         self.channel = salt.fileserver.FSChan(opts)
         self.auth = DumbAuth()
 
@@ -3,18 +3,26 @@ File server pluggable modules and generic backend functions
 """
 
 
+import bisect
 import errno
 import fnmatch
 import logging
 import os
 import re
+import threading
 import time
+import uuid
 from collections.abc import Sequence
 
 import salt.loader
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.compress
 import salt.utils.data
+import salt.utils.filedelta
 import salt.utils.files
 import salt.utils.path
+import salt.utils.stringutils
 import salt.utils.url
 import salt.utils.versions
 from salt.ext import six
@@ -23,6 +31,20 @@ from salt.utils.decorators import ensure_unicode_args
 
 log = logging.getLogger(__name__)
 
+# The decoded file list caches loaded by this process, keyed on the path of
+# the cache file. Each entry holds the identity of the cache file it was read
+# from, so that it is only loaded again once the file has been replaced.
+_FILE_LIST_INDEX = {}
+
+# A file being compressed for file_precompress whose temporary file was not
+# written to for this many seconds is assumed to have been abandoned
+PRECOMPRESS_STALE = 600
+
+# Block signatures of the delta transfers in progress are kept for this many
+# seconds, and looked up by the token handed to the minion
+DELTA_SIGS_TTL = 3600
+DELTA_TOKEN_RE = re.compile(r"^[0-9a-f]{32}$")
+
 
 def _unlock_cache(w_lock):
     """
@@ -143,18 +165,19 @@ def check_file_list_cache(opts, form, list_cache, w_lock):
                     log.warning("The file list_cache was created in the future!")
                 if 0 <= age < opts.get("fileserver_list_cache_time", 20):
                     # Young enough! Load this sucker up!
-                    with salt.utils.files.fopen(list_cache, "rb") as fp_:
-                        log.debug(
-                            "Returning file list from cache: age=%s cache_time=%s %s",
-                            age,
-                            opts.get("fileserver_list_cache_time", 20),
-                            list_cache,
-                        )
-                        return (
-                            salt.utils.data.decode(serial.load(fp_).get(form, [])),
-                            False,
-                            False,
-                        )
+                    log.debug(
+                        "Returning file list from cache: age=%s cache_time=%s %s",
+                        age,
+                        opts.get("fileserver_list_cache_time", 20),
+                        list_cache,
+                    )
+                    return (
+                        _load_file_list_index(serial, list_cache, cache_stat).get(
+                            form, []
+                        ),
+                        False,
+                        False,
+                    )
                 elif _lock_cache(w_lock):
                     # Set the w_lock and go
                     refresh_cache = True
@@ -169,19 +192,136 @@ def check_file_list_cache(opts, form, list_cache, w_lock):
     return None, refresh_cache, save_cache
 
 
+def _file_list_cache_id(cache_stat):
+    return (cache_stat.st_ino, cache_stat.st_mtime_ns, cache_stat.st_size)
+
+
+def _load_file_list_index(serial, list_cache, cache_stat):
+    """
+    Return the decoded contents of a file list cache, only reading the file
+    when it has been replaced since this process last read it
+    """
+    cache_id = _file_list_cache_id(cache_stat)
+    index = _FILE_LIST_INDEX.get(list_cache)
+    if index is None or index[0] != cache_id:
+        with salt.utils.files.fopen(list_cache, "rb") as fp_:
+            index = (cache_id, salt.utils.data.decode(serial.load(fp_)))
+        _FILE_LIST_INDEX[list_cache] = index
+    return index[1]
+
+
 def write_file_list_cache(opts, data, list_cache, w_lock):
     """
-    Checks the cache file to see if there is a new enough file list cache, and
-    returns the match (if found, along with booleans used by the fileserver
-    backend to determine if the cache needs to be refreshed/written).
+    Write the file list cache. The cache file is replaced atomically, so that
+    readers never see a partially written cache.
     """
     serial = salt.payload.Serial(opts)
-    with salt.utils.files.fopen(list_cache, "w+b") as fp_:
-        fp_.write(serial.dumps(data))
+    try:
+        with salt.utils.atomicfile.atomic_open(list_cache, "w+b") as fp_:
+            fp_.write(serial.dumps(data))
+        _FILE_LIST_INDEX[list_cache] = (
+            _file_list_cache_id(os.stat(list_cache)),
+            salt.utils.data.decode(data),
+        )
+    finally:
         _unlock_cache(w_lock)
         log.trace("Lockfile %s removed", w_lock)
 
 
+def prefix_filter(paths, prefix):
+    """
+    Return the paths from the sorted list ``paths`` which start with
+    ``prefix``, found by bisecting the list rather than checking every path
+    """
+    if not prefix:
+        return paths
+    start = bisect.bisect_left(paths, prefix)
+    end = bisect.bisect_left(paths, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+    return paths[start:end]
+
+
+# Backends which only see their files change when they are updated, the
+# fileserver generations are not published when any other one is enabled.
+# The files of minionfs for instance change whenever a minion pushes one.
+GENERATION_BACKENDS = frozenset(["roots", "gitfs", "hgfs", "svnfs", "s3fs", "azurefs"])
+
+
+def _generations_path(opts):
+    return os.path.join(opts["cachedir"], "fileserver_generations.p")
+
+
+def read_generations(opts):
+    """
+    Return the fileserver generation of each saltenv, the ``*`` key holding
+    the generation of the changes which could affect any saltenv. See
+    :func:`bump_generations`. Returns no generations when a backend which
+    does not support them is enabled.
+
+    .. versionadded:: Aluminium
+    """
+    if not set(opts.get("fileserver_backend", [])) <= GENERATION_BACKENDS:
+        return {}
+    path = _generations_path(opts)
+    try:
+        return dict(
+            _load_file_list_index(salt.payload.Serial(opts), path, os.stat(path))
+        )
+    except Exception as exc:  # pylint: disable=broad-except
+        if getattr(exc, "errno", None) != errno.ENOENT:
+            log.debug("Failed to read the fileserver generations: %s", exc)
+        return {}
+
+
+def bump_generations(opts, saltenvs):
+    """
+    Bump the fileserver generation of the given saltenvs, ``*`` standing for
+    all of them. Generations are timestamps in milliseconds which are made to
+    always increase, so that they keep increasing even if the file holding
+    them was lost.
+
+    .. versionadded:: Aluminium
+    """
+    gens = read_generations(opts)
+    now = int(time.time() * 1000)
+    for saltenv in saltenvs:
+        gens[saltenv] = max(now, gens.get(saltenv, 0) + 1)
+    path = _generations_path(opts)
+    serial = salt.payload.Serial(opts)
+    with salt.utils.atomicfile.atomic_open(path, "w+b") as fp_:
+        fp_.write(serial.dumps(gens))
+    _FILE_LIST_INDEX[path] = (_file_list_cache_id(os.stat(path)), gens)
+    log.debug("Bumped the fileserver generation of %s", ", ".join(saltenvs))
+    return gens
+
+
+def changed_saltenvs(update_ret):
+    """
+    Return the saltenvs whose generation must be bumped after a backend
+    update returned ``update_ret``: none if it reported that nothing changed,
+    the ones it named if it did, all of them otherwise.
+
+    .. versionadded:: Aluminium
+    """
+    if isinstance(update_ret, dict):
+        if not update_ret.get("changed"):
+            return []
+        if update_ret.get("saltenvs"):
+            return update_ret["saltenvs"]
+    return ["*"]
+
+
+def generation(gens, saltenv):
+    """
+    Return the generation of a saltenv out of the generations published by
+    the master, or None if it did not publish any
+
+    .. versionadded:: Aluminium
+    """
+    if not gens:
+        return None
+    return max(gens.get(saltenv, 0), gens.get("*", 0))
+
+
 def check_env_cache(opts, env_cache):
     """
     Returns cached env names, if present. Otherwise returns None.
@@ -479,11 +619,14 @@ class Fileserver:
         function
         """
         back = self.backends(back)
+        changed = set()
         for fsb in back:
             fstr = "{}.update".format(fsb)
             if fstr in self.servers:
                 log.debug("Updating %s fileserver cache", fsb)
-                self.servers[fstr](**kwargs)
+                changed.update(changed_saltenvs(self.servers[fstr](**kwargs)))
+        if changed and self.opts.get("fileserver_generation"):
+            bump_generations(self.opts, changed)
 
     def update_intervals(self, back=None):
         """
@@ -626,11 +769,230 @@ class Fileserver:
         fnd = self.find_file(load["path"], load["saltenv"])
         if not fnd.get("back"):
             return ret
+        if load.get("codecs") and self.opts.get("file_precompress"):
+            precompressed = self._serve_precompressed(load, fnd)
+            if precompressed:
+                return precompressed
         fstr = "{}.serve_file".format(fnd["back"])
         if fstr in self.servers:
             return self.servers[fstr](load, fnd)
         return ret
 
+    def _local_path(self, fnd):
+        """
+        Return the path of the local copy of a file found by find_file, asking
+        the backend to write one if it serves the file from elsewhere
+        """
+        fstr = "{}.materialize".format(fnd["back"])
+        if fstr in self.servers:
+            return self.servers[fstr](fnd)
+        return fnd.get("path")
+
+    def _precompressed_path(self, codec, hsum):
+        return os.path.join(self.opts["cachedir"], "file_precompress", codec, hsum)
+
+    def _serve_precompressed(self, load, fnd):
+        """
+        Serve a chunk of the compressed variant of a file, which is kept in
+        the master cache keyed by the hash of the file contents so that it is
+        only compressed once. The minion passes the codecs it supports, and
+        once the transfer started the codec and hash which were picked for
+        it. Returns an empty dict when the file is not served compressed.
+        """
+        codec = salt.utils.stringutils.to_str(load.get("codec") or "")
+        hsum = salt.utils.stringutils.to_str(load.get("chash") or "")
+        if codec and hsum:
+            if codec not in salt.utils.compress.available_codecs() or (
+                os.path.basename(hsum) != hsum
+            ):
+                return {}
+            cpath = self._precompressed_path(codec, hsum)
+        else:
+            if load["loc"]:
+                # The transfer started uncompressed
+                return {}
+            fpath = self._local_path(fnd)
+            if not fpath or not os.path.isfile(fpath):
+                return {}
+            if os.path.getsize(fpath) < self.opts["file_precompress_min_size"]:
+                return {}
+            codecs = [salt.utils.stringutils.to_str(x) for x in load["codecs"]]
+            codec = next(
+                (x for x in salt.utils.compress.available_codecs() if x in codecs),
+                None,
+            )
+            if codec is None:
+                return {}
+            hsum = self.file_hash({"path": load["path"], "saltenv": load["saltenv"]})
+            if not hsum:
+                return {}
+            hsum = hsum["hsum"]
+            cpath = self._precompressed_path(codec, hsum)
+            try:
+                # Keep it from being pruned
+                os.utime(cpath, None)
+            except OSError:
+                # Serve this request uncompressed, the following ones are
+                # served from the compressed copy once it is written
+                self._start_precompress(fpath, cpath, codec)
+                return {}
+        try:
+            with salt.utils.files.fopen(cpath, "rb") as fp_:
+                fp_.seek(load["loc"])
+                data = fp_.read(self.opts["file_buffer_size"])
+        except OSError:
+            # Pruned in the middle of the transfer, the minion starts over
+            return {"data": "", "dest": fnd["rel"], "codec": codec, "chash": hsum}
+        return {"data": data, "dest": fnd["rel"], "codec": codec, "chash": hsum}
+
+    def _start_precompress(self, fpath, cpath, codec):
+        """
+        Compress a file in a background thread, unless another worker is
+        already compressing it
+        """
+        cdir = os.path.dirname(cpath)
+        try:
+            os.makedirs(cdir)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+        tmp = "{}.tmp".format(cpath)
+        try:
+            fd_ = os.open(tmp, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if os.path.getmtime(tmp) < time.time() - PRECOMPRESS_STALE:
+                    # Left behind by a worker which died while compressing
+                    os.remove(tmp)
+            except OSError:
+                pass
+            return
+        os.close(fd_)
+        thread = threading.Thread(
+            target=self._precompress, args=(fpath, tmp, cpath, codec)
+        )
+        thread.daemon = True
+        thread.start()
+
+    def _precompress(self, fpath, tmp, cpath, codec):
+        """
+        Write the compressed variant of a file and prune the variants which
+        were not refreshed in ``file_precompress_ttl`` seconds
+        """
+        log.debug("Compressing %s to %s", fpath, cpath)
+        try:
+            salt.utils.compress.compress_file(fpath, tmp, codec)
+            os.rename(tmp, cpath)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.error("Failed to compress %s: %s", fpath, exc)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        cdir = os.path.dirname(cpath)
+        expire = time.time() - self.opts["file_precompress_ttl"]
+        for name in os.listdir(cdir):
+            path = os.path.join(cdir, name)
+            try:
+                if os.path.getmtime(path) < expire:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _delta_sigs_path(self, token):
+        return os.path.join(self.opts["cachedir"], "file_delta", token)
+
+    def _store_delta_sigs(self, sigs):
+        """
+        Keep the block signatures of a delta transfer, so that the minion
+        only sends them with its first request. Returns the token the minion
+        passes instead of them, and prunes the signatures of transfers
+        which were abandoned.
+        """
+        token = uuid.uuid4().hex
+        path = self._delta_sigs_path(token)
+        sdir = os.path.dirname(path)
+        try:
+            os.makedirs(sdir)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+        with salt.utils.atomicfile.atomic_open(path, "wb") as fp_:
+            salt.payload.Serial(self.opts).dump(sigs, fp_)
+        expire = time.time() - DELTA_SIGS_TTL
+        for name in os.listdir(sdir):
+            spath = os.path.join(sdir, name)
+            try:
+                if os.path.getmtime(spath) < expire:
+                    os.remove(spath)
+            except OSError:
+                pass
+        return token
+
+    def serve_file_delta(self, load):
+        """
+        Serve up the changes to a file as a list of operations against the
+        block signatures of the copy the minion already has, see
+        :mod:`salt.utils.filedelta`. The minion sends the signatures with its
+        first request and the returned token with the following ones. An
+        empty dict tells the minion to fall back to :meth:`serve_file`.
+
+        .. versionadded:: Aluminium
+        """
+        ret = {}
+
+        if "env" in load:
+            # "env" is not supported; Use "saltenv".
+            load.pop("env")
+
+        if any(x not in load for x in ("path", "loc", "saltenv", "block_size")):
+            return ret
+        block_size = load["block_size"]
+        if not isinstance(block_size, int) or not (
+            1024 <= block_size <= salt.utils.filedelta.MAX_BLOCK_SIZE
+        ):
+            return ret
+        if not isinstance(load["saltenv"], str):
+            load["saltenv"] = str(load["saltenv"])
+
+        token = salt.utils.stringutils.to_str(load.get("token") or "")
+        if token:
+            if not DELTA_TOKEN_RE.match(token):
+                return ret
+            try:
+                with salt.utils.files.fopen(self._delta_sigs_path(token), "rb") as fp_:
+                    sigs = salt.payload.Serial(self.opts).load(fp_)
+            except OSError:
+                # Pruned, the minion fetches the whole file
+                return ret
+        elif "sigs" in load:
+            sigs = load["sigs"]
+        else:
+            return ret
+
+        fnd = self.find_file(load["path"], load["saltenv"])
+        if not fnd.get("back") or not fnd.get("path"):
+            return ret
+        fpath = os.path.normpath(self._local_path(fnd))
+        if not os.path.isfile(fpath):
+            # Not a backend which keeps a local copy of its files
+            return ret
+        with salt.utils.files.fopen(fpath, "rb") as fp_:
+            ops, loc, done = salt.utils.filedelta.delta(
+                fp_, sigs, block_size, load["loc"]
+            )
+        ret.update({"dest": fnd["rel"], "ops": ops, "loc": loc, "done": done})
+        if done:
+            if token:
+                try:
+                    os.remove(self._delta_sigs_path(token))
+                except OSError:
+                    pass
+        elif not token:
+            ret["token"] = self._store_delta_sigs(sigs)
+        return ret
+
     def __file_hash_and_stat(self, load):
         """
         Common code for hashing and stating files
@@ -673,6 +1035,46 @@ class Fileserver:
         except (IndexError, TypeError):
             return "", None
 
+    def file_hash_and_stat_list(self, load):
+        """
+        Return the hashes and stat results of a list of files, or of all of
+        the files under a prefix, in one go. Files which are not found are
+        left out.
+
+        .. versionadded:: Aluminium
+        """
+        if "env" in load:
+            # "env" is not supported; Use "saltenv".
+            load.pop("env")
+
+        if "saltenv" not in load:
+            return {}
+        saltenv = load["saltenv"]
+        paths = load.get("paths")
+        if paths is None:
+            paths = self.file_list(
+                {"saltenv": saltenv, "prefix": load.get("prefix", "")}
+            )
+        ret = {"hash_type": self.opts["hash_type"], "hashes": {}, "stats": {}}
+        for path in paths:
+            hsum, stat = self.file_hash_and_stat({"path": path, "saltenv": saltenv})
+            if hsum:
+                ret["hashes"][path] = hsum["hsum"]
+                ret["stats"][path] = stat
+        return ret
+
+    def file_hash_list(self, load):
+        """
+        Return the hashes of all of the files under a prefix in one go, so
+        that a client caching a whole directory does not have to ask for
+        them one file at a time
+
+        .. versionadded:: Aluminium
+        """
+        ret = self.file_hash_and_stat_list(load)
+        ret.pop("stats", None)
+        return ret
+
     def clear_file_list_cache(self, load):
         """
         Deletes the file_lists cache files
@@ -774,10 +1176,7 @@ class Fileserver:
             if fstr in self.servers:
                 ret.update(self.servers[fstr](load))
         # some *fs do not handle prefix. Ensure it is filtered
-        prefix = load.get("prefix", "").strip("/")
-        if prefix != "":
-            ret = [f for f in ret if f.startswith(prefix)]
-        return sorted(ret)
+        return prefix_filter(sorted(ret), load.get("prefix", "").strip("/"))
 
     @ensure_unicode_args
     def file_list_emptydirs(self, load):
@@ -799,10 +1198,7 @@ class Fileserver:
             if fstr in self.servers:
                 ret.update(self.servers[fstr](load))
         # some *fs do not handle prefix. Ensure it is filtered
-        prefix = load.get("prefix", "").strip("/")
-        if prefix != "":
-            ret = [f for f in ret if f.startswith(prefix)]
-        return sorted(ret)
+        return prefix_filter(sorted(ret), load.get("prefix", "").strip("/"))
 
     @ensure_unicode_args
     def dir_list(self, load):
@@ -824,10 +1220,7 @@ class Fileserver:
             if fstr in self.servers:
                 ret.update(self.servers[fstr](load))
         # some *fs do not handle prefix. Ensure it is filtered
-        prefix = load.get("prefix", "").strip("/")
-        if prefix != "":
-            ret = [f for f in ret if f.startswith(prefix)]
-        return sorted(ret)
+        return prefix_filter(sorted(ret), load.get("prefix", "").strip("/"))
 
     @ensure_unicode_args
     def symlink_list(self, load):
@@ -69,6 +69,7 @@ PER_REMOTE_OVERRIDES = (
     "disable_saltenv_mapping",
     "ref_types",
     "update_interval",
+    "fetch_timeout",
 )
 PER_REMOTE_ONLY = ("all_saltenvs", "name", "saltenv")
 
@@ -140,7 +141,7 @@ def update(remotes=None):
     """
     Execute a git fetch on all of the repos
     """
-    _gitfs().update(remotes)
+    return _gitfs().update(remotes)
 
 
 def update_intervals():
@@ -187,6 +188,16 @@ def file_hash(load, fnd):
     return _gitfs().file_hash(load, fnd)
 
 
+def materialize(fnd):
+    """
+    Return the path of a local copy of a file, writing it out of the git
+    object database if needed
+
+    .. versionadded:: Aluminium
+    """
+    return _gitfs().materialize(fnd)
+
+
 def file_list(load):
     """
     Return a list of all files on the file server in a specified
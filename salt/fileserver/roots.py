@@ -22,9 +22,12 @@ import logging
 
 # Import python libs
 import os
+import stat
 
 # Import salt libs
 import salt.fileserver
+import salt.payload
+import salt.utils.atomicfile
 import salt.utils.event
 import salt.utils.files
 import salt.utils.gzip_util
@@ -37,6 +40,11 @@ from salt.ext import six
 
 log = logging.getLogger(__name__)
 
+# The hash index written by update(), as last loaded by this process. The
+# files are keyed on their absolute path and map to their size, mtime_ns,
+# inode, hash and mtime.
+_HASH_INDEX = {"id": None, "hash_type": None, "files": {}}
+
 
 def find_file(path, saltenv="base", **kwargs):
     """
@@ -183,11 +191,20 @@ def update():
     # compare the maps, set changed to the return value
     data["changed"] = salt.fileserver.diff_mtime_map(old_mtime_map, new_mtime_map)
 
+    try:
+        _update_hash_index(new_mtime_map)
+    except (IOError, OSError) as exc:
+        log.error("Failed to update the roots hash index: %s", exc)
+
     # compute files that were removed and added
     old_files = set(old_mtime_map.keys())
     new_files = set(new_mtime_map.keys())
     data["files"]["removed"] = list(old_files - new_files)
     data["files"]["added"] = list(new_files - old_files)
+    if data["changed"]:
+        data["saltenvs"] = _changed_saltenvs(
+            data["files"]["changed"] + data["files"]["removed"] + data["files"]["added"]
+        )
 
     # write out the new map
     mtime_map_path_dir = os.path.dirname(mtime_map_path)
@@ -216,6 +233,93 @@ def update():
     return data
 
 
+def _changed_saltenvs(paths):
+    """
+    Return the saltenvs whose roots hold any of the given paths, or ``*``
+    when they cannot be told apart
+    """
+    ret = set()
+    for saltenv, roots in six.iteritems(__opts__["file_roots"]):
+        roots = [os.path.join(root, "") for root in roots]
+        if any(path.startswith(root) for path in paths for root in roots):
+            if saltenv == "__env__":
+                return ["*"]
+            ret.add(saltenv)
+    return sorted(ret) or ["*"]
+
+
+def _hash_index_path():
+    return os.path.join(__opts__["cachedir"], "roots", "hash_index.p")
+
+
+def _load_hash_index():
+    """
+    Return the files of the hash index, reading the index again only when it
+    has been replaced since this process last read it
+    """
+    index_path = _hash_index_path()
+    try:
+        index_stat = os.stat(index_path)
+    except OSError:
+        return {}
+    index_id = (index_stat.st_ino, index_stat.st_mtime_ns, index_stat.st_size)
+    if _HASH_INDEX["id"] != index_id:
+        try:
+            with salt.utils.files.fopen(index_path, "rb") as fp_:
+                index = salt.payload.Serial(__opts__).load(fp_)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug("Failed to load the roots hash index: %s", exc)
+            return {}
+        _HASH_INDEX.update(
+            {"id": index_id, "hash_type": index["hash_type"], "files": index["files"]}
+        )
+    if _HASH_INDEX["hash_type"] != __opts__["hash_type"]:
+        return {}
+    return _HASH_INDEX["files"]
+
+
+def _update_hash_index(mtime_map):
+    """
+    Bring the hash index in line with the mtime map of the file roots. Only
+    the files which are new or whose mtime changed are hashed.
+    """
+    files = dict(_load_hash_index())
+    changed = False
+    for path in set(files) - set(mtime_map):
+        del files[path]
+        changed = True
+    for path, mtime in six.iteritems(mtime_map):
+        entry = files.get(path)
+        if entry is not None and entry[4] == mtime:
+            continue
+        try:
+            path_stat = os.stat(path)
+            if not stat.S_ISREG(path_stat.st_mode):
+                continue
+            hsum = salt.utils.hashutils.get_hash(path, __opts__["hash_type"])
+        except (IOError, OSError):
+            files.pop(path, None)
+            continue
+        files[path] = [
+            path_stat.st_size,
+            path_stat.st_mtime_ns,
+            path_stat.st_ino,
+            hsum,
+            mtime,
+        ]
+        changed = True
+    if not changed and _HASH_INDEX["hash_type"] == __opts__["hash_type"]:
+        return
+    index_path = _hash_index_path()
+    if not os.path.isdir(os.path.dirname(index_path)):
+        os.makedirs(os.path.dirname(index_path))
+    with salt.utils.atomicfile.atomic_open(index_path, "wb") as fp_:
+        salt.payload.Serial(__opts__).dump(
+            {"hash_type": __opts__["hash_type"], "files": files}, fp_
+        )
+    log.debug("Updated the roots hash index with %s files", len(files))
+
+
 def file_hash(load, fnd):
     """
     Return a file hash, the hash type is set in the master config file
@@ -233,12 +337,29 @@ def file_hash(load, fnd):
     ret = {}
 
     # if the file doesn't exist, we can't get a hash
-    if not path or not os.path.isfile(path):
+    if not path:
+        return ret
+    try:
+        path_stat = os.stat(path)
+    except OSError:
+        return ret
+    if not stat.S_ISREG(path_stat.st_mode):
         return ret
 
     # set the hash_type as it is determined by config-- so mechanism won't change that
     ret["hash_type"] = __opts__["hash_type"]
 
+    # check the hash index kept by update(), the entry is only used if the
+    # file has not changed since it was hashed
+    entry = _load_hash_index().get(path)
+    if entry is not None and entry[:3] == [
+        path_stat.st_size,
+        path_stat.st_mtime_ns,
+        path_stat.st_ino,
+    ]:
+        ret["hsum"] = entry[3]
+        return ret
+
     # check if the hash is cached
     # cache file's contents should be "hash:mtime"
     cache_path = os.path.join(
@@ -436,21 +557,27 @@ def file_list(load):
     Return a list of all files on the file server in a specified
     environment
     """
-    return _file_lists(load, "files")
+    return salt.fileserver.prefix_filter(
+        _file_lists(load, "files"), load.get("prefix", "").strip("/")
+    )
 
 
 def file_list_emptydirs(load):
     """
     Return a list of all empty directories on the master
     """
-    return _file_lists(load, "empty_dirs")
+    return salt.fileserver.prefix_filter(
+        _file_lists(load, "empty_dirs"), load.get("prefix", "").strip("/")
+    )
 
 
 def dir_list(load):
     """
     Return a list of all directories on the master
     """
-    return _file_lists(load, "dirs")
+    return salt.fileserver.prefix_filter(
+        _file_lists(load, "dirs"), load.get("prefix", "").strip("/")
+    )
 
 
 def symlink_list(load):
@@ -11,12 +11,14 @@ import functools
 import logging
 import multiprocessing
 import os
+import queue
 import re
 import signal
 import stat
 import sys
 import threading
 import time
+import zlib
 
 import salt.acl
 import salt.auth
@@ -29,6 +31,7 @@ import salt.defaults.exitcodes
 import salt.engines
 import salt.exceptions
 import salt.ext.tornado.gen  # pylint: disable=F0401
+import salt.fileserver
 import salt.key
 import salt.log.setup
 import salt.minion
@@ -386,6 +389,7 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
         import salt.fileserver
 
         self.fileserver = salt.fileserver.Fileserver(self.opts)
+        self.generation_lock = threading.Lock()
         self.fill_buckets()
 
     # __setstate__ and __getstate__ are only used on Windows.
@@ -455,6 +459,16 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
                     (backend, update_func)
                 ] = None
 
+    def bump_generations(self, saltenvs):
+        """
+        Bump the fileserver generation of the given saltenvs
+        """
+        with self.generation_lock:
+            try:
+                salt.fileserver.bump_generations(self.opts, saltenvs)
+            except OSError as exc:
+                log.error("Failed to bump the fileserver generations: %s", exc)
+
     def update_fileserver(self, interval, backends):
         """
         Threading target which handles all updates for a given wait interval
@@ -466,6 +480,7 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
                 "interval of %d",
                 interval,
             )
+            changed = set()
             for backend, update_args in backends.items():
                 backend_name, update_func = backend
                 try:
@@ -481,12 +496,14 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
                         log.debug("Updating %s fileserver cache", backend_name)
                         args = ()
 
-                    update_func(*args)
+                    changed.update(salt.fileserver.changed_saltenvs(update_func(*args)))
                 except Exception as exc:  # pylint: disable=broad-except
                     log.exception(
                         "Uncaught exception while updating %s fileserver " "cache",
                         backend_name,
                     )
+            if changed and self.opts["fileserver_generation"]:
+                self.bump_generations(changed)
 
             log.debug(
                 "Completed fileserver updates for items with an update "
@@ -521,6 +538,10 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
         # Clean out the fileserver backend cache
         salt.daemons.masterapi.clean_fsbackend(self.opts)
 
+        if self.opts["fileserver_generation"]:
+            # Anything could have changed while the master was down
+            self.bump_generations(["*"])
+
         for interval in self.buckets:
             self.update_threads[interval] = threading.Thread(
                 target=self.update_fileserver, args=(interval, self.buckets[interval]),
@@ -532,6 +553,138 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
             time.sleep(60)
 
 
+class JobCacheWriter(salt.utils.process.SignalHandlingProcess):
+    """
+    A process which writes the returns received by the MWorkers to the
+    master_job_cache, so that a slow job cache does not hold up the workers.
+
+    Returns are read from a bounded queue. With more than one writer thread,
+    returns are sharded over the threads by jid so the returns of one job are
+    always written in the order they were received.
+    """
+
+    def __init__(self, opts, job_cache_queue, **kwargs):
+        """
+        Create a job cache writer
+
+        :param dict opts: The salt options
+        :param job_cache_queue: The ``multiprocessing.Queue`` the MWorkers
+            put the returns on
+        """
+        super().__init__(**kwargs)
+        self.opts = opts
+        self.job_cache_queue = job_cache_queue
+        self.thread_queues = []
+        self.threads = []
+
+    # __setstate__ and __getstate__ are only used on Windows.
+    # We do this so that __init__ will be invoked on Windows in the child
+    # process so that a register_after_fork() equivalent will work on Windows.
+    def __setstate__(self, state):
+        self.__init__(
+            state["opts"],
+            state["job_cache_queue"],
+            log_queue=state["log_queue"],
+            log_queue_level=state["log_queue_level"],
+        )
+
+    def __getstate__(self):
+        return {
+            "opts": self.opts,
+            "job_cache_queue": self.job_cache_queue,
+            "log_queue": self.log_queue,
+            "log_queue_level": self.log_queue_level,
+        }
+
+    def _handle_signals(self, signum, sigframe):
+        # Write what the MWorkers already handed over, and what the writer
+        # threads still hold, before terminating
+        while True:
+            try:
+                item = self.job_cache_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self.dispatch(item)
+        self.stop_threads()
+        super()._handle_signals(signum, sigframe)
+
+    def write(self, item):
+        """
+        Write one return taken from the queue to the job cache
+        """
+        load, endtime, req = item
+        try:
+            salt.utils.job.write_job_cache(
+                self.opts, load, endtime, req=req, mminion=self.mminion
+            )
+        except Exception:  # pylint: disable=broad-except
+            log.error(
+                "Could not store job information for load: %s", load, exc_info=True
+            )
+
+    def _thread_target(self, thread_queue):
+        while True:
+            item = thread_queue.get()
+            if item is None:
+                break
+            self.write(item)
+
+    def start_threads(self):
+        """
+        Start the writer threads, none when a single writer is configured,
+        the returns are then written by the main thread
+        """
+        count = int(self.opts["master_job_cache_writer_threads"])
+        if count < 2:
+            return
+        for _ in range(count):
+            thread_queue = queue.Queue()
+            thread = threading.Thread(target=self._thread_target, args=(thread_queue,))
+            thread.daemon = True
+            thread.start()
+            self.thread_queues.append(thread_queue)
+            self.threads.append(thread)
+
+    def stop_threads(self):
+        """
+        Wait for the writer threads to write out their queues and exit
+        """
+        thread_queues, self.thread_queues = self.thread_queues, []
+        threads, self.threads = self.threads, []
+        for thread_queue in thread_queues:
+            thread_queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def dispatch(self, item):
+        """
+        Hand a return to the writer thread of its jid, or write it directly
+        """
+        if not self.thread_queues:
+            self.write(item)
+            return
+        jid = salt.utils.stringutils.to_bytes(str(item[0]["jid"]))
+        shard = zlib.crc32(jid) % len(self.thread_queues)
+        self.thread_queues[shard].put(item)
+
+    def run(self):
+        """
+        Write the returns to the job cache as they come in
+        """
+        salt.utils.process.appendproctitle(self.__class__.__name__)
+        self.mminion = salt.minion.MasterMinion(
+            self.opts, states=False, rend=False, ignore_config_errors=True
+        )
+        self.start_threads()
+        while True:
+            item = self.job_cache_queue.get()
+            if item is None:
+                break
+            self.dispatch(item)
+        self.stop_threads()
+
+
 class Master(SMaster):
     """
     The salt master server
@@ -783,8 +936,18 @@ class Master(SMaster):
                 log.debug("Sleeping for two seconds to let concache rest")
                 time.sleep(2)
 
+            job_cache_queue = None
+            if self.opts["master_job_cache_async"]:
+                log.info("Creating master job cache writer process")
+                job_cache_queue = multiprocessing.Queue(
+                    self.opts["master_job_cache_queue_size"]
+                )
+                self.process_manager.add_process(
+                    JobCacheWriter, args=(self.opts, job_cache_queue)
+                )
+
             log.info("Creating master request server process")
-            kwargs = {}
+            kwargs = {"job_cache_queue": job_cache_queue}
             if salt.utils.platform.is_windows():
                 kwargs["log_queue"] = log_queue
                 kwargs[
@@ -886,13 +1049,14 @@ class ReqServer(salt.utils.process.SignalHandlingProcess):
     interface.
     """
 
-    def __init__(self, opts, key, mkey, secrets=None, **kwargs):
+    def __init__(self, opts, key, mkey, secrets=None, job_cache_queue=None, **kwargs):
         """
         Create a request server
 
         :param dict opts: The salt options dictionary
         :key dict: The user starting the server and the AES key
         :mkey dict: The user starting the server and the RSA key
+        :job_cache_queue: The queue of the JobCacheWriter, if any
 
         :rtype: ReqServer
         :returns: Request server
@@ -903,6 +1067,7 @@ class ReqServer(salt.utils.process.SignalHandlingProcess):
         # Prepare the AES key
         self.key = key
         self.secrets = secrets
+        self.job_cache_queue = job_cache_queue
 
     # __setstate__ and __getstate__ are only used on Windows.
     # We do this so that __init__ will be invoked on Windows in the child
@@ -913,6 +1078,7 @@ class ReqServer(salt.utils.process.SignalHandlingProcess):
             state["key"],
             state["mkey"],
             secrets=state["secrets"],
+            job_cache_queue=state["job_cache_queue"],
             log_queue=state["log_queue"],
             log_queue_level=state["log_queue_level"],
         )
@@ -923,6 +1089,7 @@ class ReqServer(salt.utils.process.SignalHandlingProcess):
             "key": self.key,
             "mkey": self.master_key,
             "secrets": self.secrets,
+            "job_cache_queue": self.job_cache_queue,
             "log_queue": self.log_queue,
             "log_queue_level": self.log_queue_level,
         }
@@ -967,7 +1134,7 @@ class ReqServer(salt.utils.process.SignalHandlingProcess):
             if transport != "tcp":
                 tcp_only = False
 
-        kwargs = {}
+        kwargs = {"job_cache_queue": self.job_cache_queue}
         if salt.utils.platform.is_windows():
             kwargs["log_queue"] = self.log_queue
             kwargs["log_queue_level"] = self.log_queue_level
@@ -1027,13 +1194,16 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
     salt master.
     """
 
-    def __init__(self, opts, mkey, key, req_channels, name, **kwargs):
+    def __init__(
+        self, opts, mkey, key, req_channels, name, job_cache_queue=None, **kwargs
+    ):
         """
         Create a salt master worker process
 
         :param dict opts: The salt options
         :param dict mkey: The user running the salt master and the AES key
         :param dict key: The user running the salt master and the RSA key
+        :param job_cache_queue: The queue of the JobCacheWriter, if any
 
         :rtype: MWorker
         :return: Master worker
@@ -1043,6 +1213,7 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
         super().__init__(**kwargs)
         self.opts = opts
         self.req_channels = req_channels
+        self.job_cache_queue = job_cache_queue
 
         self.mkey = mkey
         self.key = key
@@ -1061,6 +1232,7 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
         )
         self.opts = state["opts"]
         self.req_channels = state["req_channels"]
+        self.job_cache_queue = state["job_cache_queue"]
         self.mkey = state["mkey"]
         self.key = state["key"]
         self.k_mtime = state["k_mtime"]
@@ -1070,6 +1242,7 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
         return {
             "opts": self.opts,
             "req_channels": self.req_channels,
+            "job_cache_queue": self.job_cache_queue,
             "mkey": self.mkey,
             "key": self.key,
             "k_mtime": self.k_mtime,
@@ -1236,7 +1409,7 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
                 os.nice(self.opts["mworker_niceness"])
 
         self.clear_funcs = ClearFuncs(self.opts, self.key,)
-        self.aes_funcs = AESFuncs(self.opts)
+        self.aes_funcs = AESFuncs(self.opts, job_cache_queue=self.job_cache_queue)
         salt.utils.crypt.reinit_crypto()
         self.__bind()
 
@@ -1290,9 +1463,12 @@ class AESFuncs(TransportMethods):
         "minion_publish",
         "revoke_auth",
         "_serve_file",
+        "_serve_file_delta",
         "_file_find",
         "_file_hash",
         "_file_hash_and_stat",
+        "_file_hash_list",
+        "_file_hash_and_stat_list",
         "_file_list",
         "_file_list_emptydirs",
         "_dir_list",
@@ -1300,16 +1476,20 @@ class AESFuncs(TransportMethods):
         "_file_envs",
     )
 
-    def __init__(self, opts):
+    def __init__(self, opts, job_cache_queue=None):
         """
         Create a new AESFuncs
 
         :param dict opts: The salt options
+        :param job_cache_queue: The queue of the JobCacheWriter. If passed,
+            returns are handed over to it instead of being written to the
+            master_job_cache by the worker.
 
         :rtype: AESFuncs
         :returns: Instance for handling AES operations
         """
         self.opts = opts
+        self.job_cache_queue = job_cache_queue
         self.event = salt.utils.event.get_master_event(
             self.opts, self.opts["sock_dir"], listen=False
         )
@@ -1333,9 +1513,12 @@ class AESFuncs(TransportMethods):
 
         self.fs_ = salt.fileserver.Fileserver(self.opts)
         self._serve_file = self.fs_.serve_file
+        self._serve_file_delta = self.fs_.serve_file_delta
         self._file_find = self.fs_._find_file
         self._file_hash = self.fs_.file_hash
         self._file_hash_and_stat = self.fs_.file_hash_and_stat
+        self._file_hash_list = self.fs_.file_hash_list
+        self._file_hash_and_stat_list = self.fs_.file_hash_and_stat_list
         self._file_list = self.fs_.file_list
         self._file_list_emptydirs = self.fs_.file_list_emptydirs
         self._dir_list = self.fs_.dir_list
@@ -1519,6 +1702,10 @@ class AESFuncs(TransportMethods):
         mopts["top_file_merging_strategy"] = self.opts["top_file_merging_strategy"]
         mopts["env_order"] = self.opts["env_order"]
         mopts["default_top"] = self.opts["default_top"]
+        if self.opts["fileserver_generation"]:
+            mopts["fileserver_generations"] = salt.fileserver.read_generations(
+                self.opts
+            )
         if load.get("env_only"):
             return mopts
         mopts["renderer"] = self.opts["renderer"]
@@ -1802,7 +1989,11 @@ class AESFuncs(TransportMethods):
 
         try:
             salt.utils.job.store_job(
-                self.opts, load, event=self.event, mminion=self.mminion
+                self.opts,
+                load,
+                event=self.event,
+                mminion=self.mminion,
+                job_cache_queue=self.job_cache_queue,
             )
         except salt.exceptions.SaltCacheError:
             log.error("Could not store job information for load: %s", load)
@@ -2553,6 +2744,10 @@ class ClearFuncs(TransportMethods):
             load["tgt_type"] = clear_load["tgt_type"]
         if "to" in clear_load:
             load["to"] = clear_load["to"]
+        if self.opts["fileserver_generation"]:
+            # Lets the minions trust their file cache for this job when
+            # nothing changed on the fileserver since they last validated it
+            load["fileserver_generations"] = salt.fileserver.read_generations(self.opts)
 
         if "kwargs" in clear_load:
             if "ret_config" in clear_load["kwargs"]:
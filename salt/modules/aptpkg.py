@@ -1316,7 +1316,11 @@ def list_pkgs(
     removed = salt.utils.data.is_true(removed)
     purge_desired = salt.utils.data.is_true(purge_desired)
 
-    if "pkg.list_pkgs" in __context__:
+    stamp = salt.utils.pkg.inventory_stamp(__opts__, salt.utils.pkg.DPKG_DB_PATHS)
+    if (
+        "pkg.list_pkgs" in __context__
+        and __context__.get("pkg.list_pkgs.stamp") == stamp
+    ):
         if removed:
             ret = copy.deepcopy(__context__["pkg.list_pkgs"]["removed"])
         else:
@@ -1327,6 +1331,33 @@ def list_pkgs(
             __salt__["pkg_resource.stringify"](ret)
         return ret
 
+    ret = salt.utils.pkg.cached_inventory(
+        __opts__,
+        "dpkg",
+        "list_pkgs",
+        salt.utils.pkg.DPKG_DB_PATHS,
+        _list_dpkg_pkgs,
+        stamp=stamp,
+    )
+    __context__["pkg.list_pkgs"] = copy.deepcopy(ret)
+    __context__["pkg.list_pkgs.stamp"] = stamp
+
+    if removed:
+        ret = ret["removed"]
+    else:
+        ret = copy.deepcopy(__context__["pkg.list_pkgs"]["purge_desired"])
+        if not purge_desired:
+            ret.update(__context__["pkg.list_pkgs"]["installed"])
+    if not versions_as_list:
+        __salt__["pkg_resource.stringify"](ret)
+    return ret
+
+
+def _list_dpkg_pkgs():
+    """
+    Return the installed, removed and purge desired packages, as listed by
+    dpkg-query
+    """
     ret = {"installed": {}, "removed": {}, "purge_desired": {}}
     cmd = [
         "dpkg-query",
@@ -1363,17 +1394,6 @@ def list_pkgs(
 
     for pkglist_type in ("installed", "removed", "purge_desired"):
         __salt__["pkg_resource.sort_pkglist"](ret[pkglist_type])
-
-    __context__["pkg.list_pkgs"] = copy.deepcopy(ret)
-
-    if removed:
-        ret = ret["removed"]
-    else:
-        ret = copy.deepcopy(__context__["pkg.list_pkgs"]["purge_desired"])
-        if not purge_desired:
-            ret.update(__context__["pkg.list_pkgs"]["installed"])
-    if not versions_as_list:
-        __salt__["pkg_resource.stringify"](ret)
     return ret
 
 
@@ -2946,9 +2966,14 @@ def info_installed(*names, **kwargs):
         salt.utils.args.invalid_kwargs(kwargs)
 
     ret = dict()
-    for pkg_name, pkg_nfo in __salt__["lowpkg.info"](
-        *names, failhard=failhard, attr=attr
-    ).items():
+    pkgs_info = salt.utils.pkg.cached_inventory(
+        __opts__,
+        "dpkg",
+        ["info_installed", names, failhard, attr],
+        salt.utils.pkg.DPKG_DB_PATHS,
+        lambda: __salt__["lowpkg.info"](*names, failhard=failhard, attr=attr),
+    )
+    for pkg_name, pkg_nfo in pkgs_info.items():
         t_nfo = dict()
         if pkg_nfo.get("status", "ii")[1] != "i":
             continue  # return only packages that are really installed
@@ -743,6 +743,43 @@ def hash_file(path, saltenv="base"):
     return _client().hash_file(path, saltenv)
 
 
+def hash_and_stat_list(paths=None, prefix="", saltenv="base"):
+    """
+    .. versionadded:: Aluminium
+
+    Return the hashes and stat results of a list of files on the salt master
+    file server, or of all of the files under a prefix, in one request.
+
+    When :conf_minion:`fileclient_hash_batch_ttl` is set, the answers are
+    remembered for that many seconds, during which the minion does not ask
+    the master about these files again when caching them.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' cp.hash_and_stat_list salt://path/to/file1,salt://path/to/file2
+        salt '*' cp.hash_and_stat_list prefix=salt://path/to/dir
+    """
+    if isinstance(paths, str):
+        paths = paths.split(",")
+    prefix, senv = salt.utils.url.parse(prefix)
+    if senv:
+        saltenv = senv
+
+    data = _client().hash_and_stat_list(saltenv, paths=paths, prefix=prefix)
+    if not data:
+        return {}
+    return {
+        path: {
+            "hsum": hsum,
+            "hash_type": data["hash_type"],
+            "stat": data["stats"][path],
+        }
+        for path, hsum in data["hashes"].items()
+    }
+
+
 def stat_file(path, saltenv="base", octal=True):
     """
     Return the permissions of a file, to get the permissions of a file on the
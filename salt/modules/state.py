@@ -2228,7 +2228,9 @@ def pkg(pkg_path, pkg_sum, hash_type, test=None, **kwargs):
     if not salt.utils.hashutils.get_hash(pkg_path, hash_type) == pkg_sum:
         return {}
     root = tempfile.mkdtemp()
-    s_pkg = tarfile.open(pkg_path, "r:gz")
+    # The package may be made of several concatenated tarballs, the data
+    # specific to this target being appended to a package shared with others
+    s_pkg = tarfile.open(pkg_path, "r:gz", ignore_zeros=True)
     # Verify that the tarball does not extract outside of the intended root
     members = s_pkg.getmembers()
     for member in members:
@@ -692,48 +692,61 @@ def list_pkgs(versions_as_list=False, **kwargs):
 
     contextkey = "pkg.list_pkgs"
 
-    if contextkey not in __context__:
-        ret = {}
-        cmd = [
+    stamp = salt.utils.pkg.inventory_stamp(__opts__, salt.utils.pkg.RPM_DB_PATHS)
+    if contextkey not in __context__ or __context__.get("pkg.list_pkgs.stamp") != stamp:
+        __context__[contextkey] = salt.utils.pkg.cached_inventory(
+            __opts__,
             "rpm",
-            "-qa",
-            "--queryformat",
-            salt.utils.pkg.rpm.QUERYFORMAT.replace("%{REPOID}", "(none)") + "\n",
-        ]
-        output = __salt__["cmd.run"](cmd, python_shell=False, output_loglevel="trace")
-        for line in output.splitlines():
-            pkginfo = salt.utils.pkg.rpm.parse_pkginfo(
-                line, osarch=__grains__["osarch"]
-            )
-            if pkginfo is not None:
-                # see rpm version string rules available at https://goo.gl/UGKPNd
-                pkgver = pkginfo.version
-                epoch = None
-                release = None
-                if ":" in pkgver:
-                    epoch, pkgver = pkgver.split(":", 1)
-                if "-" in pkgver:
-                    pkgver, release = pkgver.split("-", 1)
-                all_attr = {
-                    "epoch": epoch,
-                    "version": pkgver,
-                    "release": release,
-                    "arch": pkginfo.arch,
-                    "install_date": pkginfo.install_date,
-                    "install_date_time_t": pkginfo.install_date_time_t,
-                }
-                __salt__["pkg_resource.add_pkg"](ret, pkginfo.name, all_attr)
-
-        for pkgname in ret:
-            ret[pkgname] = sorted(ret[pkgname], key=lambda d: d["version"])
-
-        __context__[contextkey] = ret
+            "list_pkgs",
+            salt.utils.pkg.RPM_DB_PATHS,
+            _list_rpm_pkgs,
+            stamp=stamp,
+        )
+        __context__["pkg.list_pkgs.stamp"] = stamp
 
     return __salt__["pkg_resource.format_pkg_list"](
         __context__[contextkey], versions_as_list, attr
     )
 
 
+def _list_rpm_pkgs():
+    """
+    Return the attributes of the installed packages, as listed by rpm
+    """
+    ret = {}
+    cmd = [
+        "rpm",
+        "-qa",
+        "--queryformat",
+        salt.utils.pkg.rpm.QUERYFORMAT.replace("%{REPOID}", "(none)") + "\n",
+    ]
+    output = __salt__["cmd.run"](cmd, python_shell=False, output_loglevel="trace")
+    for line in output.splitlines():
+        pkginfo = salt.utils.pkg.rpm.parse_pkginfo(line, osarch=__grains__["osarch"])
+        if pkginfo is not None:
+            # see rpm version string rules available at https://goo.gl/UGKPNd
+            pkgver = pkginfo.version
+            epoch = None
+            release = None
+            if ":" in pkgver:
+                epoch, pkgver = pkgver.split(":", 1)
+            if "-" in pkgver:
+                pkgver, release = pkgver.split("-", 1)
+            all_attr = {
+                "epoch": epoch,
+                "version": pkgver,
+                "release": release,
+                "arch": pkginfo.arch,
+                "install_date": pkginfo.install_date,
+                "install_date_time_t": pkginfo.install_date_time_t,
+            }
+            __salt__["pkg_resource.add_pkg"](ret, pkginfo.name, all_attr)
+
+    for pkgname in ret:
+        ret[pkgname] = sorted(ret[pkgname], key=lambda d: d["version"])
+    return ret
+
+
 def list_repo_pkgs(*args, **kwargs):
     """
     .. versionadded:: 2014.1.0
@@ -1067,7 +1080,14 @@ def info_installed(*names, **kwargs):
     """
     all_versions = kwargs.get("all_versions", False)
     ret = dict()
-    for pkg_name, pkgs_nfo in __salt__["lowpkg.info"](*names, **kwargs).items():
+    pkgs_info = salt.utils.pkg.cached_inventory(
+        __opts__,
+        "rpm",
+        ["info_installed", names, salt.utils.args.clean_kwargs(**kwargs)],
+        salt.utils.pkg.RPM_DB_PATHS,
+        lambda: __salt__["lowpkg.info"](*names, **kwargs),
+    )
+    for pkg_name, pkgs_nfo in pkgs_info.items():
         pkg_nfo = pkgs_nfo if all_versions else [pkgs_nfo]
         for _nfo in pkg_nfo:
             t_nfo = dict()
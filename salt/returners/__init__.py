@@ -4,10 +4,15 @@ Returners Directory
 
 :func:`get_returner_options` is a general purpose function that returners may
 use to fetch their configuration options.
+
+:func:`get_pooled_connection`, :func:`release_pooled_connection` and
+:class:`ReturnBatch` help database returners to reuse their connections
+across calls and to insert rows in batches.
 """
 from __future__ import absolute_import, print_function, unicode_literals
 
 import logging
+import threading
 
 from salt.ext import six
 
@@ -204,3 +209,98 @@ def _fetch_profile_opts(
         (pattr, creds.get("{0}.{1}".format(virtualname, profile_attrs[pattr])))
         for pattr in profile_attrs
     )
+
+
+def get_pooled_connection(context, key, connect, ping=None):
+    """
+    Return an idle database connection from the pool stored in
+    ``context[key]``, or a new one created by calling ``connect``.
+
+    :param dict context: The ``__context__`` of the returner. Pooling is
+        disabled when it is not a dict-like object.
+    :param str key: The ``__context__`` key holding the pool.
+    :param connect: Function returning a new connection.
+    :param ping: Optional function which raises if a pooled connection is no
+        longer usable, such connections are closed and discarded.
+    """
+    pool = context.get(key) if hasattr(context, "get") else None
+    while pool:
+        try:
+            conn = pool.pop()
+        except IndexError:
+            # Another thread took the last connection
+            break
+        try:
+            if ping is not None:
+                ping(conn)
+            log.debug("Reusing pooled database connection from %s", key)
+            return conn
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug("Discarding stale database connection from %s: %s", key, exc)
+            try:
+                conn.close()
+            except Exception:  # pylint: disable=broad-except
+                pass
+    log.debug("Opening new database connection for %s", key)
+    return connect()
+
+
+def release_pooled_connection(context, key, conn):
+    """
+    Hand a connection obtained by :func:`get_pooled_connection` back to the
+    pool so the next call can reuse it. The connection is closed if pooling
+    is not possible.
+    """
+    try:
+        context.setdefault(key, []).append(conn)
+    except (AttributeError, TypeError):
+        conn.close()
+
+
+class ReturnBatch(object):
+    """
+    Collect rows to be inserted by a returner and hand them to ``flush`` as a
+    single batch, once ``size`` rows have been collected or once the oldest
+    row has waited ``window`` seconds.
+
+    Rows still waiting when the process exits are lost, so the window should
+    be kept short.
+    """
+
+    def __init__(self, flush, window, size=1000):
+        self.flush_func = flush
+        self.window = window
+        self.size = size
+        self.rows = []
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def add(self, row):
+        """
+        Queue a row, flushing the batch when it is full
+        """
+        with self.lock:
+            self.rows.append(row)
+            if len(self.rows) < self.size:
+                if self.timer is None:
+                    self.timer = threading.Timer(self.window, self.flush)
+                    self.timer.daemon = True
+                    self.timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        """
+        Hand all the queued rows to the flush function
+        """
+        with self.lock:
+            rows, self.rows = self.rows, []
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not rows:
+            return
+        try:
+            self.flush_func(rows)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.critical("Could not store a batch of %s returns: %s", len(rows), exc)
@@ -45,6 +45,20 @@ optional. The following ssl options are simply for illustration purposes:
     alternative.mysql.ssl_key: '/etc/pki/mysql/certs/localhost.key'
     alternative.mysql.unix_socket: '/tmp/mysql.sock'
 
+Connections to the database are kept in a pool and reused across calls.
+Returns can also be queued and inserted in batches with a single multi-row
+``INSERT``. Returns are queued for at most ``batch_window`` seconds, or until
+``batch_size`` returns have been queued. Batching is disabled when
+``batch_window`` is ``0``, the default. Queued returns are lost if the process
+exits before the window has passed.
+
+.. code-block:: yaml
+
+    mysql.batch_window: 1
+    mysql.batch_size: 1000
+
+.. versionadded:: Aluminium
+
 Should you wish the returner data to be cleaned out every so often, set
 `keep_jobs` to the number of hours for the jobs to live in the tables.
 Setting it to `0` will cause the data to stay in the tables. The default
@@ -140,6 +154,7 @@ To override individual configuration items, append --return_kwargs '{"key:": "va
 
 """
 
+import functools
 import logging
 import sys
 from contextlib import contextmanager
@@ -178,6 +193,20 @@ log = logging.getLogger(__name__)
 # Define the module's virtual name
 __virtualname__ = "mysql"
 
+# MySQLdb rewrites executemany() of these into a single multi-row INSERT
+MYSQL_RETURN_SQL = """INSERT INTO `salt_returns`
+                      (`fun`, `jid`, `return`, `id`, `success`, `full_ret`)
+                      VALUES (%s, %s, %s, %s, %s, %s)"""
+
+MYSQL_EVENT_SQL = """INSERT INTO `salt_events` (`tag`, `data`, `master_id`)
+                     VALUES (%s, %s, %s)"""
+
+MYSQL_SAVE_LOAD_SQL = """INSERT INTO `jids` (`jid`, `load`) VALUES (%s, %s)"""
+
+MYSQL_LOCK_LOAD_SQL = """SELECT `load` FROM `jids` WHERE `jid` = %s FOR UPDATE"""
+
+MYSQL_UPDATE_LOAD_SQL = """UPDATE `jids` SET `load` = %s WHERE `jid` = %s"""
+
 
 def __virtual__():
     """
@@ -200,6 +229,8 @@ def _get_options(ret=None):
         "ssl_cert": None,
         "ssl_key": None,
         "unix_socket": "/tmp/mysql.sock",
+        "batch_window": 0,
+        "batch_size": 1000,
     }
 
     attrs = {
@@ -212,6 +243,8 @@ def _get_options(ret=None):
         "ssl_cert": "ssl_cert",
         "ssl_key": "ssl_key",
         "unix_socket": "unix_socket",
+        "batch_window": "batch_window",
+        "batch_size": "batch_size",
     }
 
     _options = salt.returners.get_returner_options(
@@ -227,31 +260,27 @@ def _get_options(ret=None):
         if isinstance(v, str) and v.lower() == "none":
             # Ensure 'None' is rendered as None
             _options[k] = None
-        if k == "port":
-            # Ensure port is an int
+        if k in ("port", "batch_size"):
+            # Ensure port and batch size are ints
             _options[k] = int(v)
+        if k == "batch_window":
+            _options[k] = float(v or 0)
 
     return _options
 
 
 @contextmanager
-def _get_serv(ret=None, commit=False):
+def _get_serv(ret=None, commit=False, options=None):
     """
     Return a mysql cursor
-    """
-    _options = _get_options(ret)
 
-    connect = True
-    if __context__ and "mysql_returner_conn" in __context__:
-        try:
-            log.debug("Trying to reuse MySQL connection pool")
-            conn = __context__["mysql_returner_conn"]
-            conn.ping()
-            connect = False
-        except OperationalError as exc:
-            log.debug("OperationalError on ping: %s", exc)
+    Connections are kept in a pool in ``__context__`` and reused by the
+    following calls. ``options``, the connection options already resolved
+    by ``_get_options()``, take precedence over ``ret``.
+    """
+    _options = options if options is not None else _get_options(ret)
 
-    if connect:
+    def _connect():
         log.debug("Generating new MySQL connection pool")
         try:
             # An empty ssl_options dictionary passed to MySQLdb.connect will
@@ -263,7 +292,7 @@ def _get_serv(ret=None, commit=False):
                 ssl_options["cert"] = _options.get("ssl_cert")
             if _options.get("ssl_key"):
                 ssl_options["key"] = _options.get("ssl_key")
-            conn = MySQLdb.connect(
+            return MySQLdb.connect(
                 host=_options.get("host"),
                 user=_options.get("user"),
                 passwd=_options.get("pass"),
@@ -272,58 +301,88 @@ def _get_serv(ret=None, commit=False):
                 ssl=ssl_options,
                 unix_socket=_options.get("unix_socket"),
             )
-
-            try:
-                __context__["mysql_returner_conn"] = conn
-            except TypeError:
-                pass
         except OperationalError as exc:
             raise salt.exceptions.SaltMasterError(
                 "MySQL returner could not connect to database: {exc}".format(exc=exc)
             )
 
+    pool_key = "mysql_returner_pool_{host}_{port}_{db}_{user}".format(**_options)
+    conn = salt.returners.get_pooled_connection(
+        __context__, pool_key, _connect, ping=lambda conn: conn.ping()
+    )
+
     cursor = conn.cursor()
 
     try:
         yield cursor
-    except MySQLdb.DatabaseError as err:
-        error = err.args
-        sys.stderr.write(str(error))
-        cursor.execute("ROLLBACK")
+    except Exception as err:  # pylint: disable=broad-except
+        if isinstance(err, MySQLdb.DatabaseError):
+            sys.stderr.write(str(err.args))
+        # Never hand a connection back to the pool in the middle of a
+        # transaction, whatever the error was
+        try:
+            cursor.execute("ROLLBACK")
+        except MySQLdb.Error:
+            conn.close()
+            conn = None
         raise
     else:
         if commit:
             cursor.execute("COMMIT")
         else:
             cursor.execute("ROLLBACK")
+    finally:
+        if conn is not None:
+            salt.returners.release_pooled_connection(__context__, pool_key, conn)
+
+
+def _insert_returns(options, rows):
+    """
+    Insert a batch of returns with a single multi-row INSERT, into the
+    database the connection ``options`` point to
+    """
+    with _get_serv(commit=True, options=options) as cur:
+        cur.executemany(MYSQL_RETURN_SQL, rows)
 
 
 def returner(ret):
     """
     Return data to a mysql server
+
+    If ``mysql.batch_window`` is set, returns are queued and inserted together
+    once the window has passed or ``batch_size`` returns have been queued.
     """
     # if a minion is returning a standalone job, get a jobid
     if ret["jid"] == "req":
         ret["jid"] = prep_jid(nocache=ret.get("nocache", False))
         save_load(ret["jid"], ret)
 
+    row = (
+        ret["fun"],
+        ret["jid"],
+        salt.utils.json.dumps(ret["return"]),
+        ret["id"],
+        ret.get("success", False),
+        salt.utils.json.dumps(ret),
+    )
     try:
-        with _get_serv(ret, commit=True) as cur:
-            sql = """INSERT INTO `salt_returns`
-                     (`fun`, `jid`, `return`, `id`, `success`, `full_ret`)
-                     VALUES (%s, %s, %s, %s, %s, %s)"""
-
-            cur.execute(
-                sql,
-                (
-                    ret["fun"],
-                    ret["jid"],
-                    salt.utils.json.dumps(ret["return"]),
-                    ret["id"],
-                    ret.get("success", False),
-                    salt.utils.json.dumps(ret),
-                ),
+        _options = _get_options(ret)
+        if _options["batch_window"] > 0:
+            # Returns bound for other databases, with ret_config, are batched
+            # separately
+            batch_key = "mysql_returner_batch_{host}_{port}_{db}_{user}".format(
+                **_options
             )
+            if batch_key not in __context__:
+                __context__[batch_key] = salt.returners.ReturnBatch(
+                    functools.partial(_insert_returns, _options),
+                    _options["batch_window"],
+                    size=_options["batch_size"],
+                )
+            __context__[batch_key].add(row)
+            return
+        with _get_serv(ret, commit=True) as cur:
+            cur.execute(MYSQL_RETURN_SQL, row)
     except salt.exceptions.SaltMasterError as exc:
         log.critical(exc)
         log.critical(
@@ -339,12 +398,17 @@ def event_return(events):
     option in master config.
     """
     with _get_serv(events, commit=True) as cur:
-        for event in events:
-            tag = event.get("tag", "")
-            data = event.get("data", "")
-            sql = """INSERT INTO `salt_events` (`tag`, `data`, `master_id`)
-                     VALUES (%s, %s, %s)"""
-            cur.execute(sql, (tag, salt.utils.json.dumps(data), __opts__["id"]))
+        cur.executemany(
+            MYSQL_EVENT_SQL,
+            [
+                (
+                    event.get("tag", ""),
+                    salt.utils.json.dumps(event.get("data", "")),
+                    __opts__["id"],
+                )
+                for event in events
+            ],
+        )
 
 
 def save_load(jid, load, minions=None):
@@ -352,11 +416,8 @@ def save_load(jid, load, minions=None):
     Save the load to the specified jid id
     """
     with _get_serv(commit=True) as cur:
-
-        sql = """INSERT INTO `jids` (`jid`, `load`) VALUES (%s, %s)"""
-
         try:
-            cur.execute(sql, (jid, salt.utils.json.dumps(load)))
+            cur.execute(MYSQL_SAVE_LOAD_SQL, (jid, salt.utils.json.dumps(load)))
         except MySQLdb.IntegrityError:
             # https://github.com/saltstack/salt/issues/22171
             # Without this try/except we get tons of duplicate entry errors
@@ -366,8 +427,21 @@ def save_load(jid, load, minions=None):
 
 def save_minions(jid, minions, syndic_id=None):  # pylint: disable=unused-argument
     """
-    Included for API consistency
+    Add the minions matched on lower-level masters to the ``Minions`` of the
+    job load
     """
+    with _get_serv(commit=True) as cur:
+        cur.execute(MYSQL_LOCK_LOAD_SQL, (jid,))
+        data = cur.fetchone()
+        if not data:
+            return
+        load = salt.utils.json.loads(data[0])
+        known = load.get("Minions") or []
+        new = [minion for minion in sorted(set(minions)) if minion not in known]
+        if not new:
+            return
+        load["Minions"] = known + new
+        cur.execute(MYSQL_UPDATE_LOAD_SQL, (salt.utils.json.dumps(load), jid))
 
 
 def get_load(jid):
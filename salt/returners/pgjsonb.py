@@ -43,6 +43,21 @@ either exclude these options or set them to None.
 
 .. versionadded:: 2017.5.0
 
+Connections to the database are reused across calls. Returns can also be
+queued and inserted in batches with a single multi-row ``INSERT``, which
+helps masters receiving thousands of returns per second. Returns are queued
+for at most ``batch_window`` seconds, or until ``batch_size`` returns have
+been queued. Batching is disabled when ``batch_window`` is ``0``, the
+default. Queued returns are lost if the process exits before the window
+has passed.
+
+.. code-block:: yaml
+
+    returner.pgjsonb.batch_window: 1
+    returner.pgjsonb.batch_size: 1000
+
+.. versionadded:: Aluminium
+
 Alternative configuration values can be used by prefacing the configuration
 with `alternative.`. Any values not found in the alternative configuration will
 be pulled from the default location. As stated above, SSL configuration is
@@ -162,6 +177,7 @@ To override individual configuration items, append --return_kwargs '{"key:": "va
 """
 from __future__ import absolute_import, print_function, unicode_literals
 
+import functools
 import logging
 import sys
 import time
@@ -186,6 +202,17 @@ try:
     import psycopg2.extras
 
     HAS_PG = True
+
+    class _PreparedConnection(psycopg2.extensions.connection):
+        """
+        A connection which remembers the statements prepared on it
+        """
+
+        def __init__(self, *args, **kwargs):
+            super(_PreparedConnection, self).__init__(*args, **kwargs)
+            self.prepared = set()
+
+
 except ImportError:
     HAS_PG = False
 
@@ -194,7 +221,40 @@ log = logging.getLogger(__name__)
 # Define the module's virtual name
 __virtualname__ = "pgjsonb"
 
-PG_SAVE_LOAD_SQL = """INSERT INTO jids (jid, load) VALUES (%(jid)s, %(load)s)"""
+PG_RETURN_SQL = """INSERT INTO salt_returns
+                   (fun, jid, return, id, success, full_ret, alter_time)
+                   VALUES %s"""
+PG_RETURN_TEMPLATE = "(%s, %s, %s, %s, %s, %s, to_timestamp(%s))"
+
+PG_EVENT_SQL = """INSERT INTO salt_events (tag, data, master_id, alter_time)
+                  VALUES %s"""
+PG_EVENT_TEMPLATE = "(%s, %s, %s, to_timestamp(%s))"
+
+# Statements prepared once per pooled connection, as name: (types, statement)
+PG_PREPARED_SQL = {
+    "salt_save_load": (
+        "(varchar, jsonb)",
+        """INSERT INTO jids (jid, load) VALUES ($1, $2)""",
+    ),
+    "salt_save_load_upsert": (
+        "(varchar, jsonb)",
+        """INSERT INTO jids (jid, load) VALUES ($1, $2)
+           ON CONFLICT (jid) DO UPDATE SET load=$2""",
+    ),
+    "salt_save_minions": (
+        "(varchar, jsonb)",
+        """UPDATE jids
+           SET load = jsonb_set(
+               load, '{Minions}', (
+                   SELECT COALESCE(jsonb_agg(DISTINCT minion), '[]'::jsonb)
+                   FROM jsonb_array_elements(
+                       COALESCE(load->'Minions', '[]'::jsonb) || $2
+                   ) AS minions(minion)
+               )
+           )
+           WHERE jid = $1""",
+    ),
+}
 
 
 def __virtual__():
@@ -216,6 +276,8 @@ def _get_options(ret=None):
         "pass": "salt",
         "db": "salt",
         "port": 5432,
+        "batch_window": 0,
+        "batch_size": 1000,
     }
 
     attrs = {
@@ -229,6 +291,8 @@ def _get_options(ret=None):
         "sslkey": "sslkey",
         "sslrootcert": "sslrootcert",
         "sslcrl": "sslcrl",
+        "batch_window": "batch_window",
+        "batch_size": "batch_size",
     }
 
     _options = salt.returners.get_returner_options(
@@ -239,86 +303,154 @@ def _get_options(ret=None):
         __opts__=__opts__,
         defaults=defaults,
     )
-    # Ensure port is an int
+    # Ensure port and batch settings are numbers
     if "port" in _options:
         _options["port"] = int(_options["port"])
+    _options["batch_window"] = float(_options.get("batch_window") or 0)
+    _options["batch_size"] = int(_options.get("batch_size") or 1000)
     return _options
 
 
+def _ping(conn):
+    """
+    Make sure a pooled connection is still open
+    """
+    if conn.closed:
+        raise psycopg2.InterfaceError("connection already closed")
+
+
 @contextmanager
-def _get_serv(ret=None, commit=False):
+def _get_serv(ret=None, commit=False, options=None):
     """
     Return a Pg cursor
+
+    Connections are kept in a pool in ``__context__`` and reused by the
+    following calls. ``options``, the connection options already resolved
+    by ``_get_options()``, take precedence over ``ret``.
     """
-    _options = _get_options(ret)
-    try:
-        # An empty ssl_options dictionary passed to MySQLdb.connect will
-        # effectively connect w/o SSL.
-        ssl_options = {
-            k: v
-            for k, v in six.iteritems(_options)
-            if k in ["sslmode", "sslcert", "sslkey", "sslrootcert", "sslcrl"]
-        }
-        conn = psycopg2.connect(
-            host=_options.get("host"),
-            port=_options.get("port"),
-            dbname=_options.get("db"),
-            user=_options.get("user"),
-            password=_options.get("pass"),
-            **ssl_options
-        )
-    except psycopg2.OperationalError as exc:
-        raise salt.exceptions.SaltMasterError(
-            "pgjsonb returner could not connect to database: {exc}".format(exc=exc)
-        )
+    _options = options if options is not None else _get_options(ret)
 
-    if conn.server_version is not None and conn.server_version >= 90500:
-        global PG_SAVE_LOAD_SQL
-        PG_SAVE_LOAD_SQL = """INSERT INTO jids
-                              (jid, load)
-                              VALUES (%(jid)s, %(load)s)
-                              ON CONFLICT (jid) DO UPDATE
-                              SET load=%(load)s"""
+    def _connect():
+        try:
+            # An empty ssl_options dictionary passed to MySQLdb.connect will
+            # effectively connect w/o SSL.
+            ssl_options = {
+                k: v
+                for k, v in six.iteritems(_options)
+                if k in ["sslmode", "sslcert", "sslkey", "sslrootcert", "sslcrl"]
+            }
+            return psycopg2.connect(
+                host=_options.get("host"),
+                port=_options.get("port"),
+                dbname=_options.get("db"),
+                user=_options.get("user"),
+                password=_options.get("pass"),
+                connection_factory=_PreparedConnection,
+                **ssl_options
+            )
+        except psycopg2.OperationalError as exc:
+            raise salt.exceptions.SaltMasterError(
+                "pgjsonb returner could not connect to database: {exc}".format(exc=exc)
+            )
+
+    pool_key = "pgjsonb_returner_pool_{host}_{port}_{db}_{user}".format(**_options)
+    conn = salt.returners.get_pooled_connection(
+        __context__, pool_key, _connect, ping=_ping
+    )
 
     cursor = conn.cursor()
 
     try:
         yield cursor
-    except psycopg2.DatabaseError as err:
-        error = err.args
-        sys.stderr.write(six.text_type(error))
-        cursor.execute("ROLLBACK")
-        six.reraise(*sys.exc_info())
+    except Exception as err:  # pylint: disable=broad-except
+        if isinstance(err, psycopg2.DatabaseError):
+            sys.stderr.write(six.text_type(err.args))
+        if isinstance(err, psycopg2.OperationalError):
+            conn.close()
+        else:
+            # Never hand a connection back to the pool in the middle of a
+            # transaction, whatever the error was
+            try:
+                cursor.execute("ROLLBACK")
+            except psycopg2.Error:
+                conn.close()
+            # Statements prepared in the failed transaction may be gone
+            conn.prepared.clear()
+        raise
     else:
         if commit:
             cursor.execute("COMMIT")
         else:
             cursor.execute("ROLLBACK")
     finally:
-        conn.close()
+        if not conn.closed:
+            salt.returners.release_pooled_connection(__context__, pool_key, conn)
+
+
+def _execute_prepared(cur, name, params):
+    """
+    Execute one of the ``PG_PREPARED_SQL`` statements, preparing it first if
+    this is the first time it is used on the connection.
+    """
+    conn = cur.connection
+    if name not in conn.prepared:
+        cur.execute("SELECT 1 FROM pg_prepared_statements WHERE name = %s", (name,))
+        if not cur.fetchone():
+            types, statement = PG_PREPARED_SQL[name]
+            cur.execute("PREPARE {0} {1} AS {2}".format(name, types, statement))
+        conn.prepared.add(name)
+    cur.execute(
+        "EXECUTE {0} ({1})".format(name, ", ".join(["%s"] * len(params))), params
+    )
+
+
+def _insert_returns(options, rows):
+    """
+    Insert a batch of returns with a single multi-row INSERT, into the
+    database the connection ``options`` point to
+    """
+    with _get_serv(commit=True, options=options) as cur:
+        psycopg2.extras.execute_values(
+            cur, PG_RETURN_SQL, rows, template=PG_RETURN_TEMPLATE, page_size=len(rows)
+        )
 
 
 def returner(ret):
     """
     Return data to a Pg server
+
+    If ``returner.pgjsonb.batch_window`` is set, returns are queued and
+    inserted together once the window has passed or ``batch_size`` returns
+    have been queued.
     """
+    row = (
+        ret["fun"],
+        ret["jid"],
+        psycopg2.extras.Json(ret["return"]),
+        ret["id"],
+        ret.get("success", False),
+        psycopg2.extras.Json(ret),
+        time.time(),
+    )
     try:
+        _options = _get_options(ret)
+        if _options["batch_window"] > 0:
+            # Returns bound for other databases, with ret_config, are batched
+            # separately
+            batch_key = "pgjsonb_returner_batch_{host}_{port}_{db}_{user}".format(
+                **_options
+            )
+            if batch_key not in __context__:
+                __context__[batch_key] = salt.returners.ReturnBatch(
+                    functools.partial(_insert_returns, _options),
+                    _options["batch_window"],
+                    size=_options["batch_size"],
+                )
+            __context__[batch_key].add(row)
+            return
         with _get_serv(ret, commit=True) as cur:
-            sql = """INSERT INTO salt_returns
-                    (fun, jid, return, id, success, full_ret, alter_time)
-                    VALUES (%s, %s, %s, %s, %s, %s, to_timestamp(%s))"""
-
-            cur.execute(
-                sql,
-                (
-                    ret["fun"],
-                    ret["jid"],
-                    psycopg2.extras.Json(ret["return"]),
-                    ret["id"],
-                    ret.get("success", False),
-                    psycopg2.extras.Json(ret),
-                    time.time(),
-                ),
+            psycopg2.extras.execute_values(
+                cur, PG_RETURN_SQL, [row], template=PG_RETURN_TEMPLATE
             )
     except salt.exceptions.SaltMasterError:
         log.critical(
@@ -334,14 +466,18 @@ def event_return(events):
     option in master config.
     """
     with _get_serv(events, commit=True) as cur:
-        for event in events:
-            tag = event.get("tag", "")
-            data = event.get("data", "")
-            sql = """INSERT INTO salt_events (tag, data, master_id, alter_time)
-                     VALUES (%s, %s, %s, to_timestamp(%s))"""
-            cur.execute(
-                sql, (tag, psycopg2.extras.Json(data), __opts__["id"], time.time())
+        rows = [
+            (
+                event.get("tag", ""),
+                psycopg2.extras.Json(event.get("data", "")),
+                __opts__["id"],
+                time.time(),
             )
+            for event in events
+        ]
+        psycopg2.extras.execute_values(
+            cur, PG_EVENT_SQL, rows, template=PG_EVENT_TEMPLATE, page_size=1000
+        )
 
 
 def save_load(jid, load, minions=None):
@@ -349,10 +485,12 @@ def save_load(jid, load, minions=None):
     Save the load to the specified jid id
     """
     with _get_serv(commit=True) as cur:
+        if cur.connection.server_version >= 90500:
+            name = "salt_save_load_upsert"
+        else:
+            name = "salt_save_load"
         try:
-            cur.execute(
-                PG_SAVE_LOAD_SQL, {"jid": jid, "load": psycopg2.extras.Json(load)}
-            )
+            _execute_prepared(cur, name, (jid, psycopg2.extras.Json(load)))
         except psycopg2.IntegrityError:
             # https://github.com/saltstack/salt/issues/22171
             # Without this try/except we get tons of duplicate entry errors
@@ -362,8 +500,15 @@ def save_load(jid, load, minions=None):
 
 def save_minions(jid, minions, syndic_id=None):  # pylint: disable=unused-argument
     """
-    Included for API consistency
+    Add the minions matched on lower-level masters to the ``Minions`` of the
+    job load. Requires PostgreSQL 9.5 or later, a no-op otherwise.
     """
+    with _get_serv(commit=True) as cur:
+        if cur.connection.server_version < 90500:
+            return
+        _execute_prepared(
+            cur, "salt_save_minions", (jid, psycopg2.extras.Json(list(minions)))
+        )
 
 
 def get_load(jid):
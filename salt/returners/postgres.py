@@ -41,6 +41,20 @@ the default location:
     alternative.returner.postgres.db: 'salt'
     alternative.returner.postgres.port: 5432
 
+Connections to the database are reused across calls. Returns can also be
+queued and inserted in batches with a single multi-row ``INSERT``. Returns
+are queued for at most ``batch_window`` seconds, or until ``batch_size``
+returns have been queued. Batching is disabled when ``batch_window`` is
+``0``, the default. Queued returns are lost if the process exits before the
+window has passed.
+
+.. code-block:: yaml
+
+    returner.postgres.batch_window: 1
+    returner.postgres.batch_size: 1000
+
+.. versionadded:: Aluminium
+
 Running the following commands as the postgres user should create the database
 correctly:
 
@@ -128,6 +142,7 @@ To override individual configuration items, append --return_kwargs '{"key:": "va
 """
 from __future__ import absolute_import, print_function, unicode_literals
 
+import functools
 import logging
 
 # Import python libs
@@ -146,13 +161,53 @@ from salt.ext import six
 
 try:
     import psycopg2
+    import psycopg2.extras
 
     HAS_POSTGRES = True
+
+    class _PreparedConnection(psycopg2.extensions.connection):
+        """
+        A connection which remembers the statements prepared on it
+        """
+
+        def __init__(self, *args, **kwargs):
+            super(_PreparedConnection, self).__init__(*args, **kwargs)
+            self.prepared = set()
+
+
 except ImportError:
     HAS_POSTGRES = False
 
 __virtualname__ = "postgres"
 
+PG_RETURN_SQL = """INSERT INTO salt_returns
+                   (fun, jid, return, id, success, full_ret)
+                   VALUES %s"""
+
+PG_EVENT_SQL = """INSERT INTO salt_events (tag, data, master_id)
+                  VALUES %s"""
+
+# Statements prepared once per pooled connection, as name: (types, statement)
+PG_PREPARED_SQL = {
+    "salt_save_load": (
+        "(varchar, text)",
+        "INSERT INTO jids (jid, load) VALUES ($1, $2)",
+    ),
+    "salt_save_minions": (
+        "(varchar, jsonb)",
+        """UPDATE jids
+           SET load = jsonb_set(
+               load::jsonb, '{Minions}', (
+                   SELECT COALESCE(jsonb_agg(DISTINCT minion), '[]'::jsonb)
+                   FROM jsonb_array_elements(
+                       COALESCE(load::jsonb->'Minions', '[]'::jsonb) || $2
+                   ) AS minions(minion)
+               )
+           )::text
+           WHERE jid = $1""",
+    ),
+}
+
 log = logging.getLogger(__name__)
 
 
@@ -172,6 +227,8 @@ def _get_options(ret=None):
         "passwd": "salt",
         "db": "salt",
         "port": 5432,
+        "batch_window": 0,
+        "batch_size": 1000,
     }
 
     attrs = {
@@ -180,6 +237,8 @@ def _get_options(ret=None):
         "passwd": "passwd",
         "db": "db",
         "port": "port",
+        "batch_window": "batch_window",
+        "batch_size": "batch_size",
     }
 
     _options = salt.returners.get_returner_options(
@@ -190,70 +249,142 @@ def _get_options(ret=None):
         __opts__=__opts__,
         defaults=defaults,
     )
-    # Ensure port is an int
+    # Ensure port and batch settings are numbers
     if "port" in _options:
         _options["port"] = int(_options["port"])
+    _options["batch_window"] = float(_options.get("batch_window") or 0)
+    _options["batch_size"] = int(_options.get("batch_size") or 1000)
     return _options
 
 
+def _ping(conn):
+    """
+    Make sure a pooled connection is still open
+    """
+    if conn.closed:
+        raise psycopg2.InterfaceError("connection already closed")
+
+
 @contextmanager
-def _get_serv(ret=None, commit=False):
+def _get_serv(ret=None, commit=False, options=None):
     """
     Return a Pg cursor
+
+    Connections are kept in a pool in ``__context__`` and reused by the
+    following calls. ``options``, the connection options already resolved
+    by ``_get_options()``, take precedence over ``ret``.
     """
-    _options = _get_options(ret)
-    try:
-        conn = psycopg2.connect(
-            host=_options.get("host"),
-            user=_options.get("user"),
-            password=_options.get("passwd"),
-            database=_options.get("db"),
-            port=_options.get("port"),
-        )
+    _options = options if options is not None else _get_options(ret)
 
-    except psycopg2.OperationalError as exc:
-        raise salt.exceptions.SaltMasterError(
-            "postgres returner could not connect to database: {exc}".format(exc=exc)
-        )
+    def _connect():
+        try:
+            return psycopg2.connect(
+                host=_options.get("host"),
+                user=_options.get("user"),
+                password=_options.get("passwd"),
+                database=_options.get("db"),
+                port=_options.get("port"),
+                connection_factory=_PreparedConnection,
+            )
+        except psycopg2.OperationalError as exc:
+            raise salt.exceptions.SaltMasterError(
+                "postgres returner could not connect to database: {exc}".format(exc=exc)
+            )
+
+    pool_key = "postgres_returner_pool_{host}_{port}_{db}_{user}".format(**_options)
+    conn = salt.returners.get_pooled_connection(
+        __context__, pool_key, _connect, ping=_ping
+    )
 
     cursor = conn.cursor()
 
     try:
         yield cursor
-    except psycopg2.DatabaseError as err:
-        error = err.args
-        sys.stderr.write(six.text_type(error))
-        cursor.execute("ROLLBACK")
-        six.reraise(*sys.exc_info())
+    except Exception as err:  # pylint: disable=broad-except
+        if isinstance(err, psycopg2.DatabaseError):
+            sys.stderr.write(six.text_type(err.args))
+        if isinstance(err, psycopg2.OperationalError):
+            conn.close()
+        else:
+            # Never hand a connection back to the pool in the middle of a
+            # transaction, whatever the error was
+            try:
+                cursor.execute("ROLLBACK")
+            except psycopg2.Error:
+                conn.close()
+            # Statements prepared in the failed transaction may be gone
+            conn.prepared.clear()
+        raise
     else:
         if commit:
             cursor.execute("COMMIT")
         else:
             cursor.execute("ROLLBACK")
     finally:
-        conn.close()
+        if not conn.closed:
+            salt.returners.release_pooled_connection(__context__, pool_key, conn)
+
+
+def _execute_prepared(cur, name, params):
+    """
+    Execute one of the ``PG_PREPARED_SQL`` statements, preparing it first if
+    this is the first time it is used on the connection.
+    """
+    conn = cur.connection
+    if name not in conn.prepared:
+        cur.execute("SELECT 1 FROM pg_prepared_statements WHERE name = %s", (name,))
+        if not cur.fetchone():
+            types, statement = PG_PREPARED_SQL[name]
+            cur.execute("PREPARE {0} {1} AS {2}".format(name, types, statement))
+        conn.prepared.add(name)
+    cur.execute(
+        "EXECUTE {0} ({1})".format(name, ", ".join(["%s"] * len(params))), params
+    )
+
+
+def _insert_returns(options, rows):
+    """
+    Insert a batch of returns with a single multi-row INSERT, into the
+    database the connection ``options`` point to
+    """
+    with _get_serv(commit=True, options=options) as cur:
+        psycopg2.extras.execute_values(cur, PG_RETURN_SQL, rows, page_size=len(rows))
 
 
 def returner(ret):
     """
     Return data to a postgres server
+
+    If ``returner.postgres.batch_window`` is set, returns are queued and
+    inserted together once the window has passed or ``batch_size`` returns
+    have been queued.
     """
+    row = (
+        ret["fun"],
+        ret["jid"],
+        salt.utils.json.dumps(ret["return"]),
+        ret["id"],
+        ret.get("success", False),
+        salt.utils.json.dumps(ret),
+    )
     try:
-        with _get_serv(ret, commit=True) as cur:
-            sql = """INSERT INTO salt_returns
-                    (fun, jid, return, id, success, full_ret)
-                    VALUES (%s, %s, %s, %s, %s, %s)"""
-            cur.execute(
-                sql,
-                (
-                    ret["fun"],
-                    ret["jid"],
-                    salt.utils.json.dumps(ret["return"]),
-                    ret["id"],
-                    ret.get("success", False),
-                    salt.utils.json.dumps(ret),
-                ),
+        _options = _get_options(ret)
+        if _options["batch_window"] > 0:
+            # Returns bound for other databases, with ret_config, are batched
+            # separately
+            batch_key = "postgres_returner_batch_{host}_{port}_{db}_{user}".format(
+                **_options
             )
+            if batch_key not in __context__:
+                __context__[batch_key] = salt.returners.ReturnBatch(
+                    functools.partial(_insert_returns, _options),
+                    _options["batch_window"],
+                    size=_options["batch_size"],
+                )
+            __context__[batch_key].add(row)
+            return
+        with _get_serv(ret, commit=True) as cur:
+            psycopg2.extras.execute_values(cur, PG_RETURN_SQL, [row])
     except salt.exceptions.SaltMasterError:
         log.critical(
             "Could not store return with postgres returner. PostgreSQL server unavailable."
@@ -268,12 +399,15 @@ def event_return(events):
     option in master config.
     """
     with _get_serv(events, commit=True) as cur:
-        for event in events:
-            tag = event.get("tag", "")
-            data = event.get("data", "")
-            sql = """INSERT INTO salt_events (tag, data, master_id)
-                     VALUES (%s, %s, %s)"""
-            cur.execute(sql, (tag, salt.utils.json.dumps(data), __opts__["id"]))
+        rows = [
+            (
+                event.get("tag", ""),
+                salt.utils.json.dumps(event.get("data", "")),
+                __opts__["id"],
+            )
+            for event in events
+        ]
+        psycopg2.extras.execute_values(cur, PG_EVENT_SQL, rows, page_size=1000)
 
 
 def save_load(jid, load, minions=None):  # pylint: disable=unused-argument
@@ -281,13 +415,8 @@ def save_load(jid, load, minions=None):  # pylint: disable=unused-argument
     Save the load to the specified jid id
     """
     with _get_serv(commit=True) as cur:
-
-        sql = """INSERT INTO jids
-               (jid, load)
-                VALUES (%s, %s)"""
-
         try:
-            cur.execute(sql, (jid, salt.utils.json.dumps(load)))
+            _execute_prepared(cur, "salt_save_load", (jid, salt.utils.json.dumps(load)))
         except psycopg2.IntegrityError:
             # https://github.com/saltstack/salt/issues/22171
             # Without this try/except we get tons of duplicate entry errors
@@ -297,8 +426,15 @@ def save_load(jid, load, minions=None):  # pylint: disable=unused-argument
 
 def save_minions(jid, minions, syndic_id=None):  # pylint: disable=unused-argument
     """
-    Included for API consistency
+    Add the minions matched on lower-level masters to the ``Minions`` of the
+    job load. Requires PostgreSQL 9.5 or later, a no-op otherwise.
     """
+    with _get_serv(commit=True) as cur:
+        if cur.connection.server_version < 90500:
+            return
+        _execute_prepared(
+            cur, "salt_save_minions", (jid, psycopg2.extras.Json(list(minions)))
+        )
 
 
 def get_load(jid):
@@ -28,6 +28,20 @@ the default location:
     alternative.sqlite3.database: /usr/lib/salt/salt.db
     alternative.sqlite3.timeout: 5.0
 
+The database connection, and with it sqlite3's cache of prepared statements,
+is reused across calls. Returns can also be queued and inserted in batches
+within a single transaction. Returns are queued for at most ``batch_window``
+seconds, or until ``batch_size`` returns have been queued. Batching is
+disabled when ``batch_window`` is ``0``, the default. Queued returns are lost
+if the process exits before the window has passed.
+
+.. code-block:: yaml
+
+    sqlite3.batch_window: 1
+    sqlite3.batch_size: 1000
+
+.. versionadded:: Aluminium
+
 Use the commands to create the sqlite3 database and tables:
 
 .. code-block:: sql
@@ -83,9 +97,11 @@ To override individual configuration items, append --return_kwargs '{"key:": "va
 from __future__ import absolute_import, print_function, unicode_literals
 
 import datetime
+import functools
 
 # Import python libs
 import logging
+from contextlib import contextmanager
 
 import salt.returners
 
@@ -101,6 +117,15 @@ try:
     import sqlite3
 
     HAS_SQLITE3 = True
+
+    class _PooledConnection(sqlite3.Connection):
+        """
+        A connection which remembers the pool it belongs to
+        """
+
+        pool_key = None
+
+
 except ImportError:
     HAS_SQLITE3 = False
 
@@ -109,6 +134,10 @@ log = logging.getLogger(__name__)
 # Define the module's virtual name
 __virtualname__ = "sqlite3"
 
+SQLITE3_RETURN_SQL = """INSERT INTO salt_returns
+                        (fun, jid, id, fun_args, date, full_ret, success)
+                        VALUES (:fun, :jid, :id, :fun_args, :date, :full_ret, :success)"""
+
 
 def __virtual__():
     if not HAS_SQLITE3:
@@ -120,21 +149,33 @@ def _get_options(ret=None):
     """
     Get the SQLite3 options from salt.
     """
-    attrs = {"database": "database", "timeout": "timeout"}
+    attrs = {
+        "database": "database",
+        "timeout": "timeout",
+        "batch_window": "batch_window",
+        "batch_size": "batch_size",
+    }
 
     _options = salt.returners.get_returner_options(
         __virtualname__, ret, attrs, __salt__=__salt__, __opts__=__opts__
     )
+    _options["batch_window"] = float(_options.get("batch_window") or 0)
+    _options["batch_size"] = int(_options.get("batch_size") or 1000)
     return _options
 
 
-def _get_conn(ret=None):
+def _get_conn(ret=None, options=None):
     """
     Return a sqlite3 database connection
+
+    Connections are kept in a pool in ``__context__``, :func:`_close_conn`
+    hands them back for the following calls to reuse. ``options``, the
+    options already resolved by :func:`_get_options`, take precedence over
+    ``ret``.
     """
-    # Possible todo: support detect_types, isolation_level, check_same_thread,
-    # factory, cached_statements. Do we really need to though?
-    _options = _get_options(ret)
+    # Possible todo: support detect_types, isolation_level, factory,
+    # cached_statements. Do we really need to though?
+    _options = options if options is not None else _get_options(ret)
     database = _options.get("database")
     timeout = _options.get("timeout")
 
@@ -142,43 +183,92 @@ def _get_conn(ret=None):
         raise Exception('sqlite3 config option "sqlite3.database" is missing')
     if not timeout:
         raise Exception('sqlite3 config option "sqlite3.timeout" is missing')
-    log.debug("Connecting the sqlite3 database: %s timeout: %s", database, timeout)
-    conn = sqlite3.connect(database, timeout=float(timeout))
-    return conn
+
+    def _connect():
+        log.debug("Connecting the sqlite3 database: %s timeout: %s", database, timeout)
+        # Pooled connections are only ever used by one thread at a time, but
+        # not necessarily the thread which opened them.
+        conn = sqlite3.connect(
+            database,
+            timeout=float(timeout),
+            check_same_thread=False,
+            factory=_PooledConnection,
+        )
+        conn.pool_key = pool_key
+        return conn
+
+    pool_key = "sqlite3_returner_pool_{0}".format(database)
+    return salt.returners.get_pooled_connection(__context__, pool_key, _connect)
 
 
 def _close_conn(conn):
     """
-    Close the sqlite3 database connection
+    Commit and hand the sqlite3 database connection back to the pool
     """
-    log.debug("Closing the sqlite3 database connection")
+    log.debug("Releasing the sqlite3 database connection")
     conn.commit()
-    conn.close()
+    salt.returners.release_pooled_connection(__context__, conn.pool_key, conn)
+
+
+@contextmanager
+def _get_cursor(ret=None, options=None):
+    """
+    Return a cursor on a pooled sqlite3 database connection. The transaction
+    is committed and the connection handed back to the pool on success, it is
+    rolled back first on error.
+    """
+    conn = _get_conn(ret, options=options)
+    try:
+        yield conn.cursor()
+    except Exception:
+        conn.rollback()
+        salt.returners.release_pooled_connection(__context__, conn.pool_key, conn)
+        raise
+    _close_conn(conn)
+
+
+def _insert_returns(options, rows):
+    """
+    Insert a batch of returns within a single transaction, into the database
+    ``options`` point to
+    """
+    with _get_cursor(options=options) as cur:
+        cur.executemany(SQLITE3_RETURN_SQL, rows)
 
 
 def returner(ret):
     """
     Insert minion return data into the sqlite3 database
+
+    If ``sqlite3.batch_window`` is set, returns are queued and inserted
+    together once the window has passed or ``batch_size`` returns have been
+    queued.
     """
     log.debug("sqlite3 returner <returner> called with data: %s", ret)
-    conn = _get_conn(ret)
-    cur = conn.cursor()
-    sql = """INSERT INTO salt_returns
-             (fun, jid, id, fun_args, date, full_ret, success)
-             VALUES (:fun, :jid, :id, :fun_args, :date, :full_ret, :success)"""
-    cur.execute(
-        sql,
-        {
-            "fun": ret["fun"],
-            "jid": ret["jid"],
-            "id": ret["id"],
-            "fun_args": six.text_type(ret["fun_args"]) if ret.get("fun_args") else None,
-            "date": six.text_type(datetime.datetime.now()),
-            "full_ret": salt.utils.json.dumps(ret["return"]),
-            "success": ret.get("success", ""),
-        },
-    )
-    _close_conn(conn)
+    row = {
+        "fun": ret["fun"],
+        "jid": ret["jid"],
+        "id": ret["id"],
+        "fun_args": six.text_type(ret["fun_args"]) if ret.get("fun_args") else None,
+        "date": six.text_type(datetime.datetime.now()),
+        "full_ret": salt.utils.json.dumps(ret["return"]),
+        "success": ret.get("success", ""),
+    }
+    _options = _get_options(ret)
+    if _options["batch_window"] > 0:
+        # Returns bound for other databases, with ret_config, are batched
+        # separately
+        batch_key = "sqlite3_returner_batch_{}".format(_options.get("database"))
+        if batch_key not in __context__:
+            __context__[batch_key] = salt.returners.ReturnBatch(
+                functools.partial(_insert_returns, _options),
+                _options["batch_window"],
+                size=_options["batch_size"],
+            )
+        __context__[batch_key].add(row)
+        return
+    with _get_cursor(ret) as cur:
+        cur.execute(SQLITE3_RETURN_SQL, row)
 
 
 def save_load(jid, load, minions=None):
@@ -186,17 +276,35 @@ def save_load(jid, load, minions=None):
     Save the load to the specified jid
     """
     log.debug("sqlite3 returner <save_load> called jid: %s load: %s", jid, load)
-    conn = _get_conn(ret=None)
-    cur = conn.cursor()
-    sql = """INSERT INTO jids (jid, load) VALUES (:jid, :load)"""
-    cur.execute(sql, {"jid": jid, "load": salt.utils.json.dumps(load)})
-    _close_conn(conn)
+    with _get_cursor(ret=None) as cur:
+        sql = """INSERT INTO jids (jid, load) VALUES (:jid, :load)"""
+        cur.execute(sql, {"jid": jid, "load": salt.utils.json.dumps(load)})
 
 
 def save_minions(jid, minions, syndic_id=None):  # pylint: disable=unused-argument
     """
-    Included for API consistency
+    Add the minions matched on lower-level masters to the ``Minions`` of the
+    job load
     """
+    log.debug("sqlite3 returner <save_minions> called jid: %s", jid)
+    with _get_cursor(ret=None) as cur:
+        # Hold the write lock from the read on, so that concurrent syndics do
+        # not overwrite each other's minions
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute("""SELECT load FROM jids WHERE jid = :jid""", {"jid": jid})
+        data = cur.fetchone()
+        if not data:
+            return
+        load = salt.utils.json.loads(data[0])
+        known = load.get("Minions") or []
+        new = [minion for minion in sorted(set(minions)) if minion not in known]
+        if not new:
+            return
+        load["Minions"] = known + new
+        cur.execute(
+            """UPDATE jids SET load = :load WHERE jid = :jid""",
+            {"jid": jid, "load": salt.utils.json.dumps(load)},
+        )
 
 
 def get_load(jid):
@@ -204,14 +312,12 @@ def get_load(jid):
     Return the load from a specified jid
     """
     log.debug("sqlite3 returner <get_load> called jid: %s", jid)
-    conn = _get_conn(ret=None)
-    cur = conn.cursor()
-    sql = """SELECT load FROM jids WHERE jid = :jid"""
-    cur.execute(sql, {"jid": jid})
-    data = cur.fetchone()
+    with _get_cursor(ret=None) as cur:
+        sql = """SELECT load FROM jids WHERE jid = :jid"""
+        cur.execute(sql, {"jid": jid})
+        data = cur.fetchone()
     if data:
         return salt.utils.json.loads(data[0].encode())
-    _close_conn(conn)
     return {}
 
 
@@ -220,17 +326,15 @@ def get_jid(jid):
     Return the information returned from a specified jid
     """
     log.debug("sqlite3 returner <get_jid> called jid: %s", jid)
-    conn = _get_conn(ret=None)
-    cur = conn.cursor()
-    sql = """SELECT id, full_ret FROM salt_returns WHERE jid = :jid"""
-    cur.execute(sql, {"jid": jid})
-    data = cur.fetchone()
-    log.debug("query result: %s", data)
-    ret = {}
-    if data and len(data) > 1:
-        ret = {six.text_type(data[0]): {"return": salt.utils.json.loads(data[1])}}
-        log.debug("ret: %s", ret)
-    _close_conn(conn)
+    with _get_cursor(ret=None) as cur:
+        sql = """SELECT id, full_ret FROM salt_returns WHERE jid = :jid"""
+        cur.execute(sql, {"jid": jid})
+        data = cur.fetchone()
+        log.debug("query result: %s", data)
+        ret = {}
+        if data and len(data) > 1:
+            ret = {six.text_type(data[0]): {"return": salt.utils.json.loads(data[1])}}
+            log.debug("ret: %s", ret)
     return ret
 
 
@@ -239,25 +343,23 @@ def get_fun(fun):
     Return a dict of the last function called for all minions
     """
     log.debug("sqlite3 returner <get_fun> called fun: %s", fun)
-    conn = _get_conn(ret=None)
-    cur = conn.cursor()
-    sql = """SELECT s.id, s.full_ret, s.jid
-            FROM salt_returns s
-            JOIN ( SELECT MAX(jid) AS jid FROM salt_returns GROUP BY fun, id) max
-            ON s.jid = max.jid
-            WHERE s.fun = :fun
-            """
-    cur.execute(sql, {"fun": fun})
-    data = cur.fetchall()
-    ret = {}
-    if data:
-        # Pop the jid off the list since it is not
-        # needed and I am trying to get a perfect
-        # pylint score :-)
-        data.pop()
-        for minion, ret in data:
-            ret[minion] = salt.utils.json.loads(ret)
-    _close_conn(conn)
+    with _get_cursor(ret=None) as cur:
+        sql = """SELECT s.id, s.full_ret, s.jid
+                FROM salt_returns s
+                JOIN ( SELECT MAX(jid) AS jid FROM salt_returns GROUP BY fun, id) max
+                ON s.jid = max.jid
+                WHERE s.fun = :fun
+                """
+        cur.execute(sql, {"fun": fun})
+        data = cur.fetchall()
+        ret = {}
+        if data:
+            # Pop the jid off the list since it is not
+            # needed and I am trying to get a perfect
+            # pylint score :-)
+            data.pop()
+            for minion, ret in data:
+                ret[minion] = salt.utils.json.loads(ret)
     return ret
 
 
@@ -266,15 +368,15 @@ def get_jids():
     Return a list of all job ids
     """
     log.debug("sqlite3 returner <get_jids> called")
-    conn = _get_conn(ret=None)
-    cur = conn.cursor()
-    sql = """SELECT jid, load FROM jids"""
-    cur.execute(sql)
-    data = cur.fetchall()
-    ret = {}
-    for jid, load in data:
-        ret[jid] = salt.utils.jid.format_jid_instance(jid, salt.utils.json.loads(load))
-    _close_conn(conn)
+    with _get_cursor(ret=None) as cur:
+        sql = """SELECT jid, load FROM jids"""
+        cur.execute(sql)
+        data = cur.fetchall()
+        ret = {}
+        for jid, load in data:
+            ret[jid] = salt.utils.jid.format_jid_instance(
+                jid, salt.utils.json.loads(load)
+            )
     return ret
 
 
@@ -283,15 +385,13 @@ def get_minions():
     Return a list of minions
     """
     log.debug("sqlite3 returner <get_minions> called")
-    conn = _get_conn(ret=None)
-    cur = conn.cursor()
-    sql = """SELECT DISTINCT id FROM salt_returns"""
-    cur.execute(sql)
-    data = cur.fetchall()
-    ret = []
-    for minion in data:
-        ret.append(minion[0])
-    _close_conn(conn)
+    with _get_cursor(ret=None) as cur:
+        sql = """SELECT DISTINCT id FROM salt_returns"""
+        cur.execute(sql)
+        data = cur.fetchall()
+        ret = []
+        for minion in data:
+            ret.append(minion[0])
     return ret
 
 
@@ -5,12 +5,18 @@ hitting minions without zeromq in place via an ssh agent, and connecting to
 systems that cannot or should not host a minion agent.
 """
 
+import hashlib
 import logging
 import os
+import time
 
 # Import salt libs
 import salt.loader
+import salt.payload
 import salt.syspaths
+import salt.utils.atomicfile
+import salt.utils.files
+import salt.utils.json
 from salt.ext import six
 
 log = logging.getLogger(__name__)
@@ -55,6 +61,68 @@ def get_roster_file(options):
     return template
 
 
+def cached_roster(opts, backend, source, gen, key=None):
+    """
+    Return the roster data the backend generates from the file ``source`` by
+    calling ``gen``. ``key`` holds the other arguments the data depends on,
+    the data generated with different ones is cached separately.
+
+    With ``roster_cache``, the data is kept in the master cache and is reused
+    until ``source`` is modified or the data is older than
+    ``roster_cache_ttl`` seconds, so that large rosters are not rendered or
+    parsed again by every salt-ssh run.
+
+    .. versionadded:: Aluminium
+    """
+    if not opts.get("roster_cache"):
+        return gen()
+    source = os.path.abspath(source)
+    try:
+        st = os.stat(source)
+    except OSError:
+        return gen()
+    source_id = [st.st_mtime_ns, st.st_size]
+    cache_dir = os.path.join(opts["cachedir"], "roster")
+    cache = os.path.join(
+        cache_dir,
+        "{}.p".format(
+            hashlib.sha256(
+                "{}:{}:{}".format(
+                    backend,
+                    source,
+                    salt.utils.json.dumps(key, sort_keys=True, default=str),
+                ).encode("utf-8")
+            ).hexdigest()
+        ),
+    )
+    serial = salt.payload.Serial(opts)
+    ttl = opts.get("roster_cache_ttl", 3600)
+    try:
+        with salt.utils.files.fopen(cache, "rb") as fp_:
+            cached = serial.load(fp_)
+        if cached["source"] == source_id and (
+            not ttl or time.time() - cached["time"] < ttl
+        ):
+            log.debug("Using the cached %s roster of %s", backend, source)
+            return cached["data"]
+    except (OSError, IOError):
+        pass
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug("Failed to read the roster cache %s: %s", cache, exc)
+
+    data = gen()
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0o700)
+        # The roster may hold passwords, atomic_open creates the file with
+        # mode 0600
+        with salt.utils.atomicfile.atomic_open(cache, "wb") as fp_:
+            serial.dump({"source": source_id, "time": time.time(), "data": data}, fp_)
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug("Failed to write the roster cache %s: %s", cache, exc)
+    return data
+
+
 class Roster:
     """
     Used to manage a roster of minions allowing the master to become outwardly
@@ -91,8 +91,10 @@ Any of the [groups] or direct hostnames will return.  The 'all' is special, and
 from __future__ import absolute_import, print_function, unicode_literals
 import copy
 import fnmatch
+import os
 
 # Import Salt libs
+import salt.roster
 import salt.utils.path
 from salt.roster import get_roster_file
 
@@ -120,9 +122,21 @@ def targets(tgt, tgt_type="glob", **kwargs):
     Return the targets from the ansible inventory_file
     Default: /etc/salt/roster
     """
-    __context__["inventory"] = __utils__["ansible.targets"](
-        inventory=get_roster_file(__opts__), **kwargs
-    )
+    inventory = get_roster_file(__opts__)
+    if os.path.isfile(inventory) and not os.access(inventory, os.X_OK):
+        __context__["inventory"] = salt.roster.cached_roster(
+            __opts__,
+            "ansible",
+            inventory,
+            lambda: __utils__["ansible.targets"](inventory=inventory, **kwargs),
+            key=kwargs,
+        )
+    else:
+        # Dynamic inventory scripts, and directories which may hold them,
+        # are run every time
+        __context__["inventory"] = __utils__["ansible.targets"](
+            inventory=inventory, **kwargs
+        )
 
     if tgt_type == "glob":
         hosts = [
@@ -10,6 +10,7 @@ import salt.config
 
 # Import Salt libs
 import salt.loader
+import salt.roster
 from salt.ext import six
 from salt.roster import get_roster_file
 from salt.template import compile_template
@@ -24,15 +25,19 @@ def targets(tgt, tgt_type="glob", **kwargs):
     """
     template = get_roster_file(__opts__)
 
-    rend = salt.loader.render(__opts__, {})
-    raw = compile_template(
+    raw = salt.roster.cached_roster(
+        __opts__,
+        "flat",
         template,
-        rend,
-        __opts__["renderer"],
-        __opts__["renderer_blacklist"],
-        __opts__["renderer_whitelist"],
-        mask_value="passw*",
-        **kwargs
+        lambda: compile_template(
+            template,
+            salt.loader.render(__opts__, {}),
+            __opts__["renderer"],
+            __opts__["renderer_blacklist"],
+            __opts__["renderer_whitelist"],
+            mask_value="passw*",
+            **kwargs
+        ),
     )
     conditioned_raw = {}
     for minion in raw:
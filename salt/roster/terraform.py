@@ -61,6 +61,7 @@ import logging
 import os.path
 
 # Import Salt libs
+import salt.roster
 import salt.utils.files
 import salt.utils.json
 
@@ -179,6 +180,8 @@ def targets(tgt, tgt_type="glob", **kwargs):  # pylint: disable=W0613
         log.error("Terraform roster can only be used with terraform state files")
         return {}
 
-    raw = _parse_state_file(roster_file)
+    raw = salt.roster.cached_roster(
+        __opts__, "terraform", roster_file, lambda: _parse_state_file(roster_file)
+    )
     log.debug("%s hosts in terraform state file", len(raw))
     return __utils__["roster_matcher.targets"](raw, tgt, tgt_type, "ipv4")
@@ -779,6 +779,12 @@ class State:
         self.instance_id = str(id(self))
         self.inject_globals = {}
         self.mocked = mocked
+        # Batches planned by mod_batch which are yet to run, along with the
+        # original low data of the state which applies them, by the tag of
+        # that state, and the returns of the batched states which were already
+        # applied
+        self.batches = {}
+        self.batch_results = {}
 
     def _gather_pillar(self):
         """
@@ -867,6 +873,54 @@ class State:
                     log.error("Failed to execute aggregate for state %s", low["state"])
         return low
 
+    def _mod_batch(self, low, running, chunks):
+        """
+        Execute the batching systems to plan the other states which can be
+        applied along with the low chunk
+        """
+        batch_opt = self.opts.get("state_batch", False)
+        if batch_opt is True:
+            batch_opt = [low["state"]]
+        elif not isinstance(batch_opt, list):
+            return low
+        if (
+            low["state"] not in batch_opt
+            or low.get("__agg__")
+            or low.get("__batched__")
+            or low.get("__prereq__")
+        ):
+            return low
+        batch_fun = "{}.mod_batch".format(low["state"])
+        if batch_fun in self.states:
+            orig_low = low
+            low = self.states[batch_fun](low, chunks, running)
+            batch = low.pop("__batch__", None)
+            if batch:
+                self.batches[_gen_tag(low)] = (batch, orig_low)
+        return low
+
+    def _split_batch(self, tag, batch, ret):
+        """
+        Split the successful return of the state which applied a batch between
+        the states in the batch. The changes are keyed by the names each state
+        manages, those no state claims stay with the state which applied the
+        batch.
+        """
+        changes = ret.get("changes")
+        if not isinstance(changes, dict):
+            changes = {}
+        for member, names in batch.items():
+            if member == tag:
+                continue
+            member_ret = dict(ret)
+            member_ret["name"] = split_low_tag(member)["name"]
+            member_ret["changes"] = {
+                name: changes.pop(name) for name in names if name in changes
+            }
+            self.batch_results[member] = member_ret
+        ret["changes"] = changes
+        return ret
+
     def _run_check(self, low_data):
         """
         Check that unless doesn't return 0, and that onlyif returns a 0.
@@ -2165,7 +2219,11 @@ class State:
             if "__orchestration_jid__" in low:
                 inject_globals["__orchestration_jid__"] = low["__orchestration_jid__"]
 
-            if "result" not in ret or ret["result"] is False:
+            batch_tag = _gen_tag(low)
+            if batch_tag in self.batch_results:
+                # The state was applied along with the batch it was planned in
+                ret = self.batch_results.pop(batch_tag)
+            elif "result" not in ret or ret["result"] is False:
                 self.states.inject_globals = inject_globals
                 if self.mocked:
                     ret = mock_ret(cdata)
@@ -2187,6 +2245,17 @@ class State:
                                 *cdata["args"], **cdata["kwargs"]
                             )
                 self.states.inject_globals = {}
+            if batch_tag in self.batches:
+                batch, batch_low = self.batches.pop(batch_tag)
+                if ret.get("result") is False:
+                    # Which of the states of the batch failed is not known,
+                    # run each of them on its own instead
+                    log.debug(
+                        "Batch applied by %s failed, running its states one by one",
+                        batch_tag,
+                    )
+                    return self.call(batch_low, chunks, running, retries)
+                ret = self._split_batch(batch_tag, batch, ret)
             if (
                 "check_cmd" in low
                 and "{0[state]}.mod_run_check_cmd".format(low) not in self.states
@@ -2198,6 +2267,8 @@ class State:
                 exc,
                 exc_info_on_loglevel=logging.DEBUG,
             )
+            # The other states of a batch the state applied run on their own
+            self.batches.pop(_gen_tag(low), None)
             trb = traceback.format_exc()
             # There are a number of possibilities to not have the cdata
             # populated with what we might have expected, so just be smart
@@ -2861,6 +2932,7 @@ class State:
         the chunk
         """
         low = self._mod_aggregate(low, running, chunks)
+        low = self._mod_batch(low, running, chunks)
         self._mod_init(low)
         tag = _gen_tag(low)
         if not low.get("prerequired"):
@@ -3243,6 +3315,45 @@ class State:
                 if needs_default:
                     state[state_ref].insert(-1, "__call__")
 
+    def prefetch_sources(self, chunks):
+        """
+        Cache the salt:// sources of the chunks before running them, so that
+        they are fetched in bulk rather than one state at a time
+        """
+        files = {}
+        dirs = []
+        for low in chunks:
+            source = low.get("source")
+            if isinstance(source, list):
+                # Only the first one of the alternatives is usually needed
+                source = source[0] if source else None
+            if isinstance(source, dict):
+                source = next(iter(source), None)
+            if not isinstance(source, str) or not source.startswith("salt://"):
+                continue
+            saltenv = low.get("saltenv") or low.get("__env__", "base")
+            if low["state"] == "file" and low["fun"] == "recurse":
+                dirs.append((source, saltenv, low))
+            elif source not in files.setdefault(saltenv, []):
+                files[saltenv].append(source)
+        if not files and not dirs:
+            return
+        log.debug("Prefetching the sources of %d states", len(chunks))
+        try:
+            for saltenv, paths in files.items():
+                self.functions["cp.cache_files"](paths, saltenv)
+            for source, saltenv, low in dirs:
+                self.functions["cp.cache_dir"](
+                    source,
+                    saltenv,
+                    include_empty=low.get("include_empty", False),
+                    include_pat=low.get("include_pat"),
+                    exclude_pat=low.get("exclude_pat"),
+                )
+        except Exception as exc:  # pylint: disable=broad-except
+            # The states fetch what they need themselves anyway
+            log.warning("Failed to prefetch state sources: %s", exc)
+
     def call_high(self, high, orchestration_jid=None):
         """
         Process a high data call and ensure the defined states.
@@ -3268,6 +3379,8 @@ class State:
         # the low data chunks
         if errors:
             return errors
+        if self.opts.get("state_prefetch_sources"):
+            self.prefetch_sources(chunks)
         ret = self.call_chunks(chunks)
         ret = self.call_listen(chunks, ret)
 
@@ -3513,6 +3626,9 @@ class BaseHighState:
             )
             opts["env_order"] = mopts.get("env_order", opts.get("env_order", []))
             opts["default_top"] = mopts.get("default_top", opts.get("default_top"))
+            opts["fileserver_generations"] = mopts.get(
+                "fileserver_generations", opts.get("fileserver_generations")
+            )
             opts["state_events"] = mopts.get("state_events")
             opts["state_aggregate"] = mopts.get(
                 "state_aggregate", opts.get("state_aggregate", False)
@@ -4619,6 +4735,9 @@ class HighState(BaseHighState):
     # a stack of active HighState objects during a state.highstate run
     stack = []
 
+    # the class of the state runtime
+    state_class = State
+
     def __init__(
         self,
         opts,
@@ -4634,7 +4753,7 @@ class HighState(BaseHighState):
         self.opts = opts
         self.client = salt.fileclient.get_file_client(self.opts)
         BaseHighState.__init__(self, opts)
-        self.state = State(
+        self.state = self.state_class(
             self.opts,
             pillar_override,
             jid,
@@ -4418,6 +4418,17 @@ def recurse(
         )
         merge_ret(path, _ret)
 
+    if __opts__.get("fileclient_hash_batch_ttl") and (
+        "cp.hash_and_stat_list" in __salt__
+    ):
+        # Validate all of the cached copies of the sources at once, instead
+        # of asking the master about every file as it is managed
+        try:
+            __salt__["cp.hash_and_stat_list"](prefix=srcpath, saltenv=senv)
+        except Exception as exc:  # pylint: disable=broad-except
+            # The files are checked one by one
+            log.debug("Could not fetch the hashes of %s: %s", source, exc)
+
     mng_files, mng_dirs, mng_symlinks, keep = _gen_recurse_managed_files(
         name, source, keep_symlinks, include_pat, exclude_pat, maxdepth, include_empty
     )
@@ -3525,6 +3525,206 @@ def mod_aggregate(low, chunks, running):
     return low
 
 
+# Keywords which tie a pkg state to its place in the run, states holding them
+# are not batched
+_BATCH_BLOCKERS = frozenset(
+    [
+        "require",
+        "require_any",
+        "watch",
+        "watch_any",
+        "prereq",
+        "prerequired",
+        "onchanges",
+        "onchanges_any",
+        "onfail",
+        "onfail_any",
+        "onfail_all",
+        "onfail_stop",
+        "listen",
+        "onlyif",
+        "unless",
+        "creates",
+        "check_cmd",
+        "retry",
+        "parallel",
+        "aggregate",
+        "sources",
+        "__agg__",
+        "__batched__",
+        "__prereq__",
+    ]
+)
+
+# Keywords which may differ between the states of a batch
+_BATCH_IGNORED = frozenset(
+    [
+        "name",
+        "pkgs",
+        "version",
+        "order",
+        "__id__",
+        "__sls__",
+        "__run_num__",
+        "require_in",
+        "watch_in",
+        "onchanges_in",
+        "onfail_in",
+        "listen_in",
+        "use_in",
+    ]
+)
+
+
+def _batch_pkgs(chunk):
+    """
+    Return the packages of a pkg state in the form of a pkgs ref, or None if
+    they can not be batched
+    """
+    if "pkgs" in chunk:
+        if not isinstance(chunk["pkgs"], list):
+            return None
+        return chunk["pkgs"]
+    if chunk.get("version") is not None:
+        return [{chunk["name"]: chunk["version"]}]
+    return [chunk["name"]]
+
+
+def _batch_args(chunk):
+    return {
+        key: val
+        for key, val in chunk.items()
+        if key not in _BATCH_IGNORED and key not in _BATCH_BLOCKERS
+    }
+
+
+# Requisites which make a state run after the states they refer to
+_BATCH_ORDERING = (
+    "require",
+    "require_any",
+    "watch",
+    "watch_any",
+    "prereq",
+    "onchanges",
+    "onchanges_any",
+    "onfail",
+    "onfail_any",
+    "onfail_all",
+    "listen",
+)
+
+
+def _requisite_target(chunk, others, keys=_BATCH_ORDERING):
+    """
+    Whether a requisite of one of the other states refers to the pkg state
+    """
+    for other in others:
+        for key in keys:
+            reqs = other.get(key, [])
+            if not isinstance(reqs, list):
+                reqs = [reqs]
+            for req in reqs:
+                if isinstance(req, dict):
+                    req_key, req_val = next(iter(req.items()))
+                else:
+                    req_key, req_val = "id", req
+                if req_key == "sls":
+                    if fnmatch.fnmatch(chunk["__sls__"], str(req_val)):
+                        return True
+                elif req_key in ("id", "pkg") and any(
+                    fnmatch.fnmatch(str(val), str(req_val))
+                    for val in (chunk["__id__"], chunk["name"])
+                ):
+                    return True
+    return False
+
+
+def mod_batch(low, chunks, running):
+    """
+    Plan the pkg states which can be applied in the same package manager
+    transaction as the present low data, when the ``state_batch`` option is
+    set.
+
+    Unlike mod_aggregate, only the states which call the same function with
+    the same arguments and have no requisites or run checks are batched, and
+    only when none of the states which run between the present one and them
+    depends on them through a requisite, so that moving them ahead keeps the
+    outcome of the run. Their packages are merged into a single pkgs ref in
+    the present low data, and ``__batch__`` maps the tag of each batched
+    state to its package names so that the state runtime can hand each state
+    its own changes.
+    """
+    if low.get("fun") not in ("installed", "latest", "removed", "purged"):
+        return low
+    if any(key in low for key in _BATCH_BLOCKERS) or _requisite_target(
+        low, chunks, ("prereq",)
+    ):
+        return low
+    leader_tag = __utils__["state.gen_tag"](low)
+    tags = [__utils__["state.gen_tag"](chunk) for chunk in chunks]
+    if leader_tag not in tags:
+        return low
+    leader_pkgs = _batch_pkgs(low)
+    if leader_pkgs is None:
+        return low
+    leader_args = _batch_args(low)
+    pkgs = _OrderedDict()
+    batch = _OrderedDict()
+    members = [low]
+    # The states left to run between the present one and the next state
+    # batched, in the order of the run
+    between = []
+    index = tags.index(leader_tag) + 1
+    for chunk, tag in [(low, leader_tag)] + list(zip(chunks[index:], tags[index:])):
+        if chunk is not low:
+            if tag in running:
+                # Already run ahead of its turn by a requisite
+                continue
+            if (
+                chunk.get("state") != "pkg"
+                or chunk.get("fun") != low["fun"]
+                or any(key in chunk for key in _BATCH_BLOCKERS)
+                or _batch_args(chunk) != leader_args
+                or _requisite_target(chunk, chunks, ("prereq",))
+                or _requisite_target(chunk, between)
+            ):
+                between.append(chunk)
+                continue
+        chunk_pkgs = leader_pkgs if chunk is low else _batch_pkgs(chunk)
+        if chunk_pkgs is None:
+            between.append(chunk)
+            continue
+        names = []
+        for pkg in chunk_pkgs:
+            name = next(iter(pkg)) if isinstance(pkg, dict) else str(pkg)
+            if name in pkgs and pkgs[name] != pkg:
+                # The same package is wanted in another version
+                between.append(chunk)
+                break
+            names.append(name)
+        else:
+            for name, pkg in zip(names, chunk_pkgs):
+                pkgs[name] = pkg
+            batch[tag] = names
+            if chunk is not low:
+                members.append(chunk)
+    if len(batch) < 2:
+        return low
+    log.debug(
+        "Applying %s pkg states in a single transaction with %s",
+        len(batch),
+        leader_tag,
+    )
+    for chunk in members:
+        chunk["__batched__"] = True
+    low = dict(low)
+    low.pop("__batched__", None)
+    low.pop("version", None)
+    low["pkgs"] = list(pkgs.values())
+    low["__batch__"] = batch
+    return low
+
+
 def mod_watch(name, **kwargs):
     """
     Install/reinstall a package based on a watch requisite
@@ -12,6 +12,7 @@ The thorium system allows for advanced event tracking and reactions
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
 
+import itertools
 import logging
 import os
 import time
@@ -22,19 +23,151 @@ import salt.cache
 import salt.loader
 import salt.payload
 import salt.state
+import salt.utils.atomicfile
+import salt.utils.files
+import salt.utils.ringbuffer
 from salt.exceptions import SaltRenderError
+from salt.utils.event import tagify
 
 # Import 3rd-party libs
 from salt.ext import six
 
 log = logging.getLogger(__name__)
 
+# Thorium state modules whose functions only read the register named by the
+# chunk. They are not evaluated again until that register changes.
+REGISTER_READERS = frozenset(["calc", "check"])
+
+
+class Register(dict):
+    """
+    The thorium register. Each register in it has a version, which changes
+    every time the register is written. Setting or deleting a register bumps
+    its version, functions which change a register in place must call
+    ``__reg__.touch(name)`` afterwards.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(Register, self).__init__(*args, **kwargs)
+        self._counter = itertools.count(1)
+        self.versions = {}
+        for name in self:
+            self.touch(name)
+
+    def touch(self, name):
+        """
+        Bump the version of the named register
+        """
+        self.versions[name] = next(self._counter)
+
+    def __setitem__(self, name, value):
+        super(Register, self).__setitem__(name, value)
+        self.touch(name)
+
+    def __delitem__(self, name):
+        super(Register, self).__delitem__(name)
+        self.touch(name)
+
+    def pop(self, name, *args):
+        if name in self:
+            self.touch(name)
+        return super(Register, self).pop(name, *args)
+
+    def update(self, *args, **kwargs):
+        data = dict(*args, **kwargs)
+        super(Register, self).update(data)
+        for name in data:
+            self.touch(name)
+
+
+def touch(register, name):
+    """
+    Bump the version of the named register, ``__reg__`` is a plain dict
+    when thorium modules are called outside of the thorium runtime
+    """
+    if isinstance(register, Register):
+        register.touch(name)
+
+
+def _pack_register(data):
+    """
+    Convert the sets and ring buffers of the register, which msgpack cannot
+    store, into tagged dicts
+    """
+    if isinstance(data, dict):
+        return {key: _pack_register(val) for key, val in data.items()}
+    if isinstance(data, set):
+        return {"__set__": list(data)}
+    if isinstance(data, salt.utils.ringbuffer.RingBuffer):
+        return {"__ring__": data.size, "samples": list(data)}
+    return data
+
+
+def _unpack_register(data):
+    """
+    Reverse _pack_register
+    """
+    if not isinstance(data, dict):
+        return data
+    if "__set__" in data:
+        return set(data["__set__"])
+    if "__ring__" in data:
+        return salt.utils.ringbuffer.RingBuffer(data["__ring__"], data["samples"])
+    return {key: _unpack_register(val) for key, val in data.items()}
+
+
+class ThorRuntime(salt.state.State):
+    """
+    The state runtime of thorium. Register readers whose register has not
+    changed since they were last evaluated are not called again, their
+    previous return is used instead.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(ThorRuntime, self).__init__(*args, **kwargs)
+        # The version of the register and the return of the register readers
+        # when they were last evaluated, keyed by the chunk tag
+        self.readers = {}
+        self.stats = {"evaluated": 0, "skipped": 0}
+
+    def reader_version(self, low):
+        """
+        Return the version of the register read by ``low``, or None if the
+        chunk is not a register reader or its register does not exist yet
+        """
+        if low["state"] not in REGISTER_READERS or low["fun"] == "event":
+            return None
+        regdata = self.inject_globals["__reg__"]
+        if low["name"] not in regdata:
+            return None
+        return getattr(regdata, "versions", {}).get(low["name"])
+
+    def call(self, low, chunks=None, running=None, retries=1):
+        """
+        Call a single thorium chunk once its requisites have been met,
+        unless it is a register reader and its register is unchanged
+        """
+        tag = salt.state._gen_tag(low)
+        if tag in self.readers:
+            version, ret = self.readers[tag]
+            if self.reader_version(low) == version:
+                self.stats["skipped"] += 1
+                return dict(ret)
+        ret = super(ThorRuntime, self).call(low, chunks, running, retries)
+        self.stats["evaluated"] += 1
+        version = self.reader_version(low)
+        if version is not None and isinstance(ret, dict):
+            self.readers[tag] = (version, dict(ret))
+        return ret
+
 
 class ThorState(salt.state.HighState):
     """
     Compile the thorium state and manage it in the thorium runtime
     """
 
+    state_class = ThorRuntime
+
     def __init__(
         self, opts, grains=False, grain_keys=None, pillar=False, pillar_keys=None
     ):
@@ -60,8 +193,16 @@ class ThorState(salt.state.HighState):
             except Exception as exc:  # pylint: disable=broad-except
                 log.error(exc)
 
-        self.state.inject_globals = {"__reg__": regdata}
+        self.serial = salt.payload.Serial(self.opts)
+        self.snapshot_path = os.path.join(
+            self.opts["cachedir"], "thorium", "register.p"
+        )
+        if self.opts.get("thorium_register_snapshot_interval", 0):
+            regdata.update(self.load_snapshot())
+
+        self.state.inject_globals = {"__reg__": Register(regdata)}
         self.event = salt.utils.event.get_master_event(self.opts, self.opts["sock_dir"])
+        self._reset_stats()
 
     def gather_cache(self):
         """
@@ -145,6 +286,82 @@ class ThorState(salt.state.HighState):
             raise SaltRenderError(err)
         return self.state.compile_high_data(high)
 
+    def load_snapshot(self):
+        """
+        Load the register snapshot written by a previous run
+        """
+        if not os.path.isfile(self.snapshot_path):
+            return {}
+        try:
+            with salt.utils.files.fopen(self.snapshot_path, "rb") as fp_:
+                snapshot = self.serial.load(fp_)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.error(
+                "Failed to load thorium register snapshot %s: %s",
+                self.snapshot_path,
+                exc,
+            )
+            return {}
+        regdata = _unpack_register(snapshot)
+        log.debug("Loaded %s thorium registers from snapshot", len(regdata))
+        return regdata
+
+    def save_snapshot(self):
+        """
+        Write the register to the cachedir so that it survives a restart
+        """
+        snapshot = _pack_register(self.state.inject_globals["__reg__"])
+        try:
+            snapshot_dir = os.path.dirname(self.snapshot_path)
+            if not os.path.isdir(snapshot_dir):
+                os.makedirs(snapshot_dir)
+            with salt.utils.atomicfile.atomic_open(self.snapshot_path, "wb") as fp_:
+                self.serial.dump(snapshot, fp_)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.error(
+                "Failed to write thorium register snapshot %s: %s",
+                self.snapshot_path,
+                exc,
+            )
+
+    def _reset_stats(self):
+        self.stats = {
+            "ticks": 0,
+            "events": 0,
+            "evaluated": 0,
+            "skipped": 0,
+            "tick_mean": 0,
+            "tick_max": 0,
+        }
+        # The runtime counts the evaluated and skipped register readers
+        self.state.stats = self.stats
+        self.stat_clock = time.time()
+
+    def _update_stats(self, events, duration):
+        ticks = self.stats["ticks"]
+        self.stats["tick_mean"] = (self.stats["tick_mean"] * ticks + duration) / (
+            ticks + 1
+        )
+        self.stats["tick_max"] = max(self.stats["tick_max"], duration)
+        self.stats["ticks"] += 1
+        self.stats["events"] += len(events)
+
+    def _post_stats(self):
+        """
+        Fire an event with the tick durations and event intake rate of the
+        thorium runtime and wipe the tracker
+        """
+        now = time.time()
+        elapsed = now - self.stat_clock
+        if elapsed <= self.opts["master_stats_event_iter"]:
+            return
+        stats = dict(self.stats)
+        stats["events_per_second"] = stats["events"] / elapsed
+        self.event.fire_event(
+            {"time": elapsed, "stats": stats}, tagify("stats", "thorium")
+        )
+        self._reset_stats()
+
     def get_events(self):
         """
         iterate over the available events and return a list of events
@@ -164,7 +381,8 @@ class ThorState(salt.state.HighState):
         chunks = self.get_chunks()
         interval = self.opts["thorium_interval"]
         recompile = self.opts.get("thorium_recompile", 300)
-        r_start = time.time()
+        snapshot = self.opts.get("thorium_register_snapshot_interval", 0)
+        r_start = s_start = time.time()
         while True:
             events = self.get_events()
             if not events:
@@ -174,13 +392,22 @@ class ThorState(salt.state.HighState):
             self.state.inject_globals["__events__"] = events
             self.state.call_chunks(chunks)
             elapsed = time.time() - start
+            self._update_stats(events, elapsed)
+            if self.opts.get("master_stats", False):
+                self._post_stats()
             left = interval - elapsed
             if left > 0:
                 time.sleep(left)
             self.state.reset_run_num()
+            if snapshot and (start - s_start) > snapshot:
+                self.save_snapshot()
+                s_start = time.time()
             if (start - r_start) > recompile:
                 cache = self.gather_cache()
                 chunks = self.get_chunks()
+                self.state.readers = {}
                 if self.reg_ret is not None:
-                    self.returners["{0}.save_reg".format(self.reg_ret)](chunks)
+                    self.returners["{0}.save_reg".format(self.reg_ret)](
+                        self.state.inject_globals["__reg__"]
+                    )
                 r_start = time.time()
@@ -11,6 +11,8 @@ values are stored and computed, such as averages etc.
 # import python libs
 from __future__ import absolute_import, print_function, unicode_literals
 
+import salt.utils.ringbuffer
+
 try:
     import statistics
 
@@ -19,6 +21,17 @@ except ImportError:
     HAS_STATS = False
 
 
+# Operations which reg.ring buffers answer from their running aggregates
+RING_OPS = {
+    "add": lambda ring, percent: ring.sum,
+    "mean": lambda ring, percent: ring.mean(),
+    "median": lambda ring, percent: ring.median(),
+    "median_low": lambda ring, percent: ring.median_low(),
+    "median_high": lambda ring, percent: ring.median_high(),
+    "percentile": lambda ring, percent: ring.percentile(percent),
+}
+
+
 def __virtual__():
     """
     The statistics module must be pip installed
@@ -26,9 +39,10 @@ def __virtual__():
     return HAS_STATS
 
 
-def calc(name, num, oper, minimum=0, maximum=0, ref=None):
+def calc(name, num, oper, minimum=0, maximum=0, ref=None, percent=50):
     """
-    Perform a calculation on the ``num`` most recent values. Requires a list.
+    Perform a calculation on the ``num`` most recent values. Requires a list,
+    or a register populated by ``reg.ring``.
     Valid values for ``oper`` are:
 
     - add: Add last ``num`` values together
@@ -39,6 +53,17 @@ def calc(name, num, oper, minimum=0, maximum=0, ref=None):
     - median_high: Calculate high median of last ``num`` values
     - median_grouped: Calculate grouped median of last ``num`` values
     - mode: Calculate mode of last ``num`` values
+    - percentile: Calculate the ``percent`` percentile of last ``num`` values
+
+    When the register was populated by ``reg.ring``, ``ref`` selects the field
+    to use (it can be left out if only one field is stored). If ``num`` covers
+    the whole window the add, mean, median, median_low, median_high and
+    percentile operations use the running aggregates of the buffer instead of
+    going over its values.
+
+    .. versionchanged:: Aluminium
+        Added the ``percentile`` operation and support for ``reg.ring``
+        registers.
 
     USAGE:
 
@@ -54,6 +79,7 @@ def calc(name, num, oper, minimum=0, maximum=0, ref=None):
     if name not in __reg__:
         ret["comment"] = "{0} not found in register".format(name)
         ret["result"] = False
+        return ret
 
     def opadd(vals):
         sum = 0
@@ -76,21 +102,46 @@ def calc(name, num, oper, minimum=0, maximum=0, ref=None):
         "median_high": statistics.median_high,
         "median_grouped": statistics.median_grouped,
         "mode": statistics.mode,
+        "percentile": lambda vals: salt.utils.ringbuffer.percentile(
+            sorted(vals), percent
+        ),
     }
 
-    count = 0
-    vals = []
-    __reg__[name]["val"].reverse()
-    for regitem in __reg__[name]["val"]:
-        count += 1
-        if count > num:
-            break
-        if ref is None:
-            vals.append(regitem)
+    regval = __reg__[name]["val"]
+    if isinstance(regval, dict):
+        # A reg.ring register, holding a buffer per field
+        if ref is not None:
+            ring = regval.get(ref)
         else:
-            vals.append(regitem[ref])
-
-    answer = ops[oper](vals)
+            ring = next(iter(regval.values()), None)
+        if not ring:
+            # No values of the field have been seen yet
+            ret["comment"] = "No values found in register {0}".format(name)
+            ret["changes"] = {
+                "Number of values": 0,
+                "Operator": oper,
+                "Answer": None,
+            }
+            return ret
+        if num >= len(ring) and oper in RING_OPS:
+            answer = RING_OPS[oper](ring, percent)
+            vals = ring
+        else:
+            vals = ring.last(num)
+            answer = ops[oper](vals)
+    else:
+        count = 0
+        vals = []
+        for regitem in reversed(regval):
+            count += 1
+            if count > num:
+                break
+            if ref is None:
+                vals.append(regitem)
+            else:
+                vals.append(regitem[ref])
+
+        answer = ops[oper](vals)
 
     if minimum > 0 and answer < minimum:
         ret["result"] = False
@@ -259,3 +310,31 @@ def mode(name, num, minimum=0, maximum=0, ref=None):
     return calc(
         name=name, num=num, oper="mode", minimum=minimum, maximum=maximum, ref=ref
     )
+
+
+def percentile(name, num, percent, minimum=0, maximum=0, ref=None):
+    """
+    Calculates the ``percent`` percentile of the ``num`` most recent values,
+    using the nearest rank method. Requires a list.
+
+    .. versionadded:: Aluminium
+
+    USAGE:
+
+    .. code-block:: yaml
+
+        foo:
+          calc.percentile:
+            - name: myregentry
+            - num: 1000
+            - percent: 95
+    """
+    return calc(
+        name=name,
+        num=num,
+        oper="percentile",
+        minimum=minimum,
+        maximum=maximum,
+        ref=ref,
+        percent=percent,
+    )
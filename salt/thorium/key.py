@@ -11,6 +11,7 @@ import time
 
 # Import salt libs
 import salt.key
+import salt.thorium
 
 
 def _get_key_api():
@@ -75,4 +76,6 @@ def timeout(name, delete=0, reject=0):
         keyapi.reject(id_)
         __reg__["status"]["val"].pop(id_, None)
         __context__[ktr].pop(id_, None)
+    if remove or reject_set:
+        salt.thorium.touch(__reg__, "status")
     return ret
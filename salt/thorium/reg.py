@@ -7,6 +7,8 @@ values are stored and computed, such as averages etc.
 # import python libs
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import salt.thorium
+import salt.utils.ringbuffer
 import salt.utils.stringutils
 
 __func_alias__ = {
@@ -42,6 +44,8 @@ def set_(name, add, match):
                 val = "None"
             ret["changes"][add] = val
             __reg__[name]["val"].add(val)
+    if ret["changes"]:
+        salt.thorium.touch(__reg__, name)
     return ret
 
 
@@ -82,8 +86,67 @@ def list_(name, add, match, stamp=False, prune=0):
                     if stamp is True:
                         item["time"] = event["data"]["_stamp"]
             __reg__[name]["val"].append(item)
-    if prune > 0:
+            salt.thorium.touch(__reg__, name)
+    if prune > 0 and len(__reg__[name]["val"]) > prune:
         __reg__[name]["val"] = __reg__[name]["val"][:prune]
+        salt.thorium.touch(__reg__, name)
+    return ret
+
+
+def ring(name, add, match, size=100):
+    """
+    Keep the last ``size`` numeric values of each of the specified fields in a
+    fixed size buffer. Non numeric values are skipped.
+
+    The buffers keep a running sum of their values, so adding a value is
+    cheap and the sum and mean are computed without going over the values
+    again. The values are only sorted, once per change, when a median or a
+    percentile is asked for. The register value is a dict of buffers keyed by field,
+    use the ``ref`` option of the ``calc`` functions to select the field.
+
+    .. versionadded:: Aluminium
+
+    USAGE:
+
+    .. code-block:: yaml
+
+        foo:
+          reg.ring:
+            - add: load
+            - match: salt/beacon/*/load/
+            - size: 1000
+    """
+    ret = {"name": name, "changes": {}, "comment": "", "result": True}
+    if size < 1:
+        ret["comment"] = "The size of the ring must be at least 1"
+        ret["result"] = False
+        return ret
+    if not isinstance(add, list):
+        add = add.split(",")
+    if name not in __reg__:
+        __reg__[name] = {}
+        __reg__[name]["val"] = {}
+    for event in __events__:
+        try:
+            event_data = event["data"]["data"]
+        except KeyError:
+            event_data = event["data"]
+        if salt.utils.stringutils.expr_match(event["tag"], match):
+            for key in add:
+                if key not in event_data:
+                    continue
+                value = event_data[key]
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    try:
+                        value = float(value)
+                    except (TypeError, ValueError):
+                        continue
+                if key not in __reg__[name]["val"]:
+                    __reg__[name]["val"][key] = salt.utils.ringbuffer.RingBuffer(size)
+                __reg__[name]["val"][key].append(value)
+                ret["changes"][key] = value
+    if ret["changes"]:
+        salt.thorium.touch(__reg__, name)
     return ret
 
 
@@ -122,6 +185,7 @@ def mean(name, add, match):
             __reg__[name]["total"] += comp
             __reg__[name]["count"] += 1
             __reg__[name]["val"] = __reg__[name]["total"] / __reg__[name]["count"]
+            salt.thorium.touch(__reg__, name)
     return ret
 
 
@@ -140,6 +204,7 @@ def clear(name):
     ret = {"name": name, "changes": {}, "comment": "", "result": True}
     if name in __reg__:
         __reg__[name].clear()
+        salt.thorium.touch(__reg__, name)
     return ret
 
 
@@ -11,6 +11,9 @@ from __future__ import absolute_import, print_function, unicode_literals
 import fnmatch
 import time
 
+# Import salt libs
+import salt.thorium
+
 
 def reg(name):
     """
@@ -33,4 +36,6 @@ def reg(name):
                 idata[key] = event["data"]["data"][key]
             __reg__["status"]["val"][event["data"]["id"]] = idata
             ret["changes"][event["data"]["id"]] = True
+    if ret["changes"]:
+        salt.thorium.touch(__reg__, "status")
     return ret
@@ -5,6 +5,7 @@ In-memory caching used by Salt
 # Import Python libs
 from __future__ import absolute_import, print_function, unicode_literals
 
+import collections
 import logging
 import os
 import re
@@ -272,6 +273,50 @@ class CacheRegex(object):
         return regex
 
 
+class LRUCache(object):
+    """
+    A mapping holding at most ``size`` items, which evicts the least recently
+    used item when a new one is added to a full cache
+    """
+
+    def __init__(self, size=1000):
+        self.size = size
+        self.cache = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.cache)
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def __getitem__(self, key):
+        value = self.cache.pop(key)
+        self.cache[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self.cache.pop(key, None)
+        self.cache[key] = value
+        while len(self.cache) > self.size:
+            self.cache.popitem(last=False)
+
+    def get(self, key, default=None):
+        """
+        Return the value of ``key``, marking it as recently used, or
+        ``default`` if it is not cached
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def clear(self):
+        """
+        Clear the cache
+        """
+        self.cache.clear()
+
+
 class ContextCache(object):
     def __init__(self, opts, name):
         """
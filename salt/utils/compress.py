@@ -0,0 +1,72 @@
+"""
+Whole file compression codecs used to serve files from the master
+
+.. versionadded:: Aluminium
+"""
+
+import shutil
+import zlib
+
+import salt.utils.files
+import salt.utils.gzip_util
+
+try:
+    import zstandard
+
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+
+def available_codecs():
+    """
+    Return the codecs usable on this host, in order of preference
+    """
+    ret = []
+    if HAS_ZSTD:
+        ret.append("zstd")
+    ret.append("gzip")
+    return ret
+
+
+def compress_file(src, dest, codec, chunk_size=1048576):
+    """
+    Write the compressed contents of the file ``src`` to ``dest``
+    """
+    with salt.utils.files.fopen(src, "rb") as ifile:
+        with salt.utils.files.fopen(dest, "wb") as ofile:
+            if codec == "zstd":
+                zstandard.ZstdCompressor().copy_stream(
+                    ifile, ofile, read_size=chunk_size
+                )
+            elif codec == "gzip":
+                with salt.utils.gzip_util.open_fileobj(ofile, "wb", 6) as ogz:
+                    shutil.copyfileobj(ifile, ogz, chunk_size)
+            else:
+                raise ValueError("Unknown codec '{}'".format(codec))
+
+
+class Decompressor:
+    """
+    Incrementally decompress a stream compressed with :func:`compress_file`
+    """
+
+    def __init__(self, codec):
+        if codec == "zstd" and HAS_ZSTD:
+            self._obj = zstandard.ZstdDecompressor().decompressobj()
+        elif codec == "gzip":
+            # Expect a gzip header
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            raise ValueError("Unknown codec '{}'".format(codec))
+
+    def decompress(self, data):
+        return self._obj.decompress(data)
+
+    @property
+    def eof(self):
+        """
+        Whether the end of the compressed stream was reached. Decompressors
+        which cannot tell are assumed to have been cut short.
+        """
+        return getattr(self._obj, "eof", False)
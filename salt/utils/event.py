@@ -53,8 +53,11 @@ Namespaced tag
 import datetime
 import fnmatch
 import hashlib
+import itertools
 import logging
 import os
+import queue
+import threading
 import time
 from collections.abc import MutableMapping
 from multiprocessing.util import Finalize
@@ -68,6 +71,7 @@ import salt.payload
 import salt.transport.client
 import salt.transport.ipc
 import salt.utils.asynchronous
+import salt.utils.atomicfile
 import salt.utils.cache
 import salt.utils.dicttrim
 import salt.utils.files
@@ -1204,6 +1208,15 @@ class EventReturn(salt.utils.process.SignalHandlingProcess):
     """
     A dedicated process which listens to the master event bus and queues
     and forwards events to the specified returner.
+
+    Events are collected into batches which are flushed either when
+    ``event_return_queue`` events have been collected or when the oldest
+    event has waited ``event_return_queue_max_seconds``. Flushed batches are
+    handed to ``event_return_workers`` writer threads through a queue bounded
+    by ``event_return_backlog``. When the backlog is full, or when a returner
+    fails to store a batch, the batch is written to an on-disk spool (if
+    ``event_return_spool`` is enabled) and replayed once the returner
+    recovers.
     """
 
     def __init__(self, opts, **kwargs):
@@ -1223,11 +1236,31 @@ class EventReturn(salt.utils.process.SignalHandlingProcess):
         self.event_return_queue_max_seconds = self.opts.get(
             "event_return_queue_max_seconds", 0
         )
+        self.event_return_workers = max(1, self.opts.get("event_return_workers", 1))
+        self.event_return_backlog = max(1, self.opts.get("event_return_backlog", 10))
+        self.event_return_spool = self.opts.get("event_return_spool", False)
+        self.event_return_spool_max_batches = self.opts.get(
+            "event_return_spool_max_batches", 1000
+        )
+        self.spool_dir = os.path.join(self.opts["cachedir"], "event_return_spool")
         local_minion_opts = self.opts.copy()
         local_minion_opts["file_client"] = "local"
         self.minion = salt.minion.MasterMinion(local_minion_opts)
         self.event_queue = []
         self.stop = False
+        # The signal which asked run() to stop, handled once the events are
+        # flushed
+        self._stop_signal = None
+        self.serial = salt.payload.Serial(self.opts)
+        # The writer pool is only started in run(), flushes done before that
+        # (or from a signal handler) are written synchronously.
+        self._batch_queue = None
+        self._writers = []
+        # Serializes replays only, spooling never waits on it
+        self._replay_lock = threading.Lock()
+        self._spool_counter = itertools.count(1)
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
 
     # __setstate__ and __getstate__ are only used on Windows.
     # We do this so that __init__ will be invoked on Windows in the child
@@ -1247,33 +1280,81 @@ class EventReturn(salt.utils.process.SignalHandlingProcess):
         }
 
     def _handle_signals(self, signum, sigframe):
-        # Flush and terminate
-        if self.event_queue:
-            self.flush_events()
+        # Only ask run() to stop, it flushes the queue and drains the writers
+        # on its way out before terminating. Flushing from here could wait on
+        # a lock the interrupted main thread holds.
+        if self._stop_signal is None:
+            self._stop_signal = (signum, sigframe)
         self.stop = True
-        super()._handle_signals(signum, sigframe)
 
-    def flush_events(self):
+    def _returners(self):
+        """
+        Return the list of configured event returner functions
+        """
         if isinstance(self.opts["event_return"], list):
-            # Multiple event returners
-            for r in self.opts["event_return"]:
-                log.debug("Calling event returner %s, one of many.", r)
-                event_return = "{}.event_return".format(r)
-                self._flush_event_single(event_return)
-        else:
-            # Only a single event returner
-            log.debug(
-                "Calling event returner %s, only one configured.",
-                self.opts["event_return"],
-            )
-            event_return = "{}.event_return".format(self.opts["event_return"])
-            self._flush_event_single(event_return)
+            return ["{}.event_return".format(r) for r in self.opts["event_return"]]
+        return ["{}.event_return".format(self.opts["event_return"])]
+
+    def flush_events(self):
+        """
+        Hand the currently queued events to the writers as a single batch
+        """
+        if not self.event_queue:
+            return
+        batch = {"time": time.time(), "events": list(self.event_queue)}
         del self.event_queue[:]
+        if self._batch_queue is None:
+            self._write_batch(batch)
+            return
+        try:
+            self._batch_queue.put_nowait(batch)
+            return
+        except queue.Full:
+            pass
+        if self.event_return_spool:
+            log.warning(
+                "Event return backlog is full, spooling %s events to disk",
+                len(batch["events"]),
+            )
+            for event_return in self._returners():
+                self._spool_batch(event_return, batch["events"])
+        else:
+            # Apply backpressure, stop reading from the bus until a writer
+            # has picked up a batch.
+            log.debug("Event return backlog is full, waiting for a writer")
+            self._batch_queue.put(batch)
 
-    def _flush_event_single(self, event_return):
+    def _write_batch(self, batch):
+        """
+        Store one batch of events in every configured event returner
+        """
+        events = batch["events"]
+        for event_return in self._returners():
+            if len(self._returners()) > 1:
+                log.debug("Calling event returner %s, one of many.", event_return)
+            else:
+                log.debug(
+                    "Calling event returner %s, only one configured.", event_return
+                )
+            if self._flush_event_single(event_return, events):
+                self._update_stats(batch, events)
+                if self.event_return_spool:
+                    self._replay_spool(event_return)
+            elif self.event_return_spool:
+                self._spool_batch(event_return, events)
+            else:
+                self._update_stats(batch, events, failed=True)
+
+    def _flush_event_single(self, event_return, events):
+        """
+        Pass ``events`` to the ``event_return`` function.
+
+        Returns True if the returner stored the events, else False
+        """
         if event_return in self.minion.returners:
             try:
-                self.minion.returners[event_return](self.event_queue)
+                self.minion.returners[event_return](events)
+                return True
             except Exception as exc:  # pylint: disable=broad-except
                 log.error(
                     "Could not store events - returner '%s' raised " "exception: %s",
@@ -1283,14 +1364,218 @@ class EventReturn(salt.utils.process.SignalHandlingProcess):
                 # don't waste processing power unnecessarily on converting a
                 # potentially huge dataset to a string
                 if log.level <= logging.DEBUG:
-                    log.debug(
-                        "Event data that caused an exception: %s", self.event_queue
-                    )
+                    log.debug("Event data that caused an exception: %s", events)
         else:
             log.error(
                 "Could not store return for event(s) - returner " "'%s' not found.",
                 event_return,
             )
+        return False
+
+    def _spool_path(self, event_return):
+        return os.path.join(self.spool_dir, event_return.split(".", 1)[0])
+
+    def _spool_batch(self, event_return, events):
+        """
+        Write a batch which could not be stored to the on-disk spool of the
+        given returner, dropping the oldest spooled batches when the spool is
+        over ``event_return_spool_max_batches``.
+        """
+        spool_path = self._spool_path(event_return)
+        # The file names are unique to this process and writer, spooling does
+        # not wait for a replay which may be in progress
+        fn_ = os.path.join(
+            spool_path,
+            "{:020d}-{}-{:06d}.p".format(
+                int(time.time() * 1000000), os.getpid(), next(self._spool_counter)
+            ),
+        )
+        try:
+            if not os.path.isdir(spool_path):
+                os.makedirs(spool_path, exist_ok=True)
+            with salt.utils.atomicfile.atomic_open(fn_, "wb") as fh_:
+                self.serial.dump(events, fh_)
+        except OSError as exc:
+            log.error(
+                "Could not spool %s events for returner '%s': %s",
+                len(events),
+                event_return,
+                exc,
+            )
+            self._incr_stat("events_dropped", len(events))
+            return
+        self._incr_stat("batches_spooled")
+        spooled = self._spooled(spool_path)
+        overflow = len(spooled) - self.event_return_spool_max_batches
+        for old in spooled[: max(0, overflow)]:
+            try:
+                os.remove(os.path.join(spool_path, old))
+            except OSError:
+                # Replayed or dropped by another writer meanwhile
+                continue
+            log.warning(
+                "Event return spool for '%s' is full, dropping %s", event_return, old,
+            )
+            self._incr_stat("batches_dropped")
+
+    @staticmethod
+    def _spooled(spool_path):
+        """
+        Return the names of the spooled batches, oldest first, leaving out
+        the files atomic_open is still writing
+        """
+        try:
+            names = os.listdir(spool_path)
+        except OSError:
+            return []
+        return sorted(name for name in names if not name.startswith("."))
+
+    def _replay_spool(self, event_return):
+        """
+        Send the spooled batches of a returner which has recovered, oldest
+        first, stopping at the first failure.
+        """
+        spool_path = self._spool_path(event_return)
+        if not os.path.isdir(spool_path):
+            return
+        # Only one writer needs to replay, the others keep draining the bus
+        if not self._replay_lock.acquire(blocking=False):
+            return
+        try:
+            for name in self._spooled(spool_path):
+                fn_ = os.path.join(spool_path, name)
+                try:
+                    with salt.utils.files.fopen(fn_, "rb") as fh_:
+                        events = self.serial.load(fh_)
+                except FileNotFoundError:
+                    # Dropped by a writer trimming the spool
+                    continue
+                except Exception as exc:  # pylint: disable=broad-except
+                    log.error("Discarding unreadable spool file %s: %s", fn_, exc)
+                    try:
+                        os.remove(fn_)
+                    except OSError:
+                        pass
+                    continue
+                if not self._flush_event_single(event_return, events):
+                    break
+                log.debug(
+                    "Replayed %s spooled events to returner '%s'",
+                    len(events),
+                    event_return,
+                )
+                try:
+                    os.remove(fn_)
+                except OSError:
+                    pass
+                self._incr_stat("batches_replayed")
+        finally:
+            self._replay_lock.release()
+
+    def _writer_target(self, batch_queue):
+        """
+        Writer thread, stores batches from ``batch_queue`` until it receives
+        the ``None`` sentinel
+        """
+        while True:
+            batch = batch_queue.get()
+            try:
+                if batch is None:
+                    break
+                self._write_batch(batch)
+            except Exception:  # pylint: disable=broad-except
+                log.error("Event return writer failed", exc_info=True)
+            finally:
+                batch_queue.task_done()
+
+    def _start_writers(self):
+        self._batch_queue = queue.Queue(self.event_return_backlog)
+        for _ in range(self.event_return_workers):
+            thread = threading.Thread(
+                target=self._writer_target, args=(self._batch_queue,)
+            )
+            thread.daemon = True
+            thread.start()
+            self._writers.append(thread)
+
+    def _drain_writers(self):
+        """
+        Write out every batch still sitting in the backlog and stop the
+        writer threads
+        """
+        if self._batch_queue is None:
+            return
+        batch_queue, self._batch_queue = self._batch_queue, None
+        while True:
+            try:
+                batch = batch_queue.get_nowait()
+            except queue.Empty:
+                break
+            if batch is not None:
+                self._write_batch(batch)
+        for _ in self._writers:
+            batch_queue.put(None)
+        for thread in self._writers:
+            thread.join(5)
+        self._writers = []
+
+    def _reset_stats(self):
+        self.stats = {
+            "events_received": 0,
+            "events_written": 0,
+            "events_failed": 0,
+            "events_dropped": 0,
+            "batches_written": 0,
+            "batches_spooled": 0,
+            "batches_replayed": 0,
+            "batches_dropped": 0,
+            "lag_mean": 0,
+            "lag_max": 0,
+        }
+        self.stat_clock = time.time()
+
+    def _incr_stat(self, name, count=1):
+        with self._stats_lock:
+            self.stats[name] += count
+
+    def _update_stats(self, batch, events, failed=False):
+        """
+        Account for a batch which has been handled by a returner. The lag is
+        the time between the batch being flushed from the event queue and the
+        returner storing it.
+        """
+        with self._stats_lock:
+            if failed:
+                self.stats["events_failed"] += len(events)
+                return
+            lag = time.time() - batch["time"]
+            written = self.stats["batches_written"]
+            self.stats["lag_mean"] = (self.stats["lag_mean"] * written + lag) / (
+                written + 1
+            )
+            self.stats["lag_max"] = max(self.stats["lag_max"], lag)
+            self.stats["batches_written"] += 1
+            self.stats["events_written"] += len(events)
+
+    def _post_stats(self):
+        """
+        Fire an event with the throughput and lag of the event returners and
+        wipe the tracker
+        """
+        now = time.time()
+        if now - self.stat_clock <= self.opts["master_stats_event_iter"]:
+            return
+        with self._stats_lock:
+            stats = dict(self.stats)
+            elapsed = now - self.stat_clock
+            stats["events_per_second"] = stats["events_written"] / elapsed
+            stats["backlog"] = (
+                self._batch_queue.qsize() if self._batch_queue is not None else 0
+            )
+            self._reset_stats()
+        self.event.fire_event(
+            {"time": elapsed, "stats": stats}, tagify("stats", "event_return")
+        )
 
     def run(self):
         """
@@ -1304,54 +1589,53 @@ class EventReturn(salt.utils.process.SignalHandlingProcess):
             )
             os.nice(self.opts["event_return_niceness"])
 
+        self._start_writers()
         self.event = get_event("master", opts=self.opts, listen=True)
-        events = self.event.iter_events(full=True)
         self.event.fire_event({}, "salt/event_listen/start")
+        # Wake up at least every event_return_queue_max_seconds so that a
+        # quiet bus still gets its queue flushed in time, and every few
+        # seconds to notice a signal asking to stop.
+        wait = min(self.event_return_queue_max_seconds or 5, 5)
         try:
-            # events below is a generator, we will iterate until we get the salt/event/exit tag
+            # we will loop until we get the salt/event/exit tag
             oldestevent = None
-            for event in events:
-
-                if event["tag"] == "salt/event/exit":
-                    # We're done eventing
-                    self.stop = True
-                if self._filter(event):
-                    # This event passed the filter, add it to the queue
-                    self.event_queue.append(event)
+            while True:
+                event = self.event.get_event(wait=wait, full=True, auto_reconnect=True)
+
+                if event is not None:
+                    if event["tag"] == "salt/event/exit":
+                        # We're done eventing
+                        self.stop = True
+                    if self._filter(event):
+                        # This event passed the filter, add it to the queue
+                        self.event_queue.append(event)
+                        self._incr_stat("events_received")
+                        if oldestevent is None:
+                            oldestevent = time.time()
                 too_long_in_queue = False
 
                 # if max_seconds is >0, then we want to make sure we flush the queue
                 # every event_return_queue_max_seconds seconds,  If it's 0, don't
                 # apply any of this logic
-                if self.event_return_queue_max_seconds > 0:
-                    rightnow = datetime.datetime.now()
-                    if not oldestevent:
-                        oldestevent = rightnow
-                    age_in_seconds = (rightnow - oldestevent).seconds
-                    if age_in_seconds > 0:
-                        log.debug(
-                            "Oldest event in queue is %s seconds old.", age_in_seconds
-                        )
+                if self.event_return_queue_max_seconds > 0 and oldestevent:
+                    age_in_seconds = time.time() - oldestevent
                     if age_in_seconds >= self.event_return_queue_max_seconds:
-                        too_long_in_queue = True
-                        oldestevent = None
-                    else:
-                        too_long_in_queue = False
-
-                    if too_long_in_queue:
                         log.debug(
                             "Oldest event has been in queue too long, will flush queue"
                         )
+                        too_long_in_queue = True
 
                 # If we are over the max queue size or the oldest item in the queue has been there too long
                 # then flush the queue
-                if (
+                if self.event_queue and (
                     len(self.event_queue) >= self.event_return_queue
                     or too_long_in_queue
                 ):
                     log.debug("Flushing %s events.", len(self.event_queue))
                     self.flush_events()
                     oldestevent = None
+                if self.opts["master_stats"]:
+                    self._post_stats()
                 if self.stop:
                     # We saw the salt/event/exit tag, we can stop eventing
                     break
@@ -1362,6 +1646,9 @@ class EventReturn(salt.utils.process.SignalHandlingProcess):
                 log.debug("Flushing %s events.", len(self.event_queue))
 
                 self.flush_events()
+            self._drain_writers()
+        if self._stop_signal is not None:
+            super()._handle_signals(*self._stop_signal)
 
     def _filter(self, event):
         """
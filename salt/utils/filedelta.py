@@ -0,0 +1,165 @@
+"""
+Block level deltas between two versions of a file, in the spirit of rsync
+
+The side which holds an older copy of a file computes the
+:func:`signatures` of its fixed size blocks. The side which holds the new
+copy runs :func:`delta` against those signatures, which finds the blocks
+the two copies have in common using a rolling weak checksum (``adler32``)
+confirmed by a strong one, and returns a list of operations: block indexes
+to copy from the old copy and literal bytes for everything else. The
+operations are turned back into the new file with :func:`apply`.
+
+.. versionadded:: Aluminium
+"""
+
+import hashlib
+import zlib
+
+# Modulus of the adler32 checksum
+_MOD = 65521
+
+# Number of bytes :func:`delta` may roll the weak checksum over, as a
+# multiple of the block size, before it stops looking for matches at every
+# offset and falls back to block aligned comparisons only. Rolling is done in
+# Python and is much slower than the aligned checks, which run in C.
+ROLL_BLOCKS = 2
+
+# Largest block size a delta transfer may use
+MAX_BLOCK_SIZE = 1048576
+
+# Default number of bytes of the file :func:`delta` looks at, and of literal
+# bytes it collects, per call
+MAX_SCAN = 33554432
+MAX_LITERAL = 1048576
+
+# Number of bytes :func:`delta` reads from the file at once
+READ_SIZE = 1048576
+
+
+def strong_sum(block):
+    """
+    Return the strong checksum of a block
+    """
+    return hashlib.sha256(block).digest()[:16]
+
+
+def signatures(fp_, block_size):
+    """
+    Return the ``[weak, strong]`` checksums of each full block of the open
+    file ``fp_``. A short block at the end of the file is left out, it is
+    sent as literal data if it changed.
+    """
+    ret = []
+    while True:
+        block = fp_.read(block_size)
+        if len(block) < block_size:
+            break
+        ret.append([zlib.adler32(block), strong_sum(block)])
+    return ret
+
+
+def roll(weak, block_size, old, new):
+    """
+    Update the adler32 checksum ``weak`` of a window of ``block_size`` bytes
+    which moves one byte forward, dropping byte ``old`` and taking ``new``
+    """
+    a = weak & 0xFFFF
+    b = weak >> 16
+    a = (a - old + new) % _MOD
+    b = (b - block_size * old + a - 1) % _MOD
+    return (b << 16) | a
+
+
+def delta(fp_, sigs, block_size, loc=0, max_scan=MAX_SCAN, max_literal=MAX_LITERAL):
+    """
+    Compare the open file ``fp_`` from offset ``loc`` on against the block
+    signatures of another copy of it.
+
+    Returns a tuple of the list of operations, the offset at which the next
+    call should resume and whether the end of the file was reached. An
+    operation is either the index of a block of the other copy or literal
+    bytes. About ``max_scan`` bytes of the file are looked at, and the scan
+    stops early once ``max_literal`` literal bytes were collected. The file
+    is read in a window of a few blocks, not all at once.
+    """
+    index = {}
+    for idx, (weak, strong) in enumerate(sigs):
+        index.setdefault(weak, {}).setdefault(strong, idx)
+
+    fp_.seek(loc)
+    # The window of the file being scanned, the scan is at offset pos in it
+    data = b""
+    pos = 0
+    eof = False
+    scanned = 0
+    ops = []
+    literal = bytearray()
+    literal_size = 0
+    rolled = 0
+    weak = None
+    while scanned < max_scan and literal_size < max_literal:
+        if len(data) - pos <= block_size and not eof:
+            # Keep what is left to scan and read the next part of the file,
+            # rolling needs the byte following the current block
+            data = data[pos:]
+            pos = 0
+            while len(data) <= block_size:
+                chunk = fp_.read(max(READ_SIZE, block_size))
+                if not chunk:
+                    eof = True
+                    break
+                data += chunk
+        if pos + block_size > len(data):
+            # Less than a block left, the rest of the file is literal data
+            literal += data[pos:]
+            scanned += len(data) - pos
+            pos = len(data)
+            break
+        if weak is None:
+            weak = zlib.adler32(data[pos : pos + block_size])
+        match = index.get(weak)
+        if match:
+            idx = match.get(strong_sum(data[pos : pos + block_size]))
+            if idx is not None:
+                if literal:
+                    ops.append(bytes(literal))
+                    literal = bytearray()
+                ops.append(idx)
+                pos += block_size
+                scanned += block_size
+                weak = None
+                continue
+        if rolled < ROLL_BLOCKS * block_size and pos + block_size < len(data):
+            weak = roll(weak, block_size, data[pos], data[pos + block_size])
+            literal.append(data[pos])
+            literal_size += 1
+            rolled += 1
+            pos += 1
+            scanned += 1
+        else:
+            literal += data[pos : pos + block_size]
+            literal_size += block_size
+            pos += block_size
+            scanned += block_size
+            weak = None
+    if literal:
+        ops.append(bytes(literal))
+    done = eof and pos == len(data)
+    return ops, loc + scanned, done
+
+
+def apply(ops, basis, out, block_size, hash_obj=None):
+    """
+    Write the data described by the operations ``ops`` to the open file
+    ``out``, copying blocks from the open file ``basis``. The data written is
+    also fed to ``hash_obj`` when one is passed.
+    """
+    for op_ in ops:
+        if isinstance(op_, int):
+            basis.seek(op_ * block_size)
+            chunk = basis.read(block_size)
+        else:
+            chunk = op_
+        out.write(chunk)
+        if hash_obj is not None:
+            hash_obj.update(chunk)
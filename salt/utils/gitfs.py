@@ -3,6 +3,7 @@ Classes which provide the shared base for GitFS, git_pillar, and winrepo
 """
 
 
+import binascii
 import contextlib
 import copy
 import errno
@@ -11,16 +12,20 @@ import glob
 import hashlib
 import logging
 import os
+import posixpath
 import shlex
 import shutil
 import stat
 import subprocess
+import threading
 import time
 import weakref
 from datetime import datetime
 
 import salt.ext.tornado.ioloop
 import salt.fileserver
+import salt.payload
+import salt.utils.atomicfile
 import salt.utils.configparser
 import salt.utils.data
 import salt.utils.files
@@ -51,6 +56,25 @@ GLOBAL_ONLY = ()
 
 SYMLINK_RECURSE_DEPTH = 100
 
+# Size, in bytes, of the blobs GitFS keeps in memory in each process while
+# serving their files in chunks
+BLOB_CACHE_SIZE = 32 * 1024 * 1024
+
+# Size, in bytes, above which files are written to the cache even when
+# gitfs_write_blobs is False, to be read from disk chunk by chunk
+BLOB_MAX_SIZE = 1024 * 1024
+
+# Longest time, in seconds, a remote which keeps failing to fetch is skipped
+FETCH_BACKOFF_MAX = 3600
+
+# Consecutive fetch failures of each remote, and until when it is skipped, by
+# role and remote ID
+_FETCH_BACKOFF = {}
+
+# Role and remote ID of the remotes whose fetch timed out but is still running
+# in a thread of this process
+_FETCH_RUNNING = set()
+
 # Auth support (auth params can be global or per-remote, too)
 AUTH_PROVIDERS = ("pygit2",)
 AUTH_PARAMS = ("user", "password", "pubkey", "privkey", "passphrase", "insecure_auth")
@@ -168,6 +192,7 @@ def enforce_types(key, val):
         "refspecs": "stringlist",
         "ref_types": "stringlist",
         "update_interval": int,
+        "fetch_timeout": int,
     }
 
     def _find_global(key):
@@ -813,6 +838,7 @@ class GitProvider:
         This function requires that a _fetch() function be implemented in a
         sub-class.
         """
+        self.fetch_locked = False
         try:
             with self.gen_lock(lock_type="update"):
                 log.debug("Fetching %s remote '%s'", self.role, self.id)
@@ -820,6 +846,7 @@ class GitProvider:
                 return self._fetch()
         except GitLockError as exc:
             if exc.errno == errno.EEXIST:
+                self.fetch_locked = True
                 log.warning(
                     "Update lock file is present for %s remote '%s', "
                     "skipping. If this warning persists, it is possible that "
@@ -1165,6 +1192,12 @@ class GitProvider:
         self.credentials = None
         return True
 
+    def read_blob(self, oid):
+        """
+        This function must be overridden in a sub-class
+        """
+        raise NotImplementedError()
+
     def write_file(self, blob, dest):
         """
         This function must be overridden in a sub-class
@@ -1479,6 +1512,16 @@ class GitPython(GitProvider):
         except (gitdb.exc.ODBError, AttributeError):
             return None
 
+    def read_blob(self, oid):
+        """
+        Return the contents of the blob with the given hex SHA, or None if it
+        is not in the repo
+        """
+        try:
+            return self.repo.odb.stream(binascii.unhexlify(oid)).read()
+        except (ValueError, binascii.Error, gitdb.exc.BadObject):
+            return None
+
     def write_file(self, blob, dest):
         """
         Using the blob object, write the file to the destination path
@@ -1503,6 +1546,8 @@ class Pygit2(GitProvider):
         role="gitfs",
     ):
         self.provider = "pygit2"
+        # Blobs of the tree of each saltenv, see _tree_index()
+        self._tree_indexes = {}
         super().__init__(
             opts,
             remote,
@@ -1783,52 +1828,18 @@ class Pygit2(GitProvider):
         """
         Get a list of directories for the target environment using pygit2
         """
-
-        def _traverse(tree, blobs, prefix):
-            """
-            Traverse through a pygit2 Tree object recursively, accumulating all
-            the empty directories within it in the "blobs" list
-            """
-            for entry in iter(tree):
-                if entry.oid not in self.repo:
-                    # Entry is a submodule, skip it
-                    continue
-                blob = self.repo[entry.oid]
-                if not isinstance(blob, pygit2.Tree):
-                    continue
-                blobs.append(
-                    salt.utils.path.join(prefix, entry.name, use_posixpath=True)
-                )
-                if blob:
-                    _traverse(
-                        blob,
-                        blobs,
-                        salt.utils.path.join(prefix, entry.name, use_posixpath=True),
-                    )
-
         ret = set()
-        tree = self.get_tree(tgt_env)
-        if not tree:
+        index = self._tree_index(tgt_env)
+        if index is None:
             return ret
-        if self.root(tgt_env):
-            try:
-                oid = tree[self.root(tgt_env)].oid
-                tree = self.repo[oid]
-            except KeyError:
-                return ret
-            if not isinstance(tree, pygit2.Tree):
-                return ret
-            relpath = lambda path: os.path.relpath(path, self.root(tgt_env))
-        else:
-            relpath = lambda path: path
-        blobs = []
-        if tree:
-            _traverse(tree, blobs, self.root(tgt_env))
         add_mountpoint = lambda path: salt.utils.path.join(
             self.mountpoint(tgt_env), path, use_posixpath=True
         )
-        for blob in blobs:
-            ret.add(add_mountpoint(relpath(blob)))
+        for repo_path in index["blobs"]:
+            parent = posixpath.dirname(repo_path)
+            while parent and add_mountpoint(parent) not in ret:
+                ret.add(add_mountpoint(parent))
+                parent = posixpath.dirname(parent)
         if self.mountpoint(tgt_env):
             ret.add(self.mountpoint(tgt_env))
         return ret
@@ -1917,104 +1928,210 @@ class Pygit2(GitProvider):
         """
         Get file list for the target environment using pygit2
         """
-
-        def _traverse(tree, blobs, prefix):
-            """
-            Traverse through a pygit2 Tree object recursively, accumulating all
-            the file paths and symlink info in the "blobs" dict
-            """
-            for entry in iter(tree):
-                if entry.oid not in self.repo:
-                    # Entry is a submodule, skip it
-                    continue
-                obj = self.repo[entry.oid]
-                if isinstance(obj, pygit2.Blob):
-                    repo_path = salt.utils.path.join(
-                        prefix, entry.name, use_posixpath=True
-                    )
-                    blobs.setdefault("files", []).append(repo_path)
-                    if stat.S_ISLNK(tree[entry.name].filemode):
-                        link_tgt = self.repo[tree[entry.name].oid].data
-                        blobs.setdefault("symlinks", {})[repo_path] = link_tgt
-                elif isinstance(obj, pygit2.Tree):
-                    _traverse(
-                        obj,
-                        blobs,
-                        salt.utils.path.join(prefix, entry.name, use_posixpath=True),
-                    )
-
         files = set()
         symlinks = {}
-        tree = self.get_tree(tgt_env)
-        if not tree:
+        index = self._tree_index(tgt_env)
+        if index is None:
             # Not found, return empty objects
             return files, symlinks
-        if self.root(tgt_env):
-            try:
-                # This might need to be changed to account for a root that
-                # spans more than one directory
-                oid = tree[self.root(tgt_env)].oid
-                tree = self.repo[oid]
-            except KeyError:
-                return files, symlinks
-            if not isinstance(tree, pygit2.Tree):
-                return files, symlinks
-            relpath = lambda path: os.path.relpath(path, self.root(tgt_env))
-        else:
-            relpath = lambda path: path
-        blobs = {}
-        if tree:
-            _traverse(tree, blobs, self.root(tgt_env))
         add_mountpoint = lambda path: salt.utils.path.join(
             self.mountpoint(tgt_env), path, use_posixpath=True
         )
-        for repo_path in blobs.get("files", []):
-            files.add(add_mountpoint(relpath(repo_path)))
-        for repo_path, link_tgt in blobs.get("symlinks", {}).items():
-            symlinks[add_mountpoint(relpath(repo_path))] = link_tgt
+        for repo_path in index["blobs"]:
+            files.add(add_mountpoint(repo_path))
+        for repo_path, link_tgt in index["links"].items():
+            symlinks[add_mountpoint(repo_path)] = link_tgt
         return files, symlinks
 
     def find_file(self, path, tgt_env):
         """
         Find the specified file in the specified environment
         """
-        tree = self.get_tree(tgt_env)
-        if not tree:
+        index = self._tree_index(tgt_env)
+        if index is None:
             # Branch/tag/SHA not found in repo
             return None, None, None
-        blob = None
-        mode = None
+        root = self.root(tgt_env)
+        if root:
+            if not path.startswith(root + "/"):
+                return None, None, None
+            path = path[len(root) + 1 :]
         depth = 0
         while True:
             depth += 1
             if depth > SYMLINK_RECURSE_DEPTH:
-                blob = None
-                break
+                return None, None, None
             try:
-                entry = tree[path]
-                mode = entry.filemode
-                if stat.S_ISLNK(mode):
-                    # Path is a symlink. The blob data corresponding to this
-                    # path's object ID will be the target of the symlink. Follow
-                    # the symlink and set path to the location indicated
-                    # in the blob data.
-                    link_tgt = self.repo[entry.oid].data
-                    path = salt.utils.path.join(
-                        os.path.dirname(path), link_tgt, use_posixpath=True
-                    )
-                else:
-                    blob = self.repo[entry.oid]
-                    if isinstance(blob, pygit2.Tree):
-                        # Path is a directory, not a file.
-                        blob = None
-                    break
+                oid, mode = index["blobs"][path]
             except KeyError:
-                blob = None
+                # Not found, or path is a directory, not a file
+                return None, None, None
+            if not stat.S_ISLNK(mode):
                 break
+            # Path is a symlink, follow it to the location indicated in the
+            # blob data.
+            path = salt.utils.path.join(
+                os.path.dirname(path), index["links"][path], use_posixpath=True
+            )
+        blob = self.repo[oid]
         if isinstance(blob, pygit2.Blob):
-            return blob, blob.hex, mode
+            return blob, oid, mode
         return None, None, None
 
+    def _root_tree(self, tgt_env):
+        """
+        Return the pygit2.Tree object of the root of the target environment
+        """
+        tree = self.get_tree(tgt_env)
+        if not tree:
+            return None
+        if self.root(tgt_env):
+            try:
+                # This might need to be changed to account for a root that
+                # spans more than one directory
+                tree = self.repo[tree[self.root(tgt_env)].oid]
+            except KeyError:
+                return None
+            if not isinstance(tree, pygit2.Tree):
+                return None
+        return tree
+
+    def _tree_index_path(self, tgt_env):
+        return salt.utils.path.join(
+            self.gitdir,
+            "salt_tree_index",
+            "{}.p".format(tgt_env.replace(os.path.sep, "_|-")),
+        )
+
+    def _tree_index(self, tgt_env):
+        """
+        Return a dict holding the blobs of the tree of the target environment,
+        below its root, as ``{path: (oid, filemode)}`` and the targets of the
+        symlinks among them, or None if the environment was not found.
+
+        The index of each environment is kept in memory and in the git dir of
+        the remote. When the tree of the environment changed, the index is
+        updated with the diff between the indexed and the current tree, only
+        the first index of an environment needs to walk the whole tree.
+        """
+        tree = self._root_tree(tgt_env)
+        if tree is None:
+            return None
+        tree_id = tree.hex
+        index = self._tree_indexes.get(tgt_env)
+        index_path = self._tree_index_path(tgt_env)
+        if index is None:
+            try:
+                with salt.utils.files.fopen(index_path, "rb") as fp_:
+                    index = salt.payload.Serial(self.opts).load(fp_)
+            except Exception as exc:  # pylint: disable=broad-except
+                if getattr(exc, "errno", None) != errno.ENOENT:
+                    log.debug(
+                        "Failed to read %s tree index %s: %s",
+                        self.role,
+                        index_path,
+                        exc,
+                    )
+        if index is not None and index["tree"] == tree_id:
+            self._tree_indexes[tgt_env] = index
+            return index
+
+        start = time.time()
+        new_index = None
+        if index is not None:
+            try:
+                new_index = self._update_tree_index(index, tree)
+            except Exception as exc:  # pylint: disable=broad-except
+                log.debug(
+                    "Unable to diff the %s tree index of '%s' in remote '%s', "
+                    "rebuilding it: %s",
+                    self.role,
+                    tgt_env,
+                    self.id,
+                    exc,
+                )
+        if new_index is None:
+            new_index = self._build_tree_index(tree)
+        log.debug(
+            "%s %s tree index of '%s' in remote '%s' in %.3f seconds",
+            "Updated" if index is not None else "Built",
+            self.role,
+            tgt_env,
+            self.id,
+            time.time() - start,
+        )
+        self._tree_indexes[tgt_env] = new_index
+        try:
+            if not os.path.isdir(os.path.dirname(index_path)):
+                os.makedirs(os.path.dirname(index_path))
+            with salt.utils.atomicfile.atomic_open(index_path, "wb") as fp_:
+                salt.payload.Serial(self.opts).dump(new_index, fp_)
+        except (IOError, OSError) as exc:
+            log.debug(
+                "Failed to write %s tree index %s: %s", self.role, index_path, exc
+            )
+        return new_index
+
+    def _index_blob(self, index, repo_path, oid, mode):
+        """
+        Add a blob to a tree index, submodules are skipped
+        """
+        if stat.S_ISLNK(mode):
+            index["links"][repo_path] = salt.utils.stringutils.to_unicode(
+                self.repo[oid].data
+            )
+        elif not stat.S_ISREG(mode):
+            return
+        index["blobs"][repo_path] = (oid, mode)
+
+    def _build_tree_index(self, tree):
+        """
+        Index the blobs of a tree by walking it
+        """
+
+        def _traverse(tree, prefix):
+            for entry in iter(tree):
+                if entry.oid not in self.repo:
+                    # Entry is a submodule, skip it
+                    continue
+                obj = self.repo[entry.oid]
+                repo_path = salt.utils.path.join(prefix, entry.name, use_posixpath=True)
+                if isinstance(obj, pygit2.Blob):
+                    self._index_blob(index, repo_path, obj.hex, entry.filemode)
+                elif isinstance(obj, pygit2.Tree):
+                    _traverse(obj, repo_path)
+
+        index = {"tree": tree.hex, "blobs": {}, "links": {}}
+        _traverse(tree, "")
+        return index
+
+    def _update_tree_index(self, index, tree):
+        """
+        Update the index of a tree with the changes between the indexed tree
+        and ``tree``. Returns None if the indexed tree is gone from the repo.
+        """
+        try:
+            old_tree = self.repo[index["tree"]]
+        except (KeyError, ValueError):
+            return None
+        new_index = {
+            "tree": tree.hex,
+            "blobs": dict(index["blobs"]),
+            "links": dict(index["links"]),
+        }
+        for delta in old_tree.diff_to_tree(tree).deltas:
+            if delta.old_file.mode:
+                new_index["blobs"].pop(delta.old_file.path, None)
+                new_index["links"].pop(delta.old_file.path, None)
+            if delta.new_file.mode:
+                self._index_blob(
+                    new_index,
+                    delta.new_file.path,
+                    str(delta.new_file.id),
+                    delta.new_file.mode,
+                )
+        return new_index
+
     def get_tree_from_branch(self, ref):
         """
         Return a pygit2.Tree object matching a head ref fetched into
@@ -2205,6 +2322,17 @@ class Pygit2(GitProvider):
             )
             failhard(self.role)
 
+    def read_blob(self, oid):
+        """
+        Return the contents of the blob with the given hex SHA, or None if it
+        is not in the repo
+        """
+        try:
+            blob = self.repo[oid]
+        except (KeyError, ValueError):
+            return None
+        return blob.data if isinstance(blob, pygit2.Blob) else None
+
     def write_file(self, blob, dest):
         """
         Using the blob object, write the file to the destination path
@@ -2289,6 +2417,8 @@ class GitBase:
         self.file_list_cachedir = salt.utils.path.join(
             self.opts["cachedir"], "file_lists", self.role
         )
+        # Result and duration of the last fetch of each remote
+        self.fetch_results = {}
         if init_remotes:
             self.init_remotes(
                 remotes if remotes is not None else [],
@@ -2523,28 +2653,167 @@ class GitBase:
             )
             remotes = []
 
-        changed = False
+        repos = []
+        now = time.time()
         for repo in self.remotes:
             name = getattr(repo, "name", None)
             if not remotes or (repo.id, name) in remotes or name in remotes:
-                try:
-                    if repo.fetch():
-                        # We can't just use the return value from repo.fetch()
-                        # because the data could still have changed if old
-                        # remotes were cleared above. Additionally, we're
-                        # running this in a loop and later remotes without
-                        # changes would override this value and make it
-                        # incorrect.
-                        changed = True
-                except Exception as exc:  # pylint: disable=broad-except
-                    log.error(
-                        "Exception caught while fetching %s remote '%s': %s",
+                if self.fetch_running(repo):
+                    log.debug(
+                        "Skipping %s remote '%s', its last fetch is still running",
                         self.role,
                         repo.id,
-                        exc,
-                        exc_info=True,
                     )
-        return changed
+                    continue
+                failures, retry_at = _FETCH_BACKOFF.get((self.role, repo.id), (0, 0))
+                if retry_at > now:
+                    log.debug(
+                        "Skipping %s remote '%s' for %d seconds after %d failed "
+                        "fetch(es)",
+                        self.role,
+                        repo.id,
+                        retry_at - now,
+                        failures,
+                    )
+                    continue
+                repos.append(repo)
+
+        self.fetch_results = {}
+        workers = self.opts.get("{}_fetch_workers".format(self.role), 1)
+        if workers > 1 or any(self._fetch_timeout(repo) for repo in repos):
+            self._fetch_concurrently(repos, workers)
+        else:
+            for repo in repos:
+                self._fetch_done(repo, *self._fetch_remote(repo), backoff=False)
+        # We can't just use the return value from repo.fetch() because the
+        # data could still have changed if old remotes were cleared above.
+        return any(x["result"] == "changed" for x in self.fetch_results.values())
+
+    def _fetch_timeout(self, repo):
+        return getattr(
+            repo,
+            "fetch_timeout",
+            self.opts.get("{}_fetch_timeout".format(self.role), 0),
+        )
+
+    def fetch_running(self, repo):
+        """
+        Return whether a fetch of the remote which timed out is still running
+        in this process. Its local copy must not be read until it completes.
+        """
+        return (self.role, repo.id) in _FETCH_RUNNING
+
+    def _fetch_remote(self, repo):
+        """
+        Fetch a remote, returning the result of the fetch (``changed``,
+        ``unchanged``, ``locked`` or ``failed``) and how long it took
+        """
+        start = time.time()
+        try:
+            ret = repo.fetch()
+        except Exception as exc:  # pylint: disable=broad-except
+            log.error(
+                "Exception caught while fetching %s remote '%s': %s",
+                self.role,
+                repo.id,
+                exc,
+                exc_info=True,
+            )
+            ret = False
+        # Providers return None when the local copy was up-to-date and False
+        # when the fetch failed or another process holds the update lock
+        if ret is False:
+            result = "locked" if getattr(repo, "fetch_locked", False) else "failed"
+        else:
+            result = "changed" if ret else "unchanged"
+        return result, time.time() - start
+
+    def _fetch_done(self, repo, result, duration, backoff=True):
+        """
+        Record the result of the fetch of a remote, and when it failed or timed
+        out, how long it should be skipped for
+        """
+        key = (self.role, repo.id)
+        if result in ("changed", "unchanged"):
+            _FETCH_BACKOFF.pop(key, None)
+        elif backoff and result in ("failed", "timeout"):
+            failures = _FETCH_BACKOFF.get(key, (0, 0))[0] + 1
+            delay = min(
+                getattr(repo, "update_interval", 60) * 2 ** failures, FETCH_BACKOFF_MAX,
+            )
+            _FETCH_BACKOFF[key] = (failures, time.time() + delay)
+        self.fetch_results[repo.id] = {"result": result, "duration": duration}
+        log.debug(
+            "Fetch of %s remote '%s' %s in %.2f seconds",
+            self.role,
+            repo.id,
+            result,
+            duration,
+        )
+
+    def _fetch_concurrently(self, repos, workers):
+        """
+        Fetch remotes from up to ``workers`` threads, giving up on the remotes
+        whose fetch takes longer than their fetch_timeout. A fetch which timed
+        out cannot be interrupted, it no longer counts against ``workers`` so
+        that the remotes queued behind it still start.
+        """
+        queued = list(repos)
+        # Remotes being fetched, and when their fetch started, by remote ID
+        active = {}
+        finished = []
+        cond = threading.Condition()
+
+        def _fetch(repo):
+            ret = self._fetch_remote(repo)
+            with cond:
+                _FETCH_RUNNING.discard((self.role, repo.id))
+                finished.append((repo, ret))
+                cond.notify()
+
+        with cond:
+            while queued or active:
+                while queued and len(active) < max(1, workers):
+                    repo = queued.pop(0)
+                    active[repo.id] = (repo, time.time())
+                    # The fetch threads are not daemon threads, the process
+                    # cannot exit before a fetch which timed out is done.
+                    threading.Thread(
+                        target=_fetch,
+                        args=(repo,),
+                        name="{}-fetch-{}".format(self.role, repo.id),
+                    ).start()
+                if not finished:
+                    # Wake up when the next running fetch times out
+                    deadlines = [
+                        start + self._fetch_timeout(repo)
+                        for repo, start in active.values()
+                        if self._fetch_timeout(repo)
+                    ]
+                    cond.wait(
+                        max(0, min(deadlines) - time.time()) if deadlines else None
+                    )
+                for repo, ret in finished:
+                    # The fetches which timed out are already accounted for
+                    if repo.id in active:
+                        del active[repo.id]
+                        self._fetch_done(repo, *ret)
+                del finished[:]
+                now = time.time()
+                for repo, start in list(active.values()):
+                    timeout = self._fetch_timeout(repo)
+                    if timeout and now - start >= timeout:
+                        log.error(
+                            "Fetch of %s remote '%s' did not complete within "
+                            "%d seconds",
+                            self.role,
+                            repo.id,
+                            timeout,
+                        )
+                        # The fetch keeps its update lock until it completes
+                        del active[repo.id]
+                        _FETCH_RUNNING.add((self.role, repo.id))
+                        self._fetch_done(repo, "timeout", now - start)
 
     def lock(self, remote=None):
         """
@@ -2584,6 +2853,7 @@ class GitBase:
         data["changed"] = self.clear_old_remotes()
         if self.fetch_remotes(remotes=remotes):
             data["changed"] = True
+        data["remotes"] = self.fetch_results
 
         # A masterless minion will need a new env cache file even if no changes
         # were fetched.
@@ -2595,6 +2865,20 @@ class GitBase:
                 os.makedirs(env_cachedir)
             refresh_env_cache = True
 
+        # The local copy of a remote whose fetch timed out is still being
+        # written to, leave the env cache and the hash cache of the files as
+        # they are until the fetch completes
+        running = [repo.id for repo in self.remotes if self.fetch_running(repo)]
+        if running:
+            log.debug(
+                "Fetch of %s remote(s) %s still running, the env cache and the "
+                "file hash cache are not updated",
+                self.role,
+                ", ".join(running),
+            )
+            if os.path.isfile(self.env_cache):
+                refresh_env_cache = False
+
         if refresh_env_cache:
             new_envs = self.envs(ignore_cache=True)
             serial = salt.payload.Serial(self.opts)
@@ -2612,13 +2896,15 @@ class GitBase:
                 listen=False,
             )
             event.fire_event(data, tagify(["gitfs", "update"], prefix="fileserver"))
-        try:
-            salt.fileserver.reap_fileserver_cache_dir(
-                self.hash_cachedir, self.find_file
-            )
-        except OSError:
-            # Hash file won't exist if no files have yet been served up
-            pass
+        if not running:
+            try:
+                salt.fileserver.reap_fileserver_cache_dir(
+                    self.hash_cachedir, self.find_file
+                )
+            except OSError:
+                # Hash file won't exist if no files have yet been served up
+                pass
+        return data
 
     def update_intervals(self):
         """
@@ -2829,6 +3115,19 @@ class GitBase:
         return None
 
 
+def _is_binary(contents):
+    """
+    Detect if the contents of a file are binary, the same way
+    salt.utils.files.is_binary() does for a file on disk
+    """
+    try:
+        return salt.utils.stringutils.is_binary(
+            contents[:2048].decode(__salt_system_encoding__)
+        )
+    except UnicodeDecodeError:
+        return True
+
+
 class GitFS(GitBase):
     """
     Functionality specific to the git fileserver backend
@@ -2915,6 +3214,8 @@ class GitFS(GitBase):
                 return cache_match
         ret = set()
         for repo in self.remotes:
+            if self.fetch_running(repo):
+                continue
             repo_envs = repo.envs()
             for env_list in repo.saltenv_revmap.values():
                 repo_envs.update(env_list)
@@ -2988,36 +3289,56 @@ class GitFS(GitBase):
                     fnd["stat"] = [mode]
                 return fnd
 
-            salt.fileserver.wait_lock(lk_fn, dest)
+            fnd["rel"] = path
+            fnd["path"] = dest
+            # Large files are still written to the cache, so that they are
+            # not read whole from the object database for each chunk served
+            write_blobs = (
+                self.opts.get("gitfs_write_blobs", True)
+                or getattr(blob, "size", 0) > BLOB_MAX_SIZE
+            )
+            if not write_blobs:
+                # The file is served from the object database of the remote,
+                # dest is only written if a local copy is needed, see
+                # materialize().
+                fnd["blob"] = blob_hexsha
+                fnd["remote"] = repo.cachedir_basename
+            else:
+                salt.fileserver.wait_lock(lk_fn, dest)
             try:
                 with salt.utils.files.fopen(blobshadest, "r") as fp_:
                     sha = salt.utils.stringutils.to_unicode(fp_.read())
-                    if sha == blob_hexsha:
-                        fnd["rel"] = path
-                        fnd["path"] = dest
+                    if sha == blob_hexsha and (not write_blobs or os.path.isfile(dest)):
                         return _add_file_stat(fnd, blob_mode)
             except OSError as exc:
                 if exc.errno != errno.ENOENT:
                     raise
 
-            with salt.utils.files.fopen(lk_fn, "w"):
-                pass
+            if write_blobs:
+                with salt.utils.files.fopen(lk_fn, "w"):
+                    pass
 
             for filename in glob.glob(hashes_glob):
                 try:
                     os.remove(filename)
                 except Exception:  # pylint: disable=broad-except
                     pass
-            # Write contents of file to their destination in the FS cache
-            repo.write_file(blob, dest)
-            with salt.utils.files.fopen(blobshadest, "w+") as fp_:
-                fp_.write(blob_hexsha)
-            try:
-                os.remove(lk_fn)
-            except OSError:
-                pass
-            fnd["rel"] = path
-            fnd["path"] = dest
+            if write_blobs:
+                # Write contents of file to their destination in the FS cache
+                repo.write_file(blob, dest)
+                with salt.utils.files.fopen(blobshadest, "w+") as fp_:
+                    fp_.write(blob_hexsha)
+                try:
+                    os.remove(lk_fn)
+                except OSError:
+                    pass
+            else:
+                # Drop the copy of an older version of the file. Nothing is
+                # written to dest, the blob SHA is replaced atomically instead
+                # of under the lock.
+                salt.utils.files.remove(dest)
+                with salt.utils.atomicfile.atomic_open(blobshadest, "w") as fp_:
+                    fp_.write(blob_hexsha)
             return _add_file_stat(fnd, blob_mode)
 
         # No matching file was found in tgt_env. Return a dict with empty paths
@@ -3044,18 +3365,66 @@ class GitFS(GitBase):
             return ret
         ret["dest"] = fnd["rel"]
         gzip = load.get("gzip", None)
-        fpath = os.path.normpath(fnd["path"])
-        with salt.utils.files.fopen(fpath, "rb") as fp_:
-            fp_.seek(load["loc"])
-            data = fp_.read(self.opts["file_buffer_size"])
-            if data and six.PY3 and not salt.utils.files.is_binary(fpath):
-                data = data.decode(__salt_system_encoding__)
-            if gzip and data:
-                data = salt.utils.gzip_util.compress(data, gzip)
-                ret["gzip"] = gzip
-            ret["data"] = data
+        if fnd.get("blob"):
+            contents = self._blob_contents(fnd)
+            if contents is None:
+                return ret
+            data = contents[load["loc"] : load["loc"] + self.opts["file_buffer_size"]]
+            binary = _is_binary(contents)
+        else:
+            fpath = os.path.normpath(fnd["path"])
+            with salt.utils.files.fopen(fpath, "rb") as fp_:
+                fp_.seek(load["loc"])
+                data = fp_.read(self.opts["file_buffer_size"])
+            binary = salt.utils.files.is_binary(fpath)
+        if data and six.PY3 and not binary:
+            data = data.decode(__salt_system_encoding__)
+        if gzip and data:
+            data = salt.utils.gzip_util.compress(data, gzip)
+            ret["gzip"] = gzip
+        ret["data"] = data
         return ret
 
+    def _blob_contents(self, fnd):
+        """
+        Return the contents of the blob a file found by find_file() is served
+        from. The last blobs read are kept, up to BLOB_CACHE_SIZE bytes, as
+        their files are served in chunks.
+        """
+        cache = self.__dict__.setdefault("_blob_cache", OrderedDict())
+        oid = fnd["blob"]
+        if oid in cache:
+            cache[oid] = cache.pop(oid)
+            return cache[oid]
+        for repo in self.remotes:
+            if repo.cachedir_basename == fnd.get("remote"):
+                contents = repo.read_blob(oid)
+                break
+        else:
+            return None
+        if contents is not None:
+            cache[oid] = contents
+            # Drop the least recently used blobs, but keep the one just read
+            size = sum(len(x) for x in cache.values())
+            while size > BLOB_CACHE_SIZE and len(cache) > 1:
+                size -= len(cache.popitem(last=False)[1])
+        return contents
+
+    def materialize(self, fnd):
+        """
+        Write the file found by find_file() to the fileserver cache if it is
+        served from a blob, for the callers which need a local copy of it.
+        Returns the path of the local copy.
+        """
+        if not fnd.get("blob") or os.path.isfile(fnd["path"]):
+            return fnd["path"]
+        contents = self._blob_contents(fnd)
+        if contents is None:
+            return ""
+        with salt.utils.atomicfile.atomic_open(fnd["path"], "wb") as fp_:
+            fp_.write(contents)
+        return fnd["path"]
+
     def file_hash(self, load, fnd):
         """
         Return a file hash, the hash type is set in the master config file
@@ -3088,7 +3457,13 @@ class GitFS(GitBase):
             if exc.errno != errno.EEXIST:
                 raise
 
-        ret["hsum"] = salt.utils.hashutils.get_hash(path, self.opts["hash_type"])
+        if fnd.get("blob"):
+            contents = self._blob_contents(fnd)
+            if contents is None:
+                return "", None
+            ret["hsum"] = hashlib.new(self.opts["hash_type"], contents).hexdigest()
+        else:
+            ret["hsum"] = salt.utils.hashutils.get_hash(path, self.opts["hash_type"])
         with salt.utils.files.fopen(hashdest, "w+") as fp_:
             fp_.write(ret["hsum"])
         return ret
@@ -3203,6 +3578,14 @@ class GitPillar(GitBase):
         self.pillar_dirs = OrderedDict()
         self.pillar_linked_dirs = []
         for repo in self.remotes:
+            if self.fetch_running(repo):
+                log.warning(
+                    "Skipping checkout of %s remote '%s', its fetch is still "
+                    "running",
+                    self.role,
+                    repo.id,
+                )
+                continue
             cachedir = self.do_checkout(repo)
             if cachedir is not None:
                 # Figure out which environment this remote should be assigned
@@ -3366,6 +3749,14 @@ class WinRepo(GitBase):
         """
         self.winrepo_dirs = {}
         for repo in self.remotes:
+            if self.fetch_running(repo):
+                log.warning(
+                    "Skipping checkout of %s remote '%s', its fetch is still "
+                    "running",
+                    self.role,
+                    repo.id,
+                )
+                continue
             cachedir = self.do_checkout(repo)
             if cachedir is not None:
                 self.winrepo_dirs[repo.id] = cachedir
@@ -17,9 +17,14 @@ import salt.utils.verify
 log = logging.getLogger(__name__)
 
 
-def store_job(opts, load, event=None, mminion=None):
+def store_job(opts, load, event=None, mminion=None, job_cache_queue=None):
     """
     Store job information using the configured master_job_cache
+
+    If ``job_cache_queue`` is passed, the return is fired on the event bus
+    right away and writing it to the job cache is left to whoever consumes
+    the queue (the master's ``JobCacheWriter``), through
+    :func:`write_job_cache`.
     """
     # Generate EndTime
     endtime = salt.utils.jid.jid_to_time(salt.utils.jid.gen_jid(opts))
@@ -32,7 +37,8 @@ def store_job(opts, load, event=None, mminion=None):
         mminion = salt.minion.MasterMinion(opts, states=False, rend=False)
 
     job_cache = opts["master_job_cache"]
-    if load["jid"] == "req":
+    req = load["jid"] == "req"
+    if req:
         # The minion is returning a standalone job, request a jobid
         load["arg"] = load.get("arg", load.get("fun_args", []))
         load["tgt_type"] = "glob"
@@ -53,6 +59,41 @@ def store_job(opts, load, event=None, mminion=None):
                 exc_info=True,
             )
 
+    if job_cache_queue is None:
+        _prep_job_cache(opts, load, mminion, req)
+
+    if event:
+        # If the return data is invalid, just ignore it
+        log.info("Got return from %s for job %s", load["id"], load["jid"])
+        event.fire_event(
+            load, salt.utils.event.tagify([load["jid"], "ret", load["id"]], "job")
+        )
+        event.fire_ret_load(load)
+
+    if job_cache_queue is not None:
+        job_cache_queue.put((load, endtime, req))
+        return
+
+    _store_return(opts, load, mminion, endtime)
+
+
+def write_job_cache(opts, load, endtime, req=False, mminion=None):
+    """
+    Write a return, which :func:`store_job` has already fired on the event
+    bus, to the configured master_job_cache
+    """
+    if mminion is None:
+        mminion = salt.minion.MasterMinion(opts, states=False, rend=False)
+    _prep_job_cache(opts, load, mminion, req)
+    _store_return(opts, load, mminion, endtime)
+
+
+def _prep_job_cache(opts, load, mminion, req):
+    """
+    Save the load of a standalone job, or store the jid of a published one
+    """
+    job_cache = opts["master_job_cache"]
+    if req:
         # save the load, since we don't have it
         saveload_fstr = "{0}.save_load".format(job_cache)
         try:
@@ -83,13 +124,12 @@ def store_job(opts, load, event=None, mminion=None):
                 exc_info=True,
             )
 
-    if event:
-        # If the return data is invalid, just ignore it
-        log.info("Got return from %s for job %s", load["id"], load["jid"])
-        event.fire_event(
-            load, salt.utils.event.tagify([load["jid"], "ret", load["id"]], "job")
-        )
-        event.fire_ret_load(load)
+
+def _store_return(opts, load, mminion, endtime):
+    """
+    Write the return to the master_job_cache
+    """
+    job_cache = opts["master_job_cache"]
 
     # if you have a job_cache, or an ext_job_cache, don't write to
     # the regular master cache
@@ -11,12 +11,28 @@ import os
 import re
 
 # Import Salt libs
+import salt.payload
+import salt.utils.atomicfile
 import salt.utils.data
 import salt.utils.files
+import salt.utils.json
 import salt.utils.versions
 
 log = logging.getLogger(__name__)
 
+# Package databases the inventory cache watches for changes
+DPKG_DB_PATHS = ("/var/lib/dpkg/status",)
+RPM_DB_PATHS = (
+    "/var/lib/rpm/Packages",
+    "/var/lib/rpm/rpmdb.sqlite",
+    "/var/lib/rpm/rpmdb.sqlite-wal",
+    "/usr/lib/sysimage/rpm/rpmdb.sqlite",
+    "/usr/lib/sysimage/rpm/rpmdb.sqlite-wal",
+)
+
+# Number of results kept per inventory cache file
+INVENTORY_MAX_ENTRIES = 32
+
 
 def rtag(opts):
     """
@@ -96,3 +112,74 @@ def match_version(desired, available, cmp_func=None, ignore_epoch=False):
         ):
             return candidate
     return None
+
+
+def inventory_stamp(opts, paths):
+    """
+    Return the ``[path, mtime_ns, size]`` of each existing file of a package
+    database, or ``None`` when the ``pkg_inventory_cache`` option is not set.
+
+    .. versionadded:: Aluminium
+    """
+    if not opts.get("pkg_inventory_cache"):
+        return None
+    ret = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        ret.append([path, st.st_mtime_ns, st.st_size])
+    return ret
+
+
+def cached_inventory(opts, name, key, paths, gen, stamp=None):
+    """
+    Return the result of ``gen`` for the package database made of the files
+    in ``paths``.
+
+    With ``pkg_inventory_cache``, results are kept in the minion cache under
+    ``key``, a JSON serializable description of the query, and reused by
+    later runs until the database is modified, so that the package manager
+    does not have to be queried again. ``stamp`` is the
+    :func:`inventory_stamp` of the database taken by the caller, if any.
+
+    .. versionadded:: Aluminium
+    """
+    if stamp is None:
+        stamp = inventory_stamp(opts, paths)
+    if not stamp:
+        return gen()
+    key = salt.utils.json.dumps(key, sort_keys=True, default=str)
+    cache = os.path.join(opts["cachedir"], "pkg_inventory", "{}.p".format(name))
+    serial = salt.payload.Serial(opts)
+    entries = {}
+    try:
+        with salt.utils.files.fopen(cache, "rb") as fp_:
+            cached = serial.load(fp_)
+        if cached["stamp"] == stamp:
+            entries = cached["entries"]
+            if key in entries:
+                log.debug("Using the cached %s package inventory", name)
+                return entries[key]
+    except (OSError, IOError):
+        pass
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug("Failed to read the package inventory cache %s: %s", cache, exc)
+
+    data = gen()
+    if inventory_stamp(opts, paths) != stamp:
+        # The database changed while it was queried
+        return data
+    entries[key] = data
+    while len(entries) > INVENTORY_MAX_ENTRIES:
+        entries.pop(next(iter(entries)))
+    try:
+        cache_dir = os.path.dirname(cache)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0o700)
+        with salt.utils.atomicfile.atomic_open(cache, "wb") as fp_:
+            serial.dump({"stamp": stamp, "entries": entries}, fp_)
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug("Failed to write the package inventory cache %s: %s", cache, exc)
+    return data
@@ -437,6 +437,10 @@ class ThreadPool:
         # create a task queue of queue_size
         self._job_queue = queue.Queue(queue_size)
 
+        # track how long jobs wait in the queue before a worker picks them up
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
         self._workers = []
 
         # create worker threads
@@ -455,17 +459,32 @@ class ThreadPool:
         if kwargs is None:
             kwargs = {}
         try:
-            self._job_queue.put_nowait((func, args, kwargs))
+            self._job_queue.put_nowait((func, args, kwargs, time.time()))
             return True
         except queue.Full:
             return False
 
+    def _reset_stats(self):
+        self._stats = {"jobs": 0, "wait_mean": 0, "wait_max": 0}
+
+    def stats(self, reset=False):
+        """
+        Return the current queue depth along with the number of jobs started
+        and the mean and max time they waited in the queue
+        """
+        with self._stats_lock:
+            ret = dict(self._stats)
+            if reset:
+                self._reset_stats()
+        ret["depth"] = self._job_queue.qsize()
+        return ret
+
     def _thread_target(self):
         while True:
             # 1s timeout so that if the parent dies this thread will die within 1s
             try:
                 try:
-                    func, args, kwargs = self._job_queue.get(timeout=1)
+                    func, args, kwargs, queued = self._job_queue.get(timeout=1)
                     self._job_queue.task_done()  # Mark the task as done once we get it
                 except queue.Empty:
                     continue
@@ -474,6 +493,14 @@ class ThreadPool:
                 # we have to catch a possible exception from our exception handler in
                 # order to avoid an unclean shutdown. Le sigh.
                 continue
+            wait = time.time() - queued
+            with self._stats_lock:
+                jobs = self._stats["jobs"]
+                self._stats["wait_mean"] = (self._stats["wait_mean"] * jobs + wait) / (
+                    jobs + 1
+                )
+                self._stats["wait_max"] = max(self._stats["wait_max"], wait)
+                self._stats["jobs"] += 1
             try:
                 log.debug(
                     "ThreadPool executing func: %s with args=%s kwargs=%s",
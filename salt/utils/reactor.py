@@ -11,6 +11,8 @@ import fnmatch
 import glob
 import logging
 import os
+import re
+import time
 
 # Import salt libs
 import salt.client
@@ -22,10 +24,13 @@ import salt.utils.cache
 import salt.utils.data
 import salt.utils.event
 import salt.utils.files
+import salt.utils.hashutils
+import salt.utils.json
 import salt.utils.master
 import salt.utils.process
 import salt.utils.yaml
 import salt.wheel
+from salt.utils.event import tagify
 
 # Import 3rd-party libs
 from salt.ext import six
@@ -37,6 +42,79 @@ REACTOR_INTERNAL_KEYWORDS = frozenset(
 )
 
 
+class ReactorMatcher(object):
+    """
+    Index of the tag globs of a reactor map, used to find the reactors for
+    a tag without running fnmatch against every glob.
+
+    The literal prefix of each glob (the part before its first wildcard) is
+    stored in a prefix trie, so only the globs whose prefix starts the tag
+    are checked, using their precompiled regex. Results are memoized per tag.
+    """
+
+    cache_size = 1000
+
+    def __init__(self, react_map):
+        # Each trie node is a dict of characters to child nodes, the indexes
+        # of the globs whose literal prefix ends at that node are kept under
+        # the None key.
+        self.trie = {}
+        self.globs = []
+        for ropt in react_map:
+            if not isinstance(ropt, dict):
+                continue
+            if len(ropt) != 1:
+                continue
+            key = next(six.iterkeys(ropt))
+            val = ropt[key]
+            if isinstance(val, six.string_types):
+                val = [val]
+            elif not isinstance(val, list):
+                continue
+            pattern = os.path.normcase(key)
+            prefix = re.split(r"[*?[]", pattern, maxsplit=1)[0]
+            if prefix == pattern:
+                regex = None
+            else:
+                regex = re.compile(fnmatch.translate(pattern))
+            node = self.trie
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append(len(self.globs))
+            self.globs.append((pattern, regex, val))
+        self.cache = salt.utils.cache.LRUCache(self.cache_size)
+
+    def match(self, tag):
+        """
+        Return the list of reactors configured for the globs matching ``tag``,
+        in the order of the reactor map
+        """
+        reactors = self.cache.get(tag)
+        if reactors is not None:
+            return list(reactors)
+        tag_ = os.path.normcase(tag)
+        candidates = []
+        node = self.trie
+        for char in tag_:
+            candidates.extend(node.get(None, ()))
+            node = node.get(char)
+            if node is None:
+                break
+        else:
+            candidates.extend(node.get(None, ()))
+        reactors = []
+        for idx in sorted(candidates):
+            pattern, regex, val = self.globs[idx]
+            if regex is None:
+                if pattern != tag_:
+                    continue
+            elif not regex.match(tag_):
+                continue
+            reactors.extend(val)
+        self.cache[tag] = reactors
+        return list(reactors)
+
+
 class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
     """
     Read in the reactor configuration variable and compare it to events
@@ -53,9 +131,19 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
         super(Reactor, self).__init__(**kwargs)
         local_minion_opts = opts.copy()
         local_minion_opts["file_client"] = "local"
+        # Reuse the compiled code of the reactor templates between renders
+        local_minion_opts["_jinja_code_cache"] = opts.get("reactor_render_cache", True)
         self.minion = salt.minion.MasterMinion(local_minion_opts)
         salt.state.Compiler.__init__(self, opts, self.minion.rend)
         self.is_leader = True
+        # salt:// reactor files resolved to their cached local path
+        self.cached_files = salt.utils.cache.CacheDict(opts["reactor_refresh_interval"])
+        # digests of recently called chunks, used for coalescing
+        self.recent_chunks = {}
+        self._reset_stats()
+        # tag index of the reactor map, rebuilt whenever the map changes
+        self.matcher = None
+        self.matcher_mtime = None
 
     # We need __setstate__ and __getstate__ to avoid pickling errors since
     # 'self.rend' (from salt.state.Compiler) contains a function reference
@@ -84,8 +172,15 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
         """
         react = {}
 
+        render_cache = self.opts.get("reactor_render_cache", True)
         if glob_ref.startswith("salt://"):
-            glob_ref = self.minion.functions["cp.cache_file"](glob_ref) or ""
+            if render_cache and glob_ref in self.cached_files:
+                glob_ref = self.cached_files[glob_ref]
+            else:
+                source = glob_ref
+                glob_ref = self.minion.functions["cp.cache_file"](source) or ""
+                if render_cache and glob_ref:
+                    self.cached_files[source] = glob_ref
         globbed_ref = glob.glob(glob_ref)
         if not globbed_ref:
             log.error(
@@ -95,7 +190,9 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
             )
         for fn_ in globbed_ref:
             try:
+                start = time.time()
                 res = self.render_template(fn_, tag=tag, data=data)
+                self._update_render_stats(time.time() - start)
 
                 # for #20841, inject the sls name here since verify_high()
                 # assumes it exists in case there are any errors
@@ -113,32 +210,28 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
         process
         """
         log.debug("Gathering reactors for tag %s", tag)
-        reactors = []
         if isinstance(self.opts["reactor"], six.string_types):
             try:
-                with salt.utils.files.fopen(self.opts["reactor"]) as fp_:
-                    react_map = salt.utils.yaml.safe_load(fp_)
-            except (OSError, IOError):
-                log.error('Failed to read reactor map: "%s"', self.opts["reactor"])
-            except Exception:  # pylint: disable=broad-except
-                log.error(
-                    'Failed to parse YAML in reactor map: "%s"', self.opts["reactor"]
-                )
-        else:
-            react_map = self.opts["reactor"]
-        for ropt in react_map:
-            if not isinstance(ropt, dict):
-                continue
-            if len(ropt) != 1:
-                continue
-            key = next(six.iterkeys(ropt))
-            val = ropt[key]
-            if fnmatch.fnmatch(tag, key):
-                if isinstance(val, six.string_types):
-                    reactors.append(val)
-                elif isinstance(val, list):
-                    reactors.extend(val)
-        return reactors
+                mtime = os.path.getmtime(self.opts["reactor"])
+            except OSError:
+                mtime = None
+            if self.matcher is None or mtime != self.matcher_mtime:
+                react_map = []
+                try:
+                    with salt.utils.files.fopen(self.opts["reactor"]) as fp_:
+                        react_map = salt.utils.yaml.safe_load(fp_)
+                except (OSError, IOError):
+                    log.error('Failed to read reactor map: "%s"', self.opts["reactor"])
+                except Exception:  # pylint: disable=broad-except
+                    log.error(
+                        'Failed to parse YAML in reactor map: "%s"',
+                        self.opts["reactor"],
+                    )
+                self.matcher = ReactorMatcher(react_map or [])
+                self.matcher_mtime = mtime
+        elif self.matcher is None:
+            self.matcher = ReactorMatcher(self.opts["reactor"])
+        return self.matcher.match(tag)
 
     def list_all(self):
         """
@@ -171,6 +264,7 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
                 return {"status": False, "comment": "Reactor already exists."}
 
         self.minion.opts["reactor"].append({tag: reaction})
+        self.matcher = None
         return {"status": True, "comment": "Reactor added."}
 
     def delete_reactor(self, tag):
@@ -182,6 +276,7 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
             _tag = next(six.iterkeys(reactor))
             if _tag == tag:
                 self.minion.opts["reactor"].remove(reactor)
+                self.matcher = None
                 return {"status": True, "comment": "Reactor deleted."}
 
         return {"status": False, "comment": "Reactor does not exists."}
@@ -224,13 +319,76 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
         self.resolve_aliases(chunks)
         return chunks
 
+    def coalesce(self, chunk):
+        """
+        Return True if an identical chunk has already been called within the
+        last ``reactor_coalesce_window`` seconds, else record the chunk and
+        return False
+        """
+        window = self.opts.get("reactor_coalesce_window", 0)
+        if not window:
+            return False
+        now = time.time()
+        for digest, called in list(self.recent_chunks.items()):
+            if now - called > window:
+                del self.recent_chunks[digest]
+        digest = salt.utils.hashutils.sha256_digest(
+            salt.utils.json.dumps(chunk, sort_keys=True, default=str)
+        )
+        if digest in self.recent_chunks:
+            return True
+        self.recent_chunks[digest] = now
+        return False
+
     def call_reactions(self, chunks):
         """
         Execute the reaction state
         """
         for chunk in chunks:
+            if self.coalesce(chunk):
+                log.debug(
+                    "Reactor '%s' coalesced with an identical reaction",
+                    chunk.get("__id__"),
+                )
+                self.stats["coalesced"] += 1
+                continue
+            self.stats["reactions"] += 1
             self.wrap.run(chunk)
 
+    def _reset_stats(self):
+        self.stats = {
+            "events": 0,
+            "reactions": 0,
+            "coalesced": 0,
+            "renders": 0,
+            "render_mean": 0,
+            "render_max": 0,
+        }
+        self.stat_clock = time.time()
+
+    def _update_render_stats(self, duration):
+        renders = self.stats["renders"]
+        self.stats["render_mean"] = (self.stats["render_mean"] * renders + duration) / (
+            renders + 1
+        )
+        self.stats["render_max"] = max(self.stats["render_max"], duration)
+        self.stats["renders"] += 1
+
+    def _post_stats(self, event):
+        """
+        Fire an event with the reactor throughput, render times and worker
+        queue depth and wait, and wipe the tracker
+        """
+        now = time.time()
+        if now - self.stat_clock <= self.opts["master_stats_event_iter"]:
+            return
+        stats = dict(self.stats)
+        stats["pools"] = self.wrap.pool_stats(reset=True)
+        event.fire_event(
+            {"time": now - self.stat_clock, "stats": stats}, tagify("stats", "reactor"),
+        )
+        self._reset_stats()
+
     def run(self):
         """
         Enter into the server loop
@@ -301,14 +459,16 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
                         continue
                     else:
                         reactors = self.list_reactors(data["tag"])
-                        if not reactors:
-                            continue
-                        chunks = self.reactions(data["tag"], data["data"], reactors)
-                        if chunks:
-                            try:
-                                self.call_reactions(chunks)
-                            except SystemExit:
-                                log.warning("Exit ignored by reactor")
+                        if reactors:
+                            self.stats["events"] += 1
+                            chunks = self.reactions(data["tag"], data["data"], reactors)
+                            if chunks:
+                                try:
+                                    self.call_reactions(chunks)
+                                except SystemExit:
+                                    log.warning("Exit ignored by reactor")
+                if self.opts.get("master_stats", False):
+                    self._post_stats(event)
 
 
 class ReactWrap(object):
@@ -334,10 +494,36 @@ class ReactWrap(object):
                 opts["reactor_refresh_interval"]
             )
 
-        self.pool = salt.utils.process.ThreadPool(
-            self.opts["reactor_worker_threads"],  # number of workers for runner/wheel
-            queue_size=self.opts["reactor_worker_hwm"],  # queue size for those workers
-        )
+        # reactor_worker_threads is either the number of workers shared by
+        # runner and wheel reactions, or a dict giving each its own pool
+        self.pools = {}
+        worker_threads = self.opts["reactor_worker_threads"]
+        if isinstance(worker_threads, dict):
+            for reaction_type in ("runner", "wheel"):
+                self.pools[reaction_type] = salt.utils.process.ThreadPool(
+                    worker_threads.get(reaction_type, 10),
+                    queue_size=self.opts["reactor_worker_hwm"],
+                )
+            self.pool = self.pools["runner"]
+        else:
+            self.pool = salt.utils.process.ThreadPool(
+                worker_threads,  # number of workers for runner/wheel
+                queue_size=self.opts[
+                    "reactor_worker_hwm"
+                ],  # queue size for those workers
+            )
+
+    def pool_stats(self, reset=False):
+        """
+        Return the queue statistics of the worker pools, keyed by the
+        reaction type using them
+        """
+        if not self.pools:
+            return {"runner,wheel": self.pool.stats(reset=reset)}
+        return {
+            reaction_type: pool.stats(reset=reset)
+            for reaction_type, pool in self.pools.items()
+        }
 
     def populate_client_cache(self, low):
         """
@@ -493,13 +679,17 @@ class ReactWrap(object):
         """
         Wrap RunnerClient for executing :ref:`runner modules <all-salt.runners>`
         """
-        return self.pool.fire_async(self.client_cache["runner"].low, args=(fun, kwargs))
+        return self.pools.get("runner", self.pool).fire_async(
+            self.client_cache["runner"].low, args=(fun, kwargs)
+        )
 
     def wheel(self, fun, **kwargs):
         """
         Wrap Wheel to enable executing :ref:`wheel modules <all-salt.wheel>`
         """
-        return self.pool.fire_async(self.client_cache["wheel"].low, args=(fun, kwargs))
+        return self.pools.get("wheel", self.pool).fire_async(
+            self.client_cache["wheel"].low, args=(fun, kwargs)
+        )
 
     def local(self, fun, tgt, **kwargs):
         """
@@ -0,0 +1,106 @@
+"""
+A fixed size buffer of numeric samples which keeps running aggregates
+
+.. versionadded:: Aluminium
+"""
+
+import collections
+import math
+
+
+def percentile(ordered, percent):
+    """
+    Return the value at the given percentile of a sorted list, using the
+    nearest rank method
+    """
+    rank = math.ceil(percent / 100.0 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+class RingBuffer:
+    """
+    Hold the last ``size`` numeric samples, in order of arrival.
+
+    The sum is updated as samples are added and evicted, so adding a sample
+    costs O(1) and the sum and mean of the whole window are available without
+    going over the samples again. The median and percentiles need the window
+    sorted: it is sorted when one of them is first asked for after samples
+    were added, in O(n log n), and the order is kept until the next sample.
+    """
+
+    def __init__(self, size, values=()):
+        if size < 1:
+            raise ValueError("The size of a RingBuffer must be at least 1")
+        self.size = size
+        self.samples = collections.deque(maxlen=size)
+        self._ordered = []
+        self.sum = 0
+        for value in values:
+            self.append(value)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __iter__(self):
+        return iter(self.samples)
+
+    def __reversed__(self):
+        return reversed(self.samples)
+
+    def __eq__(self, other):
+        if not isinstance(other, RingBuffer):
+            return NotImplemented
+        return self.size == other.size and self.samples == other.samples
+
+    def __repr__(self):
+        return "RingBuffer({!r}, {!r})".format(self.size, list(self.samples))
+
+    def append(self, value):
+        """
+        Add a sample, evicting the oldest one if the buffer is full
+        """
+        if len(self.samples) == self.size:
+            self.sum -= self.samples[0]
+        self.samples.append(value)
+        self.sum += value
+        self._ordered = None
+
+    @property
+    def ordered(self):
+        """
+        The samples of the window in ascending order
+        """
+        if self._ordered is None:
+            self._ordered = sorted(self.samples)
+        return self._ordered
+
+    def last(self, num):
+        """
+        Return the ``num`` most recent samples, newest first
+        """
+        ret = []
+        for value in reversed(self.samples):
+            if len(ret) >= num:
+                break
+            ret.append(value)
+        return ret
+
+    def mean(self):
+        return self.sum / len(self.samples)
+
+    def median_low(self):
+        return self.ordered[(len(self.ordered) - 1) // 2]
+
+    def median_high(self):
+        return self.ordered[len(self.ordered) // 2]
+
+    def median(self):
+        if len(self.ordered) % 2:
+            return self.median_low()
+        return (self.median_low() + self.median_high()) / 2
+
+    def percentile(self, percent):
+        """
+        Return the sample at the given percentile of the window
+        """
+        return percentile(self.ordered, percent)
@@ -12,6 +12,8 @@ import logging
 import re
 
 # Import Salt libs
+import salt.utils.data
+from salt.defaults import DEFAULT_TARGET_DELIM
 from salt.ext import six
 
 # Try to import range from https://github.com/ytoolshed/range
@@ -33,6 +35,10 @@ def targets(conditioned_raw, tgt, tgt_type, ipv="ipv4"):
     return rmatcher.targets()
 
 
+# Characters which make a glob match more than one name
+_GLOB_CHARS = re.compile(r"[*?[]")
+
+
 def _tgt_set(tgt):
     """
     Return the tgt as a set of literal names
@@ -80,6 +86,11 @@ class RosterMatcher(object):
         """
         Return minions that match via glob
         """
+        if self.tgt == "*":
+            return self._ret_minions(iter)
+        if not _GLOB_CHARS.search(self.tgt):
+            # A single name, look it up instead of matching every name
+            return self._ret_minions(_tgt_set([self.tgt]).intersection)
         fnfilter = functools.partial(fnmatch.filter, pat=self.tgt)
         return self._ret_minions(fnfilter)
 
@@ -98,6 +109,43 @@ class RosterMatcher(object):
         tgt = _tgt_set(self.tgt)
         return self._ret_minions(tgt.intersection)
 
+    def _ret_grain_minions(self, regex_match):
+        """
+        Return minions whose roster grains match
+        """
+        default_grains = __opts__.get("roster_defaults", {}).get("grains") or {}
+
+        def grainfilter(raw):
+            for minion, data in six.iteritems(raw):
+                grains = default_grains
+                if isinstance(data, dict) and data.get("grains"):
+                    grains = data["grains"]
+                if grains and salt.utils.data.subdict_match(
+                    grains,
+                    self.tgt,
+                    delimiter=DEFAULT_TARGET_DELIM,
+                    regex_match=regex_match,
+                ):
+                    yield minion
+
+        return self._ret_minions(grainfilter)
+
+    def ret_grain_minions(self):
+        """
+        Return minions whose grains set in the roster match via glob
+
+        .. versionadded:: Aluminium
+        """
+        return self._ret_grain_minions(False)
+
+    def ret_grain_pcre_minions(self):
+        """
+        Return minions whose grains set in the roster match via pcre
+
+        .. versionadded:: Aluminium
+        """
+        return self._ret_grain_minions(True)
+
     def ret_nodegroup_minions(self):
         """
         Return minions which match the special list-only groups defined by
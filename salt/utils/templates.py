@@ -11,6 +11,7 @@ from pathlib import Path
 
 import jinja2
 import jinja2.ext
+import salt.utils.cache
 import salt.utils.data
 import salt.utils.dateutils
 import salt.utils.files
@@ -49,6 +50,11 @@ TEMPLATE_DIRNAME = os.path.join(saltpath[0], "templates")
 SLS_ENCODING = "utf-8"  # this one has no BOM.
 SLS_ENCODER = codecs.getencoder(SLS_ENCODING)
 
+# Compiled Jinja code, keyed on the template source and environment options.
+# Only used by callers which render the same template source repeatedly,
+# such as the reactor.
+JINJA_CODE_CACHE = salt.utils.cache.LRUCache(256)
+
 
 class AliasedLoader:
     """
@@ -376,6 +382,26 @@ def _get_jinja_error(trace, context=None):
     return line, out
 
 
+def _cached_template(jinja_env, env_args, tmplstr):
+    """
+    Return a template for ``tmplstr`` bound to ``jinja_env``, reusing the
+    compiled code from a previous render of the same source and environment
+    options when available.
+    """
+    key = salt.utils.hashutils.sha256_digest(
+        "{}{}".format(
+            repr(sorted((k, v) for k, v in env_args.items() if k != "loader")), tmplstr,
+        )
+    )
+    code = JINJA_CODE_CACHE.get(key)
+    if code is None:
+        code = jinja_env.compile(tmplstr)
+        JINJA_CODE_CACHE[key] = code
+    return jinja_env.template_class.from_code(
+        jinja_env, code, jinja_env.make_globals(None), None
+    )
+
+
 def render_jinja_tmpl(tmplstr, context, tmplpath=None):
     opts = context["opts"]
     saltenv = context["saltenv"]
@@ -493,7 +519,10 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
             decoded_context[key] = salt.utils.data.decode(value)
 
     try:
-        template = jinja_env.from_string(tmplstr)
+        if opts.get("_jinja_code_cache", False):
+            template = _cached_template(jinja_env, env_args, tmplstr)
+        else:
+            template = jinja_env.from_string(tmplstr)
         template.globals.update(decoded_context)
         output = template.render(**decoded_context)
     except jinja2.exceptions.UndefinedError as exc:
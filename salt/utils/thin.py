@@ -3,6 +3,8 @@ Generate the salt thin tarball from the installed python files
 """
 
 import copy
+import gzip
+import hashlib
 import logging
 import os
 import shutil
@@ -18,6 +20,7 @@ import salt
 import salt.exceptions
 import salt.ext.six as _six
 import salt.ext.tornado as tornado
+import salt.utils.atomicfile
 import salt.utils.files
 import salt.utils.hashutils
 import salt.utils.json
@@ -702,6 +705,202 @@ def thin_sum(cachedir, form="sha1"):
     return code_checksum, salt.utils.hashutils.get_hash(thintar, form)
 
 
+class _LayerCollector:
+    """
+    Record the files packed into a thin layer, standing in for the archive
+    the thin is packed into
+    """
+
+    def __init__(self):
+        self.files = []
+
+    def add(self, name, arcname=None):
+        self.files.append((os.path.abspath(name), arcname or name))
+
+
+def _collect_top(top, py_ver, collector, tempdirs):
+    """
+    Add the files of a top to a layer collector, the way :func:`gen_thin`
+    packs them
+    """
+    base = os.path.basename(top)
+    top_dirname = os.path.dirname(top)
+    if not os.path.isdir(top_dirname):
+        # This is likely a compressed python .egg
+        tempdir = tempfile.mkdtemp()
+        tempdirs.append(tempdir)
+        with zipfile.ZipFile(top_dirname) as egg:
+            egg.extractall(tempdir)
+        top_dirname = tempdir
+        top = os.path.join(tempdir, base)
+    site_pkg_dir = _is_shareable(base) and "pyall" or "py{}".format(py_ver)
+    if not os.path.isdir(top):
+        # top is a single file module
+        if os.path.exists(top):
+            collector.add(top, arcname=os.path.join(site_pkg_dir, base))
+        return
+    for root, dirs, files in salt.utils.path.os_walk(top, followlinks=True):
+        for name in files:
+            if not name.endswith((".pyc", ".pyo")):
+                path = os.path.join(root, name)
+                collector.add(
+                    path,
+                    arcname=os.path.join(
+                        site_pkg_dir, os.path.relpath(path, top_dirname)
+                    ),
+                )
+
+
+def _write_layer(layerdir, files, form):
+    """
+    Pack the ``(path, arcname)`` files of a layer into an archive named after
+    the digest of their names and contents, unless it already exists. Return
+    the digest and the checksum of the archive.
+    """
+    digest = getattr(hashlib, form)()
+    seen = set()
+    members = []
+    for path, arcname in sorted(files, key=lambda item: item[1]):
+        if arcname in seen:
+            continue
+        seen.add(arcname)
+        members.append((path, arcname))
+        digest.update(salt.utils.stringutils.to_bytes(arcname + "\0"))
+        digest.update(
+            salt.utils.stringutils.to_bytes(
+                salt.utils.hashutils.get_hash(path, form) + "\0"
+            )
+        )
+    digest = digest.hexdigest()
+    layer = os.path.join(layerdir, "{}.tgz".format(digest))
+    if not os.path.isfile(layer):
+        tmp_layer = _get_thintar_prefix(layer)
+        with salt.utils.files.fopen(tmp_layer, "wb") as fp_:
+            # No timestamp in the gzip header, identical layers stay identical
+            with gzip.GzipFile(fileobj=fp_, mode="wb", mtime=0) as gzp:
+                with tarfile.open(fileobj=gzp, mode="w", dereference=True) as tfp:
+                    for path, arcname in members:
+                        tfp.add(path, arcname=arcname)
+        shutil.move(tmp_layer, layer)
+    return digest, salt.utils.hashutils.get_hash(layer, form)
+
+
+def gen_thin_layers(
+    cachedir,
+    extra_mods="",
+    overwrite=False,
+    so_mods="",
+    extended_cfg=None,
+    form="sha1",
+):
+    """
+    Generate the salt-thin as content addressed layers instead of one
+    tarball: ``salt`` itself, its third party ``deps``, one layer per
+    alternative Salt version of ``extended_cfg`` and the small ``meta`` layer
+    with the ``salt-call`` script and the supported Python versions.
+
+    Layers are archives named after the digest of their content, so a layer
+    which did not change keeps its name across regenerations and only the
+    layers which changed have to be deployed again.
+
+    Returns the manifest of the layers, a list of
+    ``[name, digest, archive checksum]``.
+    """
+    layerdir = os.path.join(cachedir, "thin", "layers")
+    if not os.path.isdir(layerdir):
+        os.makedirs(layerdir)
+    manifest_path = os.path.join(layerdir, "manifest.json")
+    key = {
+        "version": salt.version.__version__,
+        "python": sys.version_info[0],
+        "extra_mods": extra_mods or "",
+        "so_mods": so_mods or "",
+        "extended_cfg": extended_cfg or {},
+        "form": form,
+    }
+    if not overwrite and os.path.isfile(manifest_path):
+        try:
+            with salt.utils.files.fopen(manifest_path, "r") as fp_:
+                manifest = salt.utils.json.load(fp_)
+            if manifest["key"] == salt.utils.json.loads(salt.utils.json.dumps(key)):
+                return manifest["layers"]
+        except (OSError, ValueError, KeyError) as exc:
+            log.debug("Regenerating the thin layers: %s", exc)
+
+    tops = get_tops(extra_mods=extra_mods or "", so_mods=so_mods or "")
+    layers = {"salt": _LayerCollector(), "deps": _LayerCollector()}
+    tempdirs = []
+    try:
+        for top in tops:
+            if not os.path.isabs(top):
+                continue
+            name = "salt" if os.path.basename(top) == "salt" else "deps"
+            _collect_top(top, sys.version_info[0], layers[name], tempdirs)
+
+        if extended_cfg:
+            alternatives = _LayerCollector()
+            try:  # cwd may not exist if it was removed but salt was run from it
+                start_dir = os.getcwd()
+            except OSError:
+                start_dir = None
+            try:
+                _pack_alternative(
+                    extended_cfg, salt.utils.hashutils.DigestCollector(), alternatives
+                )
+            finally:
+                if start_dir:
+                    os.chdir(start_dir)
+            for path, arcname in alternatives.files:
+                ns_ = arcname.split(os.sep, 1)[0]
+                layers.setdefault("alt-{}".format(ns_), _LayerCollector()).files.append(
+                    (path, arcname)
+                )
+
+        metadir = os.path.join(layerdir, "meta")
+        if not os.path.isdir(metadir):
+            os.makedirs(metadir)
+        meta = {
+            "version": salt.utils.stringutils.to_bytes(salt.version.__version__),
+            "salt-call": _get_salt_call("pyall", **_get_ext_namespaces(extended_cfg)),
+            "supported-versions": _get_supported_py_config(
+                tops={sys.version_info[0]: tops}, extended_cfg=extended_cfg
+            ),
+        }
+        layers["meta"] = _LayerCollector()
+        for name, data in meta.items():
+            with salt.utils.files.fopen(os.path.join(metadir, name), "wb") as fp_:
+                fp_.write(data)
+            layers["meta"].add(os.path.join(metadir, name), arcname=name)
+
+        manifest = []
+        for name in sorted(layers):
+            digest, archive_sum = _write_layer(layerdir, layers[name].files, form)
+            manifest.append([name, digest, archive_sum])
+    finally:
+        for tempdir in tempdirs:
+            shutil.rmtree(tempdir, ignore_errors=True)
+
+    # Drop the archives of the layers which are not used anymore
+    current = {"{}.tgz".format(digest) for _, digest, _ in manifest}
+    for fname in os.listdir(layerdir):
+        if fname.endswith(".tgz") and fname not in current:
+            try:
+                os.remove(os.path.join(layerdir, fname))
+            except OSError:
+                pass
+
+    with salt.utils.atomicfile.atomic_open(manifest_path, "w") as fp_:
+        salt.utils.json.dump({"key": key, "layers": manifest}, fp_)
+    return manifest
+
+
+def thin_layer_path(cachedir, digest):
+    """
+    Return the path of the archive of a thin layer
+    """
+    return os.path.join(cachedir, "thin", "layers", "{}.tgz".format(digest))
+
+
 def gen_min(
     cachedir,
     extra_mods="",
@@ -0,0 +1,130 @@
+import pytest
+import salt.returners.mysql as mysql
+import salt.utils.json
+from tests.support.mock import MagicMock, patch
+
+
+class _Error(Exception):
+    pass
+
+
+class _DatabaseError(_Error):
+    pass
+
+
+class _OperationalError(_DatabaseError):
+    pass
+
+
+class _IntegrityError(_DatabaseError):
+    pass
+
+
+@pytest.fixture
+def configure_loader_modules():
+    return {mysql: {"__opts__": {"id": "master"}, "__context__": {}}}
+
+
+@pytest.fixture
+def cursor():
+    """
+    Patch a mocked MySQLdb into the returner module
+    """
+    conn = MagicMock()
+    cursor = conn.cursor.return_value
+    mysqldb = MagicMock(
+        Error=_Error, DatabaseError=_DatabaseError, IntegrityError=_IntegrityError,
+    )
+    mysqldb.connect.return_value = conn
+    with patch.object(mysql, "MySQLdb", mysqldb), patch.object(
+        mysql, "OperationalError", _OperationalError, create=True
+    ):
+        yield cursor
+
+
+def _statements(cursor):
+    return [call[0][0] for call in cursor.execute.call_args_list]
+
+
+def test_event_return_executemany(cursor):
+    events = [{"tag": "salt/foo", "data": {"a": 1}}, {"tag": "salt/bar", "data": {}}]
+    mysql.event_return(events)
+    cursor.executemany.assert_called_once()
+    sql, rows = cursor.executemany.call_args[0]
+    assert sql == mysql.MYSQL_EVENT_SQL
+    assert [row[0] for row in rows] == ["salt/foo", "salt/bar"]
+    assert _statements(cursor) == ["COMMIT"]
+
+
+def test_returner_batch_executemany(cursor):
+    with patch.dict(mysql.__opts__, {"mysql.batch_window": 60, "mysql.batch_size": 2}):
+        for minion_id in ("minion1", "minion2"):
+            mysql.returner(
+                {
+                    "fun": "test.ping",
+                    "jid": "20201019112233445566",
+                    "id": minion_id,
+                    "return": True,
+                }
+            )
+    cursor.executemany.assert_called_once()
+    sql, rows = cursor.executemany.call_args[0]
+    assert sql == mysql.MYSQL_RETURN_SQL
+    assert [row[3] for row in rows] == ["minion1", "minion2"]
+
+
+def test_returner_batch_ret_config(cursor):
+    """
+    Batched returns go to the database of their ret_config profile
+    """
+    opts = {
+        "mysql.batch_window": 60,
+        "alternative.mysql.host": "alternative",
+        "alternative.mysql.batch_window": 60,
+    }
+    with patch.dict(mysql.__opts__, opts), patch.object(
+        mysql,
+        "__salt__",
+        {"config.option": lambda key, default=None: opts.get(key, default)},
+        create=True,
+    ):
+        mysql.returner(
+            {
+                "fun": "test.ping",
+                "jid": "20201019112233445566",
+                "id": "minion1",
+                "return": True,
+                "ret_config": "alternative",
+            }
+        )
+        batch = mysql.__context__["mysql_returner_batch_alternative_3306_salt_salt"]
+        batch.flush()
+    assert mysql.MySQLdb.connect.call_args[1]["host"] == "alternative"
+    cursor.executemany.assert_called_once()
+
+
+def test_save_minions(cursor):
+    cursor.fetchone.return_value = (
+        salt.utils.json.dumps({"fun": "test.ping", "Minions": ["minion1"]}),
+    )
+    mysql.save_minions("20201019112233445566", ["minion2", "minion1", "minion2"])
+    assert _statements(cursor) == [
+        mysql.MYSQL_LOCK_LOAD_SQL,
+        mysql.MYSQL_UPDATE_LOAD_SQL,
+        "COMMIT",
+    ]
+    load = salt.utils.json.loads(cursor.execute.call_args_list[1][0][1][0])
+    assert load["Minions"] == ["minion1", "minion2"]
+
+    # Nothing to update when the minions are already known
+    cursor.reset_mock()
+    cursor.fetchone.return_value = (salt.utils.json.dumps(load),)
+    mysql.save_minions("20201019112233445566", ["minion2"])
+    assert _statements(cursor) == [mysql.MYSQL_LOCK_LOAD_SQL, "COMMIT"]
+
+
+def test_rollback_on_any_error(cursor):
+    with pytest.raises(KeyError):
+        with mysql._get_serv(commit=True):
+            raise KeyError("boom")
+    assert _statements(cursor) == ["ROLLBACK"]
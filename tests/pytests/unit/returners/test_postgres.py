@@ -0,0 +1,129 @@
+import pytest
+import salt.returners.pgjsonb as pgjsonb
+import salt.returners.postgres as postgres
+from tests.support.mock import MagicMock, patch
+
+
+class _Error(Exception):
+    pass
+
+
+class _DatabaseError(_Error):
+    pass
+
+
+class _OperationalError(_DatabaseError):
+    pass
+
+
+class _IntegrityError(_DatabaseError):
+    pass
+
+
+@pytest.fixture
+def configure_loader_modules():
+    return {
+        postgres: {"__opts__": {"id": "master"}, "__context__": {}},
+        pgjsonb: {"__opts__": {"id": "master"}, "__context__": {}},
+    }
+
+
+@pytest.fixture(params=[postgres, pgjsonb], ids=["postgres", "pgjsonb"])
+def returner(request):
+    """
+    Patch a mocked psycopg2 into the returner module
+    """
+    module = request.param
+    conn = MagicMock(closed=False, prepared=set(), server_version=120000)
+
+    def _close():
+        conn.closed = True
+
+    conn.close.side_effect = _close
+    cursor = conn.cursor.return_value
+    cursor.connection = conn
+    cursor.fetchone.return_value = None
+    psycopg2 = MagicMock(
+        Error=_Error,
+        DatabaseError=_DatabaseError,
+        OperationalError=_OperationalError,
+        IntegrityError=_IntegrityError,
+    )
+    psycopg2.connect.return_value = conn
+    with patch.object(module, "psycopg2", psycopg2, create=True), patch.object(
+        module, "_PreparedConnection", object, create=True
+    ):
+        yield module, psycopg2, conn, cursor
+
+
+def _statements(cursor):
+    return [call[0][0] for call in cursor.execute.call_args_list]
+
+
+def test_event_return_execute_values(returner):
+    module, psycopg2, _, cursor = returner
+    events = [{"tag": "salt/foo", "data": {"a": 1}}, {"tag": "salt/bar", "data": {}}]
+    module.event_return(events)
+    execute_values = psycopg2.extras.execute_values
+    execute_values.assert_called_once()
+    args = execute_values.call_args[0]
+    assert args[0] is cursor
+    assert args[1] == module.PG_EVENT_SQL
+    assert [row[0] for row in args[2]] == ["salt/foo", "salt/bar"]
+    assert _statements(cursor) == ["COMMIT"]
+
+
+def test_save_load_prepared_once(returner):
+    module, psycopg2, conn, cursor = returner
+    module.save_load("20201019112233445566", {"fun": "test.ping"})
+    module.save_load("20201019112233445567", {"fun": "test.ping"})
+    # Only one connection was opened, and the statement prepared on it once
+    psycopg2.connect.assert_called_once()
+    # pgjsonb upserts the load on PostgreSQL 9.5 and later
+    name = "salt_save_load_upsert" if module is pgjsonb else "salt_save_load"
+    statements = _statements(cursor)
+    prepares = [stmt for stmt in statements if stmt.startswith("PREPARE")]
+    assert len(prepares) == 1
+    assert prepares[0].startswith("PREPARE {} ".format(name))
+    assert statements.count("EXECUTE {} (%s, %s)".format(name)) == 2
+    assert conn.prepared == {name}
+
+
+def test_save_minions_prepared(returner):
+    module, psycopg2, conn, cursor = returner
+    module.save_minions("20201019112233445566", ["minion1", "minion2"])
+    statements = _statements(cursor)
+    assert any(stmt.startswith("PREPARE salt_save_minions ") for stmt in statements)
+    assert (
+        "jsonb_agg(DISTINCT minion)" in module.PG_PREPARED_SQL["salt_save_minions"][1]
+    )
+    assert "EXECUTE salt_save_minions (%s, %s)" in statements
+    psycopg2.extras.Json.assert_called_once_with(["minion1", "minion2"])
+
+    # Older servers have no jsonb_set
+    cursor.reset_mock()
+    conn.server_version = 90400
+    module.save_minions("20201019112233445566", ["minion3"])
+    assert _statements(cursor) == ["COMMIT"]
+
+
+def test_rollback_on_any_error(returner):
+    """
+    A connection is only handed back to the pool outside of a transaction
+    """
+    module, _, conn, cursor = returner
+    with pytest.raises(KeyError):
+        with module._get_serv(commit=True):
+            raise KeyError("boom")
+    assert _statements(cursor) == ["ROLLBACK"]
+    pool_key = next(key for key in module.__context__ if key.endswith("_salt"))
+    assert module.__context__[pool_key] == [conn]
+
+    # A connection which can not roll back is dropped
+    cursor.reset_mock()
+    cursor.execute.side_effect = _Error("connection lost")
+    with pytest.raises(KeyError):
+        with module._get_serv(commit=True):
+            raise KeyError("boom")
+    assert conn.closed
+    assert module.__context__[pool_key] == []
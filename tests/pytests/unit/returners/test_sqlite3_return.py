@@ -0,0 +1,157 @@
+import shutil
+import sqlite3
+
+import pytest
+import salt.returners
+import salt.returners.sqlite3_return as sqlite3_return
+from tests.support.mock import patch
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = str(tmp_path / "salt.db")
+    conn = sqlite3.connect(database)
+    conn.execute("CREATE TABLE jids (jid TEXT PRIMARY KEY, load TEXT NOT NULL)")
+    conn.execute(
+        "CREATE TABLE salt_returns (fun TEXT KEY, jid TEXT KEY, id TEXT KEY, "
+        "fun_args TEXT, date TEXT NOT NULL, full_ret TEXT NOT NULL, "
+        "success TEXT NOT NULL)"
+    )
+    conn.commit()
+    conn.close()
+    return database
+
+
+@pytest.fixture
+def configure_loader_modules(database):
+    return {
+        sqlite3_return: {
+            "__opts__": {"sqlite3.database": database, "sqlite3.timeout": 5.0},
+            "__context__": {},
+        }
+    }
+
+
+def _ret(minion_id):
+    return {
+        "fun": "test.ping",
+        "jid": "20201019112233445566",
+        "id": minion_id,
+        "fun_args": [],
+        "return": True,
+        "success": True,
+    }
+
+
+def _count_returns(database):
+    conn = sqlite3.connect(database)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM salt_returns").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_returner_reuses_connection(database):
+    sqlite3_return.returner(_ret("minion1"))
+    pool = sqlite3_return.__context__["sqlite3_returner_pool_{}".format(database)]
+    assert len(pool) == 1
+    conn = pool[0]
+    sqlite3_return.returner(_ret("minion2"))
+    assert pool == [conn]
+    assert _count_returns(database) == 2
+
+
+def test_returner_batch(database):
+    with patch.dict(
+        sqlite3_return.__opts__, {"sqlite3.batch_window": 60, "sqlite3.batch_size": 3},
+    ):
+        sqlite3_return.returner(_ret("minion1"))
+        sqlite3_return.returner(_ret("minion2"))
+        assert _count_returns(database) == 0
+        sqlite3_return.returner(_ret("minion3"))
+        assert _count_returns(database) == 3
+
+        sqlite3_return.returner(_ret("minion4"))
+        batch = sqlite3_return.__context__["sqlite3_returner_batch_{}".format(database)]
+        assert batch.timer is not None
+        batch.flush()
+        assert batch.timer is None
+        assert _count_returns(database) == 4
+
+
+def test_returner_batch_ret_config(database, tmp_path):
+    """
+    Batched returns go to the database of their ret_config profile
+    """
+    alternative = str(tmp_path / "alternative.db")
+    shutil.copy(database, alternative)
+    ret = dict(_ret("minion1"), ret_config="alternative")
+    opts = dict(
+        sqlite3_return.__opts__,
+        **{
+            "sqlite3.batch_window": 60,
+            "alternative.sqlite3.database": alternative,
+            "alternative.sqlite3.timeout": 5.0,
+        }
+    )
+    with patch.dict(sqlite3_return.__opts__, opts), patch.object(
+        sqlite3_return,
+        "__salt__",
+        {"config.option": lambda key, default=None: opts.get(key, default)},
+        create=True,
+    ):
+        sqlite3_return.returner(ret)
+        sqlite3_return.returner(_ret("minion2"))
+        for key in (
+            "sqlite3_returner_batch_{}".format(db) for db in (database, alternative)
+        ):
+            sqlite3_return.__context__[key].flush()
+    assert _count_returns(database) == 1
+    assert _count_returns(alternative) == 1
+
+
+def test_save_minions():
+    jid = "20201019112233445566"
+    sqlite3_return.save_load(jid, {"fun": "test.ping", "Minions": ["minion1"]})
+    sqlite3_return.save_minions(jid, ["minion3", "minion1", "minion2"])
+    assert sqlite3_return.get_load(jid)["Minions"] == ["minion1", "minion2", "minion3"]
+    # Unknown jobs are left alone
+    sqlite3_return.save_minions("20201019000000000000", ["minion1"])
+    assert sqlite3_return.get_load("20201019000000000000") == {}
+
+
+def test_save_load_get_load():
+    sqlite3_return.save_load("20201019112233445566", {"fun": "test.ping"})
+    assert sqlite3_return.get_load("20201019112233445566") == {"fun": "test.ping"}
+    assert sqlite3_return.get_load("20201019000000000000") == {}
+
+
+def test_return_batch_flush_on_window():
+    flushed = []
+    batch = salt.returners.ReturnBatch(flushed.append, 0.01)
+    batch.add(1)
+    batch.add(2)
+    batch.timer.join(5)
+    assert flushed == [[1, 2]]
+    assert batch.rows == []
+
+
+def test_insert_returns_releases_connection_on_error(database):
+    row = {
+        "fun": "test.ping",
+        "jid": "20201019112233445566",
+        "id": "minion1",
+        "fun_args": None,
+        "date": "now",
+        "full_ret": "true",
+        "success": True,
+    }
+    with pytest.raises(sqlite3.Error):
+        # The second row misses a column, the whole batch is rolled back
+        sqlite3_return._insert_returns(
+            sqlite3_return._get_options(), [row, {"fun": "test.ping"}]
+        )
+    pool = sqlite3_return.__context__["sqlite3_returner_pool_{}".format(database)]
+    assert len(pool) == 1
+    assert not pool[0].in_transaction
+    assert _count_returns(database) == 0
@@ -0,0 +1,68 @@
+import queue
+
+import pytest
+import salt.master
+from tests.support.mock import patch
+
+
+def _items(count):
+    return [
+        ({"jid": "2020101911223344{:04d}".format(idx)}, None, False)
+        for idx in range(count)
+    ]
+
+
+@pytest.mark.parametrize("threads", [1, 2, 4])
+def test_job_cache_writer(threads):
+    """
+    Every queued return is written, by the configured number of writers,
+    before the writer returns
+    """
+    job_cache_queue = queue.Queue()
+    items = _items(20)
+    for item in items:
+        job_cache_queue.put(item)
+    job_cache_queue.put(None)
+    opts = {"master_job_cache_writer_threads": threads}
+    writer = salt.master.JobCacheWriter(opts, job_cache_queue)
+    started = []
+    start_threads = writer.start_threads
+
+    def _start_threads():
+        start_threads()
+        started.extend(writer.threads)
+
+    written = []
+    with patch("salt.minion.MasterMinion"), patch(
+        "salt.utils.job.write_job_cache",
+        side_effect=lambda opts, load, *args, **kwargs: written.append(load["jid"]),
+    ), patch.object(writer, "start_threads", _start_threads):
+        writer.run()
+    assert len(started) == (threads if threads > 1 else 0)
+    assert not any(thread.is_alive() for thread in started)
+    assert sorted(written) == [item[0]["jid"] for item in items]
+
+
+def test_job_cache_writer_signal():
+    """
+    Returns queued for the writer threads are written out on termination
+    """
+    job_cache_queue = queue.Queue()
+    items = _items(10)
+    opts = {"master_job_cache_writer_threads": 2}
+    writer = salt.master.JobCacheWriter(opts, job_cache_queue)
+    writer.mminion = None
+    written = []
+    with patch(
+        "salt.utils.job.write_job_cache",
+        side_effect=lambda opts, load, *args, **kwargs: written.append(load["jid"]),
+    ), patch("salt.utils.process.SignalHandlingProcess._handle_signals"):
+        writer.start_threads()
+        for item in items[:5]:
+            writer.dispatch(item)
+        for item in items[5:]:
+            job_cache_queue.put(item)
+        threads = list(writer.threads)
+        writer._handle_signals(15, None)
+    assert not any(thread.is_alive() for thread in threads)
+    assert sorted(written) == [item[0]["jid"] for item in items]
@@ -0,0 +1,113 @@
+import salt.config
+import salt.thorium
+import salt.utils.event
+import salt.utils.ringbuffer
+from tests.support.mock import MagicMock, patch
+
+
+def _thorstate(tmp_path, **opts):
+    master_opts = salt.config.master_config(None)
+    master_opts.update(
+        {
+            "cachedir": str(tmp_path / "cache"),
+            "sock_dir": str(tmp_path / "sock"),
+            "thorium_roots": {"base": [str(tmp_path / "thorium")]},
+        }
+    )
+    master_opts.update(opts)
+    with patch.object(salt.utils.event, "get_master_event", MagicMock()):
+        return salt.thorium.ThorState(master_opts)
+
+
+def _chunks(state, high):
+    return state.state.compile_high_data(high)
+
+
+def test_skips_unchanged_readers(tmp_path):
+    """
+    Register readers are only evaluated again once their register changed
+    """
+    state = _thorstate(tmp_path)
+    chunks = _chunks(
+        state,
+        {
+            "foo": {
+                "reg": [{"add": "bar"}, {"match": "my/event"}, "list"],
+                "__sls__": "test",
+                "__env__": "base",
+            },
+            "foo_check": {
+                "check": [
+                    {"name": "foo"},
+                    {"value": 1},
+                    {"require": [{"reg": "foo"}]},
+                    "len_gte",
+                ],
+                "__sls__": "test",
+                "__env__": "base",
+            },
+        },
+    )
+    event = {"tag": "my/event", "data": {"bar": 1}}
+    state.state.inject_globals["__events__"] = [event]
+    check_tag = "check_|-foo_check_|-foo_|-len_gte"
+    ret = state.state.call_chunks(chunks)
+    assert ret[check_tag]["result"] is True
+    assert state.stats["evaluated"] == 2
+    assert state.stats["skipped"] == 0
+
+    # No matching event, the register is unchanged and the check is skipped
+    state.state.inject_globals["__events__"] = [{"tag": "other", "data": {}}]
+    assert state.state.call_chunks(chunks)[check_tag] == ret[check_tag]
+    assert state.stats["evaluated"] == 3
+    assert state.stats["skipped"] == 1
+
+    state.state.inject_globals["__events__"] = [event]
+    state.state.call_chunks(chunks)
+    assert state.stats["evaluated"] == 5
+    assert state.stats["skipped"] == 1
+
+
+def test_register_snapshot(tmp_path):
+    """
+    The register survives a restart through its snapshot, sets and ring
+    buffers included
+    """
+    state = _thorstate(tmp_path, thorium_register_snapshot_interval=60)
+    state.state.inject_globals["__reg__"].update(
+        {
+            "foo": {"val": [1, 2]},
+            "bar": {"val": {"a", "b"}},
+            "baz": {"val": {"load": salt.utils.ringbuffer.RingBuffer(2, [1, 2, 3])}},
+        }
+    )
+    state.save_snapshot()
+
+    state = _thorstate(tmp_path, thorium_register_snapshot_interval=60)
+    assert state.state.inject_globals["__reg__"] == {
+        "foo": {"val": [1, 2]},
+        "bar": {"val": {"a", "b"}},
+        "baz": {"val": {"load": salt.utils.ringbuffer.RingBuffer(2, [2, 3])}},
+    }
+
+
+def test_register_versions():
+    """
+    Every write to a register bumps its version
+    """
+    register = salt.thorium.Register({"foo": {"val": []}})
+    versions = [register.versions["foo"]]
+    register["foo"]["val"].append(1)
+    register.touch("foo")
+    versions.append(register.versions["foo"])
+    register["foo"] = {"val": []}
+    versions.append(register.versions["foo"])
+    register.update(foo={"val": [2]}, bar={"val": 0})
+    versions.append(register.versions["foo"])
+    register.pop("foo")
+    versions.append(register.versions["foo"])
+    assert versions == sorted(set(versions))
+    # The register is unchanged by reading it
+    version = register.versions["bar"]
+    assert register["bar"] == {"val": 0}
+    assert register.versions["bar"] == version
@@ -0,0 +1,73 @@
+import pytest
+import salt.thorium.calc as calc
+import salt.thorium.reg as reg
+from tests.support.mock import patch
+
+
+@pytest.fixture
+def register():
+    return {}
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture(autouse=True)
+def thorium_globals(register, events):
+    # The thorium globals are not known to the loader module mocks
+    with patch.object(calc, "__reg__", register, create=True), patch.object(
+        reg, "__reg__", register, create=True
+    ), patch.object(reg, "__events__", events, create=True):
+        yield
+
+
+def test_ring_register(register, events):
+    """
+    reg.ring keeps the last values of each field and calc aggregates them
+    """
+    events.extend(
+        {"tag": "my/event", "data": {"load": value}} for value in (4, 8, "bogus", 6, 2)
+    )
+    ret = reg.ring("load", "load", "my/event", size=3)
+    assert ret["changes"] == {"load": 2}
+    assert list(register["load"]["val"]["load"]) == [8, 6, 2]
+
+    assert calc.mean("load", num=3)["changes"]["Answer"] == 16 / 3
+    assert calc.median("load", num=10, ref="load")["changes"]["Answer"] == 6
+    assert calc.add("load", num=2)["changes"]["Answer"] == 8
+    ret = calc.percentile("load", num=3, percent=100, maximum=7)
+    assert ret["changes"]["Answer"] == 8
+    assert ret["result"] is False
+
+
+def test_list_register_not_reordered(register):
+    """
+    calc does not reorder the list it reads
+    """
+    register["load"] = {"val": [1, 2, 3, 4]}
+    assert calc.add("load", num=2)["changes"]["Answer"] == 7
+    assert calc.add("load", num=2)["changes"]["Answer"] == 7
+    assert register["load"]["val"] == [1, 2, 3, 4]
+    assert calc.percentile("load", num=4, percent=50)["changes"]["Answer"] == 2
+
+
+def test_empty_ring_register(register, events):
+    """
+    calc returns an empty result until a ring register has values
+    """
+    ret = reg.ring("load", "load", "my/event", size=0)
+    assert ret["result"] is False
+    assert "load" not in register
+
+    reg.ring("load", "load", "my/event", size=3)
+    assert register["load"]["val"] == {}
+    for ref in (None, "load"):
+        ret = calc.mean("load", num=3, ref=ref, minimum=1)
+        assert ret["result"] is True
+        assert ret["changes"] == {
+            "Number of values": 0,
+            "Operator": "mean",
+            "Answer": None,
+        }
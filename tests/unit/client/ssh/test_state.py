@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import os
+import shutil
+import tarfile
+import tempfile
+
+import salt.client.ssh.state
+import salt.utils.files
+import salt.utils.json
+from tests.support.mock import MagicMock
+from tests.support.runtests import RUNTIME_VARS
+from tests.support.unit import TestCase
+
+
+class PrepTransTarTestCase(TestCase):
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        self.sls = os.path.join(self.cachedir, "foo.sls")
+        with salt.utils.files.fopen(self.sls, "w") as fp_:
+            fp_.write("foo: test.succeed_without_changes")
+        self.file_client = MagicMock()
+        self.file_client.opts = {
+            "cachedir": self.cachedir,
+            "ssh_state_pkg_cache": True,
+            "ssh_state_pkg_cache_ttl": 86400,
+        }
+        self.file_client.cache_file.side_effect = lambda name, *args, **kwargs: (
+            self.sls if name == "salt://foo.sls" else ""
+        )
+        self.file_client.cache_dir.return_value = []
+        self.chunks = [{"state": "test", "fun": "succeed_without_changes"}]
+
+    def _members(self, trans_tar):
+        ret = {}
+        with tarfile.open(trans_tar, "r:gz", ignore_zeros=True) as tfp:
+            for member in tfp.getmembers():
+                ret[member.name] = tfp.extractfile(member).read()
+        os.remove(trans_tar)
+        return ret
+
+    def test_shared_pkg(self):
+        """
+        Targets with the same low data and files share the state tarball, only
+        their pillar differs
+        """
+        trans_tars = []
+        for id_ in ("host1", "host2"):
+            trans_tars.append(
+                salt.client.ssh.state.prep_trans_tar(
+                    self.file_client,
+                    self.chunks,
+                    {"base": [["salt://foo.sls"]]},
+                    pillar={"id": id_},
+                    id_=id_,
+                )
+            )
+        pkgs = os.listdir(os.path.join(self.cachedir, "salt-ssh-state-pkgs"))
+        self.assertEqual(len(pkgs), 1)
+
+        for id_, trans_tar in zip(("host1", "host2"), trans_tars):
+            members = self._members(trans_tar)
+            self.assertEqual(
+                sorted(members), ["base/foo.sls", "lowstate.json", "pillar.json"]
+            )
+            self.assertEqual(salt.utils.json.loads(members["pillar.json"]), {"id": id_})
+            self.assertEqual(
+                salt.utils.json.loads(members["lowstate.json"]), self.chunks
+            )
+
+        # Other low data gets its own tarball
+        salt.client.ssh.state.prep_trans_tar(
+            self.file_client, [], {"base": [["salt://foo.sls"]]}, id_="host3"
+        )
+        pkgs = os.listdir(os.path.join(self.cachedir, "salt-ssh-state-pkgs"))
+        self.assertEqual(len(pkgs), 2)
+
+    def test_uncached_pkg(self):
+        self.file_client.opts["ssh_state_pkg_cache"] = False
+        trans_tar = salt.client.ssh.state.prep_trans_tar(
+            self.file_client,
+            self.chunks,
+            {"base": [["salt://foo.sls"]]},
+            pillar={"id": "host1"},
+            id_="host1",
+        )
+        self.assertEqual(
+            sorted(self._members(trans_tar)),
+            ["base/foo.sls", "lowstate.json", "pillar.json"],
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(self.cachedir, "salt-ssh-state-pkgs"))
+        )
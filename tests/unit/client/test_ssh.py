@@ -3,18 +3,21 @@
 """
 
 
+import asyncio
 import os
 import re
 import shutil
 import tempfile
 
 import salt.config
+import salt.exceptions
 import salt.roster
 import salt.utils.files
 import salt.utils.path
 import salt.utils.thin
 import salt.utils.yaml
 from salt.client import ssh
+from salt.defaults.exitcodes import EX_THIN_DEPLOY
 from tests.support.case import ShellCase
 from tests.support.helpers import slowTest
 from tests.support.mock import MagicMock, call, patch
@@ -201,6 +204,47 @@ class SSHSingleTests(TestCase):
             "-o User=root  date +%s",
         )
 
+    def test_control_persist(self):
+        """
+        ssh and scp commands share a master connection per host when
+        ssh_control_persist is set
+        """
+        self.opts["ssh_control_persist"] = 300
+        single = ssh.Single(
+            self.opts,
+            self.opts["argv"],
+            "localhost",
+            mods={},
+            fsclient=None,
+            thin=salt.utils.thin.thin_path(self.opts["cachedir"]),
+            mine=False,
+            **self.target
+        )
+        control_path = single.shell._control_path()
+        self.assertTrue(
+            control_path.startswith(os.path.join(self.tmp_cachedir, "ssh_control"))
+        )
+        control_opts = (
+            "-o ControlMaster=auto -o ControlPath={} "
+            "-o ControlPersist=300".format(control_path)
+        )
+        self.assertIn(control_opts, single.shell._cmd_str("date +%s"))
+        self.assertIn(control_opts, single.shell._cmd_str("a b:c", ssh="scp"))
+        self.assertTrue(os.path.isdir(os.path.dirname(control_path)))
+
+        self.target["host"] = "login2"
+        other = ssh.Single(
+            self.opts,
+            self.opts["argv"],
+            "localhost2",
+            mods={},
+            fsclient=None,
+            thin=salt.utils.thin.thin_path(self.opts["cachedir"]),
+            mine=False,
+            **self.target
+        )
+        self.assertNotEqual(other.shell._control_path(), control_path)
+
     def test_run_with_pre_flight(self):
         """
         test Single.run() when ssh_pre_flight is set
@@ -396,6 +440,90 @@ class SSHSingleTests(TestCase):
                 call("rm '.35d96ccac2ff.py'"),
             ] == mock_cmd.call_args_list
 
+    def test_cmd_block_async(self):
+        """
+        test Single.cmd_block_async() deploys the thin and retries like
+        Single.cmd_block()
+        """
+        target = dict(self.target, passwd=None)
+        single = ssh.Single(
+            self.opts,
+            self.opts["argv"],
+            "localhost",
+            mods={},
+            fsclient=None,
+            thin=salt.utils.thin.thin_path(self.opts["cachedir"]),
+            mine=False,
+            **target
+        )
+        self.assertTrue(single.can_run_async())
+
+        shim_rets = [
+            ("{}\ndeploy\n".format(ssh.RSTR), "", EX_THIN_DEPLOY),
+            ('{0}\n{{"local": true}}'.format(ssh.RSTR), ssh.RSTR + "\n", 0),
+        ]
+        exec_calls = []
+        send_calls = []
+
+        async def exec_cmd_async(cmd):
+            exec_calls.append(cmd)
+            return shim_rets[len(exec_calls) - 1]
+
+        async def send_async(local, remote, makedirs=False):
+            send_calls.append(remote)
+            return "", "", 0
+
+        patch_shim = patch.object(single, "_cmd_str", return_value="shim")
+        patch_exec = patch.object(single.shell, "exec_cmd_async", exec_cmd_async)
+        patch_send = patch.object(single.shell, "send_async", send_async)
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        with patch_shim, patch_exec, patch_send:
+            ret = loop.run_until_complete(single.run_async())
+        self.assertEqual(ret, ('{"local": true}', "", 0))
+        self.assertEqual(exec_calls, ["shim", "shim"])
+        self.assertEqual(send_calls, [os.path.join(single.thin_dir, "salt-thin.tgz")])
+
+        exec_cmd = MagicMock(side_effect=shim_rets)
+        with patch_shim, patch.object(single.shell, "exec_cmd", exec_cmd), patch.object(
+            single.shell, "send", MagicMock()
+        ) as send:
+            self.assertEqual(single.cmd_block(), ret)
+        self.assertEqual(send.call_count, 1)
+
+        def steps():
+            yield ("deploy_python",)
+
+        with patch.object(single, "_cmd_block_steps", steps):
+            with self.assertRaises(salt.exceptions.SaltClientError):
+                loop.run_until_complete(single.cmd_block_async())
+
+    def test_cmd_block_layers(self):
+        """
+        test Single.cmd_block() only deploys the thin layers the target misses
+        """
+        single = ssh.Single(
+            self.opts,
+            self.opts["argv"],
+            "localhost",
+            mods={},
+            fsclient=None,
+            thin=salt.utils.thin.thin_path(self.opts["cachedir"]),
+            mine=False,
+            **self.target
+        )
+        exec_cmd = MagicMock(
+            side_effect=[
+                ("{}\nlayers abc def\n".format(ssh.RSTR), "", EX_THIN_DEPLOY),
+                ('{0}\n{{"local": true}}'.format(ssh.RSTR), ssh.RSTR + "\n", 0),
+            ]
+        )
+        with patch.object(single, "_cmd_str", return_value="shim"), patch.object(
+            single.shell, "exec_cmd", exec_cmd
+        ), patch.object(single, "deploy_layers") as deploy_layers:
+            self.assertEqual(single.cmd_block(), ('{"local": true}', "", 0))
+        deploy_layers.assert_called_once_with(["abc", "def"])
+
     def test_run_ssh_pre_flight(self):
         """
         test Single.run_ssh_pre_flight
@@ -667,3 +795,47 @@ class SSHTests(ShellCase):
             assert client.parse_tgt["hostname"] == host
             assert client.parse_tgt["user"] == opts["ssh_user"]
             assert self.opts.get("ssh_cli_tgt") == host
+
+    @skipIf(not ssh.HAS_RESOURCE, "resource is not available")
+    def test_async_max_conns(self):
+        """
+        test ssh_async_max_conns being lowered to the open file limit
+        """
+        opts = self.opts
+        opts["tgt"] = "localhost"
+        opts["ssh_async_max_conns"] = 100
+        with patch(
+            "salt.utils.network.is_reachable_host", MagicMock(return_value=False)
+        ):
+            client = ssh.SSH(opts)
+        with patch("resource.getrlimit", return_value=(256, 4096)):
+            assert client._async_max_conns() == 48
+        with patch("resource.getrlimit", return_value=(65536, 65536)):
+            assert client._async_max_conns() == 100
+
+    def test_handle_ssh_async(self):
+        """
+        test handle_ssh dispatching the targets from an event loop
+        """
+        opts = self.opts
+        opts["tgt"] = "localhost"
+        opts["argv"] = ["test.ping"]
+        opts["ssh_async"] = True
+        with patch(
+            "salt.utils.network.is_reachable_host", MagicMock(return_value=False)
+        ):
+            client = ssh.SSH(opts)
+        client.targets = {"host1": {}, "host2": {}}
+
+        async def run_async(single):
+            return '{{"local": {{"return": "{}"}}}}'.format(single.id), "", 0
+
+        with patch("salt.client.ssh.Single.run_async", run_async), patch(
+            "salt.client.ssh.Single.can_run_async", return_value=True
+        ):
+            rets = list(client.handle_ssh())
+        assert sorted(rets, key=lambda ret: list(ret)[0]) == [
+            {"host1": {"return": "host1"}},
+            {"host2": {"return": "host2"}},
+        ]
+        assert client.targets["host1"]["host"] == "host1"
@@ -109,6 +109,31 @@ class RootsTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMix
 
         self.assertDictEqual(ret, {"hsum": hsum, "hash_type": "sha256"})
 
+    def test_file_hash_index(self):
+        """
+        The hash index written by update() is used as long as the file is
+        unchanged
+        """
+        roots.update()
+        path = str(self.tmp_state_tree / "testfile")
+        load = {"saltenv": "base", "path": "testfile"}
+        fnd = {"path": path, "rel": "testfile"}
+        with patch("salt.utils.hashutils.get_hash", return_value="bogus"):
+            ret = roots.file_hash(load, fnd)
+        with salt.utils.files.fopen(path, "rb") as fp_:
+            hsum = salt.utils.hashutils.sha256_digest(fp_.read())
+        self.assertDictEqual(ret, {"hsum": hsum, "hash_type": "sha256"})
+
+        # a file which changed after the index was written is hashed again
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        try:
+            with patch("salt.utils.hashutils.get_hash", return_value="bogus"):
+                ret = roots.file_hash(load, fnd)
+            self.assertEqual(ret["hsum"], "bogus")
+        finally:
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
     def test_file_list_emptydirs(self):
         empty_dir = self.tmp_state_tree / "empty_dir"
         if not empty_dir.is_dir():
@@ -173,6 +198,7 @@ class RootsTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMix
         # changes will always take place the first time during testing
         ret = roots.update()
         self.assertTrue(ret["changed"])
+        self.assertEqual(ret["saltenvs"], ["base"])
 
         # check if no changes took place
         ret = roots.update()
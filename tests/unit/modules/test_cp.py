@@ -104,6 +104,30 @@ class CpTestCase(TestCase, LoaderModuleMockMixin):
             with patch("salt.modules.cp.cache_file", MagicMock(return_value=dest)):
                 self.assertEqual(cp.get_file_str(path, dest), ret)
 
+    def test_hash_and_stat_list(self):
+        """
+        Test hash_and_stat_list reshaping the fileclient answer
+        """
+        client = MagicMock()
+        client.hash_and_stat_list.return_value = {
+            "hash_type": "sha256",
+            "hashes": {"foo/bar": "abc"},
+            "stats": {"foo/bar": [33188]},
+        }
+        with patch("salt.modules.cp._client", MagicMock(return_value=client)):
+            self.assertEqual(
+                cp.hash_and_stat_list(prefix="salt://foo?saltenv=dev"),
+                {"foo/bar": {"hsum": "abc", "hash_type": "sha256", "stat": [33188]}},
+            )
+            client.hash_and_stat_list.assert_called_once_with(
+                "dev", paths=None, prefix="foo"
+            )
+            client.hash_and_stat_list.return_value = None
+            self.assertEqual(cp.hash_and_stat_list("salt://foo/bar"), {})
+            client.hash_and_stat_list.assert_called_with(
+                "base", paths=["salt://foo/bar"], prefix=""
+            )
+
     def test_push_non_absolute_path(self):
         """
         Test if push fails on a non absolute path.
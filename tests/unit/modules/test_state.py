@@ -272,7 +272,7 @@ class MockTarFile:
         pass
 
     @staticmethod
-    def open(data, data1):
+    def open(data, data1, **kwargs):
         """
             Mock open method
         """
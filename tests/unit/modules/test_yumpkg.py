@@ -123,6 +123,38 @@ class YumTestCase(TestCase, LoaderModuleMockMixin):
                 self.assertTrue(pkgs.get(pkg_name))
                 self.assertEqual(pkgs[pkg_name], [pkg_version])
 
+    def test_list_pkgs_inventory_changed(self):
+        """
+        The packages are listed again once the rpm database changed, even if
+        they are in the context
+        """
+        rpm_out = "lzo_|-(none)_|-2.06_|-8.el7_|-x86_64_|-(none)_|-1487838479"
+        cmd_mock = MagicMock(return_value=rpm_out)
+        stamps = [
+            [["/var/lib/rpm/Packages", 1, 1]],
+            [["/var/lib/rpm/Packages", 1, 1]],
+            [["/var/lib/rpm/Packages", 2, 2]],
+        ]
+        with patch.dict(yumpkg.__salt__, {"cmd.run": cmd_mock}), patch.dict(
+            yumpkg.__salt__, {"pkg_resource.add_pkg": pkg_resource.add_pkg}
+        ), patch.dict(
+            yumpkg.__salt__,
+            {"pkg_resource.format_pkg_list": pkg_resource.format_pkg_list},
+        ), patch.dict(
+            yumpkg.__salt__, {"pkg_resource.stringify": MagicMock()}
+        ), patch.dict(
+            pkg_resource.__salt__, {"pkg.parse_arch": yumpkg.parse_arch}
+        ), patch(
+            "salt.utils.pkg.inventory_stamp", MagicMock(side_effect=stamps)
+        ), patch(
+            "salt.utils.pkg.cached_inventory",
+            MagicMock(side_effect=lambda *args, **kwargs: args[4]()),
+        ):
+            for _ in stamps:
+                pkgs = yumpkg.list_pkgs(versions_as_list=True)
+                self.assertEqual(pkgs, {"lzo": ["2.06-8.el7"]})
+        self.assertEqual(cmd_mock.call_count, 2)
+
     def test_list_pkgs_with_attr(self):
         """
         Test packages listing with the attr parameter
@@ -1104,8 +1136,10 @@ class YumTestCase(TestCase, LoaderModuleMockMixin):
         Test if no exception on removing not installed package
         """
         name = "foo"
+
         def list_pkgs_mock():
             return {}
+
         cmd_mock = MagicMock(
             return_value={"pid": 12345, "retcode": 0, "stdout": "", "stderr": ""}
         )
@@ -4,15 +4,18 @@
 from __future__ import absolute_import, print_function, unicode_literals
 
 import os
+import shutil
+import tempfile
 
 # Import Salt Libs
 import salt.config
 import salt.loader
 import salt.roster.ansible as ansible
+import salt.utils.files
 from tests.support import mixins
 
 # Import Salt Testing Libs
-from tests.support.mock import patch
+from tests.support.mock import MagicMock, patch
 from tests.support.runtests import RUNTIME_VARS
 from tests.support.unit import TestCase, skipIf
 
@@ -92,3 +95,49 @@ class AnsibleRosterTestCase(TestCase, mixins.LoaderModuleMockMixin):
         with patch.dict(ansible.__opts__, self.opts):
             ret = ansible.targets("*")
             assert ret == EXPECTED
+
+
+class AnsibleRosterCacheTestCase(TestCase, mixins.LoaderModuleMockMixin):
+    def setup_loader_modules(self):
+        return {ansible: {"__utils__": {}, "__opts__": {}}}
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.inventory = os.path.join(self.tmpdir, "roster.ini")
+        with salt.utils.files.fopen(self.inventory, "w") as fp_:
+            fp_.write("host1\n")
+        self.opts = {
+            "roster_file": self.inventory,
+            "cachedir": self.tmpdir,
+            "roster_cache": True,
+            "roster_cache_ttl": 3600,
+        }
+        self.gen = MagicMock(return_value={"all": {"hosts": ["host1"]}, "_meta": {}})
+
+    def test_roster_cache(self):
+        """
+        Test that the inventory is cached per set of arguments
+        """
+        with patch.dict(ansible.__opts__, self.opts), patch.dict(
+            ansible.__utils__, {"ansible.targets": self.gen}
+        ):
+            self.assertEqual(list(ansible.targets("*")), ["host1"])
+            self.assertEqual(list(ansible.targets("*")), ["host1"])
+            self.assertEqual(self.gen.call_count, 1)
+            ansible.targets("*", yaml=True)
+            self.assertEqual(self.gen.call_count, 2)
+            ansible.targets("*", yaml=True)
+            self.assertEqual(self.gen.call_count, 2)
+
+    def test_roster_cache_script(self):
+        """
+        Test that dynamic inventory scripts are never cached
+        """
+        os.chmod(self.inventory, 0o755)
+        with patch.dict(ansible.__opts__, self.opts), patch.dict(
+            ansible.__utils__, {"ansible.targets": self.gen}
+        ):
+            ansible.targets("*")
+            ansible.targets("*")
+            self.assertEqual(self.gen.call_count, 2)
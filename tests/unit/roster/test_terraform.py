@@ -3,6 +3,8 @@ unittests for terraform roster
 """
 # Import Python libs
 import os.path
+import shutil
+import tempfile
 
 # Import Salt Libs
 import salt.config
@@ -11,7 +13,7 @@ from salt.roster import terraform
 
 # Import Salt Testing Libs
 from tests.support.mixins import LoaderModuleMockMixin
-from tests.support.mock import patch
+from tests.support.mock import MagicMock, patch
 from tests.support.runtests import RUNTIME_VARS
 from tests.support.unit import TestCase
 
@@ -111,3 +113,44 @@ class TerraformTestCase(TestCase, LoaderModuleMockMixin):
 
             ret = terraform.targets("*web*")
             self.assertDictEqual(expected_result, ret)
+
+    def test_roster_cache(self):
+        """
+        Test that the parsed state file is cached until it is modified
+        """
+        tmpdir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        tfstate = os.path.join(tmpdir, "terraform.tfstate")
+        shutil.copy(
+            os.path.join(
+                os.path.dirname(__file__), "terraform.data", "terraform.tfstate"
+            ),
+            tfstate,
+        )
+        pki_dir = os.path.abspath(
+            os.path.join(os.path.dirname(__file__), "terraform.data")
+        )
+
+        with patch.dict(
+            terraform.__opts__,
+            {
+                "roster_file": tfstate,
+                "pki_dir": pki_dir,
+                "cachedir": tmpdir,
+                "roster_cache": True,
+                "roster_cache_ttl": 3600,
+            },
+        ):
+            ret = terraform.targets("*web*")
+            self.assertEqual(sorted(ret), ["web0", "web1"])
+
+            with patch.object(
+                terraform, "_parse_state_file", MagicMock(return_value={})
+            ) as parse:
+                self.assertEqual(terraform.targets("*web*"), ret)
+                parse.assert_not_called()
+
+                mtime = os.path.getmtime(tfstate)
+                os.utime(tfstate, (mtime + 10, mtime + 10))
+                self.assertEqual(terraform.targets("*web*"), {})
+                parse.assert_called_once_with(tfstate)
@@ -1,4 +1,5 @@
 import salt.states.pkg as pkg
+import salt.utils.state
 from salt.ext import six
 from salt.ext.six.moves import zip
 from tests.support.mixins import LoaderModuleMockMixin
@@ -18,7 +19,12 @@ class PkgTestCase(TestCase, LoaderModuleMockMixin):
     }
 
     def setup_loader_modules(self):
-        return {pkg: {"__grains__": {"os": "CentOS"}}}
+        return {
+            pkg: {
+                "__grains__": {"os": "CentOS"},
+                "__utils__": {"state.gen_tag": salt.utils.state.gen_tag},
+            }
+        }
 
     def test_uptodate_with_changes(self):
         """
@@ -268,3 +274,60 @@ class PkgTestCase(TestCase, LoaderModuleMockMixin):
                 pkg._fulfills_version_spec(installed_versions, operator, version),
                 msg,
             )
+
+    def test_mod_batch(self):
+        """
+        Test that only the pkg states free to run early are batched
+        """
+
+        def _chunk(id_, **kwargs):
+            chunk = {
+                "state": "pkg",
+                "fun": "installed",
+                "name": id_,
+                "__id__": id_,
+                "__sls__": "pkgs",
+                "__env__": "base",
+            }
+            chunk.update(kwargs)
+            return chunk
+
+        chunks = [
+            _chunk("foo", version="1.0"),
+            _chunk("baz"),
+            _chunk("bar", pkgs=[{"foo": "2.0"}, "bar"]),
+            _chunk("qux"),
+            _chunk("web", state="service", fun="running", prereq=[{"pkg": "qux"}]),
+            _chunk("quux", fun="removed"),
+            _chunk("db", state="service", fun="running"),
+            _chunk("corge", fun="removed"),
+        ]
+        low = pkg.mod_batch(chunks[0], chunks, {})
+        self.assertEqual(low["pkgs"], [{"foo": "1.0"}, "baz"])
+        self.assertNotIn("version", low)
+        self.assertEqual(
+            low["__batch__"],
+            {
+                "pkg_|-foo_|-foo_|-installed": ["foo"],
+                "pkg_|-baz_|-baz_|-installed": ["baz"],
+            },
+        )
+        self.assertTrue(chunks[1]["__batched__"])
+        self.assertNotIn("__batched__", chunks[2])
+
+        # Nothing is left to batch with the state
+        self.assertEqual(pkg.mod_batch(chunks[2], chunks, {}), chunks[2])
+
+        # Unrelated states in between do not end the batch, states which
+        # depend on a later pkg state keep it from running ahead of them
+        low = pkg.mod_batch(chunks[5], chunks, {})
+        self.assertEqual(low["pkgs"], ["quux", "corge"])
+        for chunk in chunks:
+            chunk.pop("__batched__", None)
+        chunks[6]["require"] = [{"pkg": "corge"}]
+        self.assertEqual(pkg.mod_batch(chunks[5], chunks, {}), chunks[5])
+        self.assertNotIn("__batched__", chunks[7])
+        low = pkg.mod_batch(
+            chunks[5], chunks, {"service_|-db_|-db_|-running": {"result": True}}
+        )
+        self.assertEqual(low["pkgs"], ["quux", "corge"])
@@ -7,9 +7,15 @@ import errno
 import logging
 import os
 import shutil
+import tempfile
+import time
 
+import salt.utils.compress
+import salt.utils.filedelta
 import salt.utils.files
+import salt.utils.hashutils
 from salt import fileclient
+from salt.utils.ctx import RequestContext
 from tests.support.mixins import (
     AdaptedConfigurationTestCaseMixin,
     LoaderModuleMockMixin,
@@ -87,6 +93,107 @@ class FileclientTestCase(TestCase):
         assert len(oversized_file_with_query_params) < 256
 
 
+class CacheIndexTestCase(TestCase):
+    """
+    Tests for the fileclient cache index
+    """
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        self.opts = {
+            "cachedir": self.cachedir,
+            "fileclient_cache_size_max": 0,
+            "fileclient_cache_ttl": 60,
+        }
+
+    def _cache(self, index, name, size):
+        path = os.path.join(self.cachedir, "files", "base", name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with salt.utils.files.fopen(path, "wb") as fp_:
+            fp_.write(b"x" * size)
+        index.update(path, {"hsum": name, "hash_type": "sha256"})
+        return path
+
+    def test_fresh(self):
+        index = fileclient.CacheIndex(self.opts)
+        path = self._cache(index, "foo", 10)
+        self.assertTrue(index.fresh(path))
+        self.assertFalse(index.fresh(path, generation=2))
+        with patch("time.time", MagicMock(return_value=time.time() + 120)):
+            self.assertFalse(index.fresh(path))
+        with salt.utils.files.fopen(path, "ab") as fp_:
+            fp_.write(b"changed")
+        self.assertFalse(index.fresh(path))
+
+    def test_fresh_generation(self):
+        self.opts["fileclient_cache_ttl"] = 0
+        self.opts["fileserver_generations"] = {"base": 1}
+        index = fileclient.CacheIndex(self.opts)
+        path = self._cache(index, "foo", 10)
+        self.assertFalse(index.fresh(path))
+        index.update(path, {"hsum": "foo", "hash_type": "sha256"}, generation=1)
+        with patch("time.time", MagicMock(return_value=time.time() + 120)):
+            self.assertTrue(index.fresh(path, generation=1))
+        self.assertFalse(index.fresh(path, generation=2))
+
+    def test_job_generations(self):
+        """
+        The generations published with a job are only seen by that job
+        """
+        self.opts["fileclient_cache_ttl"] = 0
+        index = fileclient.CacheIndex(self.opts)
+        self.assertFalse(index.enabled)
+        data = {"jid": "1", "fileserver_generations": {"base": 1}}
+        with RequestContext({"data": data, "opts": self.opts}):
+            self.assertEqual(fileclient.fileserver_generations(self.opts), {"base": 1})
+            self.assertTrue(index.enabled)
+        self.assertIsNone(fileclient.fileserver_generations(self.opts))
+        self.assertNotIn("fileserver_generations", self.opts)
+
+    def test_shared_and_evicted(self):
+        self.opts["fileclient_cache_size_max"] = 25
+        index = fileclient.CacheIndex(self.opts)
+        old = self._cache(index, "old", 10)
+        index.save()
+        other = fileclient.CacheIndex(self.opts)
+        self.assertEqual(other.get(old)[other.HSUM], "old")
+        new = self._cache(other, "new", 10)
+        other.save()
+
+        # The oldest file goes once the limit is reached
+        newest = self._cache(index, "newest", 10)
+        index.save()
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(new))
+        self.assertTrue(os.path.exists(newest))
+        self.assertEqual(sorted(index.entries), sorted([new, newest]))
+
+    def test_disabled(self):
+        """
+        Nothing is indexed unless the index is of use
+        """
+        self.opts["fileclient_cache_ttl"] = 0
+        index = fileclient.CacheIndex(self.opts)
+        path = self._cache(index, "foo", 10)
+        index.touch(path)
+        self.assertFalse(index.fresh(path))
+        index.save()
+        self.assertIsNone(index._entries)
+        self.assertFalse(os.path.exists(index.path))
+
+    def test_existing_files(self):
+        path = os.path.join(self.cachedir, "files", "base", "foo")
+        os.makedirs(os.path.dirname(path))
+        with salt.utils.files.fopen(path, "wb") as fp_:
+            fp_.write(b"foo")
+        index = fileclient.CacheIndex(self.opts)
+        self.assertEqual(index.get(path)[index.SIZE], 3)
+        # Not validated yet
+        self.assertFalse(index.fresh(path))
+
+
 SALTENVS = ("base", "dev")
 SUBDIR = "subdir"
 SUBDIR_FILES = ("foo.txt", "bar.txt", "baz.txt")
@@ -246,6 +353,79 @@ class FileclientCacheTest(
                     self.assertTrue(SUBDIR in content)
                     self.assertTrue(saltenv in content)
 
+    def test_cache_dir_bulk(self):
+        """
+        Ensure the files of a directory are fetched in parallel, and that
+        only the ones which changed are fetched again
+        """
+        patched_opts = {x: y for x, y in self.minion_opts.items()}
+        patched_opts.update(self.MOCKED_OPTS)
+        patched_opts["fileclient_prefetch_workers"] = 3
+        fetched = []
+        cache_file = fileclient.Client.cache_file
+
+        def _cache_file(client, path, *args, **kwargs):
+            fetched.append(path)
+            return cache_file(client, path, *args, **kwargs)
+
+        with patch.dict(fileclient.__opts__, patched_opts), patch.object(
+            fileclient.FSClient, "_parallel_fetch", True
+        ), patch.object(fileclient.FSClient, "cache_file", _cache_file):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            ret = client.cache_dir("salt://{}".format(SUBDIR), "base")
+            self.assertEqual(len(ret), len(SUBDIR_FILES))
+            self.assertEqual(len(fetched), len(SUBDIR_FILES))
+
+            path = os.path.join(self.FS_ROOT, "base", SUBDIR, SUBDIR_FILES[0])
+            with salt.utils.files.fopen(path, "w") as fp_:
+                fp_.write("changed")
+            del fetched[:]
+            self.assertEqual(
+                sorted(client.cache_dir("salt://{}".format(SUBDIR), "base")),
+                sorted(ret),
+            )
+            self.assertEqual(fetched, ["salt://{}/{}".format(SUBDIR, SUBDIR_FILES[0])])
+            cache_loc = os.path.join(
+                self.CACHE_ROOT, "files", "base", SUBDIR, SUBDIR_FILES[0]
+            )
+            with salt.utils.files.fopen(cache_loc) as fp_:
+                self.assertEqual(fp_.read(), "changed")
+
+    def test_hash_and_stat_list(self):
+        """
+        Ensure the hashes fetched in bulk are used instead of asking the
+        master again, until they expire
+        """
+        patched_opts = {x: y for x, y in self.minion_opts.items()}
+        patched_opts.update(self.MOCKED_OPTS)
+
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            path = "salt://{}/{}".format(SUBDIR, SUBDIR_FILES[0])
+            expected = client.hash_and_stat_file(path, "base")
+            # Not remembered unless fileclient_hash_batch_ttl is set
+            client.hash_and_stat_list("base", prefix=SUBDIR)
+            self.assertEqual(client._hash_batch, {})
+
+        patched_opts["fileclient_hash_batch_ttl"] = 60
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            ret = client.hash_and_stat_list("base", prefix=SUBDIR)
+            self.assertEqual(
+                sorted(ret["hashes"]),
+                sorted("{}/{}".format(SUBDIR, x) for x in SUBDIR_FILES),
+            )
+            ret = client.hash_and_stat_list("base", paths=[path, "salt://missing"])
+            self.assertEqual(list(ret["hashes"]), [path[7:]])
+
+            with patch.object(client.channel, "send") as send_mock:
+                self.assertEqual(client.hash_and_stat_file(path, "base"), expected)
+                self.assertEqual(client.hash_file(path, "base"), expected[0])
+                self.assertEqual(send_mock.call_count, 0)
+                with patch("time.time", MagicMock(return_value=time.time() + 3600)):
+                    client.hash_file(path, "base")
+                self.assertEqual(send_mock.call_count, 1)
+
     def test_cache_dir_with_alternate_cachedir_and_absolute_path(self):
         """
         Ensure entire directory is cached to correct location when an alternate
@@ -352,6 +532,134 @@ class FileclientCacheTest(
                 log.debug("content = %s", content)
                 self.assertTrue(saltenv in content)
 
+    def test_cache_file_delta(self):
+        """
+        Ensure a changed file is updated from the blocks which changed when
+        fileclient_delta_transfer is enabled
+        """
+        patched_opts = {x: y for x, y in self.minion_opts.items()}
+        patched_opts.update(self.MOCKED_OPTS)
+        patched_opts.update(
+            {"fileclient_delta_transfer": True, "file_buffer_size": 1024}
+        )
+        path = os.path.join(self.FS_ROOT, "base", "delta.bin")
+        content = os.urandom(20 * 1024 + 100)
+        with salt.utils.files.fopen(path, "wb") as fp_:
+            fp_.write(content)
+
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            cache_loc = client.cache_file("salt://delta.bin", "base")
+            content = content[:5000] + b"inserted" + content[5000:]
+            with salt.utils.files.fopen(path, "wb") as fp_:
+                fp_.write(content)
+            with patch(
+                "salt.utils.filedelta.apply", wraps=salt.utils.filedelta.apply
+            ) as apply_mock:
+                self.assertEqual(
+                    client.cache_file("salt://delta.bin", "base"), cache_loc
+                )
+            ops = [op for call in apply_mock.call_args_list for op in call[0][0]]
+            # Most of the file was copied from the cached copy
+            self.assertEqual(sum(isinstance(op, int) for op in ops), 19)
+            with salt.utils.files.fopen(cache_loc, "rb") as fp_:
+                self.assertEqual(fp_.read(), content)
+
+            # Over several requests, the signatures are only sent once
+            content = b"changed" + content
+            with salt.utils.files.fopen(path, "wb") as fp_:
+                fp_.write(content)
+            delta = salt.utils.filedelta.delta
+            loads = []
+            send = client.channel.send
+
+            def _send(load, **kwargs):
+                loads.append(dict(load))
+                return send(load, **kwargs)
+
+            with patch(
+                "salt.utils.filedelta.delta", lambda *args: delta(*args, max_scan=4096),
+            ), patch.object(client.channel, "send", _send):
+                self.assertEqual(
+                    client.cache_file("salt://delta.bin", "base"), cache_loc
+                )
+            loads = [load for load in loads if load["cmd"] == "_serve_file_delta"]
+            self.assertGreater(len(loads), 1)
+            self.assertIn("sigs", loads[0])
+            self.assertTrue(all("sigs" not in load for load in loads[1:]))
+            self.assertTrue(all("token" in load for load in loads[1:]))
+            with salt.utils.files.fopen(cache_loc, "rb") as fp_:
+                self.assertEqual(fp_.read(), content)
+            self.assertEqual(
+                os.listdir(os.path.join(patched_opts["cachedir"], "file_delta")), []
+            )
+
+    def test_get_file_precompressed(self):
+        """
+        Ensure a file asked to be compressed is served from a compressed copy
+        of it when file_precompress is enabled, and that it is only
+        compressed once
+        """
+        patched_opts = {x: y for x, y in self.minion_opts.items()}
+        patched_opts.update(self.MOCKED_OPTS)
+        patched_opts.update(
+            {
+                "file_precompress": True,
+                "file_precompress_min_size": 0,
+                "file_buffer_size": 1024,
+            }
+        )
+        path = os.path.join(self.FS_ROOT, "base", "compressed.txt")
+        content = b"compressible line\n" * 2000
+        with salt.utils.files.fopen(path, "wb") as fp_:
+            fp_.write(content)
+
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            cdir = os.path.join(self.CACHE_ROOT, "file_precompress", "gzip")
+            hsum = salt.utils.hashutils.get_hash(path, patched_opts["hash_type"])
+            with patch(
+                "salt.utils.compress.compress_file",
+                wraps=salt.utils.compress.compress_file,
+            ) as compress_mock, patch(
+                "salt.utils.compress.Decompressor",
+                wraps=salt.utils.compress.Decompressor,
+            ) as decomp_mock:
+                for _ in range(3):
+                    cache_loc = client.get_file(
+                        "salt://compressed.txt", saltenv="base", gzip=5
+                    )
+                    with salt.utils.files.fopen(cache_loc, "rb") as fp_:
+                        self.assertEqual(fp_.read(), content)
+                    os.remove(cache_loc)
+                    # The first request is served uncompressed while the
+                    # compressed copy is written in the background
+                    for _ in range(100):
+                        if os.listdir(cdir) == [hsum]:
+                            break
+                        time.sleep(0.1)
+            self.assertEqual(compress_mock.call_count, 1)
+            self.assertEqual(decomp_mock.call_count, 2)
+            self.assertEqual(os.listdir(cdir), [hsum])
+
+    def test_cache_file_ttl(self):
+        """
+        Ensure a cached file is used without asking the master again within
+        fileclient_cache_ttl
+        """
+        patched_opts = {x: y for x, y in self.minion_opts.items()}
+        patched_opts.update(self.MOCKED_OPTS)
+        patched_opts["fileclient_cache_ttl"] = 60
+
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            cache_loc = client.cache_file("salt://foo.txt", "base")
+            with patch.object(client, "hash_and_stat_file") as hash_mock:
+                self.assertEqual(client.cache_file("salt://foo.txt", "base"), cache_loc)
+                self.assertEqual(hash_mock.call_count, 0)
+            client.cache_index.save()
+            self.assertIn(cache_loc, fileclient.CacheIndex(patched_opts).entries)
+
     def test_cache_file_with_alternate_cachedir_and_absolute_path(self):
         """
         Ensure file is cached to correct location when an alternate cachedir is
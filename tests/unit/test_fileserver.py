@@ -11,6 +11,7 @@ import salt.utils.files
 from salt import fileserver
 from tests.support.helpers import with_tempdir
 from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.mock import patch
 from tests.support.unit import TestCase
 
 
@@ -67,3 +68,75 @@ class VCSBackendWhitelistCase(TestCase):
         assert (
             ret[1] is True
         ), "Cache file list cache file is not refreshed when future modification time"
+
+    @with_tempdir()
+    def test_file_list_cache_index(self, cachedir):
+        """
+        The file list cache is only deserialized again once it was replaced
+        """
+        opts = {
+            "fileserver_backend": ["roots"],
+            "cachedir": cachedir,
+            "extension_modules": "",
+        }
+        list_cache = os.path.join(cachedir, "base.p")
+        w_lock = os.path.join(cachedir, ".base.w")
+        fileserver.write_file_list_cache(
+            opts, {"files": ["a", "b/c"]}, list_cache, w_lock
+        )
+        assert not os.path.exists(w_lock)
+        with patch("salt.payload.Serial.load") as load:
+            ret = fileserver.check_file_list_cache(opts, "files", list_cache, w_lock)
+            load.assert_not_called()
+        assert ret == (["a", "b/c"], False, False)
+
+        fileserver._FILE_LIST_INDEX.clear()
+        ret = fileserver.check_file_list_cache(opts, "files", list_cache, w_lock)
+        assert ret == (["a", "b/c"], False, False)
+
+
+class GenerationsTestCase(TestCase):
+    @with_tempdir()
+    def test_bump_generations(self, cachedir):
+        """
+        Generations only ever increase and ``*`` applies to all saltenvs
+        """
+        opts = {"cachedir": cachedir}
+        assert fileserver.read_generations(opts) == {}
+        assert fileserver.generation({}, "base") is None
+
+        gens = fileserver.bump_generations(opts, ["base"])
+        assert fileserver.read_generations(opts) == gens
+        fileserver._FILE_LIST_INDEX.clear()
+        assert fileserver.read_generations(opts) == gens
+        with patch("time.time", return_value=0):
+            new_gens = fileserver.bump_generations(opts, ["base", "dev"])
+        assert new_gens["base"] == gens["base"] + 1
+        assert new_gens["dev"] == 1
+
+        new_gens = fileserver.bump_generations(opts, ["*"])
+        assert fileserver.generation(new_gens, "base") == new_gens["*"]
+        assert fileserver.generation(new_gens, "prod") == new_gens["*"]
+
+        # Not published when files can change outside of an update
+        opts["fileserver_backend"] = ["roots", "gitfs"]
+        assert fileserver.read_generations(opts) == new_gens
+        opts["fileserver_backend"] = ["roots", "minionfs"]
+        assert fileserver.read_generations(opts) == {}
+
+    def test_changed_saltenvs(self):
+        assert fileserver.changed_saltenvs({"changed": False}) == []
+        assert fileserver.changed_saltenvs({"changed": True, "saltenvs": ["base"]}) == [
+            "base"
+        ]
+        assert fileserver.changed_saltenvs({"changed": True}) == ["*"]
+        assert fileserver.changed_saltenvs(None) == ["*"]
+
+
+class PrefixFilterTestCase(TestCase):
+    def test_prefix_filter(self):
+        paths = sorted(["a", "ab", "b", "b/c", "b/d", "ba", "c"])
+        for prefix in ("", "a", "b", "b/", "bb", "c", "d"):
+            assert fileserver.prefix_filter(paths, prefix) == [
+                path for path in paths if path.startswith(prefix)
+            ]
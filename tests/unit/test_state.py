@@ -8,8 +8,10 @@ import tempfile
 
 import salt.exceptions
 import salt.state
+import salt.states.pkg
 import salt.utils.files
 import salt.utils.platform
+import salt.utils.state
 from salt.exceptions import CommandExecutionError
 from salt.utils.decorators import state as statedecorators
 from salt.utils.odict import OrderedDict
@@ -804,6 +806,169 @@ class StateCompilerTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
                 self.assertEqual(sub_state["__state_ran__"], True)
                 self.assertEqual(sub_state["__sls__"], "external")
 
+    def test_prefetch_sources(self):
+        """
+        Test that the salt:// sources of the chunks are cached in bulk
+        """
+        chunks = [
+            {
+                "state": "file",
+                "fun": "managed",
+                "__env__": "base",
+                "source": ["salt://foo", "salt://bar"],
+            },
+            {
+                "state": "file",
+                "fun": "managed",
+                "__env__": "base",
+                "source": [{"salt://baz": "sha256=abc"}],
+            },
+            {
+                "state": "file",
+                "fun": "managed",
+                "__env__": "dev",
+                "source": "salt://foo",
+            },
+            {
+                "state": "file",
+                "fun": "managed",
+                "__env__": "base",
+                "source": "/tmp/qux",
+            },
+            {
+                "state": "file",
+                "fun": "recurse",
+                "__env__": "base",
+                "source": "salt://dir",
+                "include_pat": "*.conf",
+            },
+            {"state": "cmd", "fun": "run", "__env__": "base", "name": "true"},
+        ]
+        with patch("salt.state.State._gather_pillar"):
+            state_obj = salt.state.State(self.get_temp_config("minion"))
+        cache_files = MagicMock()
+        cache_dir = MagicMock()
+        with patch.dict(
+            state_obj.functions,
+            {"cp.cache_files": cache_files, "cp.cache_dir": cache_dir},
+        ):
+            state_obj.prefetch_sources(chunks)
+        cache_files.assert_any_call(["salt://foo", "salt://baz"], "base")
+        cache_files.assert_any_call(["salt://foo"], "dev")
+        self.assertEqual(cache_files.call_count, 2)
+        cache_dir.assert_called_once_with(
+            "salt://dir",
+            "base",
+            include_empty=False,
+            include_pat="*.conf",
+            exclude_pat=None,
+        )
+
+    def test_state_batch(self):
+        """
+        Test that the pkg states without requisites are applied in one
+        transaction and that each of them gets its own changes
+        """
+        calls = []
+
+        def installed(name, pkgs=None, **kwargs):
+            names = pkgs or [name]
+            calls.append(names)
+            return {
+                "name": name,
+                "result": True,
+                "comment": "Installed",
+                "changes": {pkg: {"old": "", "new": "1.0"} for pkg in names},
+            }
+
+        def _chunk(id_, order, **kwargs):
+            chunk = {
+                "state": "pkg",
+                "fun": "installed",
+                "name": id_,
+                "__id__": id_,
+                "__sls__": "pkgs",
+                "__env__": "base",
+                "order": order,
+            }
+            chunk.update(kwargs)
+            return chunk
+
+        chunks = [
+            _chunk("foo", 1),
+            _chunk("bar", 2, pkgs=["bar", "baz"]),
+            _chunk("repo", 3, require=[{"pkg": "foo"}]),
+            _chunk("quux", 4),
+            _chunk("cfg", 5, require=[{"pkg": "corge"}]),
+            _chunk("corge", 6),
+            _chunk("qux", 7, fromrepo="other"),
+        ]
+        with patch("salt.state.State._gather_pillar"):
+            minion_opts = self.get_temp_config("minion")
+            minion_opts["state_batch"] = ["pkg"]
+            state_obj = salt.state.State(minion_opts)
+        with patch.dict(
+            state_obj.states,
+            {"pkg.installed": installed, "pkg.mod_batch": salt.states.pkg.mod_batch},
+        ), patch.object(
+            salt.states.pkg,
+            "__utils__",
+            {"state.gen_tag": salt.utils.state.gen_tag},
+            create=True,
+        ), patch.object(
+            state_obj, "module_refresh"
+        ):
+            ret = state_obj.call_chunks(chunks)
+        self.assertEqual(
+            calls,
+            [["foo", "bar", "baz", "quux"], ["repo"], ["corge"], ["cfg"], ["qux"]],
+        )
+        changes = {
+            salt.state.split_low_tag(tag)["name"]: sorted(state_ret["changes"])
+            for tag, state_ret in ret.items()
+        }
+        self.assertEqual(
+            changes,
+            {
+                "foo": ["foo"],
+                "bar": ["bar", "baz"],
+                "repo": ["repo"],
+                "quux": ["quux"],
+                "cfg": ["cfg"],
+                "corge": ["corge"],
+                "qux": ["qux"],
+            },
+        )
+        self.assertTrue(all(state_ret["result"] for state_ret in ret.values()))
+
+        # When the batch fails, its states are run one by one
+        def failing(name, pkgs=None, **kwargs):
+            ret = installed(name, pkgs, **kwargs)
+            ret["result"] = "baz" not in (pkgs or [name])
+            return ret
+
+        del calls[:]
+        with patch.dict(
+            state_obj.states,
+            {"pkg.installed": failing, "pkg.mod_batch": salt.states.pkg.mod_batch},
+        ), patch.object(
+            salt.states.pkg,
+            "__utils__",
+            {"state.gen_tag": salt.utils.state.gen_tag},
+            create=True,
+        ), patch.object(
+            state_obj, "module_refresh"
+        ):
+            ret = state_obj.call_chunks(
+                [_chunk(id_, order) for order, id_ in enumerate(["foo", "baz"])]
+            )
+        self.assertEqual(calls, [["foo", "baz"], ["foo"], ["baz"]])
+        results = {
+            salt.state.split_low_tag(tag)["name"]: state_ret["result"]
+            for tag, state_ret in ret.items()
+        }
+        self.assertEqual(results, {"foo": True, "baz": False})
+
 
 class HighStateTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
     def setUp(self):
@@ -53,6 +53,24 @@ class CacheDictTestCase(TestCase):
         self.assertRaises(KeyError, cd.__getitem__, "foo")
 
 
+class LRUCacheTestCase(TestCase):
+    def test_eviction(self):
+        """
+        Make sure the least recently used key is evicted when full
+        """
+        lru = cache.LRUCache(2)
+        lru["foo"] = 1
+        lru["bar"] = 2
+        # touch foo so that bar becomes the least recently used key
+        self.assertEqual(lru["foo"], 1)
+        lru["baz"] = 3
+        self.assertEqual(len(lru), 2)
+        self.assertIn("foo", lru)
+        self.assertIn("baz", lru)
+        self.assertNotIn("bar", lru)
+        self.assertIsNone(lru.get("bar"))
+
+
 class CacheContextTestCase(TestCase):
     def setUp(self):
         context_dir = os.path.join(tempfile.gettempdir(), "context")
@@ -0,0 +1,45 @@
+"""
+Unit tests for salt.utils.compress
+"""
+
+import os
+
+import salt.utils.compress
+import salt.utils.files
+from tests.support.mock import patch
+from tests.support.runtests import RUNTIME_VARS
+from tests.support.unit import TestCase
+
+
+class DecompressorTestCase(TestCase):
+    def setUp(self):
+        self.src = os.path.join(RUNTIME_VARS.TMP, "compress_src")
+        self.dest = os.path.join(RUNTIME_VARS.TMP, "compress_dest")
+        self.content = os.urandom(4096) * 4
+        with salt.utils.files.fopen(self.src, "wb") as fp_:
+            fp_.write(self.content)
+
+    def tearDown(self):
+        for path in (self.src, self.dest):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_eof(self):
+        for codec in salt.utils.compress.available_codecs():
+            salt.utils.compress.compress_file(self.src, self.dest, codec)
+            with salt.utils.files.fopen(self.dest, "rb") as fp_:
+                data = fp_.read()
+            decomp = salt.utils.compress.Decompressor(codec)
+            out = decomp.decompress(data[:-8])
+            self.assertFalse(decomp.eof)
+            out += decomp.decompress(data[-8:])
+            self.assertTrue(decomp.eof)
+            self.assertEqual(out, self.content)
+
+    def test_eof_unknown(self):
+        """
+        A stream is not taken as complete when the decompressor cannot tell
+        """
+        decomp = salt.utils.compress.Decompressor("gzip")
+        with patch.object(decomp, "_obj", object()):
+            self.assertFalse(decomp.eof)
@@ -9,6 +9,8 @@
 import hashlib
 import os
 import shutil
+import signal
+import tempfile
 import time
 
 import salt.config
@@ -22,6 +24,7 @@ from salt.ext.tornado.testing import AsyncTestCase
 from saltfactories.utils.processes import terminate_process
 from tests.support.events import eventpublisher_process, eventsender_process
 from tests.support.helpers import slowTest
+from tests.support.mock import MagicMock, patch
 from tests.support.runtests import RUNTIME_VARS
 from tests.support.unit import TestCase, expectedFailure, skipIf
 
@@ -358,3 +361,108 @@ class TestEventReturn(TestCase):
         finally:
             if evt is not None:
                 terminate_process(evt.pid, kill_children=True)
+
+    def _event_return(self, **opts):
+        tmpdir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        master_opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+        master_opts.update(cachedir=tmpdir, event_return="mysql")
+        master_opts.update(opts)
+        with patch("salt.minion.MasterMinion", MagicMock()):
+            evt = salt.utils.event.EventReturn(master_opts)
+        evt.minion.returners = {"mysql.event_return": MagicMock()}
+        return evt
+
+    def test_event_return_flush_without_writers(self):
+        evt = self._event_return()
+        events = [{"tag": "salt/foo", "data": {"a": 1}}]
+        evt.event_queue.extend(events)
+        evt.flush_events()
+        evt.minion.returners["mysql.event_return"].assert_called_once_with(events)
+        self.assertEqual(evt.event_queue, [])
+        self.assertEqual(evt.stats["events_written"], 1)
+        self.assertEqual(evt.stats["batches_written"], 1)
+
+    def test_event_return_spool_and_replay(self):
+        evt = self._event_return(event_return_spool=True)
+        returner = evt.minion.returners["mysql.event_return"]
+        returner.side_effect = Exception("database is down")
+        first = [{"tag": "salt/foo", "data": {"a": 1}}]
+        evt.event_queue.extend(first)
+        evt.flush_events()
+        spool_path = os.path.join(evt.spool_dir, "mysql")
+        self.assertEqual(len(os.listdir(spool_path)), 1)
+        self.assertEqual(evt.stats["batches_spooled"], 1)
+
+        returner.side_effect = None
+        returner.reset_mock()
+        second = [{"tag": "salt/bar", "data": {"b": 2}}]
+        evt.event_queue.extend(second)
+        evt.flush_events()
+        self.assertEqual(returner.call_args_list[0][0][0], second)
+        self.assertEqual(returner.call_args_list[1][0][0], first)
+        self.assertEqual(os.listdir(spool_path), [])
+        self.assertEqual(evt.stats["batches_replayed"], 1)
+
+    def test_event_return_spool_max_batches(self):
+        evt = self._event_return(
+            event_return_spool=True, event_return_spool_max_batches=2
+        )
+        evt.minion.returners["mysql.event_return"].side_effect = Exception("down")
+        for idx in range(3):
+            evt.event_queue.append({"tag": "salt/foo", "data": {"idx": idx}})
+            evt.flush_events()
+        spool_path = os.path.join(evt.spool_dir, "mysql")
+        self.assertEqual(len(os.listdir(spool_path)), 2)
+        self.assertEqual(evt.stats["batches_dropped"], 1)
+
+    def test_event_return_spool_during_replay(self):
+        """
+        Spooling does not wait for a replay in progress
+        """
+        evt = self._event_return(event_return_spool=True)
+        with evt._replay_lock:
+            evt._spool_batch("mysql.event_return", [{"tag": "salt/foo"}])
+            evt._spool_batch("mysql.event_return", [{"tag": "salt/bar"}])
+        spool_path = os.path.join(evt.spool_dir, "mysql")
+        self.assertEqual(len(os.listdir(spool_path)), 2)
+
+    def test_event_return_signal(self):
+        """
+        The signal handler only stops the loop, run() flushes the queue
+        before terminating
+        """
+        evt = self._event_return(event_return_queue=10)
+        events = [{"tag": "salt/foo", "data": {"a": 1}}]
+        bus = MagicMock()
+
+        def _get_event(**kwargs):
+            if bus.get_event.call_count == 1:
+                return events[0]
+            # Received while the main thread holds the stats lock
+            with evt._stats_lock:
+                evt._handle_signals(signal.SIGTERM, None)
+            return None
+
+        bus.get_event.side_effect = _get_event
+        with patch("salt.utils.event.get_event", MagicMock(return_value=bus)), patch(
+            "salt.utils.process.SignalHandlingProcess._handle_signals"
+        ) as handle_signals:
+            evt.run()
+        evt.minion.returners["mysql.event_return"].assert_called_once_with(events)
+        handle_signals.assert_called_once_with(signal.SIGTERM, None)
+
+    def test_event_return_writers(self):
+        evt = self._event_return(event_return_workers=2)
+        evt._start_writers()
+        writers = list(evt._writers)
+        for idx in range(5):
+            evt.event_queue.append({"tag": "salt/foo", "data": {"idx": idx}})
+            evt.flush_events()
+        with patch("threading.excepthook", MagicMock()) as excepthook:
+            evt._drain_writers()
+        excepthook.assert_not_called()
+        self.assertFalse(any(thread.is_alive() for thread in writers))
+        self.assertEqual(evt.minion.returners["mysql.event_return"].call_count, 5)
+        self.assertEqual(evt.stats["events_written"], 5)
+        self.assertEqual(evt._writers, [])
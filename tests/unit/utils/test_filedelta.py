@@ -0,0 +1,96 @@
+"""
+Tests for salt.utils.filedelta
+"""
+
+import io
+import os
+import random
+import zlib
+
+import salt.utils.filedelta
+from tests.support.mock import patch
+from tests.support.unit import TestCase
+
+
+class FileDeltaTestCase(TestCase):
+    block_size = 64
+
+    def _transfer(self, old, new, **kwargs):
+        sigs = salt.utils.filedelta.signatures(io.BytesIO(old), self.block_size)
+        basis = io.BytesIO(old)
+        out = io.BytesIO()
+        src = io.BytesIO(new)
+        loc = 0
+        all_ops = []
+        while True:
+            ops, loc, done = salt.utils.filedelta.delta(
+                src, sigs, self.block_size, loc, **kwargs
+            )
+            salt.utils.filedelta.apply(ops, basis, out, self.block_size)
+            all_ops.extend(ops)
+            if done:
+                break
+        self.assertEqual(out.getvalue(), new)
+        return all_ops
+
+    def test_roll(self):
+        data = bytes(random.getrandbits(8) for _ in range(300))
+        weak = zlib.adler32(data[: self.block_size])
+        for pos in range(len(data) - self.block_size):
+            weak = salt.utils.filedelta.roll(
+                weak, self.block_size, data[pos], data[pos + self.block_size]
+            )
+            self.assertEqual(
+                weak, zlib.adler32(data[pos + 1 : pos + 1 + self.block_size])
+            )
+
+    def test_unchanged(self):
+        data = os.urandom(self.block_size * 10 + 10)
+        ops = self._transfer(data, data)
+        self.assertEqual(ops[:10], list(range(10)))
+        self.assertEqual(ops[10:], [data[-10:]])
+
+    def test_changed(self):
+        old = os.urandom(self.block_size * 10)
+        # Modified block
+        new = old[:100] + b"x" + old[101:]
+        ops = self._transfer(old, new)
+        self.assertEqual(sum(isinstance(op, int) for op in ops), 9)
+        # Inserted data, the following blocks are found at their new offset
+        new = old[:100] + b"inserted" + old[100:]
+        ops = self._transfer(old, new)
+        self.assertEqual(sum(isinstance(op, int) for op in ops), 9)
+        # Truncated and grown
+        self._transfer(old, old[:300])
+        self._transfer(old, old + os.urandom(1000))
+        self._transfer(b"", old)
+        self._transfer(old, b"")
+
+    def test_limits(self):
+        old = os.urandom(self.block_size * 20)
+        new = os.urandom(self.block_size * 3) + old
+        ops = self._transfer(old, new, max_scan=self.block_size * 4)
+        self.assertEqual(sum(isinstance(op, int) for op in ops), 20)
+        # The literal data of a response is capped
+        ops = self._transfer(b"", new, max_literal=self.block_size)
+        self.assertTrue(all(len(op) <= self.block_size * 2 for op in ops))
+
+    def test_window(self):
+        """
+        The file is read in small parts, whatever the scan limit
+        """
+        old = os.urandom(self.block_size * 100)
+        new = old[:1000] + b"x" + old[1000:]
+        sigs = salt.utils.filedelta.signatures(io.BytesIO(old), self.block_size)
+        src = io.BytesIO(new)
+        reads = []
+        read = src.read
+        src.read = lambda size=-1: reads.append(size) or read(size)
+        with patch.object(salt.utils.filedelta, "READ_SIZE", self.block_size * 4):
+            ops, loc, done = salt.utils.filedelta.delta(src, sigs, self.block_size)
+        self.assertTrue(done)
+        self.assertEqual(loc, len(new))
+        self.assertTrue(all(0 < size <= self.block_size * 4 for size in reads))
+        out = io.BytesIO()
+        salt.utils.filedelta.apply(ops, io.BytesIO(old), out, self.block_size)
+        self.assertEqual(out.getvalue(), new)
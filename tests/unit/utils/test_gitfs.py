@@ -4,8 +4,10 @@ any remotes.
 """
 
 
+import hashlib
 import os
 import shutil
+import threading
 from time import time
 
 import salt.fileserver.gitfs
@@ -108,6 +110,185 @@ class TestGitBase(TestCase, AdaptedConfigurationTestCaseMixin):
         self.assertTrue(self.main_class.remotes[0].fetched)
         self.assertFalse(self.main_class.remotes[1].fetched)
 
+    def test_fetch_concurrently(self):
+        repo1, repo2 = self.main_class.remotes
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def _hang():
+            release.wait(10)
+
+        with patch.dict(salt.utils.gitfs._FETCH_BACKOFF, clear=True), patch.object(
+            salt.utils.gitfs, "_FETCH_RUNNING", set()
+        ), patch.dict(self.main_class.opts, {"gitfs_fetch_workers": 2}), patch.object(
+            repo1, "fetch", MagicMock(side_effect=_hang)
+        ), patch.object(
+            repo1, "fetch_timeout", 1
+        ), patch.object(
+            repo2, "fetch", MagicMock(return_value=True)
+        ), patch.object(
+            repo1, "envs", MagicMock(return_value=["base"])
+        ):
+            data = self.main_class.update()
+            self.assertTrue(data["changed"])
+            self.assertEqual(data["remotes"][repo1.id]["result"], "timeout")
+            self.assertEqual(data["remotes"][repo2.id]["result"], "changed")
+
+            # The local copy of the remote is left alone while its fetch runs
+            self.assertTrue(self.main_class.fetch_running(repo1))
+            self.main_class.envs(ignore_cache=True)
+            repo1.envs.assert_not_called()
+
+            # The remote which timed out is skipped for a while
+            data = self.main_class.update()
+            self.assertEqual(list(data["remotes"]), [repo2.id])
+            self.assertEqual(repo1.fetch.call_count, 1)
+            self.assertEqual(repo2.fetch.call_count, 2)
+
+            release.set()
+            for _ in range(100):
+                if not self.main_class.fetch_running(repo1):
+                    break
+                threading.Event().wait(0.1)
+            self.assertFalse(self.main_class.fetch_running(repo1))
+            data = self.main_class.update()
+            self.assertEqual(list(data["remotes"]), [repo2.id])
+
+    def test_fetch_timeout_frees_worker(self):
+        repo1, repo2 = self.main_class.remotes
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def _hang():
+            release.wait(10)
+
+        with patch.dict(salt.utils.gitfs._FETCH_BACKOFF, clear=True), patch.object(
+            salt.utils.gitfs, "_FETCH_RUNNING", set()
+        ), patch.dict(self.main_class.opts, {"gitfs_fetch_workers": 1}), patch.object(
+            repo1, "fetch", MagicMock(side_effect=_hang)
+        ), patch.object(
+            repo1, "fetch_timeout", 1
+        ), patch.object(
+            repo2, "fetch", MagicMock(return_value=True)
+        ):
+            # The remote queued behind the one which hangs is still fetched,
+            # and the update does not wait for the hung fetch
+            start = time()
+            self.main_class.fetch_remotes()
+            self.assertLess(time() - start, 5)
+            self.assertEqual(
+                self.main_class.fetch_results[repo1.id]["result"], "timeout"
+            )
+            self.assertEqual(
+                self.main_class.fetch_results[repo2.id]["result"], "changed"
+            )
+
+    def test_fetch_failed(self):
+        repo1, repo2 = self.main_class.remotes
+
+        def _locked():
+            repo2.fetch_locked = True
+            return False
+
+        with patch.dict(salt.utils.gitfs._FETCH_BACKOFF, clear=True), patch.object(
+            repo1, "fetch", MagicMock(return_value=False)
+        ), patch.object(repo2, "fetch", MagicMock(side_effect=_locked)), patch.object(
+            repo2, "fetch_locked", False, create=True
+        ):
+            # Serial fetches are retried on the next update
+            data = self.main_class.update()
+            self.assertEqual(data["remotes"][repo1.id]["result"], "failed")
+            self.assertEqual(data["remotes"][repo2.id]["result"], "locked")
+            self.assertEqual(salt.utils.gitfs._FETCH_BACKOFF, {})
+
+            # A remote locked by another process is not counted as a failure
+            with patch.dict(self.main_class.opts, {"gitfs_fetch_workers": 2}):
+                data = self.main_class.update()
+            self.assertEqual(
+                list(salt.utils.gitfs._FETCH_BACKOFF), [("gitfs", repo1.id)]
+            )
+            data = self.main_class.update()
+            self.assertEqual(list(data["remotes"]), [repo2.id])
+
+    def test_serve_blob(self):
+        repo = self.main_class.remotes[1]
+        dest = os.path.join(self.main_class.cache_root, "refs", "base", "foo.txt")
+        fnd = {
+            "path": dest,
+            "rel": "foo.txt",
+            "blob": "0123abcd",
+            "remote": repo.cachedir_basename,
+        }
+        load = {"path": "foo.txt", "loc": 4, "saltenv": "base"}
+        for cachedir in (self.main_class.hash_cachedir, os.path.dirname(dest)):
+            self.addCleanup(shutil.rmtree, cachedir, ignore_errors=True)
+        with patch.object(
+            repo, "read_blob", MagicMock(return_value=b"foo\nbar\n"), create=True
+        ):
+            self.assertEqual(
+                self.main_class.serve_file(load, fnd),
+                {"data": "bar\n", "dest": "foo.txt"},
+            )
+            self.assertEqual(
+                self.main_class.file_hash(load, fnd)["hsum"],
+                hashlib.new(
+                    self.main_class.opts["hash_type"], b"foo\nbar\n"
+                ).hexdigest(),
+            )
+            self.assertFalse(os.path.exists(dest))
+            # The contents are read once while the file is served
+            repo.read_blob.assert_called_once_with("0123abcd")
+
+            os.makedirs(os.path.dirname(dest))
+            self.assertEqual(self.main_class.materialize(fnd), dest)
+            with salt.utils.files.fopen(dest, "rb") as fp_:
+                self.assertEqual(fp_.read(), b"foo\nbar\n")
+
+    def test_blob_cache_size(self):
+        repo = self.main_class.remotes[1]
+        fnds = [
+            {"blob": oid, "remote": repo.cachedir_basename}
+            for oid in ("0123abcd", "4567abcd", "89abcdef")
+        ]
+        self.addCleanup(self.main_class.__dict__.pop, "_blob_cache", None)
+        with patch.object(salt.utils.gitfs, "BLOB_CACHE_SIZE", 16), patch.object(
+            repo, "read_blob", MagicMock(return_value=b"0123456789"), create=True
+        ):
+            for fnd in fnds:
+                self.main_class._blob_contents(fnd)
+            self.assertEqual(list(self.main_class._blob_cache), ["89abcdef"])
+            self.main_class._blob_contents(fnds[2])
+            self.assertEqual(repo.read_blob.call_count, 3)
+
+    def test_find_file_blob(self):
+        repo1, repo2 = self.main_class.remotes
+        for cachedir in (
+            self.main_class.hash_cachedir,
+            os.path.join(self.main_class.cache_root, "refs"),
+        ):
+            self.addCleanup(shutil.rmtree, cachedir, ignore_errors=True)
+        blob = MagicMock(size=10)
+        with patch.dict(self.main_class.opts, {"gitfs_write_blobs": False}), patch(
+            "salt.fileserver.wait_lock", MagicMock()
+        ) as wait_lock, patch.object(
+            repo1, "find_file", MagicMock(return_value=(None, None, None))
+        ), patch.object(
+            repo2, "find_file", MagicMock(return_value=(blob, "0123abcd", 0o644))
+        ), patch.object(
+            repo2, "write_file", MagicMock(), create=True
+        ):
+            fnd = self.main_class.find_file("foo.txt")
+            self.assertEqual(fnd["blob"], "0123abcd")
+            wait_lock.assert_not_called()
+            repo2.write_file.assert_not_called()
+
+            # Large files are written to the cache
+            blob.size = salt.utils.gitfs.BLOB_MAX_SIZE + 1
+            fnd = self.main_class.find_file("foo.txt")
+            self.assertNotIn("blob", fnd)
+            wait_lock.assert_called_once()
+            repo2.write_file.assert_called_once_with(blob, fnd["path"])
+
 
 class TestGitFSProvider(TestCase):
     def setUp(self):
@@ -319,3 +500,48 @@ class TestPygit2(TestCase):
         self.assertIn(provider.cachedir, provider.checkout())
         provider.branch = "does_not_exist"
         self.assertIsNone(provider.checkout())
+
+    def test_file_list_tree_index(self):
+        remote = os.path.join(tests.support.paths.TMP, "pygit2-repo")
+        cache = os.path.join(tests.support.paths.TMP, "pygit2-repo-cache")
+        self._prepare_remote_repository(remote)
+        provider = self._prepare_cache_repository(remote, cache)
+        provider.remotecallbacks = None
+        provider.credentials = None
+        provider.init_remote()
+        provider.fetch()
+        files, _ = provider.file_list("base")
+        self.assertEqual(files, {"README"})
+        blob, _, _ = provider.find_file("README", "base")
+        self.assertEqual(blob.data, b"This is an empty README file")
+
+        # Replace the README with a file in a subdirectory
+        repository = pygit2.Repository(remote)
+        signature = pygit2.Signature(
+            "Dummy Commiter", "dummy@dummy.com", int(time()), 0
+        )
+        subdir = repository.TreeBuilder()
+        subdir.insert(
+            "init.sls", repository.create_blob(b"foo: bar"), pygit2.GIT_FILEMODE_BLOB
+        )
+        builder = repository.TreeBuilder()
+        builder.insert("foo", subdir.write(), pygit2.GIT_FILEMODE_TREE)
+        repository.create_commit(
+            "HEAD",
+            signature,
+            signature,
+            "Replace the README",
+            builder.write(),
+            [repository.head.target],
+        )
+        provider.fetch()
+
+        # The index is updated from the diff of the trees
+        with patch.object(provider, "_build_tree_index", MagicMock()) as build:
+            files, _ = provider.file_list("base")
+            build.assert_not_called()
+        self.assertEqual(files, {"foo/init.sls"})
+        self.assertEqual(provider.dir_list("base"), {"foo"})
+        self.assertEqual(provider.find_file("README", "base"), (None, None, None))
+        blob, _, _ = provider.find_file("foo/init.sls", "base")
+        self.assertEqual(blob.data, b"foo: bar")
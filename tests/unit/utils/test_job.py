@@ -15,7 +15,7 @@ import salt.utils.job as job
 from salt.ext import six
 
 # Import Salt Testing Libs
-from tests.support.mock import patch
+from tests.support.mock import MagicMock, patch
 from tests.support.unit import TestCase, skipIf
 
 
@@ -69,3 +69,35 @@ class JobTest(TestCase):
                         "The specified 'foo' returner threw a stack trace",
                         logged.output[0],
                     )
+
+    def test_store_job_job_cache_queue(self):
+        """
+        test store_job hands the job cache write over to the queue, after the
+        return has been fired on the event bus
+        """
+        returner = MagicMock()
+        prep_jid = MagicMock()
+        event = MagicMock()
+        job_cache_queue = MagicMock()
+        load = {"jid": "20190618090114890985", "return": {"success": True}, "id": "a"}
+        with patch.object(salt.minion, "MasterMinion", MockMasterMinion), patch.dict(
+            MockMasterMinion.returners,
+            {"foo.returner": returner, "foo.prep_jid": prep_jid},
+        ), patch("salt.utils.verify.valid_id", return_value=True):
+            job.store_job(
+                MockMasterMinion.opts,
+                load,
+                event=event,
+                job_cache_queue=job_cache_queue,
+            )
+            event.fire_event.assert_called_once()
+            prep_jid.assert_not_called()
+            returner.assert_not_called()
+            job_cache_queue.put.assert_called_once()
+
+            queued_load, endtime, req = job_cache_queue.put.call_args[0][0]
+            self.assertIs(queued_load, load)
+            self.assertFalse(req)
+            job.write_job_cache(MockMasterMinion.opts, queued_load, endtime, req=req)
+            prep_jid.assert_called_once_with(False, passed_jid=load["jid"])
+            returner.assert_called_once_with(load)
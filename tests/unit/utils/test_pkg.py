@@ -1,6 +1,12 @@
+import os
+import shutil
+import tempfile
+
+import salt.utils.files
 import salt.utils.pkg
 from salt.utils.pkg import rpm
-from tests.support.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, Mock, patch
+from tests.support.mock import MagicMock, Mock, patch
+from tests.support.runtests import RUNTIME_VARS
 from tests.support.unit import TestCase, skipIf
 
 try:
@@ -98,3 +104,53 @@ class PkgRPMTestCase(TestCase):
         :return:
         """
         assert rpm.get_osarch() == "unknown"
+
+
+class PkgInventoryTestCase(TestCase):
+    """
+    Test case for the package inventory cache
+    """
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        self.db = os.path.join(self.cachedir, "status")
+        self._write_db("Package: foo\n")
+        self.opts = {"cachedir": self.cachedir, "pkg_inventory_cache": True}
+
+    def _write_db(self, data):
+        with salt.utils.files.fopen(self.db, "w") as fp_:
+            fp_.write(data)
+
+    def _cached(self, gen, key="list_pkgs"):
+        return salt.utils.pkg.cached_inventory(self.opts, "dpkg", key, [self.db], gen)
+
+    def test_cached_inventory(self):
+        gen = MagicMock(return_value={"foo": "1.0"})
+        self.assertEqual(self._cached(gen), {"foo": "1.0"})
+        self.assertEqual(self._cached(gen), {"foo": "1.0"})
+        self.assertEqual(gen.call_count, 1)
+
+        # Other queries are cached separately
+        other = MagicMock(return_value={"foo": {"version": "1.0"}})
+        self.assertEqual(
+            self._cached(other, ["info_installed", ["foo"]]),
+            {"foo": {"version": "1.0"}},
+        )
+        self._cached(other, ["info_installed", ["foo"]])
+        self.assertEqual(other.call_count, 1)
+
+        # A change to the database invalidates the cache
+        self._write_db("Package: foo\n\nPackage: bar\n")
+        gen.return_value = {"foo": "1.0", "bar": "2.0"}
+        self.assertEqual(self._cached(gen), {"foo": "1.0", "bar": "2.0"})
+        self.assertEqual(gen.call_count, 2)
+
+    def test_cached_inventory_disabled(self):
+        self.opts["pkg_inventory_cache"] = False
+        self.assertIsNone(salt.utils.pkg.inventory_stamp(self.opts, [self.db]))
+        gen = MagicMock(return_value={"foo": "1.0"})
+        self._cached(gen)
+        self._cached(gen)
+        self.assertEqual(gen.call_count, 2)
+        self.assertFalse(os.path.exists(os.path.join(self.cachedir, "pkg_inventory")))
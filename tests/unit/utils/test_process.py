@@ -232,6 +232,21 @@ class TestThreadPool(TestCase):
         # make sure the queue is still full
         self.assertEqual(pool._job_queue.qsize(), 1)
 
+    @slowTest
+    def test_stats(self):
+        """
+        Make sure the threadpool tracks the time jobs wait in the queue
+        """
+        pool = salt.utils.process.ThreadPool(1)
+        self.assertTrue(pool.fire_async(time.sleep, args=(0.5,)))
+        self.assertTrue(pool.fire_async(time.sleep, args=(0,)))
+        time.sleep(1.5)  # Sleep to let the threads do things
+        stats = pool.stats(reset=True)
+        self.assertEqual(stats["jobs"], 2)
+        self.assertEqual(stats["depth"], 0)
+        self.assertGreaterEqual(stats["wait_max"], 0.4)
+        self.assertEqual(pool.stats()["jobs"], 0)
+
 
 class TestProcess(TestCase):
     def test_daemonize_if(self):
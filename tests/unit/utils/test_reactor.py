@@ -3,6 +3,7 @@
 from __future__ import absolute_import, print_function, unicode_literals
 
 import codecs
+import fnmatch
 import glob
 import logging
 import os
@@ -422,6 +423,78 @@ class TestReactor(TestCase, AdaptedConfigurationTestCaseMixin):
                     self.reactor.list_reactors(tag), self.reaction_map[tag]
                 )
 
+    def test_reactor_matcher(self):
+        """
+        Ensure that the matcher returns the same reactors as fnmatch over
+        the reactor map, in map order
+        """
+        react_map = [
+            {"salt/minion/*/start": "/srv/reactor/start.sls"},
+            {"salt/minion/web01/start": ["/srv/reactor/web.sls"]},
+            {"salt/minion/web??/start": "/srv/reactor/web_glob.sls"},
+            {"salt/minion/db[0-9]*": "/srv/reactor/db.sls"},
+            {"*": "/srv/reactor/all.sls"},
+            {"salt/key": "/srv/reactor/key.sls"},
+        ]
+        matcher = reactor.ReactorMatcher(react_map)
+        for tag in (
+            "salt/minion/web01/start",
+            "salt/minion/web1/start",
+            "salt/minion/db1/start",
+            "salt/minion/dbx/start",
+            "salt/key",
+            "salt/keys",
+            "",
+        ):
+            expected = []
+            for ropt in react_map:
+                key, val = next(iter(ropt.items()))
+                if fnmatch.fnmatch(tag, key):
+                    expected.extend([val] if isinstance(val, str) else val)
+            self.assertEqual(matcher.match(tag), expected)
+            # memoized results are not shared with the caller
+            matcher.match(tag).append("bogus")
+            self.assertEqual(matcher.match(tag), expected)
+
+    def test_list_reactors_rebuild(self):
+        """
+        Ensure that the tag index is rebuilt when reactors are added or
+        deleted
+        """
+        opts = self.get_temp_config("master")
+        opts["reactor"] = [{"foo/*": "/srv/reactor/foo.sls"}]
+        with patch("salt.minion.MasterMinion"):
+            reactor_ = reactor.Reactor(opts)
+        reactor_.minion.opts = opts
+        self.assertEqual(reactor_.list_reactors("bar/baz"), [])
+        reactor_.add_reactor("bar/*", ["/srv/reactor/bar.sls"])
+        self.assertEqual(reactor_.list_reactors("bar/baz"), ["/srv/reactor/bar.sls"])
+        reactor_.delete_reactor("bar/*")
+        self.assertEqual(reactor_.list_reactors("bar/baz"), [])
+
+    def test_render_reaction_code_cache(self):
+        """
+        Ensure that the compiled template cache is enabled through the
+        renderer options, and not leaked into the template context
+        """
+        self.assertTrue(self.reactor.minion.opts["_jinja_code_cache"])
+        fn_ = os.path.join(self.opts["cachedir"], "code_cache.sls")
+        with salt.utils.files.fopen(fn_, "w") as fp_:
+            fp_.write(
+                textwrap.dedent(
+                    """\
+                    leaked:
+                      runner.test.arg:
+                        - arg:
+                          - {{ _jinja_code_cache is defined }}
+                          - {{ data.foo }}
+                    """
+                )
+            )
+        for foo in ("bar", "baz"):
+            react = self.reactor.render_reaction(fn_, "foo/bar", {"foo": foo})
+            self.assertIn({"arg": [False, foo]}, react["leaked"]["runner"])
+
     def test_reactions(self):
         """
         Ensure that the correct reactions are built from the configured SLS
@@ -462,6 +535,26 @@ class TestReactor(TestCase, AdaptedConfigurationTestCaseMixin):
                                     )
                                     self.assertEqual(reactions, LOW_CHUNKS[tag])
 
+    def test_coalesce(self):
+        """
+        Ensure that identical reactions are only called once within the
+        coalesce window
+        """
+        chunk = LOW_CHUNKS["new_runner"][0]
+        wrap = Mock()
+        with patch.object(self.reactor, "wrap", wrap, create=True), patch.dict(
+            self.reactor.opts, {"reactor_coalesce_window": 60}
+        ), patch.object(self.reactor, "recent_chunks", {}):
+            self.reactor.call_reactions([chunk, chunk])
+            self.reactor.call_reactions([chunk])
+        wrap.run.assert_called_once_with(chunk)
+
+        # Without a window every reaction is called
+        wrap = Mock()
+        with patch.object(self.reactor, "wrap", wrap, create=True):
+            self.reactor.call_reactions([chunk, chunk])
+        self.assertEqual(wrap.run.call_count, 2)
+
 
 class TestReactWrap(TestCase, AdaptedConfigurationTestCaseMixin):
     """
@@ -506,6 +599,26 @@ class TestReactWrap(TestCase, AdaptedConfigurationTestCaseMixin):
                 self.wrap.client_cache["wheel"].low, args=WRAPPER_CALLS[tag]
             )
 
+    def test_worker_pools(self):
+        """
+        Test that runner and wheel reactions get their own pool when
+        reactor_worker_threads is a dict
+        """
+        opts = self.get_temp_config("master")
+        opts["reactor_worker_threads"] = {"runner": 2, "wheel": 1}
+        wrap = reactor.ReactWrap(opts)
+        self.assertEqual(wrap.pools["runner"].num_threads, 2)
+        self.assertEqual(wrap.pools["wheel"].num_threads, 1)
+        self.assertEqual(sorted(wrap.pool_stats()), ["runner", "wheel"])
+        for rtype in ("runner", "wheel"):
+            tag = "_".join(("new", rtype))
+            thread_pool = Mock()
+            with patch.dict(wrap.pools, {rtype: thread_pool}):
+                wrap.run(LOW_CHUNKS[tag][0])
+            thread_pool.fire_async.assert_called_with(
+                wrap.client_cache[rtype].low, args=WRAPPER_CALLS[tag]
+            )
+
     def test_local(self):
         """
         Test local reactions using both the old and new config schema
@@ -0,0 +1,45 @@
+"""
+Unit tests for salt.utils.ringbuffer
+"""
+
+import statistics
+
+import salt.utils.ringbuffer
+from tests.support.unit import TestCase
+
+
+class RingBufferTestCase(TestCase):
+    def test_eviction(self):
+        ring = salt.utils.ringbuffer.RingBuffer(3, [5, 1, 4, 2])
+        self.assertEqual(len(ring), 3)
+        self.assertEqual(list(ring), [1, 4, 2])
+        self.assertEqual(ring.ordered, [1, 2, 4])
+        self.assertEqual(ring.last(2), [2, 4])
+
+    def test_aggregates(self):
+        values = [3, 9, 1, 7, 5, 8, 2, 6, 4, 10, 11, 12]
+        ring = salt.utils.ringbuffer.RingBuffer(10)
+        for idx, value in enumerate(values):
+            ring.append(value)
+            window = values[max(0, idx - 9) : idx + 1]
+            self.assertEqual(ring.sum, sum(window))
+            self.assertEqual(ring.mean(), statistics.mean(window))
+            self.assertEqual(ring.median(), statistics.median(window))
+            self.assertEqual(ring.median_low(), statistics.median_low(window))
+            self.assertEqual(ring.median_high(), statistics.median_high(window))
+
+    def test_percentile(self):
+        ring = salt.utils.ringbuffer.RingBuffer(100, range(1, 101))
+        self.assertEqual(ring.percentile(95), 95)
+        self.assertEqual(ring.percentile(0), 1)
+        self.assertEqual(ring.percentile(100), 100)
+        ring.append(101)
+        self.assertEqual(ring.percentile(50), 51)
+        # The order is kept until the next sample
+        self.assertIs(ring.ordered, ring.ordered)
+        ring.append(0)
+        self.assertEqual(ring.percentile(0), 0)
+
+    def test_size(self):
+        with self.assertRaises(ValueError):
+            salt.utils.ringbuffer.RingBuffer(0)
@@ -40,7 +40,12 @@ EXPECTED = {
             "some_server": "foo.southeast.example.com",
         },
     },
-    "host3": {"host": "host3", "passwd": "test123", "minion_opts": {}},
+    "host3": {
+        "host": "host3",
+        "passwd": "test123",
+        "minion_opts": {},
+        "grains": {"os": "Debian", "roles": ["web", "db"]},
+    },
     "host4": "host4.example.com",  # For testing get_data -> string_types branch
     "host5": None,  # For testing get_data -> False
 }
@@ -94,6 +99,30 @@ class RosterMatcherTestCase(TestCase, mixins.LoaderModuleMockMixin):
         self.assertIn("host4", result)
         self.assertNotIn("host5", result)
 
+    def test_ret_glob_literal_minions(self):
+        """
+        Test that we return the minion named by a glob without wildcards.
+        """
+        result = salt.utils.roster_matcher.targets(EXPECTED, "host2", "glob")
+        self.assertEqual(["host2"], list(result))
+        result = salt.utils.roster_matcher.targets(EXPECTED, "host6", "glob")
+        self.assertEqual({}, result)
+
+    def test_ret_grain_minions(self):
+        """
+        Test that we return minions whose roster grains match.
+        """
+        result = salt.utils.roster_matcher.targets(EXPECTED, "os:Deb*", "grain")
+        self.assertEqual(["host3"], list(result))
+        result = salt.utils.roster_matcher.targets(EXPECTED, "roles:web", "grain")
+        self.assertEqual(["host3"], list(result))
+        result = salt.utils.roster_matcher.targets(
+            EXPECTED, "os:^(Debian|Ubuntu)$", "grain_pcre"
+        )
+        self.assertEqual(["host3"], list(result))
+        result = salt.utils.roster_matcher.targets(EXPECTED, "os:RedHat", "grain")
+        self.assertEqual({}, result)
+
     def test_ret_pcre_minions(self):
         """
         Test that we return minions matching a regular expression.
@@ -55,6 +55,18 @@ class RenderTestCase(TestCase):
         res = salt.utils.templates.render_jinja_tmpl(tmpl, ctx)
         self.assertEqual(res, "OK")
 
+    def test_render_jinja_code_cache(self):
+        tmpl = """{{ var }}"""
+
+        ctx = dict(self.context)
+        ctx["opts"] = dict(ctx["opts"], _jinja_code_cache=True)
+        salt.utils.templates.JINJA_CODE_CACHE.clear()
+        for var in ("OK", "ALSO OK"):
+            ctx["var"] = var
+            res = salt.utils.templates.render_jinja_tmpl(tmpl, dict(ctx))
+            self.assertEqual(res, var)
+        self.assertEqual(len(salt.utils.templates.JINJA_CODE_CACHE), 1)
+
     ### Tests for mako template
     def test_render_mako_sanity(self):
         tmpl = """OK"""
@@ -13,6 +13,7 @@ import tempfile
 import jinja2
 import salt.exceptions
 import salt.ext.six
+import salt.utils.files
 import salt.utils.hashutils
 import salt.utils.json
 import salt.utils.platform
@@ -1298,3 +1299,63 @@ class SSHThinTestCase(TestCase):
                 check=False,
             )
             assert ret.exitcode == 0, ret
+
+    def test_gen_thin_layers(self):
+        """
+        Test the thin layers only change when their content changes, and are
+        unpacked by the shim only when missing on the target
+        """
+        import salt.client.ssh.ssh_py_shim as shim
+
+        tmp_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        cachedir = os.path.join(tmp_dir, "cache")
+        tops = []
+        for mod in ("salt", "dep"):
+            top = os.path.join(tmp_dir, "lib", mod)
+            os.makedirs(top)
+            with salt.utils.files.fopen(os.path.join(top, "__init__.py"), "w") as fp_:
+                fp_.write("# {}\n".format(mod))
+            tops.append(top)
+
+        with patch("salt.utils.thin.get_tops", MagicMock(return_value=tops)):
+            layers = thin.gen_thin_layers(cachedir)
+            assert [layer[0] for layer in layers] == ["deps", "meta", "salt"]
+            with salt.utils.files.fopen(
+                os.path.join(tops[0], "__init__.py"), "a"
+            ) as fp_:
+                fp_.write("# changed\n")
+            new_layers = thin.gen_thin_layers(cachedir, overwrite=True)
+        assert new_layers[0] == layers[0]
+        assert new_layers[2][1] != layers[2][1]
+        assert not os.path.exists(thin.thin_layer_path(cachedir, layers[2][1]))
+
+        saltdir = os.path.join(tmp_dir, "thin_dir")
+        os.makedirs(saltdir)
+        shim_opts = {
+            "saltdir": saltdir,
+            "layers": new_layers,
+            "hashfunc": "sha1",
+            "delimiter": "_delim_",
+        }
+        stdout = salt.ext.six.moves.StringIO()
+        with patch.multiple(shim.OPTIONS, create=True, **shim_opts):
+            with patch("sys.stdout", stdout), self.assertRaises(SystemExit):
+                shim.check_layers()
+            assert stdout.getvalue() == "_delim_\nlayers {}\n".format(
+                " ".join(layer[1] for layer in new_layers)
+            )
+            for _, digest, _ in new_layers:
+                shutil.copy(
+                    thin.thin_layer_path(cachedir, digest),
+                    os.path.join(saltdir, "layer-{}.tgz".format(digest)),
+                )
+            shim.check_layers()
+            # Nothing is missing anymore
+            shim.check_layers()
+        assert os.path.isfile(os.path.join(saltdir, "salt-call"))
+        with salt.utils.files.fopen(
+            os.path.join(saltdir, "pyall", "salt", "__init__.py")
+        ) as fp_:
+            assert fp_.read() == "# salt\n# changed\n"
+        assert not [f for f in os.listdir(saltdir) if f.startswith("layer-")]